@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+memory and speed of the two board representations, on boards from 10x10 to 500x500: GameInfo (a dict of field
+objects) vs ArrayGameInfo (numpy arrays, see board.py). memory is measured with tracemalloc.
+the operations: recalculating all the distances to pieces, finding the task fields without a piece, and merging
+another player's knowledge of the board (taking every field it has seen more recently).
+    PYTHONPATH=../.. python bench_board.py
+"""
+import tracemalloc
+from argparse import ArgumentParser
+from datetime import timedelta
+from random import Random
+from time import perf_counter
+
+from src.communication.board import ArrayGameInfo
+from src.communication.info import GameInfo
+
+BOARD_SIZES = [10, 50, 100, 250, 500]  # board width and task area height
+
+
+def create(cls, size):
+    game_info = cls(board_width=size, task_height=size, goals_height=max(1, size // 10))
+    game_info.initialize_fields()
+    return game_info
+
+
+def memory(cls, size) -> int:
+    tracemalloc.start()
+    game_info = create(cls, size)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del game_info
+    return used
+
+
+def place_pieces(game_info, pieces, seed=11):
+    random = Random(seed)
+    locations = random.sample(list(game_info.task_fields.keys()), pieces)
+    for i, (x, y) in enumerate(locations):
+        game_info.add_piece(str(i), x, y)
+
+
+def empty_fields(game_info):
+    if isinstance(game_info, ArrayGameInfo):
+        return game_info.empty_task_fields()
+    return [location for location, field in game_info.task_fields.items() if not field.has_piece]
+
+
+def merge(own, other):
+    if isinstance(own, ArrayGameInfo):
+        return own.merge(other)
+    updated = 0
+    for fields, other_fields in ((own.task_fields, other.task_fields), (own.goal_fields, other.goal_fields)):
+        for location, field in fields.items():
+            other_field = other_fields[location]
+            if other_field.timestamp > field.timestamp:
+                fields[location] = other_field
+                updated += 1
+    return updated
+
+
+def measure(call, seconds) -> float:
+    """
+    :returns: ms per call
+    """
+    calls = 0
+    started = perf_counter()
+    while calls == 0 or perf_counter() - started < seconds:
+        call()
+        calls += 1
+    return (perf_counter() - started) / calls * 1e3
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-t', '--time', type=float, default=1, help='Seconds to run each variant for.')
+    args = vars(parser.parse_args())
+
+    print("%-8s %-10s %12s %12s %9s" % ("board", "", "GameInfo", "numpy", "ratio"))
+    for size in BOARD_SIZES:
+        results = []
+        for cls in (GameInfo, ArrayGameInfo):
+            used = memory(cls, size)
+
+            game_info = create(cls, size)
+            place_pieces(game_info, max(1, size * size // 100))
+            other = create(cls, size)
+            # the other player has seen a quarter of the board more recently:
+            for location, field in list(other.task_fields.items())[::4]:
+                field.timestamp = field.timestamp + timedelta(seconds=1)
+
+            results.append((used / 1024 / 1024,
+                            measure(game_info.update_field_distances, args["time"]),
+                            measure(lambda: empty_fields(game_info), args["time"]),
+                            measure(lambda: merge(create(cls, size), other), args["time"])))
+
+        name = "%dx%d" % (size, size)
+        for label, before, after in zip(["memory MB", "distances", "empty", "merge"], *results):
+            print("%-8s %-10s %12.3f %12.3f %8.0fx" % (name, label + ("" if label == "memory MB" else " ms"),
+                                                       before, after, before / after))
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+contention on the GameMaster's scheduler, the only thread changing the game: 1 to 8 threads (as the receiving
+threads of a server would) dispatch the Discover actions of their own player as fast as they can, with no cost, while
+another thread keeps reading the game's snapshot. throughput of the actions, how long they waited for the worker
+(lateness), how long scheduling them waited for the scheduler's lock, the longest queue and how busy the worker was.
+    PYTHONPATH=../.. python bench_contention.py
+"""
+import os
+import uuid
+from argparse import ArgumentParser
+from threading import Thread, Event
+from time import perf_counter, sleep
+
+from src.communication import gamemaster, messages, decoding
+from src.communication.gamemaster import GameMaster
+from src.communication.info import Allegiance, PlayerType
+
+messages.set_validation_policy(messages.ValidationMode.OFF)
+
+THREADS = [1, 2, 4, 8]
+
+
+class BenchGameMaster(GameMaster):
+    def send(self, message):
+        pass
+
+
+def game_master(players: int) -> tuple:
+    gm = BenchGameMaster(settings_file=os.path.join(os.path.dirname(gamemaster.__file__), "GameMasterSettings.xml"))
+    gm.socket.close()
+    gm.team_limit = (players + 1) // 2
+    gm.action_costs = {message_type: 0 for message_type in gm.action_costs}
+    guids = []
+    for i in range(players):
+        guid = str(uuid.uuid4())
+        gm.add_player(str(i), PlayerType.MEMBER.value, Allegiance.RED.value if i % 2 else Allegiance.BLUE.value, guid)
+        guids.append(guid)
+    gm.set_up_game()
+    gm.game_on = True
+    return gm, guids
+
+
+def contention(threads: int, actions: int) -> dict:
+    """
+    :param actions: number of actions dispatched by every thread
+    """
+    gm, guids = game_master(threads)
+    gm.scheduler.start()
+    done = Event()
+    reads = [0]
+
+    def dispatch(guid):
+        message = decoding.Discover.from_attributes({"gameId": gm.info.id, "playerGuid": guid})
+        for i in range(actions):
+            gm.dispatch(message)
+
+    def read():
+        while not done.is_set():
+            snapshot = gm.snapshot
+            reads[0] += snapshot["players"] > 0
+
+    reader = Thread(target=read)
+    producers = [Thread(target=dispatch, args=[guid]) for guid in guids]
+    reader.start()
+    started = perf_counter()
+    for producer in producers:
+        producer.start()
+    for producer in producers:
+        producer.join()
+    while gm.scheduler.executed < threads * actions:
+        sleep(0.001)
+    elapsed = perf_counter() - started
+    done.set()
+    reader.join()
+    gm.scheduler.stop()
+
+    stats = gm.scheduler.stats()
+    return {"actions/s": threads * actions / elapsed, "lateness ms": stats["mean_lateness"] * 1e3,
+            "lock wait us": stats["mean_lock_wait"] * 1e6, "max lock wait ms": stats["max_lock_wait"] * 1e3,
+            "max queued": stats["max_queued"], "worker busy %": stats["busy_time"] / elapsed * 100,
+            "snapshot reads/s": reads[0] / elapsed}
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-n', '--number', type=int, default=20000, help='Number of actions dispatched per thread.')
+    args = vars(parser.parse_args())
+
+    columns = ["actions/s", "lateness ms", "lock wait us", "max lock wait ms", "max queued", "worker busy %",
+               "snapshot reads/s"]
+    print("%-8s" % "threads" + "".join("%18s" % column for column in columns))
+    for threads in THREADS:
+        result = contention(threads, args["number"])
+        print("%-8d" % threads + "".join("%18.2f" % result[column] for column in columns))
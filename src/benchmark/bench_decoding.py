@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+cost of decoding received messages. "ET + substrings" is how Player and GameMaster used to read them: ET.fromstring,
+picking the type with substring checks and a findall for each child collection. "decode" is the decoding module:
+the type is read from the header and the children are parsed only by the messages which need them.
+    PYTHONPATH=../.. python bench_decoding.py
+"""
+import xml.etree.ElementTree as ET
+from argparse import ArgumentParser
+from timeit import timeit, repeat
+
+from src.communication import messages
+from src.communication.decoding import decode
+from src.communication.info import TaskFieldInfo, PieceInfo
+
+GUID = "c094cab7-da7b-457f-89e5-a5c51756035f"
+TAG = "{https://se2.mini.pw.edu.pl/17-results/}"
+GM_TYPES = ["Move", "Discover", "PlacePiece", "PickUpPiece", "TestPiece"]
+
+
+def old_gm(message):
+    root = ET.fromstring(message)
+    guid = root.attrib.get("playerGuid")
+    for message_type in GM_TYPES:
+        if message_type in message:
+            return message_type, guid, root.get("direction")
+
+
+def new_gm(message):
+    message = decode(message)
+    return message.tag, message.player_guid, message.get("direction")
+
+
+def old_data(message):
+    root = ET.fromstring(message)
+    read = 0
+    for task_field_list in root.findall(TAG + "TaskFields"):
+        for task_field in task_field_list.findall(TAG + "TaskField"):
+            read += int(task_field.attrib.get('x'))
+    for piece_list in root.findall(TAG + "Pieces"):
+        for piece in piece_list.findall(TAG + "Piece"):
+            read += len(piece.attrib.get('id'))
+    for player_location in root.findall(TAG + "PlayerLocation"):
+        read += int(player_location.attrib.get('x'))
+    return read
+
+
+def new_data(message):
+    message = decode(message)
+    read = 0
+    for task_field in message.task_fields:
+        read += int(task_field.get('x'))
+    for piece in message.pieces:
+        read += len(piece.get('id'))
+    if message.player_location is not None:
+        read += message.player_location[0]
+    return read
+
+
+def workload():
+    neighbourhood = {(x, y): TaskFieldInfo(x, y, distance_to_piece=1) for x in range(3) for y in range(4, 7)}
+    board = {(x, y): TaskFieldInfo(x, y, distance_to_piece=1) for x in range(10) for y in range(3, 13)}
+    return [
+        ("Move", old_gm, new_gm, messages.Move("0", GUID, "up")),
+        ("Discover", old_gm, new_gm, messages.Discover("0", GUID)),
+        ("TestPiece", old_gm, new_gm, messages.TestPiece("0", GUID)),
+        ("Data (empty)", old_data, new_data, messages.Data("1", False)),
+        ("Data (Move)", old_data, new_data, messages.Data("1", False, {(1, 5): neighbourhood[1, 5]},
+                                                          player_location=(1, 5))),
+        ("Data (Discover)", old_data, new_data, messages.Data("1", False, neighbourhood,
+                                                              pieces={"2": PieceInfo("2")})),
+        ("Data (board)", old_data, new_data, messages.Data("1", False, board)),
+    ]
+
+
+def measure(read, message, seconds):
+    # best of a few runs, a single slow run says more about the machine than about the decoding
+    number = max(1, int(seconds * 1e6 / 5 / max(1.0, timeit(lambda: read(message), number=10) / 10 * 1e6)))
+    return min(repeat(lambda: read(message), number=number, repeat=5)) / number * 1e6
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-t', '--time', type=float, default=0.5, help='Seconds to run each variant for.')
+    args = vars(parser.parse_args())
+
+    print("%-16s %16s %10s %9s" % ("us per message", "ET + substrings", "decode", "speed-up"))
+    for name, old, new, message in workload():
+        assert old(message) == new(message)
+        before = measure(old, message, args["time"])
+        after = measure(new, message, args["time"])
+        print("%-16s %16.2f %10.2f %8.1fx" % (name, before, after, before / after))
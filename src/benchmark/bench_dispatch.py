@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+latency of dispatching a player's action in the GameMaster (decoding it, finding the handler and the player),
+with 4 to 1,000 players in the game. "linear scan" is how the player used to be found: going through all the teams
+and comparing guids. "index" is the guid => PlayerInfo dict kept by add_player/remove_player.
+    PYTHONPATH=../.. python bench_dispatch.py
+"""
+import os
+import uuid
+from argparse import ArgumentParser
+from timeit import timeit, repeat
+
+from src.communication import gamemaster, messages
+from src.communication.gamemaster import GameMaster
+from src.communication.info import Allegiance, PlayerType
+
+PLAYER_COUNTS = [4, 16, 100, 1000]
+
+
+class BenchGameMaster(GameMaster):
+    """
+    handlers are not run, only the dispatch itself is measured.
+    """
+
+    def run_handler(self, handler, message, player_info):
+        self.last_dispatched = player_info
+
+
+class LinearScanGameMaster(BenchGameMaster):
+    def find_player_by_guid(self, guid):
+        for team in self.info.teams.values():
+            for player in team:
+                if team[player].guid == guid:
+                    return team[player]
+
+
+def game_master(cls, players: int):
+    # the settings are read from the working directory
+    working_directory = os.getcwd()
+    os.chdir(os.path.dirname(os.path.abspath(gamemaster.__file__)))
+    try:
+        gm = cls()
+    finally:
+        os.chdir(working_directory)
+    gm.socket.close()
+    gm.team_limit = players // 2
+
+    guids = []
+    for i in range(players):
+        guid = str(uuid.uuid4())
+        gm.add_player(str(i), PlayerType.MEMBER.value, Allegiance.RED.value if i % 2 else Allegiance.BLUE.value, guid)
+        guids.append(guid)
+    return gm, guids
+
+
+def measure(dispatch, message, seconds):
+    # best of a few runs, a single slow run says more about the machine than about the dispatch
+    number = max(1, int(seconds * 1e6 / 5 / max(1.0, timeit(lambda: dispatch(message), number=10) / 10 * 1e6)))
+    return min(repeat(lambda: dispatch(message), number=number, repeat=5)) / number * 1e6
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-t', '--time', type=float, default=0.5, help='Seconds to run each variant for.')
+    args = vars(parser.parse_args())
+
+    print("%-16s %12s %10s %9s" % ("us per action", "linear scan", "index", "speed-up"))
+    for players in PLAYER_COUNTS:
+        old_gm, old_guids = game_master(LinearScanGameMaster, players)
+        new_gm, new_guids = game_master(BenchGameMaster, players)
+        # the last player to join is the worst case for the scan
+        old_message = messages.Move("1", old_guids[-1], "up")
+        new_message = messages.Move("1", new_guids[-1], "up")
+
+        old_gm.dispatch(old_message)
+        new_gm.dispatch(new_message)
+        assert old_gm.last_dispatched.id == new_gm.last_dispatched.id == str(players - 1)
+
+        before = measure(old_gm.dispatch, old_message, args["time"])
+        after = measure(new_gm.dispatch, new_message, args["time"])
+        print("%-16s %12.2f %10.2f %8.1fx" % (str(players) + " players", before, after, before / after))
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+cost of updating distance_to_piece after a piece is picked up and a new one is placed, on boards of growing size.
+"full recompute" is how update_field_distances used to do it: every piece checked for every task field.
+"incremental" is GameInfo.set_piece_location, which only touches the fields whose distance changes.
+    PYTHONPATH=../.. python bench_distances.py
+"""
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+
+from src.communication.helpful_math import Manhattan_Distance as manhattan
+from src.communication.info import GameInfo, PieceInfo
+
+# (board width, task area height, number of pieces)
+BOARDS = [(10, 10, 10), (30, 30, 50), (100, 100, 300)]
+
+
+def full_recompute(game_info: GameInfo):
+    for field in game_info.task_fields.values():
+        min_piece, min_dist = None, None
+        for piece in [piece for piece in game_info.pieces.values() if piece.location is not None]:
+            if piece.location == field.location:
+                min_dist = 0
+                break
+            if min_dist is None:
+                min_piece, min_dist = piece, manhattan(field.location, piece.location)
+            if manhattan(field.location, piece.location) <= min_dist:
+                min_piece, min_dist = piece, manhattan(field.location, piece.location)
+        field.distance_to_piece = min_dist
+
+
+def game(width, height, pieces, seed=7):
+    game_info = GameInfo(board_width=width, task_height=height, goals_height=3)
+    game_info.initialize_fields()
+    random = Random(seed)
+    free = list(game_info.task_fields.keys())
+    random.shuffle(free)
+    for i in range(pieces):
+        game_info.add_piece(str(i), *free.pop())
+    return game_info, free, random
+
+
+def events(game_info, free, random):
+    """
+    :returns: generator of (piece id, new location) pairs: a piece is picked up, then put down somewhere else.
+    """
+    while True:
+        piece = game_info.pieces[str(random.randrange(len(game_info.pieces)))]
+        if piece.location is None:
+            continue
+        free.insert(random.randrange(len(free) + 1), piece.location)
+        yield piece.id, None
+        yield piece.id, free.pop()
+
+
+def measure(width, height, pieces, incremental, seconds):
+    game_info, free, random = game(width, height, pieces)
+    handled = 0
+    started = perf_counter()
+    for piece_id, location in events(game_info, free, random):
+        if incremental:
+            game_info.set_piece_location(piece_id, location)
+        else:
+            game_info.pieces[piece_id].location = location
+            full_recompute(game_info)
+        handled += 1
+        if perf_counter() - started > seconds:
+            return (perf_counter() - started) / handled * 1e3
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-t', '--time', type=float, default=2, help='Seconds to run each variant for.')
+    args = vars(parser.parse_args())
+
+    print("%-22s %15s %12s %9s" % ("ms per event", "full recompute", "incremental", "speed-up"))
+    for width, height, pieces in BOARDS:
+        before = measure(width, height, pieces, False, args["time"])
+        after = measure(width, height, pieces, True, args["time"])
+        print("%-22s %15.3f %12.3f %8.0fx" % ("%dx%d, %d pieces" % (width, height, pieces), before, after,
+                                             before / after))
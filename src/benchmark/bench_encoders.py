@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""
+encoding the messages players send every turn: building the lxml tree (what the builders do when a message has to be
+validated) vs the precompiled templates (what they do otherwise). "speed-up" compares the builders with validation
+switched off to how they used to work (tree + validation).
+    PYTHONPATH=../.. python bench_encoders.py
+"""
+from argparse import ArgumentParser
+from time import perf_counter
+
+from lxml import etree
+
+from src.communication import messages
+
+GUID = "c094cab7-da7b-457f-89e5-a5c51756035f"
+VARIANTS = [(messages.MOVE_TEMPLATE, ("0", GUID, "up")), (messages.DISCOVER_TEMPLATE, ("0", GUID)),
+            (messages.PICK_UP_PIECE_TEMPLATE, ("0", GUID)), (messages.PLACE_PIECE_TEMPLATE, ("0", GUID)),
+            (messages.TEST_PIECE_TEMPLATE, ("0", GUID))]
+
+
+def build_tree(template, values, validate):
+    root = etree.Element(messages.NAMESPACE_PREFIX + template.message_name, nsmap=messages.NSMAP)
+    for name, value in zip(template.attribute_names, values):
+        root.set(name, str(value))
+    if validate:
+        messages.SCHEMA.assertValid(root)
+    return etree.tostring(root, encoding='unicode')
+
+
+def measure(encode, seconds):
+    encoded = 0
+    start = perf_counter()
+    while perf_counter() - start < seconds:
+        for i in range(100):
+            encode()
+        encoded += 100
+    return (perf_counter() - start) / encoded * 1e6
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-t', '--time', type=float, default=0.5, help='Seconds to run each variant for.')
+    args = vars(parser.parse_args())
+
+    builders = {"Move": messages.Move, "Discover": messages.Discover, "PickUpPiece": messages.PickUpPiece,
+                "PlacePiece": messages.PlacePiece, "TestPiece": messages.TestPiece}
+
+    print("%-12s %18s %8s %10s %14s %9s" % ("us per msg", "tree + validation", "tree", "template", "builder (off)",
+                                             "speed-up"))
+    for template, values in VARIANTS:
+        validated = measure(lambda: build_tree(template, values, True), args["time"])
+        tree = measure(lambda: build_tree(template, values, False), args["time"])
+        fast = measure(lambda: template.encode(*values), args["time"])
+        messages.set_validation_policy(messages.ValidationMode.OFF)
+        builder = measure(lambda: builders[template.message_name](*values), args["time"])
+        messages.set_validation_policy(messages.ValidationMode.ALWAYS)
+        print("%-12s %18.2f %8.2f %10.2f %14.2f %8.1fx" % (template.message_name, validated, tree, fast, builder,
+                                                            validated / builder))
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+a knowledge exchange between two teammates who have walked around the task area at random from the same field for a
+number of steps, discovering at every one. the Data message the requester gets: his teammate's whole board (the way a
+player's GameInfo would be sent) and everything his teammate knows vs only what his teammate knows better than he
+does (PlayerKnowledge.learn_from), and the same exchange repeated right after the first one. its cost on both ends:
+the GM's learn_from and the player's handle_data of the message. bytes of the encoded message and us per exchange.
+    PYTHONPATH=../.. python bench_exchange.py
+"""
+import random
+from argparse import ArgumentParser
+from itertools import count
+from time import perf_counter
+from timeit import repeat
+
+from src.communication import messages
+from src.communication.info import GameInfo
+from src.communication.knowledge import PlayerKnowledge
+from src.communication.player import Player
+
+messages.set_validation_policy(messages.ValidationMode.OFF)
+
+STEPS = [10, 100, 1000]
+
+
+def board(size) -> GameInfo:
+    info = GameInfo(board_width=size, task_height=size, goals_height=max(1, size // 10))
+    info.initialize_fields()
+    for i in range(size):
+        x, y = info.free_task_fields().random()
+        info.add_piece(str(i), x, y)
+    info.update_field_distances()
+    return info
+
+
+def walk(info: GameInfo, knowledge: list, steps):
+    """
+    the players start on the same field, then each of them discovers at every step of his random walk around the
+    task area. they take their steps in turns.
+    """
+    start = random.randrange(info.board_width), info.goals_height + random.randrange(info.task_height)
+    locations = [start] * len(knowledge)
+    for step in range(steps):
+        for i, player_knowledge in enumerate(knowledge):
+            for location, field in info.get_neighbours(locations[i], True).items():
+                if info.is_task_field(location):
+                    player_knowledge.tell_task_field(field)
+                    if field.has_piece:
+                        player_knowledge.piece(field.piece_id, location)
+                else:
+                    player_knowledge.tell_goal_field(field)
+            dx, dy = random.choice([(0, 1), (0, -1), (-1, 0), (1, 0)])
+            if info.is_task_field((locations[i][0] + dx, locations[i][1] + dy)):
+                locations[i] = locations[i][0] + dx, locations[i][1] + dy
+
+
+def teammates(info: GameInfo, steps) -> tuple:
+    random.seed(steps)
+    clock = count(1)
+    asking, asked = PlayerKnowledge(clock), PlayerKnowledge(clock)
+    walk(info, [asking, asked], steps)
+    return asking, asked
+
+
+def player(info: GameInfo) -> Player:
+    receiving = Player()
+    receiving.socket.close()
+    receiving.game_info = GameInfo(board_width=info.board_width, task_height=info.task_height,
+                                   goals_height=info.goals_height)
+    receiving.game_info.initialize_fields()
+    return receiving
+
+
+def exchange_cost(info: GameInfo, steps, number) -> tuple:
+    """
+    :returns: (us of the GM's learn_from, us of the player's handle_data) per exchange.
+    """
+    exchanges = [teammates(info, steps) for _ in range(number)]  # learn_from changes the asking one
+    started = perf_counter()
+    payloads = [asking.learn_from(asked) for asking, asked in exchanges]
+    gm_seconds = perf_counter() - started
+    message = messages.Data("1", False, *payloads[0])
+    receiving = player(info)
+    player_seconds = min(repeat(lambda: receiving.handle_data(message), number=number, repeat=3))
+    return gm_seconds / number * 1e6, player_seconds / number * 1e6
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-s', '--size', type=int, default=50, help='Board width and task area height.')
+    parser.add_argument('-n', '--number', type=int, default=20, help='Number of exchanges timed.')
+    args = vars(parser.parse_args())
+
+    random.seed(0)
+    info = board(args["size"])
+    print("bytes of the Data message on a " + str(args["size"]) + "x" + str(args["size"]) + " board")
+    print("%-8s %12s %12s %12s %12s %14s %14s" % ("steps", "whole board", "all he knows", "newer only", "repeated",
+                                                  "us learn_from", "us handle_data"))
+    for steps in STEPS:
+        asking, asked = teammates(info, steps)
+        whole_board = messages.Data("1", False, info.task_fields, info.goal_fields, info.pieces)
+        everything = messages.Data("1", False, asked.task_fields, asked.goal_fields, asked.pieces)
+        newer = messages.Data("1", False, *asking.learn_from(asked))
+        repeated = messages.Data("1", False, *asking.learn_from(asked))
+        learn_from_us, handle_data_us = exchange_cost(info, steps, args["number"])
+        print("%-8s %12d %12d %12d %12d %14.1f %14.1f" % (steps, len(whole_board.encode()), len(everything.encode()),
+                                                          len(newer.encode()), len(repeated.encode()),
+                                                          learn_from_us, handle_data_us))
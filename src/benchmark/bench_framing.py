@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+throughput of splitting a multi-megabyte stream of messages, received in recv()-sized chunks, into messages.
+compares the MessageFramer with the old way of doing it (decode every chunk and split it on the separator),
+which also breaks messages cut between two chunks.
+    PYTHONPATH=../.. python bench_framing.py -m 8
+"""
+import random
+from argparse import ArgumentParser
+from time import perf_counter
+
+from src.communication.framing import MessageFramer, MSG_SEPARATOR
+
+CHUNK_SIZE = 16384
+
+
+def make_stream(megabytes):
+    # mix of short action messages and big Data messages, with some non-ascii characters to make decoding harder
+    short = '<Move xmlns="https://se2.mini.pw.edu.pl/17-results/" gameId="1" playerGuid="c094cab7" direction="up"/>'
+    field = '<TaskField x="1" y="2" timestamp="2017-02-23T17:20:11" distanceToPiece="3"/>'
+    big = '<Data playerId="1" gameFinished="false" note="zażółć"><TaskFields>' + field * 400 + '</TaskFields></Data>'
+
+    messages = []
+    size = 0
+    while size < megabytes * 1024 * 1024:
+        message = big if random.random() < 0.1 else short
+        messages.append(message)
+        size += len(message)
+    stream = (MSG_SEPARATOR.join(messages) + MSG_SEPARATOR).encode()
+    return messages, [stream[i:i + CHUNK_SIZE] for i in range(0, len(stream), CHUNK_SIZE)]
+
+
+def naive(chunks):
+    frames = []
+    for chunk in chunks:
+        for message in chunk.decode(errors="replace").split(MSG_SEPARATOR):
+            if len(message) > 0:
+                frames.append(message)
+    return frames
+
+
+def framed(chunks):
+    framer = MessageFramer()
+    frames = []
+    for chunk in chunks:
+        frames += framer.feed(chunk)
+    return frames
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-m', '--megabytes', type=int, default=8, help='Size of the stream in MiB.')
+    args = vars(parser.parse_args())
+
+    random.seed(0)
+    messages, chunks = make_stream(args["megabytes"])
+    total = sum(len(chunk) for chunk in chunks) / (1024 * 1024)
+
+    for name, function in (("naive split", naive), ("MessageFramer", framed)):
+        start = perf_counter()
+        frames = function(chunks)
+        elapsed = perf_counter() - start
+        broken = sum(1 for a, b in zip(frames, messages) if a != b) + abs(len(frames) - len(messages))
+        print("%-14s %8.1f MiB/s  %7d messages  %5d broken" % (name, total / elapsed, len(frames), broken))
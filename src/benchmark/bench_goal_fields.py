@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+the goal fields of a Discover (all 9 fields around a player in the middle of his goal area) and of a Move onto a goal
+field, as the player knows them: a deepcopy of the GM's field with the player's type (the way it used to be) vs
+updating the fields the player knows in place and a KnownGoalFieldView (Move, it isn't kept in what the player
+knows, so exchanges can't pass it on). every case is encoded into the Data message the player gets. time per
+response, the memory allocated while building it (tracemalloc's peak) and what's still allocated afterwards (the
+message and the player's new fields).
+    PYTHONPATH=../.. python bench_goal_fields.py
+"""
+import copy
+import tracemalloc
+from argparse import ArgumentParser
+from timeit import repeat
+
+from src.communication import messages
+from src.communication.info import GameInfo, PlayerInfo, Allegiance, KnownGoalFieldView
+from src.communication.knowledge import PlayerKnowledge
+
+messages.set_validation_policy(messages.ValidationMode.OFF)
+
+
+def game(size):
+    info = GameInfo(board_width=size, task_height=size, goals_height=3)
+    info.initialize_fields()
+    player = PlayerInfo("1", Allegiance.BLUE.value, PlayerKnowledge())
+    player.location = size // 2, 1
+    for location, field in info.get_neighbours(player.location, True).items():
+        player.knowledge.tell_goal_field(field)
+    return info, player
+
+
+def discover_deepcopy(info, player):
+    goal_fields = {}
+    for (x, y), neighbour in info.get_neighbours(player.location, True).items():
+        new_goal_field = copy.deepcopy(info.goal_fields[neighbour.location])
+        new_goal_field.type = player.knowledge.goal_type(neighbour.location)
+        player.knowledge.goal_fields[x, y] = new_goal_field
+        goal_fields[x, y] = player.knowledge.goal_fields[x, y]
+    return messages.Data(player.id, False, goal_fields=goal_fields)
+
+
+def discover_in_place(info, player):
+    goal_fields = {}
+    for (x, y), neighbour in info.get_neighbours(player.location, True).items():
+        goal_fields[x, y] = player.knowledge.tell_goal_field(neighbour)
+    return messages.Data(player.id, False, goal_fields=goal_fields)
+
+
+def move_deepcopy(info, player):
+    new_goal_field = copy.deepcopy(info.goal_fields[player.location])
+    new_goal_field.type = player.knowledge.goal_type(player.location)
+    return messages.Data(player.id, False, goal_fields={player.location: new_goal_field},
+                         player_location=player.location)
+
+
+def move_in_place(info, player):
+    new_goal_field = player.knowledge.tell_goal_field(info.goal_fields[player.location])
+    return messages.Data(player.id, False, goal_fields={player.location: new_goal_field},
+                         player_location=player.location)
+
+
+def move_view(info, player):
+    new_goal_field = KnownGoalFieldView(info.goal_fields[player.location],
+                                        player.knowledge.goal_type(player.location))
+    return messages.Data(player.id, False, goal_fields={player.location: new_goal_field},
+                         player_location=player.location)
+
+
+def allocations(function, *args) -> tuple:
+    """
+    :returns: (kB allocated at the peak of a call, kB still allocated after it)
+    """
+    function(*args)  # warm up (caches, interned strings)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    message = function(*args)
+    kept, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del message
+    return (peak - before) / 1024, (kept - before) / 1024
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-n', '--number', type=int, default=10000, help='Number of responses timed.')
+    parser.add_argument('-s', '--size', type=int, default=50, help='Board width and task area height.')
+    args = vars(parser.parse_args())
+
+    print("%-30s %12s %10s %10s" % ("", "us/response", "peak kB", "kept kB"))
+    for name, function in [("Discover, deepcopy", discover_deepcopy), ("Discover, in place", discover_in_place),
+                           ("Move, deepcopy", move_deepcopy), ("Move, in place", move_in_place),
+                           ("Move, KnownGoalFieldView", move_view)]:
+        info, player = game(args["size"])
+        seconds = min(repeat(lambda: function(info, player), number=args["number"], repeat=3)) / args["number"]
+        peak, kept = allocations(function, info, player)
+        print("%-30s %12.2f %10.2f %10.2f" % (name, seconds * 1e6, peak, kept))
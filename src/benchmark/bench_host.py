@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+cost of every extra game: N GameMasters (one per game, each with its own connection, settings and scheduler) vs
+a single GameHost with N games. memory of the games (tracemalloc, before any player joins) and the time to set
+them up. "process" is the peak RSS of a python process running a single GameMaster, what every game costs on top
+when each one gets a process of its own.
+    PYTHONPATH=../.. python bench_host.py
+"""
+import os
+import subprocess
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from time import perf_counter
+
+from src.communication import gamemaster
+from src.communication.gamemaster import GameMaster
+from src.communication.host import GameHost
+
+GAME_COUNTS = [1, 10, 100]
+
+PROCESS = """
+import resource
+from src.communication.gamemaster import GameMaster
+gm = GameMaster(settings_file=%r)
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def separate(games, settings_file):
+    return [GameMaster(settings_file=settings_file) for i in range(games)]
+
+
+def hosted(games, settings_file):
+    return [GameHost(settings_file=settings_file, copies=games)]
+
+
+def close(clients):
+    for client in clients:
+        client.socket.close()
+
+
+def measure(create, games, settings_file):
+    """
+    :returns: (kB per game, ms to set up a game)
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = perf_counter()
+    clients = create(games, settings_file)
+    elapsed = perf_counter() - started
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    close(clients)
+    return used / games / 1024, elapsed / games * 1e3
+
+
+def process_rss(settings_file) -> int:
+    """
+    :returns: peak RSS in kB of a process with a single GameMaster.
+    """
+    root = os.path.abspath(os.path.join(os.path.dirname(gamemaster.__file__), "..", ".."))
+    output = subprocess.check_output([sys.executable, "-c", PROCESS % settings_file],
+                                     cwd=os.path.dirname(gamemaster.__file__), env=dict(os.environ, PYTHONPATH=root))
+    return int(output.split()[-1])
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('--settings', default=None, help='GameMasterSettings.xml to use (the one of the GM by default).')
+    args = vars(parser.parse_args())
+    settings_file = args["settings"] or os.path.join(os.path.dirname(os.path.abspath(gamemaster.__file__)),
+                                                     "GameMasterSettings.xml")
+
+    print("process: %d kB per game" % process_rss(settings_file))
+    print("%-6s %14s %14s %16s %16s" % ("games", "separate kB", "hosted kB", "separate ms", "hosted ms"))
+    for games in GAME_COUNTS:
+        separate_memory, separate_time = measure(separate, games, settings_file)
+        hosted_memory, hosted_time = measure(hosted, games, settings_file)
+        print("%-6d %14.1f %14.1f %16.3f %16.3f" % (games, separate_memory, hosted_memory, separate_time, hosted_time))
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+"""
+micro-benchmarks of the functions on the hot paths: every messages builder (validated and not), ET.fromstring of
+Data and Game messages, the GameInfo board functions, BaseStrategy.get_next_move and the GameMaster's discover
+handler (with send stubbed out, nothing waits). the board functions are run on boards of every size in BOARD_SIZES
+with every number of pieces in PIECE_COUNTS.
+the results are compared with the stored baselines (baselines/bench_hotpaths.json): a case slower than its
+baseline by more than the threshold is a regression, and the script exits with 1. --save stores the results as
+the new baselines (run it on the machine the comparisons are made on).
+    PYTHONPATH=../.. python bench_hotpaths.py -k get_neighbours -t 0.2
+"""
+import json
+import os
+import random
+import sys
+import uuid
+import xml.etree.ElementTree as ET
+from argparse import ArgumentParser
+from timeit import timeit, repeat
+
+from src.communication import gamemaster, messages
+from src.communication.gamemaster import GameMaster
+from src.communication.info import GameInfo, TaskFieldInfo, PlayerInfo, Allegiance, PlayerType
+from src.communication.strategy import StrategyFactory
+
+BOARD_SIZES = [10, 50, 100]  # board width and task area height
+PIECE_COUNTS = [1, 10, 100]
+BASELINES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "bench_hotpaths.json")
+GUID = "c094cab7-da7b-457f-89e5-a5c51756035f"
+SEED = 0
+
+
+class BenchGameMaster(GameMaster):
+    """
+    responses are encoded, but not sent anywhere.
+    """
+
+    def send(self, message):
+        self.last_sent = message
+
+
+def board(size, pieces) -> GameInfo:
+    """
+    :returns: initialized board of size x size task fields (goal areas a tenth of that), with pieces on random fields.
+    """
+    random.seed(SEED)
+    info = GameInfo(board_width=size, task_height=size, goals_height=max(1, size // 10))
+    info.initialize_fields()
+    for i, (x, y) in enumerate(random.sample(sorted(info.task_fields), min(pieces, len(info.task_fields)))):
+        info.add_piece(str(i), x, y)
+    return info
+
+
+def middle(info: GameInfo) -> tuple:
+    return info.board_width // 2, info.goals_height + info.task_height // 2
+
+
+def teams(players=8) -> dict:
+    return {Allegiance.RED.value: {str(i): PlayerInfo(str(i), Allegiance.RED.value, type=PlayerType.MEMBER.value)
+                                   for i in range(players // 2)},
+            Allegiance.BLUE.value: {str(i): PlayerInfo(str(i), Allegiance.BLUE.value, type=PlayerType.MEMBER.value)
+                                    for i in range(players // 2, players)}}
+
+
+def neighbourhood() -> dict:
+    """
+    :returns: the task fields a Discover sees.
+    """
+    return {(x, y): TaskFieldInfo(x, y, distance_to_piece=2) for x in range(3) for y in range(3, 6)}
+
+
+def message_cases():
+    """
+    :returns: [(name, function)] building every message type.
+    """
+    games = {"0": GameInfo("0", "easy clone", max_blue_players=2, max_red_players=2)}
+    return [
+        ("Move", lambda: messages.Move("0", GUID, "up")),
+        ("PickUpPiece", lambda: messages.PickUpPiece("0", GUID)),
+        ("PlacePiece", lambda: messages.PlacePiece("0", GUID)),
+        ("TestPiece", lambda: messages.TestPiece("0", GUID)),
+        ("Discover", lambda: messages.Discover("0", GUID)),
+        ("AuthorizeKnowledgeExchange", lambda: messages.AuthorizeKnowledgeExchange("0", GUID, "2")),
+        ("GetGames", lambda: messages.GetGames()),
+        ("Data (Discover)", lambda: messages.Data("1", False, task_fields=neighbourhood())),
+        ("Game", lambda: messages.Game("1", teams(), 10, 10, 3, (0, 0))),
+        ("KnowledgeExchangeRequest", lambda: messages.KnowledgeExchangeRequest("1", "2")),
+        ("AcceptExchangeRequest", lambda: messages.AcceptExchangeRequest("1", "2")),
+        ("RejectKnowledgeExchange", lambda: messages.RejectKnowledgeExchange("1", "2", False)),
+        ("RegisterGame", lambda: messages.RegisterGame("easy clone", 2, 2)),
+        ("ConfirmGameRegistration", lambda: messages.ConfirmGameRegistration("0")),
+        ("RejectGameRegistration", lambda: messages.RejectGameRegistration("easy clone")),
+        ("GameStarted", lambda: messages.GameStarted("0")),
+        ("RegisteredGames", lambda: messages.RegisteredGames(games)),
+        ("JoinGame", lambda: messages.JoinGame("easy clone", "red", "leader")),
+        ("ConfirmJoiningGame", lambda: messages.ConfirmJoiningGame("1", "0", GUID, "red", "leader")),
+        ("RejectJoiningGame", lambda: messages.RejectJoiningGame("1", "easy clone")),
+        ("GameMasterDisconnected", lambda: messages.GameMasterDisconnected("0")),
+        ("PlayerDisconnected", lambda: messages.player_disconnected("1")),
+    ]
+
+
+def whole_board_data(size, pieces) -> str:
+    info = board(size, pieces)
+    return messages.Data("1", False, info.task_fields, info.goal_fields, info.pieces)
+
+
+def discover(size, pieces):
+    """
+    :returns: function handling a Discover of a player in the middle of the board.
+    """
+    gm = BenchGameMaster(settings_file=os.path.join(os.path.dirname(os.path.abspath(gamemaster.__file__)),
+                                                    "GameMasterSettings.xml"))
+    gm.socket.close()
+    gm.info = board(size, pieces)
+    gm.add_player("1", PlayerType.MEMBER.value, Allegiance.RED.value, str(uuid.uuid4()))
+    player_info = gm.find_player_by_id("1")
+    player_info.location = middle(gm.info)
+    return lambda: gm.handle_discover_message(player_info)
+
+
+def next_move(size, pieces):
+    """
+    :returns: function deciding on the next move of a player in the middle of a board he knows all about.
+    """
+    info = board(size, pieces)
+    strategy = StrategyFactory(Allegiance.RED.value, middle(info), info)
+
+    def decide():
+        strategy.get_next_move(middle(info))
+    return decide
+
+
+def empty_task_fields(size, pieces):
+    # the fields with pieces come first, so the scan has to go past all of them
+    info = GameInfo(board_width=size, task_height=size, goals_height=1)
+    info.initialize_fields()
+    for i, location in enumerate(list(info.task_fields)[:pieces]):
+        info.task_fields[location].piece_id = str(i)
+    return info.check_for_empty_task_fields
+
+
+def encode_board(size):
+    info = board(size, size)
+    return lambda: messages.Data("1", False, info.task_fields, info.goal_fields, info.pieces)
+
+
+def parse(message: str):
+    return lambda: ET.fromstring(message)
+
+
+def neighbours(size, extended):
+    info = board(size, 1)
+    location = middle(info)
+    return lambda: info.get_neighbours(location, extended)
+
+
+def cases():
+    """
+    :returns: [(name, parameters, function to time)], the functions are built lazily (boards take a while).
+    """
+    result = []
+    for validation in (messages.ValidationMode.ALWAYS, messages.ValidationMode.OFF):
+        for name, build in message_cases():
+            result.append(("messages." + name, {"validation": validation.value},
+                           lambda build=build: build))
+    for size in BOARD_SIZES:
+        result.append(("messages.Data (board)", {"board": size, "validation": "off"},
+                       lambda size=size: encode_board(size)))
+        result.append(("ET.fromstring Data (board)", {"board": size},
+                       lambda size=size: parse(whole_board_data(size, size))))
+        result.append(("GameInfo.initialize_fields", {"board": size},
+                       lambda size=size: lambda: GameInfo(board_width=size, task_height=size,
+                                                          goals_height=max(1, size // 10)).initialize_fields()))
+        result.append(("GameInfo.get_neighbours", {"board": size},
+                       lambda size=size: neighbours(size, False)))
+        result.append(("GameInfo.get_neighbours extended", {"board": size},
+                       lambda size=size: neighbours(size, True)))
+        for pieces in PIECE_COUNTS:
+            parameters = {"board": size, "pieces": pieces}
+            result.append(("GameInfo.update_field_distances", parameters,
+                           lambda size=size, pieces=pieces: board(size, pieces).update_field_distances))
+            result.append(("GameInfo.check_for_empty_task_fields", parameters,
+                           lambda size=size, pieces=pieces: empty_task_fields(size, pieces)))
+            result.append(("BaseStrategy.get_next_move", parameters,
+                           lambda size=size, pieces=pieces: next_move(size, pieces)))
+            result.append(("GameMaster.handle_discover_message", parameters,
+                           lambda size=size, pieces=pieces: discover(size, pieces)))
+    result.append(("ET.fromstring Data (Discover)", {},
+                   lambda: parse(messages.Data("1", False, task_fields=neighbourhood()))))
+    result.append(("ET.fromstring Game", {}, lambda: parse(messages.Game("1", teams(), 10, 10, 3, (0, 0)))))
+    return result
+
+
+def case_key(name, parameters) -> str:
+    if not parameters:
+        return name
+    return name + "[" + ",".join(key + "=" + str(value) for key, value in sorted(parameters.items())) + "]"
+
+
+def measure(function, seconds) -> float:
+    """
+    :returns: us per call, the best of a few runs (a slow run says more about the machine than about the code).
+    """
+    number = max(1, int(seconds * 1e6 / 5 / max(1.0, timeit(function, number=3) / 3 * 1e6)))
+    return min(repeat(function, number=number, repeat=5)) / number * 1e6
+
+
+def read_baselines(path) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_baselines(path, results: dict):
+    baselines = read_baselines(path)
+    baselines.update({key: round(result, 3) for key, result in results.items()})
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(baselines, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-t', '--time', type=float, default=0.2, help='Seconds to run each case for.')
+    parser.add_argument('-k', '--filter', default="", help='Only run the cases whose name contains this.')
+    parser.add_argument('--threshold', type=float, default=20,
+                        help='Percent by which a case may be slower than its baseline before it\'s a regression.')
+    parser.add_argument('--baselines', default=BASELINES_FILE, help='File with the stored baselines.')
+    parser.add_argument('--save', action='store_true', default=False, help='Store the results as the new baselines.')
+    args = vars(parser.parse_args())
+
+    baselines = read_baselines(args["baselines"])
+    results = {}
+    regressions = []
+    print("%-70s %10s %10s %8s" % ("us per call", "now", "baseline", "change"))
+    for name, parameters, prepare in cases():
+        key = case_key(name, parameters)
+        if args["filter"] not in key:
+            continue
+        messages.set_validation_policy(parameters.get("validation", messages.ValidationMode.OFF.value))
+        random.seed(SEED)
+        results[key] = measure(prepare(), args["time"])
+
+        baseline = baselines.get(key)
+        if baseline is None:
+            print("%-70s %10.2f %10s %8s" % (key, results[key], "-", "-"))
+            continue
+        change = (results[key] / baseline - 1) * 100
+        regressed = change > args["threshold"]
+        if regressed:
+            regressions.append(key)
+        print("%-70s %10.2f %10.2f %+7.0f%%%s" % (key, results[key], baseline, change, " REGRESSION" if regressed else ""))
+    messages.set_validation_policy(messages.ValidationMode.ALWAYS)
+
+    if args["save"]:
+        save_baselines(args["baselines"], results)
+        print("Saved " + str(len(results)) + " baselines to " + args["baselines"] + ".")
+    elif regressions:
+        print(str(len(regressions)) + " regressions (slower by more than " + str(args["threshold"]) + "%).")
+        sys.exit(1)
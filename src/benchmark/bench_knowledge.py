@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+memory the GM keeps about what its players know, with 20 players on boards of growing size: a whole board per player
+(GameInfo.initialize_fields, the way it used to be) vs a PlayerKnowledge, which only holds what the player was told.
+every player walks around the task area at random and sends a Discover at every step, the knowledge is measured
+after a number of steps. measured with tracemalloc.
+    PYTHONPATH=../.. python bench_knowledge.py
+"""
+import random
+import tracemalloc
+from argparse import ArgumentParser
+
+from src.communication.info import GameInfo
+from src.communication.knowledge import PlayerKnowledge
+
+PLAYERS = 20
+BOARD_SIZES = [10, 50, 100, 200]  # board width and task area height
+STEPS = [0, 10, 100, 1000]
+
+
+def board(size) -> GameInfo:
+    info = GameInfo(board_width=size, task_height=size, goals_height=max(1, size // 10))
+    info.initialize_fields()
+    return info
+
+
+def whole_boards(size, players) -> float:
+    """
+    :returns: MB taken by the players' boards.
+    """
+    tracemalloc.start()
+    boards = [board(size) for _ in range(players)]
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del boards
+    return used / 1024 / 1024
+
+
+def discovered(info: GameInfo, players, steps) -> float:
+    """
+    :returns: MB taken by the knowledge of players who have walked that many steps, discovering at every one.
+    """
+    random.seed(0)
+    tracemalloc.start()
+    knowledge = [PlayerKnowledge() for _ in range(players)]
+    for player_knowledge in knowledge:
+        x, y = random.randrange(info.board_width), info.goals_height + random.randrange(info.task_height)
+        for step in range(steps):
+            for field in info.get_neighbours((x, y), True).values():
+                if info.is_task_field(field.location):
+                    player_knowledge.tell_task_field(field)
+                else:
+                    player_knowledge.tell_goal_field(field)
+            dx, dy = random.choice([(0, 1), (0, -1), (-1, 0), (1, 0)])
+            if info.is_task_field((x + dx, y + dy)):
+                x, y = x + dx, y + dy
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del knowledge
+    return used / 1024 / 1024
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-p', '--players', type=int, default=PLAYERS, help='Number of players in the game.')
+    args = vars(parser.parse_args())
+
+    print("MB for " + str(args["players"]) + " players")
+    print("%-12s %14s" % ("board", "whole boards") + "".join("%14s" % (str(steps) + " steps") for steps in STEPS))
+    for size in BOARD_SIZES:
+        info = board(size)
+        info.get_neighbours((0, info.goals_height), True)  # its neighbour table isn't counted
+        print("%-12s %14.2f" % (str(size) + "x" + str(size), whole_boards(size, args["players"])) +
+              "".join("%14.2f" % discovered(info, args["players"], steps) for steps in STEPS))
@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+"""
+end-to-end load test on localhost: the server, one or more GameHosts and a PlayerSwarm, each in a process of its own,
+play for a fixed time. the players either follow the basic strategies or replay a fixed mix of actions (seeded, so
+every run sends the same actions). the results are written as json, to be compared across commits:
+round-trip latency histograms per action type (p50/p99/p999), messages and bytes routed by the server per second,
+actions per second, and the cpu time and peak rss of every process.
+    PYTHONPATH=../.. python bench_loadtest.py -p 200 -d 30 --mix move=60,discover=30,pick_up=5,place=5
+"""
+import json
+import math
+import os
+import random
+import resource
+import signal
+import socket
+import subprocess
+import sys
+from argparse import ArgumentParser, SUPPRESS
+from datetime import datetime
+from time import sleep, monotonic
+
+from src.communication import gamemaster, messages
+from src.communication.gamemaster import parse_game_master_settings, GAME_SETTINGS_TAG
+from src.communication.strategy import BaseStrategy, Decision, StrategyFactory
+from src.communication.info import PlayerType
+
+RESULT_PREFIX = "RESULT "  # children print their results on a line starting with this, after whatever they logged
+STARTUP_TIMEOUT = 10  # s to wait for the server to start listening
+DECISIONS = {"move": Decision.MOVE, "discover": Decision.DISCOVER, "pick_up": Decision.PICK_UP,
+             "place": Decision.PLACE}
+DIRECTIONS = {(0, 1): "up", (0, -1): "down", (-1, 0): "left", (1, 0): "right"}
+
+
+class MixStrategy(BaseStrategy):
+    """
+    sends a fixed mix of actions, whatever happens in the game: every decision is drawn with the mix's weights
+    from the player's own random generator.
+    """
+
+    def __init__(self, team, location, game_info, weights: dict, rng: random.Random):
+        super(MixStrategy, self).__init__(team, PlayerType.MEMBER.value, location, game_info)
+        self.choices = [DECISIONS[name] for name in weights]
+        self.weights = list(weights.values())
+        self.rng = rng
+
+    def get_next_move(self, new_location: tuple):
+        self.current_location = new_location
+        choice = self.rng.choices(self.choices, self.weights)[0]
+        if choice == Decision.MOVE:
+            offsets = [(x - new_location[0], y - new_location[1]) for x, y in self.game_info.get_neighbours(new_location)]
+            directions = [DIRECTIONS[offset] for offset in offsets if offset in DIRECTIONS]
+            self.last_move = Decision(choice, self.rng.choice(sorted(directions)) if directions else None)
+        else:
+            self.last_move = Decision(choice)
+        return self.last_move
+
+
+class WorkloadMix:
+    """
+    strategy factory for the swarm: every player gets a MixStrategy seeded with the seed and his number.
+    """
+
+    def __init__(self, weights: dict, seed: int):
+        self.weights = weights
+        self.seed = seed
+        self.created = 0
+
+    def __call__(self, team, location=None, game_info=None):
+        self.created += 1
+        return MixStrategy(team, location, game_info, self.weights, random.Random(self.seed * 1000003 + self.created))
+
+
+def parse_mix(mix: str):
+    """
+    :returns: None for "basic" (the strategies), name of the action => weight otherwise.
+    """
+    if mix == "basic":
+        return None
+    weights = {}
+    for part in mix.split(","):
+        name, weight = part.split("=")
+        if name not in DECISIONS:
+            raise ValueError("Unknown action " + name + ", pick from " + ", ".join(DECISIONS) + ".")
+        weights[name] = float(weight)
+    return weights
+
+
+def usage() -> dict:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    return {"cpu_user_s": own.ru_utime, "cpu_system_s": own.ru_stime, "max_rss_kb": own.ru_maxrss}
+
+
+def report(result: dict):
+    result.update(usage())
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+
+def run_server(args):
+    if args["server"] == "event-loop":
+        from src.communication.event_server import EventLoopServer as server_class
+    else:
+        from src.communication.server import CommunicationServer as server_class
+    server = server_class(False, "127.0.0.1", args["port"])
+    server.socket.listen(1024)
+    started = monotonic()
+    try:
+        server.accept_clients()
+    except KeyboardInterrupt:
+        pass
+    server.running = False
+    result = server.stats()
+    result["elapsed"] = monotonic() - started
+    report(result)
+
+
+def run_host(args):
+    from src.communication.host import GameHost
+
+    host = GameHost(False, args["settings"], args["copies"], args["first_copy"])
+    if host.connect("127.0.0.1", args["port"]):
+        try:
+            host.run()
+        except KeyboardInterrupt:
+            pass
+    host.scheduler.stop()
+    report({"games": host.stats(), "scheduler": host.scheduler.stats()})
+
+
+def run_swarm(args):
+    from src.communication.swarm import PlayerSwarm
+
+    random.seed(args["seed"])
+    weights = parse_mix(args["mix"])
+    factory = StrategyFactory if weights is None else WorkloadMix(weights, args["seed"])
+    swarm = PlayerSwarm(args["players"], "127.0.0.1", args["port"], args["ramp"], strategy_factory=factory)
+    swarm.run(args["duration"])
+    report({"swarm": swarm.stats(), "latency": swarm.latency_stats()})
+
+
+ROLES = {"server": run_server, "host": run_host, "swarm": run_swarm}
+
+
+def free_port() -> int:
+    probe = socket.socket()
+    probe.bind(("127.0.0.1", 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    return port
+
+
+def wait_for_server(port):
+    deadline = monotonic() + STARTUP_TIMEOUT
+    while monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            return
+        except OSError:
+            sleep(0.05)
+    raise TimeoutError("The server didn't start listening on port " + str(port) + ".")
+
+
+def spawn(role, args, **overrides):
+    arguments = dict(args, **overrides)
+    command = [sys.executable, os.path.abspath(__file__), "--role", role, "--port", str(arguments["port"]),
+               "--server", arguments["server"], "--settings", arguments["settings"], "-p", str(arguments["players"]),
+               "-d", str(arguments["duration"]), "-r", str(arguments["ramp"]), "--mix", arguments["mix"],
+               "--seed", str(arguments["seed"]), "--copies", str(arguments["copies"]),
+               "--first-copy", str(arguments["first_copy"]), "--validation", arguments["validation"]]
+    return subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+
+
+def collect(process) -> dict:
+    output, _ = process.communicate()
+    for line in reversed(output.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError("A child process (exit code " + str(process.returncode) + ") didn't report its results.")
+
+
+def stop(process) -> dict:
+    process.send_signal(signal.SIGINT)
+    return collect(process)
+
+
+def process_usage(result: dict) -> dict:
+    return {key: result[key] for key in ("cpu_user_s", "cpu_system_s", "max_rss_kb")}
+
+
+def commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_test(args) -> dict:
+    settings = parse_game_master_settings(args["settings"])
+    definitions = settings.findall(GAME_SETTINGS_TAG + "GameDefinition")
+    players_per_game = 2 * int(definitions[0].find(GAME_SETTINGS_TAG + "NumberOfPlayersPerTeam").text)
+    # enough games for everybody, spread over the hosts:
+    games = math.ceil(args["players"] / players_per_game / len(definitions))
+    copies = math.ceil(games / args["hosts"])
+
+    args = dict(args, port=free_port())
+    server = spawn("server", args)
+    wait_for_server(args["port"])
+    hosts = [spawn("host", args, copies=copies, first_copy=i * copies + 1) for i in range(args["hosts"])]
+    swarm = spawn("swarm", args)
+
+    swarm_result = collect(swarm)
+    host_results = [stop(host) for host in hosts]
+    server_result = stop(server)
+
+    elapsed = swarm_result["swarm"]["elapsed"]
+    return {
+        "date": datetime.now().isoformat(),
+        "commit": commit(),
+        "config": {key: args[key] for key in ("players", "hosts", "duration", "ramp", "mix", "seed", "server",
+                                              "validation", "settings")},
+        "games": games * len(definitions),
+        "swarm": swarm_result["swarm"],
+        "latency": swarm_result["latency"],
+        "throughput": {"actions_per_second": swarm_result["swarm"]["actions_per_second"],
+                       "routed_messages_per_second": server_result["routed_messages"] / elapsed,
+                       "routed_bytes_per_second": server_result["routed_bytes"] / elapsed},
+        "game_actions": sum(game["actions"] for result in host_results for game in result["games"]),
+        "processes": {"server": process_usage(server_result),
+                      "hosts": [process_usage(result) for result in host_results],
+                      "swarm": process_usage(swarm_result)},
+    }
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-p', '--players', type=int, default=100, help='Number of players.')
+    parser.add_argument('-g', '--hosts', type=int, default=1, help='Number of GameHost processes.')
+    parser.add_argument('-d', '--duration', type=float, default=20, help='Seconds the players play for.')
+    parser.add_argument('-r', '--ramp', type=float, default=2, help='Seconds over which the players connect.')
+    parser.add_argument('--mix', default="move=60,discover=30,pick_up=5,place=5",
+                        help='Actions the players send, with their weights, or "basic" to play the strategies.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the players\' decisions.')
+    parser.add_argument('--server', default="event-loop", choices=["event-loop", "threaded"])
+    parser.add_argument('--settings', default=os.path.join(os.path.dirname(os.path.abspath(gamemaster.__file__)),
+                                                           "GameMasterSettings.xml"),
+                        help='GameMasterSettings.xml of the games.')
+    parser.add_argument('--validation', default="off", choices=[mode.value for mode in messages.ValidationMode],
+                        help='Schema validation of the sent messages.')
+    parser.add_argument('-o', '--output', default="loadtest.json", help='File the results are written to.')
+    # used by the child processes:
+    parser.add_argument('--role', default=None, choices=list(ROLES), help=SUPPRESS)
+    parser.add_argument('--port', type=int, default=None, help=SUPPRESS)
+    parser.add_argument('--copies', type=int, default=1, help=SUPPRESS)
+    parser.add_argument('--first-copy', type=int, default=1, help=SUPPRESS)
+    args = vars(parser.parse_args())
+    messages.set_validation_policy(args["validation"])
+
+    if args["role"] is not None:
+        ROLES[args["role"]](args)
+    else:
+        results = load_test(args)
+        with open(args["output"], "w") as file:
+            json.dump(results, file, indent=2)
+        print("%d players, %.0f actions/s, %.0f routed messages/s" % (
+            args["players"], results["throughput"]["actions_per_second"],
+            results["throughput"]["routed_messages_per_second"]))
+        print("%-14s %8s %10s %10s %10s" % ("", "count", "p50 ms", "p99 ms", "p999 ms"))
+        for action_type, latency in results["latency"].items():
+            print("%-14s %8d %10.2f %10.2f %10.2f" % (action_type, latency["count"], latency["p50_ms"],
+                                                      latency["p99_ms"], latency["p999_ms"]))
+        for name, usage_of_process in [("server", results["processes"]["server"]),
+                                       ("swarm", results["processes"]["swarm"])] + \
+                [("host " + str(i + 1), host) for i, host in enumerate(results["processes"]["hosts"])]:
+            print("%-14s cpu %.2f s, rss %d kB" % (name, usage_of_process["cpu_user_s"] +
+                                                    usage_of_process["cpu_system_s"], usage_of_process["max_rss_kb"]))
+        print("written to " + args["output"])
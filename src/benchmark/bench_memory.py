@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+memory taken by the GameMaster's boards: its own one, plus the one it used to keep for every player (now a
+PlayerKnowledge, see bench_knowledge.py), on boards of growing size with 20 players. "plain" are the field and piece classes the way they used to be (an instance
+dict each, a timestamp object of their own and a new string for every id read from a message), "slots" are the
+ones from info.py, with the ids interned. measured with tracemalloc.
+    PYTHONPATH=../.. python bench_memory.py
+"""
+import tracemalloc
+from argparse import ArgumentParser
+from datetime import datetime
+
+from src.communication.decoding import interned
+from src.communication.info import TaskFieldInfo, GoalFieldInfo, PieceInfo
+
+PLAYERS = 20
+BOARD_SIZES = [10, 50, 100, 200]  # board width and task area height
+
+
+class PlainTaskFieldInfo:
+    def __init__(self, x=0, y=0, timestamp=None, distance_to_piece=-1, player_id="-1", piece_id="-1"):
+        self.x = x
+        self.y = y
+        self.timestamp = datetime.now() if timestamp is None else timestamp
+        self.player_id = player_id
+        self.distance_to_piece = distance_to_piece
+        self.piece_id = piece_id
+
+
+class PlainGoalFieldInfo:
+    def __init__(self, x=0, y=0, allegiance="neutral", player_id=None, timestamp=None, type="unknown"):
+        self.x = x
+        self.y = y
+        self.timestamp = datetime.now() if timestamp is None else timestamp
+        self.player_id = player_id
+        self.allegiance = allegiance
+        self.type = type
+
+
+class PlainPieceInfo:
+    def __init__(self, id="-1", type="unknown", player_id="-1", location=None, timestamp=None):
+        self.id = id
+        self.type = type
+        self.player_id = player_id
+        self.location = location
+        self.timestamp = datetime.now() if timestamp is None else timestamp
+
+
+def board(size, task_field_class, goal_field_class, piece_class, read_id):
+    """
+    :returns: task fields, goal fields and pieces, created the way GameInfo.initialize_fields does it.
+    """
+    goals_height = max(1, size // 10)
+    task_fields, goal_fields = {}, {}
+    for x in range(size):
+        for y in range(goals_height):
+            goal_fields[x, y] = goal_field_class(x, y, "blue")
+            goal_fields[x, y + goals_height + size] = goal_field_class(x, y + goals_height + size, "red")
+        for y in range(goals_height, goals_height + size):
+            # every player learns of the same few players standing around, the ids come from the messages
+            task_fields[x, y] = task_field_class(x, y, player_id=read_id(x % PLAYERS))
+    pieces = {str(i): piece_class(str(i)) for i in range(size * size // 100 + 1)}
+    return task_fields, goal_fields, pieces
+
+
+def measure(size, classes) -> float:
+    """
+    :returns: MB taken by the boards of the GM and all the players.
+    """
+    tracemalloc.start()
+    boards = [board(size, *classes) for _ in range(PLAYERS + 1)]
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del boards
+    return used / 1024 / 1024
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-p', '--players', type=int, default=PLAYERS, help='Number of players in the game.')
+    args = vars(parser.parse_args())
+    PLAYERS = args["players"]
+
+    print("%-10s %10s %10s %9s" % ("MB", "plain", "slots", "saved"))
+    for size in BOARD_SIZES:
+        before = measure(size, (PlainTaskFieldInfo, PlainGoalFieldInfo, PlainPieceInfo, str))
+        after = measure(size, (TaskFieldInfo, GoalFieldInfo, PieceInfo, interned))
+        print("%-10s %10.2f %10.2f %8.0f%%" % ("%dx%d" % (size, size), before, after, (1 - after / before) * 100))
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""
+cost of a single GameInfo.get_neighbours call on boards of growing size. "scan" is how the neighbours used to be
+found: checking every field of the board. "table" is the precomputed neighbour table.
+    PYTHONPATH=../.. python bench_neighbours.py
+"""
+from argparse import ArgumentParser
+from timeit import timeit, repeat
+
+from src.communication.info import GameInfo
+
+# (board width, task area height, goal area height)
+BOARDS = [(10, 10, 2), (50, 50, 5), (100, 100, 10), (500, 500, 20)]
+
+
+def scan_neighbours(game_info: GameInfo, location: tuple, look_for_extended=False):
+    dist = 1
+    if look_for_extended:
+        dist = 2
+
+    neighbours = {}
+    for (x, y), field in game_info.task_fields.items():
+        if not (abs(location[0] - x) > 1) and not abs(location[1] - y) > 1:
+            if abs(location[0] - x) + abs(location[1] - y) <= dist:
+                neighbours[x, y] = field
+    for (x, y), field in game_info.goal_fields.items():
+        if not (abs(location[0] - x) > 1) and not abs(location[1] - y) > 1:
+            if abs(location[0] - x) + abs(location[1] - y) <= dist:
+                neighbours[x, y] = field
+    return neighbours
+
+
+def measure(call, seconds):
+    # best of a few runs, a single slow run says more about the machine than about the lookup
+    number = max(1, int(seconds * 1e6 / 5 / max(1.0, timeit(call, number=3) / 3 * 1e6)))
+    return min(repeat(call, number=number, repeat=5)) / number * 1e6
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-t', '--time', type=float, default=0.5, help='Seconds to run each variant for.')
+    args = vars(parser.parse_args())
+
+    print("%-12s %12s %10s %9s" % ("us per call", "scan", "table", "speed-up"))
+    for width, task_height, goals_height in BOARDS:
+        game_info = GameInfo(board_width=width, task_height=task_height, goals_height=goals_height)
+        game_info.initialize_fields()
+        location = (width // 2, game_info.whole_board_length // 2)
+        assert list(scan_neighbours(game_info, location, True).items()) == \
+            list(game_info.get_neighbours(location, True).items())
+
+        before = measure(lambda: scan_neighbours(game_info, location, True), args["time"])
+        after = measure(lambda: game_info.get_neighbours(location, True), args["time"])
+        print("%-12s %12.2f %10.2f %8.0fx" % ("%dx%d" % (width, task_height), before, after, before / after))
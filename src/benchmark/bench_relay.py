@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+per-core throughput of routing relayed messages in the server (no sockets involved).
+"full parse" is how the server used to route: decode, ET.fromstring (twice for messages to players), substring checks
+and encoding again. "sniffer" is the current route_player_message/route_gm_message.
+    PYTHONPATH=../.. python bench_relay.py
+"""
+import xml.etree.ElementTree as ET
+from argparse import ArgumentParser
+from time import perf_counter
+
+from src.communication import messages
+from src.communication.info import ClientInfo, ClientTypeTag, TaskFieldInfo
+from src.communication.server import CommunicationServer
+
+GUID = "c094cab7-da7b-457f-89e5-a5c51756035f"
+
+
+class RelayCountingServer(CommunicationServer):
+    """
+    server which only counts the messages it would send.
+    """
+
+    def __init__(self):
+        super(RelayCountingServer, self).__init__(False, "127.0.0.1", 0)
+        self.relayed = 0
+        self.clients["0"] = ClientInfo("0", ClientTypeTag.GAME_MASTER)
+        for i in range(1, 9):
+            self.clients[str(i)] = ClientInfo(str(i), ClientTypeTag.PLAYER, game_master_id="0")
+
+    def send_frame(self, recipient, frame):
+        self.relayed += 1
+
+
+def full_parse_route_player(server, player, frame):
+    player_message = frame.decode()
+    message_root = ET.fromstring(player_message)
+    if "JoinGame" in player_message:
+        raise NotImplementedError
+    elif any(message in player_message for message in server.TO_PLAYER_MESSAGES):
+        server.send_frame(server.clients[message_root.attrib["playerId"]],
+                          (player_message + server.MSG_SEPARATOR).encode())
+    else:
+        server.send_frame(server.clients[player.game_master_id], (player_message + server.MSG_SEPARATOR).encode())
+
+
+def full_parse_route_gm(server, gm, frame):
+    gm_msg = frame.decode()
+    msg_root = ET.fromstring(gm_msg)
+    if "ConfirmJoiningGame" in gm_msg:
+        raise NotImplementedError
+    elif "Data" in gm_msg:
+        finished = msg_root.attrib["gameFinished"]
+        # relay_msg_to_player parsed the message once again:
+        player_id = ET.fromstring(gm_msg).attrib["playerId"]
+        server.send_frame(server.clients[player_id], (gm_msg + server.MSG_SEPARATOR).encode())
+
+
+def sniffer_route_player(server, player, frame):
+    server.route_player_message(player, frame)
+
+
+def sniffer_route_gm(server, gm, frame):
+    server.route_gm_message(gm, frame)
+
+
+def workload():
+    from_players = [messages.Move("0", GUID, "up").encode(), messages.Discover("0", GUID).encode(),
+                    messages.PickUpPiece("0", GUID).encode()]
+    fields = {(x, y): TaskFieldInfo(x, y, distance_to_piece=2) for x in range(3) for y in range(3)}
+    from_gm = [messages.Data("1", False, task_fields={(1, 1): fields[1, 1]}, player_location=(1, 1)).encode(),
+               messages.Data("2", False, task_fields=fields).encode()]
+    return from_players, from_gm
+
+
+def run(route_player, route_gm, seconds):
+    server = RelayCountingServer()
+    from_players, from_gm = workload()
+    player, gm = server.clients["1"], server.clients["0"]
+
+    start = perf_counter()
+    while perf_counter() - start < seconds:
+        for i in range(100):
+            for frame in from_players:
+                route_player(server, player, frame)
+            for frame in from_gm:
+                route_gm(server, gm, frame)
+    elapsed = perf_counter() - start
+    server.socket.close()
+    return server.relayed / elapsed
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-t', '--time', type=float, default=2.0, help='Seconds to run each variant for.')
+    args = vars(parser.parse_args())
+
+    results = {}
+    for name, route_player, route_gm in (("full parse", full_parse_route_player, full_parse_route_gm),
+                                         ("sniffer", sniffer_route_player, sniffer_route_gm)):
+        results[name] = run(route_player, route_gm, args["time"])
+        print("%-11s %9.0f relayed msg/s" % (name, results[name]))
+    print("speed-up: %.1fx" % (results["sniffer"] / results["full parse"]))
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+how precisely and how fast the GM's actions are run: "threads" is a new thread per action which sleeps for the
+action's cost (how the GM used to do it), "scheduler" is the ActionScheduler. jitter is the time by which an action
+ran after it was due, throughput is how many actions without any cost get handled per second.
+    PYTHONPATH=../.. python bench_scheduler.py
+"""
+from argparse import ArgumentParser
+from threading import Thread, Event, Lock
+from time import monotonic, sleep
+
+from src.communication.scheduler import ActionScheduler
+
+PLAYERS = 20
+MOVE_COST = 10 / 500  # move delay from the settings, divided by DELAY_MODIFIER
+
+
+class Recorder:
+    """
+    the action: notes how late it ran.
+    """
+
+    def __init__(self, expected: int):
+        self.expected = expected
+        self.lateness = []
+        self.lock = Lock()  # only needed by the threads
+        self.done = Event()
+
+    def __call__(self, due):
+        lateness = monotonic() - due
+        with self.lock:
+            self.lateness.append(lateness)
+            if len(self.lateness) == self.expected:
+                self.done.set()
+
+
+def threads(recorder, delay):
+    due = monotonic() + delay
+
+    def handler():
+        sleep(delay)
+        recorder(due)
+
+    Thread(target=handler, daemon=True).start()
+
+
+def scheduled(scheduler):
+    def schedule(recorder, delay):
+        scheduler.schedule(delay, recorder, monotonic() + delay)
+
+    return schedule
+
+
+def run(schedule, rounds, delay):
+    """
+    every round, each of the players sends an action and the next round comes when... well, when it comes:
+    players wait for their responses, so the rounds are spaced by the action's cost.
+    :returns: (recorder, seconds it took)
+    """
+    recorder = Recorder(rounds * PLAYERS)
+    started = monotonic()
+    for _ in range(rounds):
+        for _ in range(PLAYERS):
+            schedule(recorder, delay)
+        if delay > 0:
+            sleep(delay)
+    recorder.done.wait(60)
+    return recorder, monotonic() - started
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-t', '--time', type=float, default=2, help='Seconds to run the jitter test for.')
+    args = vars(parser.parse_args())
+    rounds = max(1, int(args["time"] / MOVE_COST))
+
+    scheduler = ActionScheduler()
+    scheduler.start()
+    variants = [("threads", threads), ("scheduler", scheduled(scheduler))]
+
+    print("%d players, %d moves each, cost %.0f ms" % (PLAYERS, rounds, MOVE_COST * 1e3))
+    print("%-10s %10s %10s %10s" % ("jitter ms", "mean", "p99", "max"))
+    for name, schedule in variants:
+        recorder, _ = run(schedule, rounds, MOVE_COST)
+        lateness = recorder.lateness
+        print("%-10s %10.2f %10.2f %10.2f" % (name, sum(lateness) / len(lateness) * 1e3,
+                                              percentile(lateness, 0.99) * 1e3, max(lateness) * 1e3))
+
+    print("%-10s %10s" % ("", "actions/s"))
+    for name, schedule in variants:
+        recorder, seconds = run(schedule, 500, 0)
+        print("%-10s %10.0f" % (name, len(recorder.lateness) / seconds))
+    scheduler.stop()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""
+compares the threaded CommunicationServer with the EventLoopServer.
+every simulated client connects, then all of them repeatedly send GetGames and wait for the RegisteredGames answer.
+run from this directory (the messages module loads the schema relatively to the working directory):
+    PYTHONPATH=../.. python bench_server.py -c 10 100 1000
+"""
+import io
+import selectors
+import socket
+import threading
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from time import perf_counter, sleep
+
+from src.communication import messages
+from src.communication.event_server import EventLoopServer
+from src.communication.server import CommunicationServer
+
+SERVERS = {"threaded": CommunicationServer, "event-loop": EventLoopServer}
+SEPARATOR = CommunicationServer.MSG_SEPARATOR.encode()
+
+
+def start_server(server_class):
+    server = server_class(False, "127.0.0.1", 0)
+    server.socket.listen(1024)
+    threading.Thread(target=server.accept_clients, daemon=True).start()
+    return server
+
+
+def connect_clients(port, count):
+    clients = []
+    for i in range(count):
+        client = socket.create_connection(("127.0.0.1", port))
+        clients.append(client)
+    return clients
+
+
+def run_rounds(clients, rounds):
+    """
+    :returns: number of completed request/response round trips
+    """
+    selector = selectors.DefaultSelector()
+    for client in clients:
+        selector.register(client, selectors.EVENT_READ)
+
+    request = (messages.GetGames() + CommunicationServer.MSG_SEPARATOR).encode()
+    completed = 0
+    for i in range(rounds):
+        for client in clients:
+            client.sendall(request)
+        pending = len(clients)
+        while pending > 0:
+            for key, mask in selector.select(timeout=10):
+                data = key.fileobj.recv(65536)
+                pending -= data.count(SEPARATOR)
+                completed += data.count(SEPARATOR)
+    selector.close()
+    return completed
+
+
+def benchmark(server_name, client_count, rounds):
+    threads_before = threading.active_count()
+    server = start_server(SERVERS[server_name])
+    port = server.socket.getsockname()[1]
+
+    start = perf_counter()
+    clients = connect_clients(port, client_count)
+    # wait until the server has registered everybody:
+    while len(server.clients) < client_count:
+        sleep(0.01)
+    connect_time = perf_counter() - start
+
+    start = perf_counter()
+    completed = run_rounds(clients, rounds)
+    elapsed = perf_counter() - start
+    threads = threading.active_count() - threads_before
+
+    # the server reports every disconnection, we don't need to see that:
+    with redirect_stdout(io.StringIO()):
+        for client in clients:
+            client.close()
+        server.running = False
+        server.socket.close()
+        sleep(1)
+
+    print("%-10s clients: %5d  connect: %7.3f s  round trips: %7d  %9.0f msg/s  threads: %5d" % (
+        server_name, client_count, connect_time, completed, completed / elapsed, threads))
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-c', '--clients', type=int, nargs='+', default=[10, 100, 1000],
+                        help='Numbers of concurrently connected clients to try.')
+    parser.add_argument('-r', '--rounds', type=int, default=20, help='GetGames round trips per client.')
+    parser.add_argument('-s', '--servers', nargs='+', default=list(SERVERS.keys()), choices=list(SERVERS.keys()))
+    args = vars(parser.parse_args())
+
+    for count in args["clients"]:
+        for name in args["servers"]:
+            benchmark(name, count, args["rounds"])
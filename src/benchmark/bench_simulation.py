@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+"""
+games per minute played by the in-process simulation (see simulation.py) on a single core, with the responses
+handed over as they are ("plain"), or encoded and decoded as xml messages, with and without schema validation.
+"speed-up" compares with the time the same games take over the server, where every action really waits its cost.
+    PYTHONPATH=../.. python bench_simulation.py
+"""
+import os
+from argparse import ArgumentParser
+from time import perf_counter
+
+from src.communication import gamemaster, messages
+from src.communication.simulation import play_game
+
+VARIANTS = [("plain", False, "off"), ("encoded", True, "off"), ("validated", True, "always")]
+
+
+def measure(encode, seconds, settings_file):
+    """
+    :returns: (games played per minute, virtual game time per wall clock time)
+    """
+    games, virtual_time = 0, 0.0
+    started = perf_counter()
+    while games == 0 or perf_counter() - started < seconds:
+        virtual_time += play_game(games, settings_file, encode).duration
+        games += 1
+    elapsed = perf_counter() - started
+    return games / elapsed * 60, virtual_time / elapsed
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-t', '--time', type=float, default=5, help='Seconds to run each variant for.')
+    args = vars(parser.parse_args())
+    settings_file = os.path.join(os.path.dirname(os.path.abspath(gamemaster.__file__)), "GameMasterSettings.xml")
+
+    print("%-10s %12s %10s" % ("", "games/min", "speed-up"))
+    for name, encode, validation in VARIANTS:
+        messages.set_validation_policy(validation)
+        games_per_minute, speed_up = measure(encode, args["time"], settings_file)
+        print("%-10s %12.0f %9.0fx" % (name, games_per_minute, speed_up))
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+"""
+scaling of the tournament (see tournament.py) with the number of worker processes: games per minute with 1 worker,
+2 workers... up to one per core. "efficiency" is the speed-up divided by the number of workers, 100% is linear.
+    PYTHONPATH=../.. python bench_tournament.py
+"""
+import os
+import tempfile
+from argparse import ArgumentParser
+from time import perf_counter
+
+from src.communication import gamemaster
+from src.communication.tournament import run_tournament
+
+
+def games_per_minute(workers, games, settings_file) -> float:
+    with tempfile.TemporaryDirectory() as directory:
+        started = perf_counter()
+        run_tournament([settings_file], [("basic", "basic")], range(games), os.path.join(directory, "results.jsonl"),
+                       workers)
+        return games / (perf_counter() - started) * 60
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-g', '--games', type=int, default=400, help='Games played by each worker.')
+    args = vars(parser.parse_args())
+    settings_file = os.path.join(os.path.dirname(os.path.abspath(gamemaster.__file__)), "GameMasterSettings.xml")
+
+    worker_counts = sorted({1, 2, 4, os.cpu_count() or 1} & set(range(1, (os.cpu_count() or 1) + 1)))
+    print("%-8s %12s %11s" % ("workers", "games/min", "efficiency"))
+    single = None
+    for workers in worker_counts:
+        rate = games_per_minute(workers, args["games"] * workers, settings_file)
+        single = rate if single is None else single
+        print("%-8d %12.0f %10.0f%%" % (workers, rate, rate / single / workers * 100))
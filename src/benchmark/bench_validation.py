@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+cost of building messages under each schema validation policy, per message type.
+"async" only measures the sender, the validation itself is done by the background thread.
+    PYTHONPATH=../.. python bench_validation.py
+"""
+from argparse import ArgumentParser
+from time import perf_counter
+
+from src.communication import messages
+from src.communication.info import TaskFieldInfo, GoalFieldInfo, PieceInfo, PieceType, PlayerInfo, Allegiance, \
+    PlayerType
+
+GUID = "c094cab7-da7b-457f-89e5-a5c51756035f"
+
+
+def builders():
+    task_fields = {(x, y): TaskFieldInfo(x, y, distance_to_piece=2) for x in range(10) for y in range(3, 13)}
+    goal_fields = {(x, y): GoalFieldInfo(x, y, Allegiance.RED.value) for x in range(10) for y in range(3)}
+    pieces = {str(i): PieceInfo(str(i), PieceType.UNKNOWN.value) for i in range(10)}
+    teams = {Allegiance.RED.value: {str(i): PlayerInfo(str(i), Allegiance.RED.value, type=PlayerType.MEMBER.value)
+                                    for i in range(4)},
+             Allegiance.BLUE.value: {str(i): PlayerInfo(str(i), Allegiance.BLUE.value, type=PlayerType.MEMBER.value)
+                                     for i in range(4, 8)}}
+    neighbourhood = {(x, y): task_fields[x, y] for x in range(3) for y in range(3, 6)}
+    return [
+        ("Move", lambda: messages.Move("0", GUID, "up")),
+        ("Discover", lambda: messages.Discover("0", GUID)),
+        ("Data (Move)", lambda: messages.Data("1", False, task_fields={(1, 4): task_fields[1, 4]},
+                                              player_location=(1, 4))),
+        ("Data (Discover)", lambda: messages.Data("1", False, task_fields=neighbourhood)),
+        ("Data (board)", lambda: messages.Data("1", False, task_fields, goal_fields, pieces)),
+        ("Game", lambda: messages.Game("1", teams, 10, 10, 3, (0, 0))),
+    ]
+
+
+def measure(build, seconds):
+    built = 0
+    start = perf_counter()
+    while perf_counter() - start < seconds:
+        for i in range(50):
+            build()
+        built += 50
+    return (perf_counter() - start) / built * 1e6
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-t', '--time', type=float, default=0.5, help='Seconds to run each variant for.')
+    parser.add_argument('-s', '--sample-rate', type=int, default=100, help='Sample rate of the "sampled" policy.')
+    args = vars(parser.parse_args())
+
+    modes = list(messages.ValidationMode)
+    print("%-16s" % "us per message" + "".join("%10s" % mode.value for mode in modes))
+    for name, build in builders():
+        row = []
+        for mode in modes:
+            policy = messages.set_validation_policy(mode, args["sample_rate"], on_violation=None)
+            row.append(measure(build, args["time"]))
+            policy.wait_for_background()
+        print("%-16s" % name + "".join("%10.1f" % cost for cost in row))
+    messages.set_validation_policy(messages.ValidationMode.ALWAYS)
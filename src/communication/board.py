@@ -0,0 +1,321 @@
+from collections.abc import Mapping
+from datetime import datetime
+
+# numpy is an optional dependency, only this module (ArrayGameInfo) needs it. nothing else in the game imports it.
+import numpy as np
+
+from src.communication.info import GameInfo, TaskFieldInfo, GoalFieldInfo, Allegiance, GoalFieldType
+
+NO_ID = -1  # no player / piece on the field
+UNKNOWN_DISTANCE = -1  # no piece on the board (or the distance isn't known yet)
+
+ALLEGIANCES = [allegiance.value for allegiance in Allegiance]  # code => allegiance
+GOAL_FIELD_TYPES = [goal_type.value for goal_type in GoalFieldType]  # code => type of goal field
+ALLEGIANCE_CODES = {allegiance: code for code, allegiance in enumerate(ALLEGIANCES)}
+GOAL_FIELD_TYPE_CODES = {goal_type: code for code, goal_type in enumerate(GOAL_FIELD_TYPES)}
+
+
+def encode_id(value) -> int:
+    """
+    :param value: player or piece id. ids are numbers (sent as strings), "-1" or None mean no id.
+    """
+    if value is None or value == "-1":
+        return NO_ID
+    return int(value)
+
+
+def decode_id(value) -> str:
+    return "-1" if value == NO_ID else str(int(value))
+
+
+def encode_timestamp(value) -> float:
+    return value.timestamp() if isinstance(value, datetime) else float(value)
+
+
+def manhattan_distance_transform(sources: np.ndarray) -> np.ndarray:
+    """
+    :param sources: 2d bool array, True where a piece lies
+    :returns: int array of the same shape: manhattan distance from every cell to the closest True cell.
+    all cells are UNKNOWN_DISTANCE if there is no True cell at all.
+    """
+    if not sources.any():
+        return np.full(sources.shape, UNKNOWN_DISTANCE, dtype=np.int32)
+
+    distances = np.where(sources, 0, sources.shape[0] + sources.shape[1]).astype(np.int32)
+    # the distance is separable: the closest piece along x first, then along y. along each axis,
+    # d[i] = min over k of d[k] + |i - k|, which is a running minimum in both directions:
+    for axis in (0, 1):
+        shape = [1, 1]
+        shape[axis] = distances.shape[axis]
+        index = np.arange(distances.shape[axis], dtype=np.int32).reshape(shape)
+        forward = np.minimum.accumulate(distances - index, axis=axis) + index
+        backward = np.flip(np.minimum.accumulate(np.flip(distances + index, axis=axis), axis=axis), axis=axis) - index
+        distances = np.minimum(forward, backward)
+    return distances
+
+
+def id_property(array_name: str):
+    def get(self):
+        return decode_id(getattr(self.board, array_name)[self.x, self.y])
+
+    def set(self, value):
+        getattr(self.board, array_name)[self.x, self.y] = encode_id(value)
+
+    return property(get, set)
+
+
+def code_property(array_name: str, values: list, codes: dict):
+    def get(self):
+        return values[getattr(self.board, array_name)[self.x, self.y]]
+
+    def set(self, value):
+        getattr(self.board, array_name)[self.x, self.y] = codes[value]
+
+    return property(get, set)
+
+
+def timestamp_get(self):
+    return datetime.fromtimestamp(self.board.timestamps[self.x, self.y])
+
+
+def timestamp_set(self, value):
+    self.board.timestamps[self.x, self.y] = encode_timestamp(value)
+
+
+class TaskFieldView(TaskFieldInfo):
+    """
+    task field of an ArrayGameInfo: its attributes are read from and written to the board's arrays.
+    """
+    player_id = id_property("player_ids")
+    piece_id = id_property("piece_ids")
+    timestamp = property(timestamp_get, timestamp_set)
+
+    def __init__(self, board, x: int, y: int):
+        self.board = board
+        self.x = x
+        self.y = y
+
+    @property
+    def distance_to_piece(self):
+        return int(self.board.distances[self.x, self.y])
+
+    @distance_to_piece.setter
+    def distance_to_piece(self, value):
+        self.board.distances[self.x, self.y] = UNKNOWN_DISTANCE if value is None else value
+
+    def detached(self) -> TaskFieldInfo:
+        """
+        :returns: a plain TaskFieldInfo with the current values, which doesn't change with the board.
+        """
+        return TaskFieldInfo(self.x, self.y, self.timestamp, self.distance_to_piece, self.player_id, self.piece_id)
+
+    def __copy__(self):
+        return self.detached()
+
+    def __deepcopy__(self, memo):
+        return self.detached()
+
+
+class GoalFieldView(GoalFieldInfo):
+    """
+    goal field of an ArrayGameInfo: its attributes are read from and written to the board's arrays.
+    """
+    player_id = id_property("player_ids")
+    allegiance = code_property("allegiances", ALLEGIANCES, ALLEGIANCE_CODES)
+    type = code_property("goal_types", GOAL_FIELD_TYPES, GOAL_FIELD_TYPE_CODES)
+    timestamp = property(timestamp_get, timestamp_set)
+
+    def __init__(self, board, x: int, y: int):
+        self.board = board
+        self.x = x
+        self.y = y
+
+    def detached(self) -> GoalFieldInfo:
+        """
+        :returns: a plain GoalFieldInfo with the current values, which doesn't change with the board.
+        """
+        return GoalFieldInfo(self.x, self.y, self.allegiance, self.player_id, self.timestamp, self.type)
+
+    def __copy__(self):
+        return self.detached()
+
+    def __deepcopy__(self, memo):
+        return self.detached()
+
+
+class FieldsView(Mapping):
+    """
+    dict-like (x,y) => field view of one area of an ArrayGameInfo, so that it can be used just like the dicts of
+    GameInfo. the fields are listed in the same order as GameInfo.initialize_fields creates them.
+    """
+
+    def __init__(self, board, view_class, rows):
+        """
+        :param rows: function returning the y coordinates of the area, in the order of the fields
+        """
+        self.board = board
+        self.view_class = view_class
+        self.rows = rows
+
+    def __contains__(self, location):
+        try:
+            x, y = location
+        except (TypeError, ValueError):
+            return False
+        return 0 <= x < self.board.fields_width and y in self.rows()
+
+    def __getitem__(self, location):
+        if location not in self:
+            raise KeyError(location)
+        return self.view_class(self.board, location[0], location[1])
+
+    def __setitem__(self, location, field):
+        """
+        copy the values of a field (FieldInfo or a view) into the board.
+        """
+        view = self[location]
+        view.player_id = field.player_id
+        view.timestamp = field.timestamp
+        if self.view_class is TaskFieldView:
+            view.piece_id = field.piece_id
+            view.distance_to_piece = field.distance_to_piece
+        else:
+            view.allegiance = field.allegiance
+            view.type = field.type
+
+    def __iter__(self):
+        for y in self.rows():
+            for x in range(self.board.fields_width):
+                yield x, y
+
+    def __len__(self):
+        return len(self.rows()) * self.board.fields_width
+
+
+class ArrayGameInfo(GameInfo):
+    """
+    GameInfo keeping the board in numpy arrays indexed [x, y] (one array per attribute of the fields) instead of
+    a dict of field objects. task_fields and goal_fields are views, so [x, y] access works as it does with GameInfo,
+    while the bulk operations (distances, looking for empty fields, merging knowledge) work on whole arrays at once.
+    fields are only created by initialize_fields. player and piece ids have to be numbers.
+    a distance to piece which isn't known (no piece on the board) is UNKNOWN_DISTANCE, never None.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(ArrayGameInfo, self).__init__(*args, **kwargs)
+        self.allocate(0, 0)
+        self.task_fields = FieldsView(self, TaskFieldView, self.task_rows)
+        self.goal_fields = FieldsView(self, GoalFieldView, self.goal_rows)
+
+    def allocate(self, width: int, length: int):
+        self.fields_width = width  # board width, 0 until the fields are initialized
+        self.player_ids = np.full((width, length), NO_ID, dtype=np.int32)
+        self.piece_ids = np.full((width, length), NO_ID, dtype=np.int32)
+        self.distances = np.full((width, length), UNKNOWN_DISTANCE, dtype=np.int32)
+        self.goal_types = np.full((width, length), GOAL_FIELD_TYPE_CODES[GoalFieldType.UNKNOWN.value], dtype=np.int8)
+        self.allegiances = np.full((width, length), ALLEGIANCE_CODES[Allegiance.NEUTRAL.value], dtype=np.int8)
+        self.timestamps = np.full((width, length), datetime.now().timestamp(), dtype=np.float64)
+
+    def task_rows(self):
+        return range(self.goals_height + self.task_height - 1, self.goals_height - 1, -1)
+
+    def goal_rows(self):
+        red = range(self.whole_board_length, self.goals_height + self.task_height - 1, -1)
+        blue = range(self.goals_height - 1, -1, -1)
+        return list(red) + list(blue)
+
+    @property
+    def task_area(self):
+        """
+        :returns: index of the task area in the arrays
+        """
+        return slice(None), slice(self.goals_height, self.goals_height + self.task_height)
+
+    def initialize_fields(self, goals_height=None, task_height=None, board_width=None):
+        old_width, old_length = self.player_ids.shape
+        old_arrays = [self.player_ids, self.piece_ids, self.distances, self.goal_types, self.allegiances,
+                      self.timestamps]
+        self.free_fields = None
+        if goals_height is not None:
+            self.goals_height = goals_height
+        if task_height is not None:
+            self.task_height = task_height
+        if board_width is not None:
+            self.board_width = board_width
+
+        self.allocate(self.board_width, self.whole_board_length + 1)
+        self.allegiances[:, self.goals_height + self.task_height:] = ALLEGIANCE_CODES[Allegiance.RED.value]
+        self.allegiances[:, :self.goals_height] = ALLEGIANCE_CODES[Allegiance.BLUE.value]
+        # fields which existed already are kept, just like GameInfo keeps them:
+        width, length = min(old_width, self.board_width), min(old_length, self.whole_board_length + 1)
+        for new, old in zip([self.player_ids, self.piece_ids, self.distances, self.goal_types, self.allegiances,
+                             self.timestamps], old_arrays):
+            new[:width, :length] = old[:width, :length]
+
+    def check_for_empty_task_fields(self):
+        return bool((self.piece_ids[self.task_area] == NO_ID).any())
+
+    def empty_task_fields(self) -> list:
+        """
+        :returns: list of (x,y) of the task fields without a piece.
+        """
+        xs, ys = np.nonzero(self.piece_ids[self.task_area] == NO_ID)
+        return list(zip(xs.tolist(), (ys + self.goals_height).tolist()))
+
+    def has_piece(self, x, y):
+        if (x, y) not in self.task_fields:
+            raise KeyError
+        return bool(self.piece_ids[x, y] != NO_ID)
+
+    def update_field_distances(self):
+        """
+        re-calculates distance_to_piece field in all TaskFields on the board.
+        """
+        task_distances = self.distances[self.task_area]
+        sources = np.zeros(task_distances.shape, dtype=bool)
+        outside = []
+        for piece in self.pieces.values():
+            if piece.location is None:
+                continue
+            x, y = piece.location
+            if (x, y) in self.task_fields:
+                sources[x, y - self.goals_height] = True
+            else:
+                outside.append((x, y))
+
+        task_distances[...] = manhattan_distance_transform(sources)
+        # pieces outside of the task area don't happen in the game, but they count:
+        for x, y in outside:
+            cone = self.distances_from(x, y)
+            task_distances[...] = np.where(task_distances == UNKNOWN_DISTANCE, cone, np.minimum(task_distances, cone))
+
+    def distances_from(self, x: int, y: int) -> np.ndarray:
+        """
+        :returns: manhattan distances from (x,y) to all the task fields.
+        """
+        xs = np.abs(np.arange(self.board_width, dtype=np.int32) - x)
+        ys = np.abs(np.arange(self.goals_height, self.goals_height + self.task_height, dtype=np.int32) - y)
+        return xs[:, None] + ys[None, :]
+
+    def piece_moved(self, old_location: tuple, new_location: tuple):
+        self.update_free_fields(old_location, new_location)
+        task_distances = self.distances[self.task_area]
+        if old_location is None and new_location is not None and new_location in self.task_fields and \
+                task_distances.size > 0 and task_distances.min() != UNKNOWN_DISTANCE:
+            # a new piece can only make the distances shorter
+            np.minimum(task_distances, self.distances_from(*new_location), out=task_distances)
+        else:
+            self.update_field_distances()
+
+    def merge(self, other: "ArrayGameInfo") -> int:
+        """
+        take over the other's knowledge of every field which it has seen more recently (e.g. after a knowledge
+        exchange). both boards must have the same size.
+        :returns: number of fields which were updated.
+        """
+        newer = other.timestamps > self.timestamps
+        for own, others in ((self.player_ids, other.player_ids), (self.piece_ids, other.piece_ids),
+                            (self.distances, other.distances), (self.goal_types, other.goal_types),
+                            (self.timestamps, other.timestamps)):
+            np.copyto(own, others, where=newer)
+        return int(newer.sum())
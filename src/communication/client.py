@@ -4,7 +4,10 @@ from datetime import datetime
 from queue import Queue
 from time import sleep
 
+from src.communication.framing import MessageFramer
 from src.communication.info import ClientTypeTag
+from src.communication.outbound import OutboundQueue
+from src.communication.unexpected import FrameTooLargeError
 
 
 class Client:
@@ -27,7 +30,7 @@ class Client:
         self.interConnectionTime = Client.INTER_CONNECTION_TIME
         self.timeBetweenMessages = Client.TIME_BETWEEN_MESSAGES
         self.connectionAttempts = Client.CONNECTION_ATTEMPTS
-        self.socket = socket.socket()
+        self.socket = self.create_socket()
         self.index = index
         self.id = None  # will be assigned after connecting to gamemaster.
         self.verbose = verbose
@@ -35,10 +38,15 @@ class Client:
         self.last_message = None
         self.typeTag = ClientTypeTag.CLIENT
         self.msg_queue = Queue()
+        self.framer = MessageFramer()  # puts together messages split between calls to recv
+        self.outbound = OutboundQueue()  # messages waiting to be written to the socket
         # self.socket.settimeout(1)
 
         self.verbose_debug("Client created.")
 
+    def create_socket(self):
+        return socket.socket()
+
     def connect(self, hostname=DEFAULT_HOSTNAME, port=DEFAULT_PORT):
         """
         try to connect to server and receive UID
@@ -95,9 +103,9 @@ class Client:
         Send message to server.
         """
         try:
-            # We append the MSG_SEPARATOR to the end of each msg
-            message += self.MSG_SEPARATOR
-            self.socket.send(message.encode())
+            # the queue appends the MSG_SEPARATOR to the end of each msg and resumes short writes
+            self.outbound.push(message.encode())
+            self.outbound.flush(self.socket)
             self.last_message = message
             self.verbose_debug("Sent to server: \"" + message + "\".")
         except socket.error as e:
@@ -111,17 +119,22 @@ class Client:
         :return: 
         """
         try:
-            received_data = (self.socket.recv(Client.MESSAGE_BUFFER_SIZE)).decode()
-            if len(received_data) < 1 or received_data is None:
-                raise ConnectionAbortedError
-            else:
-                for msg in received_data.split(self.MSG_SEPARATOR):
-                    if len(msg) > 0:
-                        self.msg_queue.put(msg)
+            # a single recv may contain only a part of a message, so keep reading until a whole one arrives:
+            while self.msg_queue.empty():
+                received_data = self.socket.recv(Client.MESSAGE_BUFFER_SIZE)
+                if len(received_data) < 1 or received_data is None:
+                    raise ConnectionAbortedError
+                for msg in self.framer.feed(received_data):
+                    self.msg_queue.put(msg)
+
             message = self.msg_queue.get()
             self.verbose_debug("Received from server: \"" + message + "\".")
             return message
 
+        except FrameTooLargeError as e:
+            self.verbose_debug("Shutting down the client: " + str(e), True)
+            self.shutdown()
+
         except ConnectionAbortedError:
             self.verbose_debug("Server has shut down. Shutting down the client as well.", True)
             self.shutdown()
@@ -0,0 +1,390 @@
+import xml.etree.ElementTree as ET
+from sys import intern
+
+from src.communication.sniffer import sniff, sniff_tag, sniff_attribute
+
+
+def local_name(tag: str) -> str:
+    return tag[tag.index("}") + 1:] if tag[0] == "{" else tag
+
+
+def interned(value, default=None):
+    """
+    ids and timestamps are repeated in thousands of fields and pieces. every parse creates new strings for them,
+    so they are interned before they're stored: all the fields referring to the same player share a single string.
+    :returns: value as an interned str, or default if value is None.
+    """
+    return default if value is None else intern(str(value))
+
+
+class DecodedMessage:
+    """
+    a received message. its type (class) is read from the name of the root element only. the rest is read when it's
+    accessed: root attributes of messages without children straight from the header (see sniffer), everything
+    else from a single parse of the whole message.
+    """
+    __slots__ = ("raw", "tag", "_attributes", "_root")
+    TYPE = None  # name of the root element, None for messages without their own class
+    HEADER_ONLY = False  # True for messages which have no children, their attributes are sniffed instead of parsed
+
+    def __init__(self, raw, tag: str):
+        self.raw = raw
+        self.tag = tag  # name of the root element (without namespace)
+        self._attributes = None
+        self._root = None
+
+    @classmethod
+    def from_attributes(cls, attributes: dict):
+        """
+        a message which was never encoded (see simulation): its root attributes are given instead of read from xml.
+        only works for messages without children.
+        """
+        message = cls(None, cls.TYPE)
+        message._attributes = attributes
+        return message
+
+    @property
+    def attributes(self) -> dict:
+        """
+        :returns: root attributes: name => value
+        """
+        if self._attributes is None:
+            self._attributes = sniff(self.raw)[1] if self.HEADER_ONLY else self.root.attrib
+        return self._attributes
+
+    @property
+    def root(self) -> ET.Element:
+        if self._root is None:
+            self._root = ET.fromstring(self.raw)
+        return self._root
+
+    def get(self, name, default=None):
+        """
+        :returns: value of a root attribute.
+        """
+        if self.HEADER_ONLY and self._attributes is None:
+            value = sniff_attribute(self.raw, name)
+            return default if value is None else value
+        return self.attributes.get(name, default)
+
+    def children(self) -> list:
+        """
+        :returns: list of (tag without namespace, element) of the root's direct children.
+        """
+        return [(local_name(child.tag), child) for child in self.root]
+
+    def __str__(self):
+        return self.raw if isinstance(self.raw, str) else self.raw.decode()
+
+
+class GameMessage(DecodedMessage):
+    """
+    sent by a Player to the GM (Move, Discover...)
+    """
+    __slots__ = ()
+    HEADER_ONLY = True
+
+    @property
+    def game_id(self):
+        return self.get("gameId")
+
+    @property
+    def player_guid(self):
+        return self.get("playerGuid")
+
+
+class Move(GameMessage):
+    __slots__ = ()
+    TYPE = "Move"
+
+    @property
+    def direction(self):
+        return self.get("direction")
+
+
+class Discover(GameMessage):
+    __slots__ = ()
+    TYPE = "Discover"
+
+
+class PickUpPiece(GameMessage):
+    __slots__ = ()
+    TYPE = "PickUpPiece"
+
+
+class PlacePiece(GameMessage):
+    __slots__ = ()
+    TYPE = "PlacePiece"
+
+
+class TestPiece(GameMessage):
+    __slots__ = ()
+    TYPE = "TestPiece"
+
+
+class AuthorizeKnowledgeExchange(GameMessage):
+    __slots__ = ()
+    TYPE = "AuthorizeKnowledgeExchange"
+
+    @property
+    def with_player_id(self):
+        return self.get("withPlayerId")
+
+
+class PlayerMessage(DecodedMessage):
+    """
+    sent to a Player, or about a Player (Data, Game, JoinGame...)
+    """
+    __slots__ = ()
+
+    @property
+    def player_id(self):
+        return self.get("playerId")
+
+
+class JoinGame(PlayerMessage):
+    __slots__ = ()
+    TYPE = "JoinGame"
+    HEADER_ONLY = True
+
+    @property
+    def game_name(self):
+        return self.get("gameName")
+
+    @property
+    def preferred_team(self):
+        return self.get("preferredTeam")
+
+    @property
+    def preferred_role(self):
+        return self.get("preferredRole")
+
+
+class ConfirmJoiningGame(PlayerMessage):
+    __slots__ = ()
+    TYPE = "ConfirmJoiningGame"
+
+    @property
+    def game_id(self):
+        return self.get("gameId")
+
+    @property
+    def private_guid(self):
+        return self.get("privateGuid")
+
+    @property
+    def player_definition(self) -> dict:
+        """
+        :returns: attributes of the PlayerDefinition (id, team, type)
+        """
+        for tag, child in self.children():
+            if tag == "PlayerDefinition":
+                return child.attrib
+        return {}
+
+
+class RejectJoiningGame(PlayerMessage):
+    __slots__ = ()
+    TYPE = "RejectJoiningGame"
+    HEADER_ONLY = True
+
+
+class PlayerDisconnected(PlayerMessage):
+    __slots__ = ()
+    TYPE = "PlayerDisconnected"
+    HEADER_ONLY = True
+
+
+class BetweenPlayersMessage(PlayerMessage):
+    """
+    about a knowledge exchange: playerId is the player it's for, senderPlayerId the one it comes from
+    """
+    __slots__ = ()
+    HEADER_ONLY = True
+
+    @property
+    def sender_player_id(self):
+        return self.get("senderPlayerId")
+
+
+class KnowledgeExchangeRequest(BetweenPlayersMessage):
+    __slots__ = ()
+    TYPE = "KnowledgeExchangeRequest"
+
+
+class AcceptExchangeRequest(BetweenPlayersMessage):
+    __slots__ = ()
+    TYPE = "AcceptExchangeRequest"
+
+
+class RejectKnowledgeExchange(BetweenPlayersMessage):
+    __slots__ = ()
+    TYPE = "RejectKnowledgeExchange"
+
+    @property
+    def permanent(self) -> bool:
+        return self.get("permanent") == "true"
+
+
+class Game(PlayerMessage):
+    __slots__ = ("_board", "_players", "_player_location")
+    TYPE = "Game"
+
+    def __init__(self, raw, tag: str):
+        super(Game, self).__init__(raw, tag)
+        self._board = None
+
+    def parse_children(self):
+        self._board, self._players, self._player_location = {}, [], None
+        for tag, child in self.children():
+            if tag == "Board":
+                self._board = child.attrib
+            elif tag == "PlayerLocation":
+                self._player_location = int(child.get("x")), int(child.get("y"))
+            elif tag == "Players":
+                self._players = list(child)
+
+    @property
+    def board(self) -> dict:
+        """
+        :returns: attributes of the Board (width, tasksHeight, goalsHeight)
+        """
+        if self._board is None:
+            self.parse_children()
+        return self._board
+
+    @property
+    def players(self) -> list:
+        """
+        :returns: list of Player elements (read their id, team, type with get)
+        """
+        if self._board is None:
+            self.parse_children()
+        return self._players
+
+    @property
+    def player_location(self) -> tuple:
+        if self._board is None:
+            self.parse_children()
+        return self._player_location
+
+
+class Data(PlayerMessage):
+    __slots__ = ("_task_fields", "_goal_fields", "_pieces", "_player_location")
+    TYPE = "Data"
+
+    def __init__(self, raw, tag: str):
+        super(Data, self).__init__(raw, tag)
+        self._task_fields = None
+
+    @property
+    def game_finished(self) -> bool:
+        return self.get("gameFinished") == "true"
+
+    def parse_children(self):
+        # a single pass over the root instead of a findall for each of the collections:
+        self._task_fields, self._goal_fields, self._pieces, self._player_location = [], [], [], None
+        for tag, child in self.children():
+            if tag == "TaskFields":
+                self._task_fields = list(child)
+            elif tag == "GoalFields":
+                self._goal_fields = list(child)
+            elif tag == "Pieces":
+                self._pieces = list(child)
+            elif tag == "PlayerLocation":
+                self._player_location = int(child.get("x")), int(child.get("y"))
+
+    @property
+    def task_fields(self) -> list:
+        """
+        :returns: list of TaskField elements
+        (read their x, y, timestamp, distanceToPiece, playerId, pieceId with get)
+        """
+        if self._task_fields is None:
+            self.parse_children()
+        return self._task_fields
+
+    @property
+    def goal_fields(self) -> list:
+        """
+        :returns: list of GoalField elements (read their x, y, timestamp, type, team, playerId with get)
+        """
+        if self._task_fields is None:
+            self.parse_children()
+        return self._goal_fields
+
+    @property
+    def pieces(self) -> list:
+        """
+        :returns: list of Piece elements (read their id, timestamp, type, playerId with get)
+        """
+        if self._task_fields is None:
+            self.parse_children()
+        return self._pieces
+
+    @property
+    def player_location(self) -> tuple:
+        """
+        :returns: x, y tuple or None if the message doesn't contain the location
+        """
+        if self._task_fields is None:
+            self.parse_children()
+        return self._player_location
+
+
+class RegisteredGames(DecodedMessage):
+    __slots__ = ()
+    TYPE = "RegisteredGames"
+
+    @property
+    def games(self) -> list:
+        """
+        :returns: list of GameInfo elements (read their gameName, blueTeamPlayers, redTeamPlayers with get)
+        """
+        return [child for tag, child in self.children() if tag == "GameInfo"]
+
+
+class ConfirmGameRegistration(DecodedMessage):
+    __slots__ = ()
+    TYPE = "ConfirmGameRegistration"
+    HEADER_ONLY = True
+
+    @property
+    def game_id(self):
+        return self.get("gameId")
+
+
+class RejectGameRegistration(DecodedMessage):
+    __slots__ = ()
+    TYPE = "RejectGameRegistration"
+    HEADER_ONLY = True
+
+
+class GameMasterDisconnected(DecodedMessage):
+    __slots__ = ()
+    TYPE = "GameMasterDisconnected"
+    HEADER_ONLY = True
+
+    @property
+    def game_id(self):
+        return self.get("gameId")
+
+
+# message type => class of the decoded message
+MESSAGE_CLASSES = {cls.TYPE: cls for cls in
+                   (Move, Discover, PickUpPiece, PlacePiece, TestPiece, AuthorizeKnowledgeExchange, JoinGame,
+                    ConfirmJoiningGame, RejectJoiningGame, PlayerDisconnected, KnowledgeExchangeRequest,
+                    AcceptExchangeRequest, RejectKnowledgeExchange, Game, Data, RegisteredGames,
+                    ConfirmGameRegistration, RejectGameRegistration, GameMasterDisconnected)}
+
+
+def decode(message) -> DecodedMessage:
+    """
+    identify the type of a message (reading only its header) and wrap it in the matching class.
+    :param message: str or bytes. an already decoded message is returned as it is.
+    :raises UnreadableHeader: if the message doesn't start with an xml element.
+    """
+    if isinstance(message, DecodedMessage):
+        return message
+    tag = sniff_tag(message)
+    return MESSAGE_CLASSES.get(tag, DecodedMessage)(message, tag)
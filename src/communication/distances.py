@@ -0,0 +1,124 @@
+from collections import deque
+from heapq import heappush, heappop
+
+
+def neighbours(location: tuple):
+    x, y = location
+    return (x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)
+
+
+class PieceDistances:
+    """
+    keeps distance_to_piece of all the task fields up to date when pieces are put on or taken off the board, touching
+    only the fields whose distance actually changes.
+    the task area is a rectangle without obstacles, so walking the fields breadth-first gives exactly the manhattan
+    distance to the closest piece, the same as GameInfo.update_field_distances.
+    """
+
+    def __init__(self, task_fields: dict):
+        """
+        :param task_fields: dict (x,y) => TaskFieldInfo, the distances are written straight into its fields.
+        """
+        self.task_fields = task_fields
+        self.pieces_at = {}  # (x,y) => number of pieces lying on that field
+
+    def rebuild(self, locations):
+        """
+        calculate the distances of all the fields from scratch.
+        :param locations: iterable of (x,y) of all the pieces lying on the board. all of them must be task fields.
+        """
+        self.pieces_at = {}
+        for location in locations:
+            self.pieces_at[location] = self.pieces_at.get(location, 0) + 1
+
+        for field in self.task_fields.values():
+            field.distance_to_piece = None  # no piece on the board, no distance
+        queue = deque(self.pieces_at.keys())
+        for location in queue:
+            self.task_fields[location].distance_to_piece = 0
+        self.spread(queue)
+
+    def spread(self, queue: deque):
+        """
+        breadth-first walk from the fields in the queue, lowering the distances of their neighbours where it's needed.
+        """
+        fields = self.task_fields
+        while queue:
+            location = queue.popleft()
+            distance = fields[location].distance_to_piece + 1
+            for neighbour in neighbours(location):
+                field = fields.get(neighbour)
+                if field is not None and (field.distance_to_piece is None or field.distance_to_piece > distance):
+                    field.distance_to_piece = distance
+                    queue.append(neighbour)
+
+    def add(self, location: tuple):
+        """
+        a piece was put on the field at location: only the fields which are now closer to it than to any other piece
+        are updated.
+        """
+        count = self.pieces_at.get(location, 0)
+        self.pieces_at[location] = count + 1
+        if count > 0:
+            return
+        if len(self.pieces_at) == 1:
+            # the first piece on the board, the old distances mean nothing
+            self.rebuild([location])
+            return
+
+        self.task_fields[location].distance_to_piece = 0
+        self.spread(deque([location]))
+
+    def remove(self, location: tuple):
+        """
+        a piece was taken off the field at location: only the fields to which it was the closest piece are updated.
+        """
+        count = self.pieces_at[location] - 1
+        if count > 0:
+            self.pieces_at[location] = count
+            return
+        del self.pieces_at[location]
+        if len(self.pieces_at) == 0:
+            self.rebuild(())
+            return
+
+        fields = self.task_fields
+        x, y = location
+        # the fields to which the removed piece was (one of) the closest. each of them can be reached from the piece
+        # through such fields only, so it's enough to walk from the piece:
+        affected = {location}
+        queue = deque([location])
+        while queue:
+            for neighbour in neighbours(queue.popleft()):
+                field = fields.get(neighbour)
+                if field is not None and neighbour not in affected and \
+                        field.distance_to_piece == abs(neighbour[0] - x) + abs(neighbour[1] - y):
+                    affected.add(neighbour)
+                    queue.append(neighbour)
+
+        # distances of the fields around the affected area didn't change, they are the starting points:
+        heap = []
+        for field_location in affected:
+            fields[field_location].distance_to_piece = None
+            for neighbour in neighbours(field_location):
+                if neighbour in fields and neighbour not in affected:
+                    heappush(heap, (fields[neighbour].distance_to_piece + 1, field_location))
+        while heap:
+            distance, field_location = heappop(heap)
+            field = fields[field_location]
+            if field.distance_to_piece is not None:
+                continue
+            field.distance_to_piece = distance
+            for neighbour in neighbours(field_location):
+                if neighbour in affected and fields[neighbour].distance_to_piece is None:
+                    heappush(heap, (distance + 1, neighbour))
+
+    def move(self, old_location: tuple, new_location: tuple):
+        """
+        :param old_location: where the piece was lying, None if it wasn't on the board
+        :param new_location: where the piece is lying now, None if it was taken off the board
+        """
+        if old_location is not None:
+            self.remove(old_location)
+        if new_location is not None:
+            self.add(new_location)
@@ -0,0 +1,188 @@
+import re
+from datetime import datetime
+
+# characters lxml escapes in attribute values, and how it does it:
+ATTRIBUTE_ESCAPES = {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#9;"}
+ESCAPED_CHARACTERS = re.compile('[&<>"\n\r\t\x00-\x08\x0b\x0c\x0e-\x1f]')
+ESCAPE_TABLE = str.maketrans(ATTRIBUTE_ESCAPES)
+# control characters which can't appear in an XML document at all (lxml refuses them as well):
+FORBIDDEN_CHARACTERS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def escape_attribute(value) -> str:
+    """
+    escape an attribute value exactly the way lxml's tostring does it.
+    :raises ValueError: if the value contains characters which are not allowed in XML.
+    """
+    if type(value) is int:
+        return str(value)
+    value = str(value)
+    if ESCAPED_CHARACTERS.search(value) is None:
+        return value
+    if FORBIDDEN_CHARACTERS.search(value) is not None:
+        raise ValueError("All strings must be XML compatible: Unicode or ASCII, no NULL bytes or control characters")
+    return value.translate(ESCAPE_TABLE)
+
+
+class MessageTemplate:
+    """
+    precompiled message consisting of a single, empty root element, which only differs in its attribute values
+    (e.g. Move, Discover). encoding it is just filling the escaped values into the markup, no tree is built.
+    the output is identical to building the message with lxml and calling tostring(root, encoding='unicode').
+    a player sends the same few messages over and over, so encoded messages are cached as well.
+    """
+    MAX_CACHED_MESSAGES = 4096  # per template, the cache is emptied when it gets full
+
+    def __init__(self, namespace: str, message_name: str, attribute_names: tuple):
+        """
+        :param namespace: default namespace (xmlns) of the message
+        :param message_name: tag of the root element
+        :param attribute_names: attribute names in the order in which the builder would set them
+        """
+        self.message_name = message_name
+        self.attribute_names = attribute_names
+        # '%' in the namespace has to be doubled, it would be taken for a placeholder else
+        markup = ('<' + message_name + ' xmlns="' + escape_attribute(namespace) + '"').replace('%', '%%')
+        for name in attribute_names:
+            markup += ' ' + name + '="%s"'
+        self.markup = markup + '/>'
+        self.cache = {}  # tuple of values => encoded message
+
+    def encode(self, *values) -> str:
+        """
+        :param values: attribute values, in the same order as attribute_names
+        :returns: message as unicode string.
+        """
+        message = self.cache.get(values)
+        if message is not None:
+            return message
+
+        message = self.markup % tuple(map(escape_attribute, values))
+        # only str values are cached: e.g. 1, 1.0 and True are equal keys, but they are encoded differently
+        if all(type(value) is str for value in values):
+            if len(self.cache) >= MessageTemplate.MAX_CACHED_MESSAGES:
+                self.cache.clear()
+            self.cache[values] = message
+        return message
+
+
+def located(fields):
+    """
+    :param fields: dict (x,y) => FieldInfo, or any iterable of FieldInfo (their own location is used then)
+    :returns: iterable of ((x,y), FieldInfo)
+    """
+    if hasattr(fields, "items"):
+        return fields.items()
+    return ((field.location, field) for field in fields)
+
+
+class DataEncoder:
+    """
+    streaming encoder of the Data message: fields and pieces are written straight into the output, no tree is built.
+    all the fields and pieces of a message get the same timestamp, the clock is read once per message.
+    the output is identical to the lxml builder given the same timestamp.
+    """
+    FLUSH_PARTS = 4096  # when encoding into a bytearray, the written parts are moved into it every that many parts
+
+    def __init__(self, namespace: str):
+        self.head = ('<Data xmlns="' + escape_attribute(namespace) + '"').replace('%', '%%') + \
+                    ' playerId="%s" gameFinished="%s"'
+
+    def encode(self, player_id, game_finished: bool, task_fields=None, goal_fields=None, pieces=None,
+               player_location: tuple = None, timestamp: datetime = None, out: bytearray = None):
+        """
+        :param task_fields: dict: (x,y) -> TaskFieldInfo, or an iterable of TaskFieldInfo
+        :param goal_fields: dict: (x,y) -> GoalFieldInfo or KnownGoalFieldView, or an iterable of them
+        :param pieces: dict: id -> PieceInfo, or an iterable of PieceInfo
+        :param player_location: tuple x,y
+        :param timestamp: timestamp of all fields and pieces, datetime.now() if not given
+        :param out: if given, the message is appended to this bytearray (utf-8 encoded) instead of being returned
+        :returns: message as unicode string, or out.
+        """
+        if timestamp is None:
+            timestamp = datetime.now()
+        timestamp = escape_attribute(timestamp.isoformat())
+        esc = escape_attribute
+
+        parts = [self.head % (esc(player_id), str(game_finished).lower())]
+        write = parts.append
+
+        # moving the written parts into out keeps the memory use low with huge messages:
+        flush_parts = DataEncoder.FLUSH_PARTS if out is not None else float("inf")
+
+        # the root's start tag is closed before its first child, or the root is written as an empty element (no
+        # pieces are no children, which is only known once they're written):
+        has_children = task_fields is not None or goal_fields is not None or player_location is not None
+        write('>')
+
+        if task_fields is not None:
+            write('<TaskFields>')
+            written = 0
+            for (x, y), field in located(task_fields):
+                write('<TaskField x="%s" y="%s" timestamp="%s" distanceToPiece="%s"' %
+                      (esc(x), esc(y), timestamp, esc(field.distance_to_piece)))
+                player_id, piece_id = field.player_id, field.piece_id
+                if player_id is not None and player_id != "-1":
+                    write(' playerId="' + esc(player_id) + '"')
+                if piece_id is not None and piece_id != "-1":
+                    write(' pieceId="' + esc(piece_id) + '"')
+                write('/>')
+                written += 1
+                if len(parts) >= flush_parts:
+                    out.extend("".join(parts).encode())
+                    parts.clear()
+            if written > 0:
+                write('</TaskFields>')
+            else:
+                parts[-1] = '<TaskFields/>'
+
+        if goal_fields is not None:
+            write('<GoalFields>')
+            written = 0
+            for (x, y), field in located(goal_fields):
+                write('<GoalField x="%s" y="%s" timestamp="%s" type="%s" team="%s"' %
+                      (esc(x), esc(y), timestamp, esc(field.type), esc(field.allegiance)))
+                player_id = field.player_id
+                if player_id is not None and player_id != "-1":
+                    write(' playerId="' + esc(player_id) + '"')
+                write('/>')
+                written += 1
+                if len(parts) >= flush_parts:
+                    out.extend("".join(parts).encode())
+                    parts.clear()
+            if written > 0:
+                write('</GoalFields>')
+            else:
+                parts[-1] = '<GoalFields/>'
+
+        if pieces is not None:
+            write('<Pieces>')
+            written = 0
+            for piece in (pieces.values() if hasattr(pieces, "values") else pieces):
+                write('<Piece id="%s" timestamp="%s" type="%s"' % (esc(piece.id), timestamp, esc(piece.type)))
+                player_id = piece.player_id
+                if player_id is not None and player_id != "-1":
+                    write(' playerId="' + esc(player_id) + '"')
+                write('/>')
+                written += 1
+                if len(parts) >= flush_parts:
+                    out.extend("".join(parts).encode())
+                    parts.clear()
+            if written > 0:
+                write('</Pieces>')
+                has_children = True
+            else:
+                parts.pop()  # no Pieces element without pieces
+
+        if player_location is not None:
+            write('<PlayerLocation x="%s" y="%s"/>' % (esc(player_location[0]), esc(player_location[1])))
+
+        if has_children:
+            write('</Data>')
+        else:
+            parts[-1] = '/>'  # nothing was written after the start tag
+
+        if out is None:
+            return "".join(parts)
+        out.extend("".join(parts).encode())
+        return out
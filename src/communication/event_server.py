@@ -0,0 +1,213 @@
+import selectors
+import socket
+
+from src.communication import messages
+from src.communication.info import ClientInfo, ClientTypeTag
+from src.communication.outbound import BackpressurePolicy, OutboundQueue
+from src.communication.server import CommunicationServer
+from src.communication.sniffer import sniff
+from src.communication.unexpected import UnexpectedClientMessage, FrameTooLargeError, OutboundQueueFull
+
+
+class EventLoopServer(CommunicationServer):
+    """
+    CommunicationServer running on a single event loop (selectors) instead of one thread per client.
+    Sockets are non-blocking: reads are handled when a socket becomes readable, and outgoing messages are queued
+    per client (OutboundQueue) and written out whenever the recipient's socket becomes writable.
+    Routing of the messages is exactly the same as in the threaded server (route_player_message, route_gm_message).
+    """
+    SELECT_TIMEOUT = 0.5  # time in s after which the loop checks if the server is still running
+    REGISTRATION_ATTEMPTS = 2  # how many times a GM may try to register its game before we consider it an error
+
+    def __init__(self, verbose: bool, hostname: str = CommunicationServer.DEFAULT_HOSTNAME,
+                 port: int = CommunicationServer.DEFAULT_PORT,
+                 backpressure: BackpressurePolicy = BackpressurePolicy.DISCONNECT,
+                 max_queued_messages: int = OutboundQueue.DEFAULT_MAX_MESSAGES):
+        if backpressure == BackpressurePolicy.BLOCK:
+            # the loop can't wait for a slow client, it would stop everybody else.
+            raise ValueError("Event loop server can only drop messages or disconnect slow clients.")
+        super(EventLoopServer, self).__init__(verbose, hostname, port, backpressure, max_queued_messages)
+
+        self.selector = selectors.DefaultSelector()
+        self.registration_attempts = {}  # client_id => number of failed game registrations
+
+    def accept_clients(self):
+        """
+        runs the event loop (on the accepting thread), which accepts new clients and handles all of their traffic.
+        """
+        self.verbose_debug("Will be accepting clients from now on (event loop mode).")
+        self.socket.setblocking(False)
+        self.selector.register(self.socket, selectors.EVENT_READ, None)
+
+        try:
+            while self.running:
+                for key, mask in self.selector.select(timeout=EventLoopServer.SELECT_TIMEOUT):
+                    if key.data is None:
+                        self.accept_pending()
+                    else:
+                        client = key.data
+                        if mask & selectors.EVENT_READ:
+                            self.handle_readable(client)
+                        if mask & selectors.EVENT_WRITE and self.clients.get(client.id) is not None:
+                            self.handle_writable(client)
+        except Exception as e:
+            self.verbose_debug("Shutting down the event loop: " + str(e))
+        finally:
+            self.selector.close()
+
+    def accept_pending(self):
+        """
+        accept all the clients waiting on the listening socket.
+        """
+        while True:
+            try:
+                client_socket, address = self.socket.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            self.register_connection(client_socket, str(self.client_indexer))
+            self.client_indexer += 1
+
+    def register_connection(self, client_socket: socket, client_id: str):
+        new_client = ClientInfo(client_id, socket=client_socket)
+        new_client.outbound = OutboundQueue(self.max_queued_messages, policy=self.backpressure)
+        self.clients[client_id] = new_client
+
+        client_socket.setblocking(False)
+        self.selector.register(client_socket, selectors.EVENT_READ, new_client)
+
+        self.verbose_debug(
+            "New client: " + new_client.get_tag() + " with address " + str(client_socket.getsockname()) + " connected.")
+
+    def handle_readable(self, client: ClientInfo):
+        try:
+            received_data = client.socket.recv(CommunicationServer.DEFAULT_BUFFER_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            received_data = b""
+
+        if len(received_data) < 1:
+            self.verbose_debug(client.get_tag() + " disconnected. Closing connection.", True)
+            self.disconnect_client(client.id)
+            return
+
+        self.verbose_debug("Received " + str(len(received_data)) + " bytes from " + client.get_tag() + ".")
+        try:
+            self.split_that_message(received_data, client)
+        except FrameTooLargeError as e:
+            self.verbose_debug("Disconnecting " + client.get_tag() + ": " + str(e), True)
+            self.disconnect_client(client.id)
+            return
+
+        while not client.queue.empty() and self.clients.get(client.id) is not None:
+            self.handle_message(client, client.queue.get())
+
+    def handle_message(self, client: ClientInfo, message: bytes):
+        """
+        dispatch a single message the same way as the threaded server's handle_client/handle_player/handle_gm do.
+        """
+        if self.verbose:
+            self.verbose_debug("Processing from " + client.get_tag() + ": \"" + message.decode() + "\".")
+        try:
+            if client.tag == ClientTypeTag.CLIENT:
+                self.identify_client(client, sniff(message)[0])
+
+                if client.tag == ClientTypeTag.PLAYER:
+                    self.verbose_debug("Identified C" + str(client.id) + " as a player")
+                    self.route_player_message(client, message)
+
+                elif client.tag == ClientTypeTag.GAME_MASTER:
+                    self.verbose_debug("Identified " + client.get_tag() + " as a Game Master")
+                    self.handle_registration(client, message)
+
+                else:
+                    self.verbose_debug("Unknown client connected to server, disconnecting him.", True)
+                    self.disconnect_client(client.id)
+
+            elif client.tag == ClientTypeTag.PLAYER:
+                self.route_player_message(client, message)
+
+            elif client.tag == ClientTypeTag.GAME_MASTER:
+                if client.game_id == "-1":
+                    self.handle_registration(client, message)
+                else:
+                    self.route_gm_message(client, message)
+
+        except (ConnectionAbortedError, ConnectionResetError):
+            self.disconnect_client(client.id)
+
+        except (Exception, UnexpectedClientMessage) as e:
+            # UnexpectedClientMessage is not an Exception, but it must not bring the whole loop down either
+            self.verbose_debug(
+                "Disconnecting " + client.get_tag() + " due to an unexpected exception: " + str(e) + ".", True)
+            self.disconnect_client(client.id)
+
+    def handle_registration(self, gm: ClientInfo, registration_msg: bytes):
+        if self.try_register_game(gm, registration_msg):
+            return
+
+        failed_attempts = self.registration_attempts.get(gm.id, 0) + 1
+        self.registration_attempts[gm.id] = failed_attempts
+        if failed_attempts > EventLoopServer.REGISTRATION_ATTEMPTS:
+            raise UnexpectedClientMessage(
+                "GameMaster tried to register a game again, while he should have switched off!")
+
+        # registration failed. send rejection:
+        self.send(gm, messages.RejectGameRegistration(gm.game_name))
+
+    def handle_writable(self, client: ClientInfo):
+        try:
+            client.outbound.write_to(client.socket)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            self.verbose_debug("Is this an error I see before me? " + str(e))
+            self.disconnect_client(client.id)
+            return
+
+        if client.outbound.is_empty():
+            self.selector.modify(client.socket, selectors.EVENT_READ, client)
+
+    def send_frame(self, recipient: ClientInfo, frame: bytes):
+        """
+        queue a given message for the recipient. it will be written out once the recipient's socket is writable.
+        :param recipient: socket object of the recipient.
+        :param frame: encoded message, without the separator.
+        """
+        # if recipient is None, then it means he has already disconnected, so lets not send him anything
+        if recipient is None or self.clients.get(recipient.id) is not recipient:
+            return
+
+        was_empty = recipient.outbound.is_empty()
+        try:
+            if not recipient.outbound.push(frame):
+                self.verbose_debug("Dropped a message for " + recipient.get_tag() + ", who is too slow to read it.")
+                return
+        except OutboundQueueFull as e:
+            self.verbose_debug("Disconnecting " + recipient.get_tag() + ": " + str(e), True)
+            self.disconnect_client(recipient.id)
+            return
+
+        if was_empty:
+            try:
+                self.selector.modify(recipient.socket, selectors.EVENT_READ | selectors.EVENT_WRITE, recipient)
+            except (KeyError, ValueError) as e:
+                self.verbose_debug("Is this an error I see before me? " + str(e))
+                return
+        if self.verbose:
+            self.verbose_debug("Message queued for " + recipient.get_tag() + ": \"" + frame.decode() + "\".")
+
+    def disconnect_client(self, client_id: str):
+        client = self.clients.get(client_id)
+        if client is None:
+            return
+
+        # stop watching the socket before it gets closed:
+        try:
+            self.selector.unregister(client.socket)
+        except (KeyError, ValueError):
+            pass
+        self.registration_attempts.pop(client_id, None)
+
+        super(EventLoopServer, self).disconnect_client(client_id)
+
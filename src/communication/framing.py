@@ -0,0 +1,68 @@
+from src.communication.unexpected import FrameTooLargeError
+
+# End of transmission byte is shown as an electric arrow.
+# See https://en.wikipedia.org/wiki/End-of-Transmission_character
+MSG_SEPARATOR = chr(23)
+DEFAULT_MAX_BUFFER_SIZE = 16 * 1024 * 1024  # 16 MiB of data without a separator is surely not a valid message
+
+
+class MessageFramer:
+    """
+    Splits a stream of bytes received from a socket into messages separated by MSG_SEPARATOR.
+    Every connection should have its own framer: it keeps the unfinished part of the stream between calls to feed,
+    so a message cut in half by recv() (or a multibyte character cut in half) is put back together before decoding.
+    """
+
+    def __init__(self, max_buffer_size: int = DEFAULT_MAX_BUFFER_SIZE, separator: str = MSG_SEPARATOR):
+        """
+        :param max_buffer_size: maximum number of bytes of an unfinished message we agree to hold.
+        :param separator: message separator, has to be encoded as a single byte.
+        """
+        self.separator = separator.encode()
+        self.max_buffer_size = max_buffer_size
+        self.buffer = bytearray()
+
+    @property
+    def pending(self) -> int:
+        """
+        :returns: number of bytes received which are not a complete message yet.
+        """
+        return len(self.buffer)
+
+    def feed_raw(self, data: bytes) -> list:
+        """
+        add received data to the buffer.
+        :returns: list of complete, non-empty messages (as bytes, without the separator).
+        """
+        index = data.find(self.separator)
+        if index == -1:
+            # no message ends in this chunk of data:
+            self.buffer += data
+            self.check_buffer_size()
+            return []
+
+        # the first message is the unfinished part of the stream plus the beginning of data:
+        self.buffer += data[:index]
+        frames = data[index + 1:].split(self.separator)
+        frames[0:0] = [bytes(self.buffer)]
+
+        # the last part is an unfinished message (empty if data ended with a separator):
+        self.buffer = bytearray(frames.pop())
+        self.check_buffer_size()
+        return [frame for frame in frames if len(frame) > 0]
+
+    def check_buffer_size(self):
+        if len(self.buffer) > self.max_buffer_size:
+            self.reset()
+            raise FrameTooLargeError("Received more than " + str(self.max_buffer_size) +
+                                     " bytes without a message separator.")
+
+    def feed(self, data: bytes) -> list:
+        """
+        add received data to the buffer.
+        :returns: list of complete, non-empty messages, decoded to strings.
+        """
+        return [frame.decode() for frame in self.feed_raw(data)]
+
+    def reset(self):
+        self.buffer = bytearray()
@@ -0,0 +1,45 @@
+from random import randrange
+
+
+class FreeFields:
+    """
+    the task fields without a piece: their locations in a list (so a random one can be picked in O(1)) plus
+    a location => position in the list map (so one can be taken out in O(1), by moving the last one into its place).
+    """
+
+    def __init__(self, locations=()):
+        """
+        :param locations: iterable of (x,y) of the free fields.
+        """
+        self.locations = []
+        self.positions = {}  # (x,y) => index in locations
+        for location in locations:
+            self.add(location)
+
+    def __len__(self):
+        return len(self.locations)
+
+    def __contains__(self, location):
+        return location in self.positions
+
+    def add(self, location: tuple):
+        if location not in self.positions:
+            self.positions[location] = len(self.locations)
+            self.locations.append(location)
+
+    def remove(self, location: tuple):
+        position = self.positions.pop(location, None)
+        if position is None:
+            return
+        last = self.locations.pop()
+        if position < len(self.locations):
+            self.locations[position] = last
+            self.positions[last] = position
+
+    def random(self) -> tuple:
+        """
+        :returns: (x,y) of a free field, every one of them is equally likely. None if there is none.
+        """
+        if len(self.locations) == 0:
+            return None
+        return self.locations[randrange(len(self.locations))]
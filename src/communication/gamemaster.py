@@ -1,16 +1,18 @@
-import copy
 import os
 import uuid
 import xml.etree.ElementTree as ET
 from argparse import ArgumentParser
+from itertools import count
 from random import random, randint
-from threading import Thread
 from time import sleep
 
-from src.communication import messages
+from src.communication import messages, decoding
 from src.communication.client import Client
-from src.communication.info import GameInfo, Direction, Allegiance, PieceInfo, PieceType, \
+from src.communication.decoding import decode, interned
+from src.communication.info import GameInfo, Direction, Allegiance, PieceType, \
     GoalFieldType, ClientTypeTag, PlayerType, PlayerInfo
+from src.communication.knowledge import PlayerKnowledge
+from src.communication.scheduler import ActionScheduler
 from src.communication.unexpected import UnexpectedServerMessage
 
 GAME_SETTINGS_TAG = "{https://se2.mini.pw.edu.pl/17-pl-19/17-pl-19/}"
@@ -18,8 +20,11 @@ XML_MESSAGE_TAG = "{https://se2.mini.pw.edu.pl/17-results/}"
 ET.register_namespace('', "https://se2.mini.pw.edu.pl/17-results/")
 DELAY_MODIFIER = 500
 
-def parse_game_master_settings():
-    full_file = os.getcwd() + "\GameMasterSettings.xml"
+def parse_game_master_settings(settings_file=None):
+    """
+    :param settings_file: path of the settings, GameMasterSettings.xml in the working directory by default
+    """
+    full_file = settings_file if settings_file is not None else os.path.join(os.getcwd(), "GameMasterSettings.xml")
     tree = ET.parse(full_file)
     root = tree.getroot()
 
@@ -27,8 +32,14 @@ def parse_game_master_settings():
 
 
 class GameMaster(Client):
+    def read_settings(self):
+        return parse_game_master_settings(self.settings_file)
+
+    def game_definitions(self):
+        return self.read_settings().findall(GAME_SETTINGS_TAG + "GameDefinition")
+
     def parse_game_definition(self):
-        root = parse_game_master_settings()
+        root = self.read_settings()
 
         self.keep_alive_interval = int(root.attrib.get('KeepAliveInterval'))
         self.retry_register_game_interval = int(root.attrib.get('RetryRegisterGameInterval'))
@@ -39,7 +50,7 @@ class GameMaster(Client):
         task_area_length = 0
         goal_area_length = 0
 
-        for game_attributes in root.findall(GAME_SETTINGS_TAG + "GameDefinition"):
+        for game_attributes in self.game_definitions():
             # load goal field information:
             for goal in game_attributes.findall(GAME_SETTINGS_TAG + "Goals"):
                 colour = goal.get("team")
@@ -65,7 +76,7 @@ class GameMaster(Client):
         self.goal_target = len(self.goals) / 2
 
     def parse_action_costs(self):
-        root = parse_game_master_settings()
+        root = self.read_settings()
 
         for action_costs in root.findall(GAME_SETTINGS_TAG + "ActionCosts"):
             self.move_delay = int(action_costs.find(GAME_SETTINGS_TAG + "MoveDelay").text)
@@ -75,13 +86,22 @@ class GameMaster(Client):
             self.placing_delay = int(action_costs.find(GAME_SETTINGS_TAG + "PlacingDelay").text)
             self.knowledge_exchange_delay = int(action_costs.find(GAME_SETTINGS_TAG + "KnowledgeExchangeDelay").text)
 
-    def __init__(self, verbose=False):
+        # type of a Player's message => its cost (divided by DELAY_MODIFIER, it's the delay in s):
+        self.action_costs = {decoding.Move: self.move_delay, decoding.Discover: self.discover_delay,
+                             decoding.PlacePiece: self.placing_delay, decoding.PickUpPiece: self.pickup_delay,
+                             decoding.TestPiece: self.test_delay,
+                             decoding.AuthorizeKnowledgeExchange: self.knowledge_exchange_delay}
+
+    def __init__(self, verbose=False, settings_file=None):
+        """
+        :param settings_file: path of the GameMasterSettings.xml to use, the one in the working directory by default
+        """
         super().__init__(verbose=verbose)
 
+        self.settings_file = settings_file
+
         self.achieved_goal_counters = {Allegiance.RED.value: 0, Allegiance.BLUE.value: 0}
 
-        self.PIECE_DICT_PRELOAD_CAPACITY = 256
-        self.RANDOMIZATION_ATTEMPTS = 10
         self.typeTag = ClientTypeTag.GAME_MASTER
         self.game_on = False
         self.piece_indexer = 0
@@ -89,16 +109,37 @@ class GameMaster(Client):
         self.num_occupied_blue_goals = 0
         self.parse_game_definition()
         self.parse_action_costs()
-        self.piece_placer = Thread()
+        # runs the players' actions once their cost has passed, and places the new pieces. one at a time: once the
+        # game is on, the scheduler's thread is the only one changing it (see schedule and call), the other threads
+        # (the receiving one in play and dispatch) only read self.snapshot.
+        self.scheduler = ActionScheduler(on_error=self.handle_action_error)
         self.last_guid = None
+        # private guid => PlayerInfo, of all the players in self.info.teams. replaced, never changed in place: the
+        # snapshot shares it with the receiving thread.
+        self.players_by_guid = {}
+        self.players_by_id = {}  # player id => PlayerInfo, of all the players in self.info.teams
+        self.knowledge_clock = count(1)  # versions of what the players know (see PlayerKnowledge)
+        self.exchange_requests = set()  # (requester id, id of the player asked), waiting for the answer
+
+        # type of a Player's message => function(message, player_info) handling it:
+        self.message_handlers = {
+            decoding.Move: lambda message, player_info: self.handle_move_message(message.direction, player_info),
+            decoding.Discover: lambda message, player_info: self.handle_discover_message(player_info),
+            decoding.PlacePiece: lambda message, player_info: self.handle_place_message(player_info),
+            decoding.PickUpPiece: lambda message, player_info: self.handle_pick_up_message(player_info),
+            decoding.TestPiece: lambda message, player_info: self.handle_test_message(player_info),
+            decoding.AuthorizeKnowledgeExchange:
+                lambda message, player_info: self.handle_knowledge_exchange_message(message.with_player_id,
+                                                                                    player_info),
+        }
+        self.publish_snapshot()  # self.snapshot
 
     @property
     def get_num_of_players(self):
         return len(self.info.teams[Allegiance.BLUE.value]) + len(self.info.teams[Allegiance.RED.value])
 
     def handle_confirm_registration(self, message):
-        confirmation_root = ET.fromstring(message)
-        self.info.id = confirmation_root.attrib.get("gameId")
+        self.info.id = decode(message).game_id
 
     def handle_reject_registration(self, register_game_message):
         sleep(self.retry_register_game_interval)
@@ -111,10 +152,14 @@ class GameMaster(Client):
         message = self.receive()
 
         try:
-            if "RejectGameRegistration" in message:
+            if message is None:
+                raise ConnectionAbortedError("No response to the game registration.")
+            message = decode(message)
+
+            if isinstance(message, decoding.RejectGameRegistration):
                 self.handle_reject_registration(register_game_message)
 
-            elif "ConfirmGameRegistration" in message:
+            elif isinstance(message, decoding.ConfirmGameRegistration):
                 # read game id from message
                 self.handle_confirm_registration(message)
 
@@ -123,7 +168,7 @@ class GameMaster(Client):
                     self.play()
 
         except UnexpectedServerMessage:
-            self.verbose_debug("Shutting down due to unexpected message: " + message)
+            self.verbose_debug("Shutting down due to unexpected message: " + str(message))
             self.shutdown()
 
         except (ConnectionAbortedError, ConnectionResetError) as e:
@@ -134,8 +179,15 @@ class GameMaster(Client):
         while True:
             # now, we will be receiving messages about players who are trying to join:
             message = self.receive()  # this will block
+            if message is None:
+                raise ConnectionAbortedError("Lost connection while waiting for players.")
+            message = decode(message)
+
+            if isinstance(message, decoding.PlayerDisconnected):
+                # his place is free again
+                self.remove_player(message.player_id)
 
-            if "JoinGame" in message:
+            elif isinstance(message, decoding.JoinGame):
                 self.handle_join(message)
 
                 if self.get_num_of_players == self.team_limit * 2:
@@ -143,19 +195,20 @@ class GameMaster(Client):
                     self.set_up_game()
 
                     self.game_on = True
+                    self.publish_snapshot()
                     break
 
             else:
-                raise UnexpectedServerMessage(message)
+                raise UnexpectedServerMessage(str(message))
 
     def handle_join(self, message):
         # a player is trying to join! let's parse his message
-        joingame_root = ET.fromstring(message)
+        join_game = decode(message)
 
-        in_player_id = joingame_root.attrib.get("playerId")
-        in_game_name = joingame_root.attrib.get("gameName")
-        in_pref_team = joingame_root.attrib.get("preferredTeam")
-        in_pref_role = joingame_root.attrib.get("preferredRole")
+        in_player_id = interned(join_game.player_id)
+        in_game_name = join_game.game_name
+        in_pref_team = join_game.preferred_team
+        in_pref_role = join_game.preferred_role
 
         if in_player_id is None:
             self.verbose_debug("The server didn't send us a playerId. :(")
@@ -222,19 +275,15 @@ class GameMaster(Client):
             self.info.goal_fields[x, y].player_id = player_id
             self.info.teams[Allegiance.BLUE.value][player_id].location = (x, y)
 
-        # create the first pieces:
-        for i in range(self.PIECE_DICT_PRELOAD_CAPACITY):
-            # using pre-loading of the dict to avoid thread synchronization problems due to changing size of dict
-            if i <= self.initial_number_of_pieces:
-                self.add_piece()
-            else:
-                self.info.pieces[str(i)] = PieceInfo()
+        # create the first pieces (one more than InitialNumberOfPieces, as there always have been):
+        for i in range(self.initial_number_of_pieces + 1):
+            self.add_piece()
 
     def place_pieces(self):
-        # this function runs on a thread and keeps adding new pieces to the board. forever.
-        while self.game_on:
-            sleep(float(self.placing_pieces_frequency) / (DELAY_MODIFIER/2))
+        # this function runs on the scheduler and keeps adding new pieces to the board. forever.
+        if self.game_on:
             self.add_piece()
+            self.schedule(float(self.placing_pieces_frequency) / (DELAY_MODIFIER / 2), self.place_pieces)
 
     def add_piece(self):
         """
@@ -242,26 +291,11 @@ class GameMaster(Client):
         """
         newpiece_id = str(self.piece_indexer)
 
-        # check if we can add the piece at all:
-        if not self.info.check_for_empty_task_fields():
+        # pick one of the fields without a piece, if there are any left:
+        location = self.info.free_task_fields().random()
+        if location is None:
             return False
-
-        # randomize until we find a suitable field:
-        x = randint(0, self.info.board_width - 1)
-        y = randint(self.info.goals_height, self.info.task_height - 1)
-
-        i = 0
-        while self.info.has_piece(x, y) and i < self.RANDOMIZATION_ATTEMPTS:
-            x = randint(0, self.info.board_width - 1)
-            y = randint(self.info.goals_height, self.info.task_height - 1)
-            i += 1
-
-        if self.info.has_piece(x, y):
-            for task_field in self.info.task_fields.values():
-                if not task_field.has_piece:
-                    x = task_field.x
-                    y = task_field.y
-                    break
+        x, y = location
 
         # assign type to new piece
         if random() >= self.sham_probability:
@@ -300,26 +334,76 @@ class GameMaster(Client):
             role = PlayerType.MEMBER.value
 
         # add this player to our dict of teams, set up his game info.
-        self.info.teams[team][player_id] = PlayerInfo(player_id, team, type=role, guid=private_guid)
-        self.info.teams[team][player_id].info.initialize_fields(self.info.goals_height, self.info.task_height,
-                                                                self.info.board_width)
+        player_info = PlayerInfo(player_id, team, PlayerKnowledge(self.knowledge_clock), type=role,
+                                 guid=private_guid)
+        self.info.teams[team][player_id] = player_info
+        players_by_guid = dict(self.players_by_guid)
+        players_by_guid[private_guid] = player_info
+        self.players_by_guid = players_by_guid
+        self.players_by_id[player_id] = player_info
+        self.publish_snapshot()  # he may join before the scheduler runs
         return team, role
 
+    def remove_player(self, player_id):
+        """
+        remove a player (who has disconnected) from his team. the field he was standing on becomes free and the piece
+        he was holding is put down on it (or lost, if it can't be put there).
+        :returns: PlayerInfo of the removed player, or None if there was no such player.
+        """
+        player_info = self.players_by_id.pop(player_id, None)
+        if player_info is None:
+            return None
+        players_by_guid = dict(self.players_by_guid)
+        players_by_guid.pop(player_info.guid, None)
+        self.players_by_guid = players_by_guid
+        del self.info.teams[player_info.team][player_id]
+        self.publish_snapshot()  # his actions are ignored from now on
+        self.forget_exchange_requests(player_id)
+
+        location = player_info.location
+        if location is None or self.info.task_fields is None:
+            # the game wasn't set up yet, he had neither a field nor a piece.
+            return player_info
+
+        field = self.info.task_fields.get(location) or self.info.goal_fields.get(location)
+        if field is not None and field.player_id == player_id:
+            field.player_id = "-1"
+
+        piece = self.info.pieces.get(player_info.piece_id)
+        if piece is not None:
+            if self.info.is_task_field(location) and not self.info.task_fields[location].has_piece:
+                self.info.task_fields[location].piece_id = piece.id
+                self.info.set_piece_location(piece.id, location)
+            else:
+                self.info.set_piece_location(piece.id, None)
+            piece.player_id = "-1"
+        player_info.piece_id = "-1"
+        return player_info
+
+    def forget_exchange_requests(self, player_id):
+        """
+        drop the knowledge exchanges a removed player has asked for or was asked for. whoever was waiting for his
+        answer is refused (for good, he's gone).
+        """
+        for requester_id, addressee_id in [pair for pair in self.exchange_requests if player_id in pair]:
+            self.exchange_requests.discard((requester_id, addressee_id))
+            if addressee_id == player_id:
+                self.send(messages.RejectKnowledgeExchange(requester_id, addressee_id, True))
+
     def find_player_by_guid(self, guid):
-        for team in self.info.teams.values():
-            for player in team:
-                if team[player].guid == guid:
-                    return team[player]
+        return self.players_by_guid.get(guid)
 
     def find_player_by_id(self, id):
-        for team in self.info.teams.values():
-            for player in team:
-                if team[player].id == id:
-                    return team[player]
+        return self.players_by_id.get(id)
 
-    def handle_move_message(self, direction, player_info: PlayerInfo):
+    def send_data(self, player_id, task_fields: dict = None, goal_fields: dict = None, pieces: dict = None,
+                  player_location: tuple = None):
+        """
+        respond to a player's action with a Data message (see messages.Data for the parameters).
+        """
+        self.send(messages.Data(player_id, self.info.finished, task_fields, goal_fields, pieces, player_location))
 
-        sleep(float(self.move_delay) / DELAY_MODIFIER)
+    def handle_move_message(self, direction, player_info: PlayerInfo):
 
         new_location = player_info.location
 
@@ -349,72 +433,61 @@ class GameMaster(Client):
                 # can't move, stay in the same location.
                 player_info.location = old_location
                 old_field.player_id = player_info.id
-                self.send(messages.Data(player_info.id, self.info.finished, player_location=player_info.location,
-                                        task_fields={new_location: new_task_field}))
+                self.send_data(player_info.id, player_location=player_info.location,
+                               task_fields={new_location: player_info.knowledge.tell_task_field(new_task_field)})
 
             else:
                 # we can move to the new field.
                 new_task_field.player_id = player_info.id
                 old_field.player_id = "-1"  # set old field to not have a player.
+                known_task_field = player_info.knowledge.tell_task_field(new_task_field)
 
                 if new_task_field.has_piece:
                     piece_id = new_task_field.piece_id
 
-                    # check if the Player already knows what type this piece is:
-                    # if yes, keep his information about it:
-                    piece_info = player_info.info.pieces.get(piece_id)
-
-                    if piece_info is None:
-                        # if he doesn't yet know about the Piece, set its type to unknown
-                        piece_info = PieceInfo(piece_id, type=PieceType.UNKNOWN.value, location=new_location)
-                        player_info.info.pieces[piece_id] = piece_info
-
-                    piece_dict = {piece_id: piece_info}
+                    # if the Player already knows what type this piece is, keep his information about it,
+                    # if he doesn't yet know about the Piece, its type is unknown to him.
+                    piece_dict = {piece_id: player_info.knowledge.piece(piece_id, new_location)}
 
                     # finally, send the message.
-                    self.send(
-                        messages.Data(player_info.id, self.info.finished, task_fields={new_location: new_task_field},
-                                      pieces=piece_dict, player_location=new_location))
+                    self.send_data(player_info.id, task_fields={new_location: known_task_field},
+                                   pieces=piece_dict, player_location=new_location)
                 else:
                     # this new field doesn't have a piece.
-                    self.send(messages.Data(player_info.id, self.info.finished,
-                                            task_fields={new_location: new_task_field}, player_location=new_location))
+                    self.send_data(player_info.id, task_fields={new_location: known_task_field},
+                                   player_location=new_location)
 
         elif self.info.is_goal_field(new_location):
             # it's a Goal Field, yo.
             if self.info.goal_fields[new_location].allegiance != player_info.team:
                 player_info.location = old_location
-                self.send(messages.Data(player_info.id, self.info.finished, player_location=player_info.location))
+                self.send_data(player_info.id, player_location=player_info.location)
 
             # i.e. a Red player shouldn't be allowed to enter a Blue goals area and vice versa.
 
             if self.info.goal_fields[new_location].is_occupied:
                 # can't move.
                 player_info.location = old_location
-                self.send(messages.Data(player_info.id, self.info.finished,
-                                        goal_fields={new_location: self.info.goal_fields[new_location]},
-                                        player_location=player_info.location))
+                # the field as the player knows it (with the type he knows, not the real one).
+                known_goal_field = player_info.knowledge.tell_goal_field(self.info.goal_fields[new_location])
+                self.send_data(player_info.id, goal_fields={new_location: known_goal_field},
+                               player_location=player_info.location)
 
             else:
-                # get a working copy of the new field.
-                new_goal_field = copy.deepcopy(self.info.goal_fields[new_location])
-                # use the type that the player knows.
-                new_goal_field.type = player_info.info.goal_fields[new_location].type
-
                 self.info.goal_fields[new_location].player_id = player_info.id
                 old_field.player_id = "-1"  # set old field to not have a player.
 
-                self.send(messages.Data(player_info.id, self.info.finished, goal_fields={new_location: new_goal_field},
-                                        player_location=player_info.location))
+                # the field as the player knows it (with the type he knows).
+                new_goal_field = player_info.knowledge.tell_goal_field(self.info.goal_fields[new_location])
+                self.send_data(player_info.id, goal_fields={new_location: new_goal_field},
+                               player_location=player_info.location)
 
         elif self.info.is_out_of_bounds(new_location):
             player_info.location = old_location
-            self.send(messages.Data(player_info.id, self.info.finished, player_location=player_info.location))
+            self.send_data(player_info.id, player_location=player_info.location)
 
     def handle_discover_message(self, player_info: PlayerInfo):
 
-        sleep(float(self.discover_delay) / DELAY_MODIFIER)
-
         goal_fields = {}
         task_fields = {}
         pieces = {}
@@ -422,56 +495,30 @@ class GameMaster(Client):
         # get all 8 neighbours
         for (x, y), neighbour in self.info.get_neighbours(player_info.location, True).items():
 
-            # if neighbour is a TaskField, update info about a player who is standing on that Field, and about distance to piece
+            # if neighbour is a TaskField, tell the player about the player who is standing on that Field,
+            # the piece on it and the distance to piece
             if self.info.is_task_field((x, y)):
-                player_info.info.task_fields[x, y].player_id = neighbour.player_id
-                player_info.info.task_fields[x, y].distance_to_piece = neighbour.distance_to_piece
+                task_fields[x, y] = player_info.knowledge.tell_task_field(neighbour)
 
                 if neighbour.has_piece:
-                    # if this field has a piece, check if player knows about it
-                    if neighbour.piece_id not in player_info.info.pieces.keys():
-                        # if he doesn't know, add an unknown piece to his info
-                        player_info.info.pieces[neighbour.piece_id] = PieceInfo(neighbour.piece_id,
-                                                                                location=neighbour.location)
-                    player_info.info.task_fields[x, y].piece_id = neighbour.piece_id
-
-                    pieces[neighbour.piece_id] = player_info.info.pieces[neighbour.piece_id]
-                task_fields[x, y] = player_info.info.task_fields[x, y]
+                    # if he doesn't know about this piece, it's an unknown piece to him
+                    pieces[neighbour.piece_id] = player_info.knowledge.piece(neighbour.piece_id, neighbour.location)
 
             else:
-                # it is a goal field.
-                # get a working copy of the new field.
-                new_goal_field = copy.deepcopy(self.info.goal_fields[neighbour.location])
-                # use the type that the player knows.
-                new_goal_field.type = player_info.info.goal_fields[neighbour.location].type
-
-                player_info.info.goal_fields[x, y] = new_goal_field
-                goal_fields[x, y] = player_info.info.goal_fields[x, y]
+                # it is a goal field, update what the player knows about it (except its type).
+                goal_fields[x, y] = player_info.knowledge.tell_goal_field(neighbour)
 
         # add information about the player's own field:
         if self.info.is_goal_field(player_info.location):
-            # get a working copy of the new field.
-            new_goal_field = copy.deepcopy(self.info.goal_fields[player_info.location])
-            # use the type that the player knows.
-            new_goal_field.type = player_info.info.goal_fields[player_info.location].type
-
-            player_info.info.goal_fields[player_info.location] = new_goal_field
-            goal_fields[player_info.location] = player_info.info.goal_fields[player_info.location]
+            goal_fields[player_info.location] = player_info.knowledge.tell_goal_field(
+                self.info.goal_fields[player_info.location])
         else:
             # it's a task field...
-            field = player_info.info.task_fields[player_info.location]
-            field.distance_to_piece = self.info.task_fields[player_info.location].distance_to_piece
-
-            if self.info.task_fields[player_info.location].has_piece:
-                # if this field has a piece, check if player knows about it
-                piece_id = self.info.task_fields[player_info.location].piece_id
-                if piece_id not in player_info.info.pieces.keys():
-                    # if he doesn't know, add an unknown piece to his info
-                    player_info.info.pieces[piece_id] = PieceInfo(piece_id, location=player_info.location)
-                player_info.info.task_fields[player_info.location].piece_id = piece_id
+            field = self.info.task_fields[player_info.location]
+            task_fields[player_info.location] = player_info.knowledge.tell_task_field(field)
 
-                pieces[piece_id] = player_info.info.pieces[piece_id]
-            task_fields[player_info.location] = player_info.info.task_fields[player_info.location]
+            if field.has_piece:
+                pieces[field.piece_id] = player_info.knowledge.piece(field.piece_id, player_info.location)
 
         if len(pieces) < 1:
             pieces = None
@@ -480,12 +527,10 @@ class GameMaster(Client):
         if len(task_fields) < 1:
             task_fields = None
 
-        self.send(messages.Data(player_info.id, self.info.finished, task_fields, goal_fields, pieces))
+        self.send_data(player_info.id, task_fields, goal_fields, pieces)
 
     def handle_pick_up_message(self, player_info: PlayerInfo):
 
-        sleep(float(self.pickup_delay) / DELAY_MODIFIER)
-
         location = player_info.location
 
         # check if the field is a task field:
@@ -497,58 +542,52 @@ class GameMaster(Client):
                 self.info.pieces[piece_id].player_id = player_info.id
                 self.info.task_fields[location].piece_id = "-1"  # setting as empty
 
-                # we update the GM's info of distance to pieces so it sends valid data later to player
-                self.info.update_field_distances()
+                # the piece is off the board now. this updates the GM's info of distance to pieces as well,
+                # so it sends valid data later to player
+                self.info.set_piece_location(piece_id, None)
 
                 player_info.piece_id = piece_id
 
                 # update player's knowledge:
-                players_piece_info = player_info.info.pieces.get(piece_id)
-                if players_piece_info is not None:
-                    players_piece_info.player_id = player_info.id
-                    players_piece_info.location = None  # set to None to indicate that it was picked up.
-                else:
-                    players_piece_info = PieceInfo(piece_id, PieceType.UNKNOWN.value, player_info.id)
-                    player_info.info.pieces[piece_id] = players_piece_info
-                players_piece_info.piece_id = "-1"
+                players_piece_info = player_info.knowledge.piece(piece_id)
+                players_piece_info.player_id = player_info.id
+                players_piece_info.location = None  # set to None to indicate that it was picked up.
 
                 # send him piece Data with his info about the piece
-                self.send(messages.Data(player_info.id, self.info.finished, pieces={piece_id: players_piece_info}))
+                self.send_data(player_info.id, pieces={piece_id: players_piece_info})
 
             else:
                 # no piece on this field. respond with an empty Data message
-                self.send(messages.Data(player_info.id, self.info.finished))
+                self.send_data(player_info.id)
         else:
             # piece isn't a task field, there can be no pieces on it to pick up, respond with an empty Data message
-            self.send(messages.Data(player_info.id, self.info.finished))
+            self.send_data(player_info.id)
 
     def handle_place_message(self, player_info: PlayerInfo):
 
-        sleep(float(self.placing_delay) / DELAY_MODIFIER)
-
         # check if that player really has a piece:
         piece_id = player_info.piece_id
         if piece_id == "-1" or piece_id is None:
             # seems like the player doesn't have a piece at all. send him an empty Data message
-            self.send(messages.Data(player_info.id, self.info.finished))
+            self.send_data(player_info.id)
 
         else:
             # check if the player is standing on TaskField or GoalField:
             if self.info.is_task_field(player_info.location):
                 # update GM's info
                 self.info.task_fields[player_info.location].piece_id = piece_id
-                self.info.pieces[piece_id].location = player_info.location
+                self.info.set_piece_location(piece_id, player_info.location)
                 self.info.pieces[piece_id].player_id = "-1"  # mark as untaken.
 
                 # update player's info
-                player_info.info.task_fields[player_info.location].piece_id = piece_id
-                player_info.info.pieces[piece_id].player_id = "-1"  # untaken
-                player_info.info.pieces[piece_id].location = player_info.location
-
-                field = player_info.info.task_fields[player_info.location]
+                field = player_info.knowledge.task_field(player_info.location)
+                field.piece_id = piece_id
+                players_piece_info = player_info.knowledge.piece(piece_id)
+                players_piece_info.player_id = "-1"  # untaken
+                players_piece_info.location = player_info.location
 
                 # send him a response
-                self.send(messages.Data(player_info.id, self.info.finished, task_fields={field.location: field}))
+                self.send_data(player_info.id, task_fields={field.location: field})
 
             else:
                 # the field is a goal field.
@@ -560,19 +599,20 @@ class GameMaster(Client):
 
                 # update GM's info:
                 self.info.pieces[piece_id].player_id = "-1"
-                self.info.pieces[piece_id].location = None
+                self.info.set_piece_location(piece_id, None)
 
                 # update player info.
                 player_info.piece_id = "-1"  # he holds nothing.
-                player_info.info.pieces[piece_id].player_id = "-1"
-                player_info.info.pieces[piece_id].location = None
+                players_piece_info = player_info.knowledge.piece(piece_id)
+                players_piece_info.player_id = "-1"
+                players_piece_info.location = None
 
                 # check if the piece is legit:
                 if self.info.pieces[piece_id].type == PieceType.NORMAL.value:
 
                     # update player info about this field
                     field = self.info.goal_fields[player_info.location]
-                    player_info.info.goal_fields[player_info.location].type = field.type
+                    player_info.knowledge.tell_goal_field(field).type = field.type
 
                     if field.type == GoalFieldType.GOAL.value:
                         self.achieved_goal_counters[player_info.team] += 1
@@ -581,17 +621,50 @@ class GameMaster(Client):
                     self.check_for_game_over(player_info)
 
                     # send information about the true nature of this goal field
-                    self.send(messages.Data(player_info.id, self.info.finished, goal_fields={field.location: field}))
+                    self.send_data(player_info.id, goal_fields={field.location: field})
 
                 else:
                     # piece is a sham, send an empty Data message
-                    self.send(messages.Data(player_info.id, self.info.finished))
+                    self.send_data(player_info.id)
 
     def handle_test_message(self, player_info: PlayerInfo):
-        sleep(float(self.test_delay) / DELAY_MODIFIER)
+        piece = self.info.pieces[player_info.piece_id]
 
-        self.send(messages.Data(player_info.id, self.info.finished,
-                                pieces={player_info.piece_id: self.info.pieces[player_info.piece_id]}))
+        # the player now knows the type of the piece he holds, send him his info about it.
+        players_piece_info = player_info.knowledge.piece(piece.id)
+        players_piece_info.type = piece.type
+        players_piece_info.player_id = player_info.id
+        players_piece_info.location = None
+        self.send_data(player_info.id, pieces={piece.id: players_piece_info})
+
+    def handle_knowledge_exchange_message(self, with_player_id, player_info: PlayerInfo):
+        """
+        ask the other player whether he wants to share his knowledge. he answers us (see handle_exchange_answer).
+        """
+        other_player = self.find_player_by_id(with_player_id)
+        if other_player is None or other_player is player_info:
+            self.send(messages.RejectKnowledgeExchange(player_info.id, with_player_id, True))
+            return
+        self.exchange_requests.add((player_info.id, other_player.id))
+        self.send(messages.KnowledgeExchangeRequest(other_player.id, player_info.id))
+
+    def handle_exchange_answer(self, answer: decoding.BetweenPlayersMessage):
+        """
+        the asked player's answer (AcceptExchangeRequest or RejectKnowledgeExchange) to a knowledge exchange.
+        if he agreed, the requester gets only what the other knows better than he does (see PlayerKnowledge.learn_from).
+        """
+        requester_id, addressee_id = answer.player_id, answer.sender_player_id
+        if (requester_id, addressee_id) not in self.exchange_requests:
+            self.verbose_debug("Ignoring a " + answer.tag + " nobody has asked for.")
+            return
+        self.exchange_requests.discard((requester_id, addressee_id))
+
+        if isinstance(answer, decoding.RejectKnowledgeExchange):
+            self.send(messages.RejectKnowledgeExchange(requester_id, addressee_id, answer.permanent))
+            return
+        requester, addressee = self.players_by_id[requester_id], self.players_by_id[addressee_id]
+        task_fields, goal_fields, pieces = requester.knowledge.learn_from(addressee.knowledge)
+        self.send_data(requester_id, task_fields, goal_fields, pieces)
 
     def check_for_game_over(self, player_info: PlayerInfo):
         # update self.info.finished and self.game_on if a team has completed all its goals.
@@ -599,22 +672,16 @@ class GameMaster(Client):
         for team in self.info.teams.keys():
             if self.achieved_goal_counters[team] >= self.goal_target:
                 self.game_on = False
-                self.verbose_debug(team.upper() + " TEAM HAS WON THE GAME!\nWe shall be restarting the game in:.", True)
                 self.info.finished = True
-                print("5")
-                sleep(1)
-                print("4")
-                sleep(1)
-                print("3")
-                sleep(1)
-                print("2")
-                sleep(1)
-                print("1")
-                sleep(1)
-                # self.shutdown()
+                self.announce_winner(team)
                 break
 
-    def play(self):
+    def announce_winner(self, team):
+        # this runs on the scheduler: no countdown, sleeping through it would hold up every other action.
+        # the game is over once play's loop ends (see clean_up).
+        self.verbose_debug(team.upper() + " TEAM HAS WON THE GAME!", True)
+
+    def start_game(self):
         # send the initial Game message to all players:
         for team in self.info.teams.values():
             for player in team:
@@ -623,64 +690,120 @@ class GameMaster(Client):
 
         # self.send(messages.GameStarted(self.info.id))
 
-        # deploy the Piece-placing thread:
-        self.piece_placer = Thread(target=self.place_pieces)
-        self.piece_placer.start()
+        # the first new piece comes after the usual delay:
+        self.schedule(float(self.placing_pieces_frequency) / (DELAY_MODIFIER / 2), self.place_pieces)
+
+    def play(self):
+        # start running the actions:
+        self.scheduler.start()
+        self.start_game()
 
-        while self.game_on:
+        while self.snapshot["game_on"]:
             try:
                 message = self.receive()
 
-                # handling depends on type of message:
-                root = ET.fromstring(message)
-
                 if message is None:
                     self.verbose_debug("Message received from server was None, probably because the server is down.")
                     return
 
-                player_guid = root.attrib.get("playerGuid")
-                player_info = self.find_player_by_guid(player_guid)
+                self.dispatch(message)
 
-                if "Move" in message:
-                    direction = root.get('direction')
-                    Thread(target=self.handle_move_message, args=[direction, player_info], daemon=True).start()
+            except Exception as e:
+                self.verbose_debug("Is this an error I see before me? " + str(e), True)
+                raise e
 
-                elif "Discover" in message:
-                    Thread(target=self.handle_discover_message, args=[player_info], daemon=True).start()
+        if self.snapshot["finished"]:
+            self.clean_up()
+            # self.run()
 
-                elif "PlacePiece" in message:
-                    Thread(target=self.handle_place_message, args=[player_info], daemon=True).start()
+    def dispatch(self, message):
+        """
+        hand a single message received during the game over to its handler.
+        """
+        # handling depends on type of message:
+        message = decode(message)
+        if isinstance(message, decoding.PlayerDisconnected):
+            # after the actions he has already sent, they might still be waiting
+            self.schedule(0, self.remove_player, message.player_id, key=message.player_id)
+            return
+        if isinstance(message, (decoding.AcceptExchangeRequest, decoding.RejectKnowledgeExchange)):
+            # not an action, it costs nothing:
+            self.schedule(0, self.handle_exchange_answer, message)
+            return
+
+        handler = self.message_handlers.get(type(message))
+        if handler is None:
+            self.verbose_debug("Ignoring an unexpected " + message.tag + " message.")
+            return
+
+        # not self.players_by_guid, the scheduler's thread changes it:
+        player_info = self.snapshot["players_by_guid"].get(message.player_guid)
+        if player_info is None:
+            self.verbose_debug("Ignoring a " + message.tag + " message from an unknown player.")
+            return
+        self.run_handler(handler, message, player_info)
+
+    def run_handler(self, handler, message, player_info: PlayerInfo):
+        """
+        run the handler once the action's cost has passed. a player's actions are handled in the order he sent them.
+        """
+        self.schedule(float(self.action_costs[type(message)]) / DELAY_MODIFIER, handler, message, player_info,
+                      key=player_info.id)
 
-                elif "PickUpPiece" in message:
-                    Thread(target=self.handle_pick_up_message, args=[player_info], daemon=True).start()
+    def schedule(self, delay: float, action, *args, key=None):
+        """
+        run the action on the scheduler after delay s (see ActionScheduler.schedule).
+        """
+        self.scheduler.schedule(delay, self.run_command, action, args, key=key)
 
-                elif "TestPiece" in message:
-                    Thread(target=self.handle_test_message, args=[player_info], daemon=True).start()
+    def call(self, action, *args):
+        """
+        run the action on the scheduler among the game's actions, and wait for what it returns: for whatever changes
+        the game from another thread (e.g. players joining a GameHost's game). see ActionScheduler.call
+        """
+        return self.scheduler.call(self.run_command, action, args)
 
-                    # TODO: add handling of other types of messages
+    def run_command(self, action, args):
+        try:
+            return action(*args)
+        finally:
+            self.publish_snapshot()
 
-            except Exception as e:
-                self.verbose_debug("Is this an error I see before me? " + str(e), True)
-                raise e
+    def publish_snapshot(self):
+        """
+        copy what the other threads may want to know about the game. it's replaced as a whole after every action, so
+        they never see one half done, and they read it without any locking.
+        """
+        self.snapshot = {"game_on": self.game_on, "finished": self.info.finished,
+                         "goals": dict(self.achieved_goal_counters), "players": self.get_num_of_players,
+                         "pieces": len(self.info.pieces), "players_by_guid": self.players_by_guid}
 
-        if self.info.finished:
-            self.clean_up()
-            # self.run()
+    def handle_action_error(self, action, error):
+        self.verbose_debug("Is this an error I see before me? " + str(error), True)
 
     def clean_up(self):
-        # clean up the info and prepare to start a new game
+        # stop running the actions and prepare to start a new game
+        self.scheduler.stop()
+        self.verbose_debug("Action scheduler: " + str(self.scheduler.stats()))
+        self.scheduler = ActionScheduler(on_error=self.handle_action_error)
+        self.reset_game()
+
+    def reset_game(self):
+        # clean up the info
         self.achieved_goal_counters = {Allegiance.RED.value: 0, Allegiance.BLUE.value: 0}
 
         self.info = GameInfo()
-        self.PIECE_DICT_PRELOAD_CAPACITY = 256
-        self.RANDOMIZATION_ATTEMPTS = 10
+        self.players_by_guid = {}
+        self.players_by_id = {}
+        self.knowledge_clock = count(1)
+        self.exchange_requests = set()
         self.piece_indexer = 0
         self.game_on = False
         self.num_occupied_red_goals = 0
         self.num_occupied_blue_goals = 0
         self.parse_game_definition()
         self.parse_action_costs()
-        self.piece_placer = Thread()
+        self.publish_snapshot()
 
     def shutdown(self):
         self.game_on = False
@@ -698,5 +821,11 @@ if __name__ == '__main__':
 
     parser = ArgumentParser()
     parser.add_argument('-v', '--verbose', action='store_true', default=False, help='Use verbose debugging mode.')
+    parser.add_argument('--validation', default="always", choices=[mode.value for mode in messages.ValidationMode],
+                        help='Schema validation of the sent messages.')
+    parser.add_argument('--sample-rate', default=100, type=int,
+                        help='Validate one in that many messages of each type (with --validation sampled).')
     args = vars(parser.parse_args())
+    messages.set_validation_policy(args["validation"], args["sample_rate"])
     simulate(args["verbose"])
+    print("Validation stats: " + str(messages.validation_stats()))
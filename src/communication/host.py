@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+from argparse import ArgumentParser
+from collections import deque
+from threading import Lock
+from time import thread_time
+
+from src.communication import messages, decoding
+from src.communication.client import Client
+from src.communication.decoding import decode, interned
+from src.communication.gamemaster import GameMaster, parse_game_master_settings, GAME_SETTINGS_TAG
+from src.communication.info import ClientTypeTag
+from src.communication.scheduler import ActionScheduler
+from src.communication.unexpected import UnexpectedServerMessage
+
+RESTART_DELAY = 5  # s between the end of a game and the next one on the same board
+
+
+class HostedGame(GameMaster):
+    """
+    one of the games of a GameHost: a GameMaster using the host's connection, settings and scheduler.
+    its actions are its own, they're dropped when the game restarts.
+    """
+
+    def __init__(self, host, definition, name, verbose=False):
+        """
+        :param definition: GameDefinition element of the settings
+        :param name: name under which the game is registered
+        """
+        self.host = host
+        self.definition = definition
+        self.name = name
+        super(HostedGame, self).__init__(verbose, host.settings_file)
+        self.scheduler = host.scheduler
+
+        # statistics:
+        self.games_played = 0
+        self.actions = 0
+        self.cpu_time = 0.0  # s spent running the game's actions
+
+    def create_socket(self):
+        return None
+
+    def read_settings(self):
+        return self.host.settings
+
+    def game_definitions(self):
+        return [self.definition]
+
+    def parse_game_definition(self):
+        super(HostedGame, self).parse_game_definition()
+        self.game_name = self.name
+
+    def send(self, message):
+        self.host.send(message)
+
+    def schedule(self, delay: float, action, *args, key=None):
+        # keys (player ids) are only unique within a game
+        self.scheduler.schedule(delay, self.run_action, action, args, key=None if key is None else (self, key),
+                                owner=self)
+
+    def run_action(self, action, args):
+        started = thread_time()
+        try:
+            self.run_command(action, args)
+        finally:
+            self.actions += 1
+            self.cpu_time += thread_time() - started
+
+    def join(self, message) -> bool:
+        """
+        handle a JoinGame message, start the game once all the players are here. it's received on the host's
+        thread, but the game only changes on the scheduler (it might be restarting right now).
+        :returns: True if the player was accepted.
+        """
+        return self.call(self.add_joining_player, message)
+
+    def add_joining_player(self, message) -> bool:
+        accepted = self.handle_join(message)
+        if accepted and self.get_num_of_players == self.team_limit * 2:
+            self.set_up_game()
+            self.game_on = True
+            self.start_game()
+        return accepted
+
+    def announce_winner(self, team):
+        self.verbose_debug(self.game_name + ": " + team.upper() + " TEAM HAS WON THE GAME! Restarting in " +
+                           str(RESTART_DELAY) + " s.", True)
+        # the players' last actions still get their answers (with gameFinished) until then.
+        # not sleeping through a countdown, that would stop all the other games as well.
+        self.schedule(RESTART_DELAY, self.restart)
+
+    def restart(self):
+        """
+        drop what's left of the finished game, new players can join the game under the same id.
+        """
+        self.scheduler.cancel(self)
+        self.host.forget_players(self)
+        game_id = self.info.id
+        self.reset_game()
+        self.info.id = game_id
+        self.games_played += 1
+
+    def stats(self) -> dict:
+        return {"name": self.game_name, "id": self.info.id, "players": self.snapshot["players"],
+                "games_played": self.games_played, "actions": self.actions, "cpu_ms": self.cpu_time * 1e3}
+
+
+class GameHost(Client):
+    """
+    a single GM client hosting many games over one connection to the server. every GameDefinition of the settings
+    (or a number of copies of each) is registered as a game of its own. received messages are routed to the games
+    by their gameId (gameName for JoinGame, playerId for PlayerDisconnected), the actions of all the games run
+    on a single scheduler.
+    """
+
+    def __init__(self, verbose=False, settings_file=None, copies=1, first_copy=1):
+        """
+        :param settings_file: path of the GameMasterSettings.xml, the one in the working directory by default
+        :param copies: number of games hosted for every GameDefinition, their names get a number
+        :param first_copy: number of the first copy (for more hosts sharing a server, their names must differ)
+        """
+        super(GameHost, self).__init__(verbose=verbose)
+        self.typeTag = ClientTypeTag.GAME_MASTER
+        self.settings_file = settings_file
+        self.settings = parse_game_master_settings(settings_file)  # parsed once, for all the games
+        self.scheduler = ActionScheduler(on_error=self.handle_action_error)
+        self.send_lock = Lock()  # the games send from the scheduler's thread, joining players are answered from ours
+
+        self.games = []
+        self.games_by_name = {}  # game name => HostedGame
+        self.games_by_id = {}  # game id => HostedGame, once the server has confirmed its registration
+        self.games_of_players = {}  # player id => HostedGame he has joined
+        self.pending_registrations = deque()  # games registered with the server, waiting for its answer, in order
+
+        for definition in self.settings.findall(GAME_SETTINGS_TAG + "GameDefinition"):
+            name = definition.find(GAME_SETTINGS_TAG + "GameName").text
+            for i in range(first_copy, first_copy + copies):
+                numbered = copies > 1 or first_copy > 1
+                game = HostedGame(self, definition, name + " " + str(i) if numbered else name, verbose)
+                self.games.append(game)
+                self.games_by_name[game.game_name] = game
+
+    def send(self, message):
+        with self.send_lock:
+            super(GameHost, self).send(message)
+
+    def run(self):
+        self.scheduler.start()
+        for game in self.games:
+            self.register(game)
+
+        while self.connected:
+            message = self.receive()
+            if message is None:
+                self.verbose_debug("Message received from server was None, probably because the server is down.")
+                return
+            try:
+                self.route(message)
+            except UnexpectedServerMessage as e:
+                self.verbose_debug("Ignoring an unexpected message: " + str(e), True)
+
+    def register(self, game: HostedGame):
+        self.pending_registrations.append(game)
+        self.send(messages.RegisterGame(game.game_name, game.team_limit, game.team_limit))
+
+    def route(self, message):
+        """
+        hand a received message over to the game it belongs to.
+        """
+        message = decode(message)
+        if isinstance(message, decoding.GameMessage):
+            game = self.games_by_id.get(message.game_id)
+            if game is None:
+                self.verbose_debug("Ignoring a " + message.tag + " message for an unknown game.")
+                return
+            game.dispatch(message)
+
+        elif isinstance(message, decoding.JoinGame):
+            game = self.games_by_name.get(message.game_name)
+            if game is None:
+                raise UnexpectedServerMessage("The server sent us a player joining someone else's game.")
+            if game.join(message):
+                self.games_of_players[interned(message.player_id)] = game
+
+        elif isinstance(message, decoding.PlayerDisconnected):
+            game = self.games_of_players.pop(message.player_id, None)
+            if game is None:
+                return
+            if game.snapshot["game_on"]:
+                game.dispatch(message)
+            else:
+                # his place is free again
+                game.call(game.remove_player, message.player_id)
+
+        elif isinstance(message, (decoding.AcceptExchangeRequest, decoding.RejectKnowledgeExchange)):
+            # a player's answer to a knowledge exchange, for the game of the player who asked for it
+            game = self.games_of_players.get(message.player_id)
+            if game is None:
+                self.verbose_debug("Ignoring a " + message.tag + " for a player of an unknown game.")
+                return
+            game.dispatch(message)
+
+        elif isinstance(message, decoding.ConfirmGameRegistration):
+            game = self.pending_registrations.popleft()
+            game.info.id = interned(message.game_id)
+            self.games_by_id[game.info.id] = game
+            self.verbose_debug("Registered game " + game.game_name + " with id " + game.info.id + ".")
+
+        elif isinstance(message, decoding.RejectGameRegistration):
+            game = self.pending_registrations.popleft()
+            self.verbose_debug("The server rejected game " + game.game_name + ", is its name taken?", True)
+
+        else:
+            self.verbose_debug("Ignoring an unexpected " + message.tag + " message.")
+
+    def forget_players(self, game: HostedGame):
+        # on the scheduler, while players might be joining other games on our thread: on a copy of the dict
+        for player_id, players_game in list(self.games_of_players.items()):
+            if players_game is game:
+                self.games_of_players.pop(player_id, None)
+
+    def handle_action_error(self, action, error):
+        self.verbose_debug("Is this an error I see before me? " + str(error), True)
+
+    def stats(self) -> list:
+        return [game.stats() for game in self.games]
+
+    def shutdown(self):
+        self.scheduler.stop()
+        self.verbose_debug("Action scheduler: " + str(self.scheduler.stats()))
+        for game_stats in self.stats():
+            self.verbose_debug(str(game_stats), True)
+        super(GameHost, self).shutdown()
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-v', '--verbose', action='store_true', default=False, help='Use verbose debugging mode.')
+    parser.add_argument('--settings', default=None, help='GameMasterSettings.xml to use (the one here by default).')
+    parser.add_argument('-c', '--copies', type=int, default=1, help='Number of games to host for every definition.')
+    parser.add_argument('--first-copy', type=int, default=1, help='Number of the first copy of each game.')
+    parser.add_argument('--validation', default="always", choices=[mode.value for mode in messages.ValidationMode],
+                        help='Schema validation of the sent messages.')
+    parser.add_argument('--sample-rate', default=100, type=int,
+                        help='Validate one in that many messages of each type (with --validation sampled).')
+    args = vars(parser.parse_args())
+    messages.set_validation_policy(args["validation"], args["sample_rate"])
+
+    host = GameHost(args["verbose"], args["settings"], args["copies"], args["first_copy"])
+    if host.connect():
+        host.run()
+        host.shutdown()
+    print("Validation stats: " + str(messages.validation_stats()))
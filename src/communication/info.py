@@ -2,7 +2,11 @@ from datetime import datetime
 from enum import Enum
 from queue import Queue
 
+from src.communication.distances import PieceDistances
+from src.communication.free_fields import FreeFields
+from src.communication.framing import MessageFramer
 from src.communication.helpful_math import Manhattan_Distance as manhattan
+from src.communication.outbound import OutboundQueue
 from src.communication.unexpected import CustomBaseExceptionWithMessage, LocationOutOfBoundsError
 
 
@@ -55,8 +59,15 @@ class GoalFieldType(Enum):
     UNKNOWN = 'unknown'
 
 
+# shared defaults of the fields and pieces, so that millions of them don't each hold their own copy:
+EMPTY_ID = "-1"  # no player / piece
+DEFAULT_TIMESTAMP = datetime.now()
+
+
 class FieldInfo:
-    def __init__(self, x=0, y=0, timestamp=datetime.now(), player_id="-1"):
+    __slots__ = ("x", "y", "timestamp", "player_id")
+
+    def __init__(self, x=0, y=0, timestamp=DEFAULT_TIMESTAMP, player_id=EMPTY_ID):
         self.x = x
         self.y = y
         self.timestamp = timestamp
@@ -99,7 +110,10 @@ class FieldInfo:
 
 class TaskFieldInfo(FieldInfo):
     # Maybe default values are not necessary here but I'm just testing the class
-    def __init__(self, x=0, y=0, timestamp=datetime.now(), distance_to_piece=-1, player_id="-1", piece_id="-1"):
+    __slots__ = ("distance_to_piece", "piece_id")
+
+    def __init__(self, x=0, y=0, timestamp=DEFAULT_TIMESTAMP, distance_to_piece=-1, player_id=EMPTY_ID,
+                 piece_id=EMPTY_ID):
         super(TaskFieldInfo, self).__init__(x, y, timestamp, player_id)
         self.distance_to_piece = distance_to_piece
         self.piece_id = piece_id
@@ -110,15 +124,68 @@ class TaskFieldInfo(FieldInfo):
 
 
 class GoalFieldInfo(FieldInfo):
-    def __init__(self, x=0, y=0, allegiance=Allegiance.NEUTRAL.value, player_id=None, timestamp=datetime.now(),
+    __slots__ = ("allegiance", "type")
+
+    def __init__(self, x=0, y=0, allegiance=Allegiance.NEUTRAL.value, player_id=None, timestamp=DEFAULT_TIMESTAMP,
                  type=GoalFieldType.UNKNOWN.value):
         super(GoalFieldInfo, self).__init__(x, y, timestamp, player_id)
         self.allegiance = allegiance
         self.type = type
 
 
+class KnownGoalFieldView:
+    """
+    read-only goal field as a player sees it: everything is read from the GM's field, except the type, which is the
+    one the player knows. nothing is copied, so the view shows the field as it is when it's read (encoded).
+    it can be passed to messages.Data wherever a GoalFieldInfo can.
+    """
+    __slots__ = ("field", "type")
+
+    def __init__(self, field: GoalFieldInfo, type: str):
+        """
+        :param field: the GM's goal field
+        :param type: the type of the field the player knows
+        """
+        object.__setattr__(self, "field", field)
+        object.__setattr__(self, "type", type)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("A KnownGoalFieldView can't be changed, change the field it shows instead.")
+
+    @property
+    def x(self):
+        return self.field.x
+
+    @property
+    def y(self):
+        return self.field.y
+
+    @property
+    def location(self):
+        return self.field.x, self.field.y
+
+    @property
+    def timestamp(self):
+        return self.field.timestamp
+
+    @property
+    def player_id(self):
+        return self.field.player_id
+
+    @property
+    def allegiance(self):
+        return self.field.allegiance
+
+    @property
+    def is_occupied(self):
+        return self.field.is_occupied
+
+
 class PieceInfo:
-    def __init__(self, id="-1", type=PieceType.UNKNOWN.value, player_id="-1", location=None, timestamp=datetime.now()):
+    __slots__ = ("id", "type", "player_id", "location", "timestamp")
+
+    def __init__(self, id=EMPTY_ID, type=PieceType.UNKNOWN.value, player_id=EMPTY_ID, location=None,
+                 timestamp=DEFAULT_TIMESTAMP):
         self.id = id
         self.type = type
         self.player_id = player_id
@@ -137,11 +204,25 @@ class ClientInfo:
         self.game_id = game_id
         self.game_master_id = game_master_id
         self.queue = Queue()
+        self.framer = MessageFramer()  # puts together messages split between calls to recv
+        self.outbound = OutboundQueue()  # messages waiting to be written to this client's socket
+
+    @property
+    def queue_depth(self):
+        return self.outbound.depth
+
+    @property
+    def bytes_in_flight(self):
+        return self.outbound.bytes_in_flight
 
     def get_tag(self):
         return self.tag.value + str(self.id)
 
 
+# offsets (dx, dy) of all the fields around a field (and the field itself)
+NEIGHBOUR_OFFSETS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+
 class GameInfo:
     def __init__(self, id="-1", name="", task_fields=None, goal_fields=None, pieces=None, board_width=0, task_height=0,
                  goals_height=0, max_blue_players=0, max_red_players=0, open=True, finished=False, game_master_id="",
@@ -171,12 +252,41 @@ class GameInfo:
         self.max_blue_players = max_blue_players
         self.max_red_players = max_red_players
 
+        # keeps distance_to_piece up to date, built on the first change of a piece's location:
+        self.piece_distances = None
+        # task fields without a piece, built when they're first asked for (see free_task_fields):
+        self.free_fields = None
+        # (x,y) => fields around (x,y), see build_neighbour_table:
+        self.neighbour_table = {}
+        self.neighbour_table_size = None  # (number of task fields, number of goal fields) when the table was built
+
     def check_for_empty_task_fields(self):
-        for task_field in self.task_fields.values():
-            if task_field.piece_id == "-1":
-                return True
+        return len(self.free_task_fields()) > 0
 
-        return False
+    def free_task_fields(self) -> FreeFields:
+        """
+        :returns: the task fields without a piece. built by a scan of the board on the first call, kept up to date
+        by piece_moved after that.
+        """
+        if self.free_fields is None:
+            self.free_fields = FreeFields(location for location, field in self.task_fields.items()
+                                          if not field.has_piece)
+        return self.free_fields
+
+    def update_free_fields(self, *locations):
+        """
+        a piece was put on or taken off the fields at locations (None and goal fields are skipped).
+        """
+        if self.free_fields is None:
+            return
+        for location in locations:
+            field = self.task_fields.get(location) if location is not None else None
+            if field is None:
+                continue
+            if field.has_piece:
+                self.free_fields.remove(location)
+            else:
+                self.free_fields.add(location)
 
     def has_piece(self, x, y):
         if (x, y) in self.task_fields.keys():
@@ -198,28 +308,50 @@ class GameInfo:
         :param look_for_extended: if True, function will look for all 8 neighbours (including diagonal) instead of 4.
         :return: dict of neighbouring fields (both Goal and Task Fields).
         """
-        dist = 1
-        if look_for_extended:
-            dist = 2
-
-        neighbours = {}  # (x,y) => FieldInfo
-        for (x, y), field in self.task_fields.items():
-            if not (abs(location[0] - x) > 1) and not abs(location[1] - y) > 1:
-                if abs(location[0] - x) + abs(location[1] - y) <= dist:
-                    neighbours[x, y] = field
-        for (x, y), field in self.goal_fields.items():
-            if not (abs(location[0] - x) > 1) and not abs(location[1] - y) > 1:
-                if abs(location[0] - x) + abs(location[1] - y) <= dist:
-                    neighbours[x, y] = field
-
-        # neighbours will include the original field itself, so we remove it:
-        # del neighbours[location[0], location[1]]
-        return neighbours
+        if self.neighbour_table_size != (len(self.task_fields), len(self.goal_fields)):
+            # the board has changed (or it's the first call)
+            self.build_neighbour_table()
+
+        entries = self.neighbour_table.get((location[0], location[1]))
+        if entries is None:
+            return {}
+
+        # neighbours will include the original field itself
+        task_fields, goal_fields = self.task_fields, self.goal_fields
+        return {neighbour: task_fields[neighbour] if is_task_field else goal_fields[neighbour]
+                for neighbour, is_task_field in entries[1 if look_for_extended else 0]}
+
+    def build_neighbour_table(self):
+        """
+        find the fields around every location on (or right next to) the board, once. they are kept in the order in
+        which they appear in task_fields and then goal_fields, as get_neighbours used to return them.
+        """
+        table = {}  # (x,y) => (4 neighbours and itself, 8 neighbours and itself) as lists of ((x,y), is task field)
+        for is_task_field, fields in ((True, self.task_fields), (False, self.goal_fields)):
+            for x, y in fields:
+                entry = ((x, y), is_task_field)
+                for dx, dy in NEIGHBOUR_OFFSETS:
+                    close, extended = table.setdefault((x + dx, y + dy), ([], []))
+                    if abs(dx) + abs(dy) <= 1:
+                        close.append(entry)
+                    extended.append(entry)
+
+        self.neighbour_table = table
+        self.neighbour_table_size = len(self.task_fields), len(self.goal_fields)
 
     def update_field_distances(self):
         """
         re-calculates distance_to_piece field in all TaskFields on the board.
         """
+        locations = [piece.location for piece in self.pieces.values() if piece.location is not None]
+        if all(location in self.task_fields for location in locations):
+            if self.piece_distances is None:
+                self.piece_distances = PieceDistances(self.task_fields)
+            self.piece_distances.rebuild(locations)
+            return
+
+        # a piece lies outside of the task area, the distances are calculated the slow way:
+        self.piece_distances = None
         for field in self.task_fields.values():
             min_piece, min_dist = None, None
             for piece in [piece for piece in self.pieces.values() if piece.location is not None]:
@@ -232,6 +364,28 @@ class GameInfo:
                     min_piece, min_dist = piece, manhattan(field.location, piece.location)
             field.distance_to_piece = min_dist
 
+    def set_piece_location(self, piece_id: str, location: tuple):
+        """
+        move a piece and update distance_to_piece of the fields around its old and new location.
+        :param location: new location of the piece, None if it was taken off the board (picked up, consumed...)
+        """
+        piece = self.pieces[piece_id]
+        old_location, piece.location = piece.location, location
+        if old_location != location:
+            self.piece_moved(old_location, location)
+
+    def piece_moved(self, old_location: tuple, new_location: tuple):
+        """
+        update distance_to_piece (and the free fields) after a piece's location changed (None means the piece
+        isn't on the board).
+        """
+        self.update_free_fields(old_location, new_location)
+        if self.piece_distances is None or (old_location is not None and old_location not in self.task_fields) or \
+                (new_location is not None and new_location not in self.task_fields):
+            self.update_field_distances()
+        else:
+            self.piece_distances.move(old_location, new_location)
+
     @staticmethod
     def fieldwise_manhattan_distance(field_a: FieldInfo, field_b: FieldInfo):
         return abs(field_a[0] - field_b[0]) + abs(field_a[1] - field_b[1])
@@ -241,6 +395,8 @@ class GameInfo:
         return 2 * self.goals_height + self.task_height - 1
 
     def initialize_fields(self, goals_height=None, task_height=None, board_width=None):
+        # there might be new task fields, the free ones are looked for again when needed
+        self.free_fields = None
 
         if goals_height is not None:
             self.goals_height = goals_height
@@ -279,23 +435,24 @@ class GameInfo:
         elif self.has_piece(x, y):
             raise CustomBaseExceptionWithMessage(
                 "Can't place a piece on location " + str((x, y)) + ". Field already has a piece!")
+        replaced_piece = self.pieces.get(id)
         new_piece = PieceInfo(id, type=type, location=(x, y))
         self.task_fields[x, y].piece_id = id
         self.pieces[id] = new_piece
-        # update distance_to_piece in all fields:
-        self.update_field_distances()
+        # update distance_to_piece in the fields around the new piece:
+        self.piece_moved(replaced_piece.location if replaced_piece is not None else None, (x, y))
 
 
 class PlayerInfo():
     """used by GameMaster only (for now, at least...)"""
 
-    def __init__(self, id="-1", team=None, info: GameInfo = None, type=None, location=None, guid=None, piece_id="-1"):
+    def __init__(self, id="-1", team=None, knowledge=None, type=None, location=None, guid=None, piece_id="-1"):
+        """
+        :param knowledge: PlayerKnowledge, what the GM has told him
+        """
         self.id = id
         self.type = type
-        if info is not None:
-            self.info = info
-        else:
-            self.info = GameInfo()
+        self.knowledge = knowledge
         self.team = team
         self.location = location
         self.piece_id = piece_id
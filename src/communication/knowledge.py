@@ -0,0 +1,183 @@
+from itertools import count
+
+from src.communication.info import TaskFieldInfo, GoalFieldInfo, PieceInfo, GoalFieldType, PieceType
+
+
+class PlayerKnowledge:
+    """
+    what the GM has told a player: only the fields and pieces he was told about are kept, so it grows with what
+    he has seen, not with the size of the board. every update of a field or a piece gets the next version, so what
+    changed since any earlier version can be listed.
+    the versions come from a clock shared by all the players of a game, so they also tell whose knowledge of a field
+    is newer when two players exchange it (the fields' own timestamps aren't kept up to date by the GM).
+    fields are keyed by their (x,y), pieces by their id (a string), so the two never collide in self.updates.
+    """
+
+    def __init__(self, clock=None):
+        """
+        :param clock: iterator of the versions (itertools.count), shared by the players of a game. his own one if None
+        """
+        self.clock = count(1) if clock is None else clock
+        self.version = 0  # version of the latest update
+        self.task_fields = {}  # (x,y) => TaskFieldInfo, as the player was told
+        self.goal_fields = {}  # (x,y) => GoalFieldInfo, with the type the player knows
+        self.pieces = {}  # piece id => PieceInfo
+        self.updates = {}  # (x,y) or piece id => version of its latest update, ordered from the oldest update
+        # (x,y) or piece id => version of the update another player learned it from, for what he was told by them:
+        self.learned = {}
+        self.learned_until = {}  # PlayerKnowledge he has learned from => its version by then
+
+    def __len__(self):
+        """
+        :returns: number of the fields and pieces the player was told about.
+        """
+        return len(self.updates)
+
+    def updated(self, key):
+        self.version = next(self.clock)
+        self.updates.pop(key, None)  # moved to the end, the updates stay ordered by their version
+        self.updates[key] = self.version
+        if self.learned:
+            self.learned.pop(key, None)  # he was told about it himself
+
+    def told_at(self, key) -> int:
+        """
+        :returns: version of the update the player's knowledge of the field or piece comes from, 0 if he has none.
+        """
+        version = self.learned.get(key)
+        return self.updates.get(key, 0) if version is None else version
+
+    def task_field(self, location: tuple) -> TaskFieldInfo:
+        """
+        :returns: the player's task field at location, to be updated (it's created if he wasn't told about it yet).
+        """
+        field = self.task_fields.get(location)
+        if field is None:
+            field = self.task_fields[location] = TaskFieldInfo(location[0], location[1])
+        self.updated(location)
+        return field
+
+    def goal_field(self, location: tuple) -> GoalFieldInfo:
+        """
+        :returns: the player's goal field at location, to be updated (it's created if he wasn't told about it yet).
+        """
+        field = self.goal_fields.get(location)
+        if field is None:
+            field = self.goal_fields[location] = GoalFieldInfo(location[0], location[1])
+        self.updated(location)
+        return field
+
+    def piece(self, piece_id: str, location: tuple = None) -> PieceInfo:
+        """
+        :param location: where a piece he didn't know about is, he knows neither its type nor its owner.
+        :returns: the player's piece, to be updated.
+        """
+        piece = self.pieces.get(piece_id)
+        if piece is None:
+            piece = self.pieces[piece_id] = PieceInfo(piece_id, location=location)
+        self.updated(piece_id)
+        return piece
+
+    def tell_task_field(self, field: TaskFieldInfo) -> TaskFieldInfo:
+        """
+        the player is told everything about the GM's task field.
+        :returns: the player's task field
+        """
+        known_field = self.task_field((field.x, field.y))
+        known_field.player_id = field.player_id
+        known_field.piece_id = field.piece_id
+        known_field.distance_to_piece = field.distance_to_piece
+        known_field.timestamp = field.timestamp
+        return known_field
+
+    def tell_goal_field(self, field: GoalFieldInfo) -> GoalFieldInfo:
+        """
+        the player is told about the GM's goal field, except for its type (he only learns it by placing a piece).
+        :returns: the player's goal field
+        """
+        known_field = self.goal_field((field.x, field.y))
+        known_field.player_id = field.player_id
+        known_field.allegiance = field.allegiance
+        known_field.timestamp = field.timestamp
+        return known_field
+
+    def believed_field(self, location: tuple):
+        """
+        :returns: the field as the player was last told about it, None if he never was.
+        """
+        field = self.task_fields.get(location)
+        if field is None:
+            field = self.goal_fields.get(location)
+        return field
+
+    def goal_type(self, location: tuple) -> str:
+        """
+        :returns: type of the goal field the player knows, unknown if he doesn't.
+        """
+        field = self.goal_fields.get(location)
+        return GoalFieldType.UNKNOWN.value if field is None else field.type
+
+    def changes_since(self, version: int) -> tuple:
+        """
+        :param version: self.version when the player was last brought up to date (0 for everything)
+        :returns: (task fields, goal fields, pieces) updated since then: dicts (x,y) => TaskFieldInfo,
+        (x,y) => GoalFieldInfo, id => PieceInfo
+        """
+        task_fields, goal_fields, pieces = {}, {}, {}
+        for key in reversed(self.updates):
+            if self.updates[key] <= version:
+                break  # the rest are older
+            if key in self.task_fields:
+                task_fields[key] = self.task_fields[key]
+            elif key in self.goal_fields:
+                goal_fields[key] = self.goal_fields[key]
+            else:
+                pieces[key] = self.pieces[key]
+        return task_fields, goal_fields, pieces
+
+    def learn_from(self, other: "PlayerKnowledge") -> tuple:
+        """
+        take over the other player's knowledge of every field and piece he was told about more recently (a knowledge
+        exchange). only what the other has updated since the last exchange with him is looked at, and a known type of
+        a goal field or a piece is never forgotten for an unknown one.
+        :returns: (task fields, goal fields, pieces) of the player which were updated, as in changes_since.
+        """
+        task_fields, goal_fields, pieces = other.changes_since(self.learned_until.get(other, 0))
+        self.learned_until[other] = other.version
+        learned_task_fields, learned_goal_fields, learned_pieces = {}, {}, {}
+        for location, field in task_fields.items():
+            if other.told_at(location) > self.told_at(location):
+                known_field = learned_task_fields[location] = self.task_field(location)
+                known_field.player_id = field.player_id
+                known_field.piece_id = field.piece_id
+                known_field.distance_to_piece = field.distance_to_piece
+                known_field.timestamp = field.timestamp
+                self.learned[location] = other.told_at(location)
+        for location, field in goal_fields.items():
+            newer = other.told_at(location) > self.told_at(location)
+            learns_type = field.type != GoalFieldType.UNKNOWN.value and self.goal_type(location) != field.type
+            if newer or learns_type:
+                told_at = max(other.told_at(location), self.told_at(location))
+                known_field = learned_goal_fields[location] = self.goal_field(location)
+                if newer:
+                    known_field.player_id = field.player_id
+                    known_field.allegiance = field.allegiance
+                    known_field.timestamp = field.timestamp
+                if learns_type:
+                    known_field.type = field.type
+                self.learned[location] = told_at
+        for piece_id, piece in pieces.items():
+            newer = other.told_at(piece_id) > self.told_at(piece_id)
+            known_type = self.pieces[piece_id].type if piece_id in self.pieces else PieceType.UNKNOWN.value
+            learns_type = piece.type != PieceType.UNKNOWN.value and known_type != piece.type
+            if newer or learns_type:
+                told_at = max(other.told_at(piece_id), self.told_at(piece_id))
+                known_piece = learned_pieces[piece_id] = self.piece(piece_id, piece.location)
+                if newer:
+                    known_piece.player_id = piece.player_id
+                    known_piece.location = piece.location
+                    known_piece.timestamp = piece.timestamp
+                if learns_type:
+                    known_piece.type = piece.type
+                self.learned[piece_id] = told_at
+        return learned_task_fields, learned_goal_fields, learned_pieces
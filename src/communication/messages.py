@@ -1,9 +1,14 @@
 #!/usr/bin/env python
 import os
 from datetime import datetime
+from enum import Enum
+from queue import Queue, Full
+from threading import Thread, Lock
 
 from lxml import etree
 
+from src.communication.encoders import MessageTemplate, DataEncoder, located
+
 XSD_PATH = "../messages/TheProjectGameCommunication.xsd"
 XML_NAMESPACE = "https://se2.mini.pw.edu.pl/17-results/"
 NAMESPACE_PREFIX = "{%s}" % XML_NAMESPACE
@@ -14,16 +19,222 @@ print(os.getcwd())
 # pre-load the XML schema:
 SCHEMA = etree.XMLSchema(etree.parse(XSD_PATH))
 
+# precompiled high-frequency messages, sent by players every turn (attributes in the order of GameMessage):
+MOVE_TEMPLATE = MessageTemplate(XML_NAMESPACE, "Move", ("gameId", "playerGuid", "direction"))
+DISCOVER_TEMPLATE = MessageTemplate(XML_NAMESPACE, "Discover", ("gameId", "playerGuid"))
+PICK_UP_PIECE_TEMPLATE = MessageTemplate(XML_NAMESPACE, "PickUpPiece", ("gameId", "playerGuid"))
+PLACE_PIECE_TEMPLATE = MessageTemplate(XML_NAMESPACE, "PlacePiece", ("gameId", "playerGuid"))
+TEST_PIECE_TEMPLATE = MessageTemplate(XML_NAMESPACE, "TestPiece", ("gameId", "playerGuid"))
+DATA_ENCODER = DataEncoder(XML_NAMESPACE)
+
+
+class ValidationMode(Enum):
+    ALWAYS = 'always'  # validate every message, raise DocumentInvalid if it's wrong (use it in tests)
+    SAMPLED = 'sampled'  # validate every n-th message of each type, only report the violations
+    OFF = 'off'  # don't validate at all
+    ASYNC = 'async'  # validate every message on a background thread, only report the violations
+
+
+def print_violation(message_type, error):
+    print("Invalid " + message_type + " message: " + str(error))
+
+
+class ValidationPolicy:
+    """
+    decides which messages built in this module are validated against the SCHEMA, and keeps count of it.
+    there is a single, process-wide policy: see set_validation_policy.
+    """
+    ASYNC_QUEUE_SIZE = 4096  # if the background validation falls behind by that many messages, we skip validating
+
+    def __init__(self, mode: ValidationMode = ValidationMode.ALWAYS, sample_rate: int = 100,
+                 on_violation=print_violation):
+        """
+        :param mode: ValidationMode
+        :param sample_rate: in SAMPLED mode, one in sample_rate messages of each type is validated
+        :param on_violation: function(message_type, error) called when a message is invalid (except in ALWAYS mode)
+        """
+        self.mode = mode
+        self.sample_rate = max(1, int(sample_rate))
+        self.on_violation = on_violation
+        self.lock = Lock()
+        self.counters = {}  # message type => {"validated": int, "skipped": int, "failed": int}
+        self.async_queue = None
+        # decided once, should_validate is called for every message:
+        self.validates_all = mode == ValidationMode.ALWAYS or mode == ValidationMode.ASYNC
+        self.samples = mode == ValidationMode.SAMPLED
+
+        if mode == ValidationMode.ASYNC:
+            self.async_queue = Queue(ValidationPolicy.ASYNC_QUEUE_SIZE)
+            Thread(target=self.validate_in_background, daemon=True).start()
+
+    def count(self, message_type, counter):
+        with self.lock:
+            counters = self.counters.get(message_type)
+            if counters is None:
+                counters = self.counters[message_type] = {"validated": 0, "skipped": 0, "failed": 0}
+            counters[counter] += 1
+
+    def should_validate(self, message_type) -> bool:
+        """
+        decide whether the next message of this type has to be validated. messages which won't be validated are
+        counted as skipped.
+        """
+        if self.validates_all:
+            return True
+        counters = self.counters.get(message_type)
+        if counters is None:
+            with self.lock:
+                counters = self.counters.setdefault(message_type, {"validated": 0, "skipped": 0, "failed": 0})
+        if self.samples and (counters["validated"] + counters["skipped"] + counters["failed"]) % self.sample_rate == 0:
+            return True
+        # no lock here, this is the hot path of OFF and SAMPLED modes. two threads may (very rarely) lose an increment,
+        # which only makes the statistics (and the sampling) a tiny bit off.
+        counters["skipped"] += 1
+        return False
+
+    def validate(self, root):
+        """
+        validate a message root according to the policy. only raises DocumentInvalid in ALWAYS mode.
+        """
+        message_type = root.tag[len(NAMESPACE_PREFIX):]
+        if self.should_validate(message_type):
+            self.validate_message(message_type, root)
+
+    def validate_message(self, message_type, message):
+        """
+        validate a message which was already chosen for validation (see should_validate).
+        :param message: message root, or the encoded message (str), which will be parsed for validation.
+        in ASYNC mode a root is serialized before it's queued: the caller still holds (and may change) it, and an lxml
+        tree mustn't be used by two threads at once.
+        """
+        if self.mode == ValidationMode.ALWAYS:
+            try:
+                SCHEMA.assertValid(message if not isinstance(message, str) else etree.fromstring(message))
+            except (etree.DocumentInvalid, etree.XMLSyntaxError):
+                self.count(message_type, "failed")
+                raise
+            self.count(message_type, "validated")
+
+        elif self.mode == ValidationMode.ASYNC:
+            if not isinstance(message, str):
+                message = etree.tostring(message, encoding='unicode')
+            try:
+                self.async_queue.put_nowait((message_type, message))
+            except Full:
+                self.count(message_type, "skipped")
+
+        else:
+            self.check(message_type, message)
+
+    def check(self, message_type, message):
+        """
+        validate the message (root or str) and report (instead of raising) the violation, if there is any.
+        """
+        try:
+            SCHEMA.assertValid(message if not isinstance(message, str) else etree.fromstring(message))
+            self.count(message_type, "validated")
+        except (etree.DocumentInvalid, etree.XMLSyntaxError) as e:
+            self.count(message_type, "failed")
+            if self.on_violation is not None:
+                self.on_violation(message_type, e)
+
+    def validate_in_background(self):
+        """
+        method running on a separate Thread (in ASYNC mode only), validates the queued messages.
+        """
+        while True:
+            item = self.async_queue.get()
+            if item is None:
+                return
+            self.check(*item)
+            self.async_queue.task_done()
+
+    def wait_for_background(self):
+        """
+        block until all the messages queued for background validation are validated.
+        """
+        if self.async_queue is not None:
+            self.async_queue.join()
+
+    def stop(self):
+        if self.async_queue is not None:
+            self.async_queue.put(None)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {message_type: dict(counters) for message_type, counters in self.counters.items()}
+
+
+VALIDATION = ValidationPolicy()
+
+
+def set_validation_policy(mode: ValidationMode, sample_rate: int = 100, on_violation=print_violation):
+    """
+    replace the process-wide validation policy (and reset its counters).
+    """
+    global VALIDATION
+    VALIDATION.stop()
+    VALIDATION = ValidationPolicy(ValidationMode(mode), sample_rate, on_violation)
+    return VALIDATION
+
+
+def validation_stats() -> dict:
+    """
+    :returns: dict: message type => {"validated": int, "skipped": int, "failed": int}
+    """
+    return VALIDATION.stats()
+
 
 def __validate_encode(root):
     """
-    check if an XML message root is valid against the SCHEMA, return it in string form
+    check if an XML message root is valid against the SCHEMA (according to the validation policy),
+    return it in string form
     :return: root encoded as unicode string.
     """
-    SCHEMA.assertValid(root)
+    if VALIDATION.async_queue is not None:
+        # the background thread gets the encoded message, never the tree (see ValidationPolicy.validate_message)
+        message_type = root.tag[len(NAMESPACE_PREFIX):]
+        message = etree.tostring(root, encoding='unicode')
+        if VALIDATION.should_validate(message_type):
+            VALIDATION.validate_message(message_type, message)
+        return message
+    VALIDATION.validate(root)
     return etree.tostring(root, encoding='unicode')
 
 
+def __encode_template(template: MessageTemplate, *values):
+    """
+    fast path of the simple, high-frequency messages (see MessageTemplate), used as long as the message doesn't have to
+    be validated right away: the tree is built (and validated) only when the policy demands it.
+    in ASYNC mode the encoded message is handed to the background thread instead.
+    :return: message encoded as unicode string, identical to what __validate_encode would return.
+    """
+    message_type = template.message_name
+    if not VALIDATION.should_validate(message_type):
+        return template.encode(*values)
+
+    if VALIDATION.async_queue is not None:
+        message = template.encode(*values)
+        VALIDATION.validate_message(message_type, message)
+        return message
+
+    root = __base_message(message_type)
+    for name, value in zip(template.attribute_names, values):
+        root.set(name, str(value))
+    VALIDATION.validate_message(message_type, root)
+    return etree.tostring(root, encoding='unicode')
+
+
+def __output(message: str, out: bytearray = None):
+    """
+    :returns: the message, or out with the (utf-8 encoded) message appended, if out is given.
+    """
+    if out is None:
+        return message
+    out.extend(message.encode())
+    return out
+
+
 def __base_message(message_name) -> etree.ElementBase:
     """
     :returns an xml root for the communication in this Project (with set namespaces)
@@ -67,29 +278,23 @@ def __append_element(root, tag, attrib=None):
 
 
 def Move(game_id, player_guid, direction: str):
-    root = __game_message("Move", game_id, player_guid)
-    root.set("direction", direction)
-    return __validate_encode(root)
+    return __encode_template(MOVE_TEMPLATE, game_id, player_guid, direction)
 
 
 def PickUpPiece(game_id, player_guid):
-    root = __game_message("PickUpPiece", game_id, player_guid)
-    return __validate_encode(root)
+    return __encode_template(PICK_UP_PIECE_TEMPLATE, game_id, player_guid)
 
 
 def PlacePiece(game_id, player_guid):
-    root = __game_message("PlacePiece", game_id, player_guid)
-    return __validate_encode(root)
+    return __encode_template(PLACE_PIECE_TEMPLATE, game_id, player_guid)
 
 
 def TestPiece(game_id, player_guid):
-    root = __game_message("TestPiece", game_id, player_guid)
-    return __validate_encode(root)
+    return __encode_template(TEST_PIECE_TEMPLATE, game_id, player_guid)
 
 
 def Discover(game_id, player_guid):
-    root = __game_message("Discover", game_id, player_guid)
-    return __validate_encode(root)
+    return __encode_template(DISCOVER_TEMPLATE, game_id, player_guid)
 
 
 def AuthorizeKnowledgeExchange(game_id, player_guid, with_player_id):
@@ -104,26 +309,42 @@ def GetGames():
 
 
 def Data(player_id, game_finished: bool, task_fields: dict = None, goal_fields: dict = None, pieces: dict = None,
-         player_location: tuple = None):
+         player_location: tuple = None, timestamp: datetime = None, out: bytearray = None):
     """
     :param player_id: target player's id
     :param game_finished: bool value, should be True if the game has ended
-    :param task_fields: dict: id -> TaskFieldInfo
-    :param goal_fields: dict: id -> GoalFieldInfo
-    :param pieces: dict: id -> PieceInfo
+    :param task_fields: dict: id -> TaskFieldInfo (or an iterable of TaskFieldInfo)
+    :param goal_fields: dict: id -> GoalFieldInfo or KnownGoalFieldView (or an iterable of them)
+    :param pieces: dict: id -> PieceInfo (or an iterable of PieceInfo)
     :param player_location: tuple x,y
-    :return:
+    :param timestamp: timestamp of all the fields and pieces in the message, datetime.now() by default
+    :param out: if given, the message is appended to this bytearray (utf-8 encoded) instead of being returned
+    :return: message as unicode string, or out.
     """
+    if timestamp is None:
+        timestamp = datetime.now()
+
+    # the tree is only built if the message has to be validated right away, it's streamed by DATA_ENCODER otherwise
+    if not VALIDATION.should_validate("Data"):
+        return DATA_ENCODER.encode(player_id, game_finished, task_fields, goal_fields, pieces, player_location,
+                                   timestamp, out)
+    if VALIDATION.async_queue is not None:
+        message = DATA_ENCODER.encode(player_id, game_finished, task_fields, goal_fields, pieces, player_location,
+                                      timestamp)
+        VALIDATION.validate_message("Data", message)
+        return __output(message, out)
+
     root = __player_message("Data", player_id)
     root.set("gameFinished", str(game_finished).lower())
+    timestamp = timestamp.isoformat()
 
     # add TaskFields collection:
     if task_fields is not None:
         c_task_fields = __append_element(root, "TaskFields")
 
         # add each TaskField to the collection:
-        for (x, y), field in task_fields.items():
-            e_attributes = {"x": str(x), "y": str(y), "timestamp": str(datetime.now().isoformat()),
+        for (x, y), field in located(task_fields):
+            e_attributes = {"x": str(x), "y": str(y), "timestamp": timestamp,
                             "distanceToPiece": str(field.distance_to_piece)}
             if field.player_id is not None and field.player_id != "-1":
                 e_attributes["playerId"] = str(field.player_id)
@@ -136,30 +357,35 @@ def Data(player_id, game_finished: bool, task_fields: dict = None, goal_fields:
         c_goal_fields = __append_element(root, "GoalFields")
 
         # add each GoalField to the collection:
-        for (x, y), field in goal_fields.items():
-            e_attributes = {"x": str(x), "y": str(y), "timestamp": str(datetime.now().isoformat()), "type": field.type,
+        for (x, y), field in located(goal_fields):
+            e_attributes = {"x": str(x), "y": str(y), "timestamp": timestamp, "type": field.type,
                             "team": field.allegiance}
             if field.player_id is not None and field.player_id != "-1":
                 e_attributes["playerId"] = str(field.player_id)
             __append_element(c_goal_fields, "GoalField", e_attributes)
 
     # add Pieces collection:
-    if pieces is not None and len(pieces) > 0:
+    if pieces is not None:
         c_pieces = __append_element(root, "Pieces")
 
         # add each Piece to the collection:
-        for piece in pieces.values():
-            e_attributes = {"id": piece.id, "timestamp": str(datetime.now().isoformat()), "type": piece.type}
+        for piece in (pieces.values() if hasattr(pieces, "values") else pieces):
+            e_attributes = {"id": piece.id, "timestamp": timestamp, "type": piece.type}
             if piece.player_id is not None and piece.player_id != "-1":
                 e_attributes["playerId"] = piece.player_id
             __append_element(c_pieces, "Piece", e_attributes)
 
+        # no Pieces element without pieces:
+        if len(c_pieces) == 0:
+            root.remove(c_pieces)
+
     # add PlayerLocation element:
     if player_location is not None:
         e_player_location = {"x": str(player_location[0]), "y": str(player_location[1])}
         __append_element(root, "PlayerLocation", e_player_location)
 
-    return __validate_encode(root)
+    VALIDATION.validate_message("Data", root)
+    return __output(etree.tostring(root, encoding='unicode'), out)
 
 
 def Game(player_id, teams: dict, board_width, tasks_height, goals_height, player_location: tuple):
@@ -0,0 +1,165 @@
+from collections import deque
+from enum import Enum
+from threading import Condition, Lock
+
+from src.communication.framing import MSG_SEPARATOR
+from src.communication.unexpected import OutboundQueueFull
+
+
+class BackpressurePolicy(Enum):
+    DROP = 'drop'  # drop the new message, the peer will never get it
+    BLOCK = 'block'  # make the sender wait until the peer catches up (or BLOCK_TIMEOUT passes, then disconnect)
+    DISCONNECT = 'disconnect'  # the peer is too slow to play, disconnect it
+
+
+class OutboundQueue:
+    """
+    Bounded queue of messages waiting to be written to one connection.
+    Senders only push messages into the queue, the I/O layer (a writer thread or the event loop) takes them out,
+    joining many small messages into a single write and resuming after short writes.
+    """
+    DEFAULT_MAX_MESSAGES = 1024
+    DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+    MAX_WRITE_SIZE = 64 * 1024  # messages are joined into writes of at most this many bytes (unless a message is bigger)
+    BLOCK_TIMEOUT = 10  # time in s for which a sender can be blocked by a slow peer
+
+    def __init__(self, max_messages: int = DEFAULT_MAX_MESSAGES, max_bytes: int = DEFAULT_MAX_BYTES,
+                 policy: BackpressurePolicy = BackpressurePolicy.BLOCK, separator: str = MSG_SEPARATOR):
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.separator = separator.encode()
+
+        self.frames = deque()  # encoded messages (with separators) which weren't taken for writing yet
+        self.queued_bytes = 0
+        self.chunk = b""  # joined messages currently being written, with the already written part cut off
+        self.closed = False
+        self.condition = Condition()
+        self.write_lock = Lock()  # only one thread at a time may write, or a chunk could be written twice
+
+        # statistics:
+        self.sent_messages = 0
+        self.sent_bytes = 0
+        self.dropped_messages = 0
+        self.writes = 0
+
+    @property
+    def depth(self) -> int:
+        """
+        :returns: number of messages waiting to be written (a message which is being written counts as well).
+        """
+        return len(self.frames) + (1 if len(self.chunk) > 0 else 0)
+
+    @property
+    def bytes_in_flight(self) -> int:
+        """
+        :returns: number of bytes which were handed to this queue, but haven't been written to the socket yet.
+        """
+        return self.queued_bytes + len(self.chunk)
+
+    def is_empty(self) -> bool:
+        return len(self.frames) == 0 and len(self.chunk) == 0
+
+    def is_full(self, new_frame_size: int) -> bool:
+        return len(self.frames) >= self.max_messages or self.queued_bytes + new_frame_size > self.max_bytes
+
+    def push(self, frame: bytes) -> bool:
+        """
+        queue a message for writing.
+        :param frame: encoded message, without the separator.
+        :returns: True if the message was queued, False if it was dropped.
+        :raises OutboundQueueFull: if the peer should be disconnected.
+        """
+        frame = frame + self.separator
+        with self.condition:
+            if self.closed:
+                return False
+
+            # a single message bigger than the whole limit is accepted into an empty queue, we would never send it else
+            if self.is_full(len(frame)) and len(self.frames) > 0:
+                if self.policy == BackpressurePolicy.DROP:
+                    self.dropped_messages += 1
+                    return False
+
+                elif self.policy == BackpressurePolicy.BLOCK:
+                    if not self.condition.wait_for(lambda: self.closed or not self.is_full(len(frame)),
+                                                   OutboundQueue.BLOCK_TIMEOUT):
+                        raise OutboundQueueFull("Peer didn't read its messages for " +
+                                                str(OutboundQueue.BLOCK_TIMEOUT) + " s.")
+                    if self.closed:
+                        return False
+
+                else:
+                    raise OutboundQueueFull("Peer has " + str(len(self.frames)) + " unread messages (" +
+                                            str(self.queued_bytes) + " bytes).")
+
+            self.frames.append(frame)
+            self.queued_bytes += len(frame)
+            self.condition.notify_all()
+            return True
+
+    def next_chunk(self) -> bytes:
+        """
+        :returns: data which should be written next: the rest of a short write, or as many queued messages as fit in
+        MAX_WRITE_SIZE joined together.
+        """
+        with self.condition:
+            if len(self.chunk) == 0 and len(self.frames) > 0:
+                joined = [self.frames.popleft()]
+                size = len(joined[0])
+                while len(self.frames) > 0 and size + len(self.frames[0]) <= OutboundQueue.MAX_WRITE_SIZE:
+                    frame = self.frames.popleft()
+                    joined.append(frame)
+                    size += len(frame)
+                self.queued_bytes -= size
+                self.sent_messages += len(joined)
+                self.chunk = joined[0] if len(joined) == 1 else b"".join(joined)
+                # some space got freed, wake up blocked senders:
+                self.condition.notify_all()
+            return self.chunk
+
+    def write_to(self, sock) -> int:
+        """
+        write (a part of) the queued data with a single send. works with both blocking and non-blocking sockets.
+        :returns: number of bytes written.
+        :raises BlockingIOError: if a non-blocking socket isn't ready for writing.
+        """
+        chunk = self.next_chunk()
+        if len(chunk) == 0:
+            return 0
+        sent = sock.send(chunk)
+        with self.condition:
+            if not self.closed:
+                self.chunk = chunk[sent:]
+            self.sent_bytes += sent
+            self.writes += 1
+        return sent
+
+    def flush(self, sock):
+        """
+        write everything that's queued to a blocking socket, handling short writes.
+        can be called by many threads at once: messages queued by one of them may be written by another.
+        """
+        with self.write_lock:
+            while not self.is_empty():
+                self.write_to(sock)
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        block until there is something to write or the queue gets closed.
+        :returns: True if there is something to write.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.closed or not self.is_empty(), timeout)
+            return not self.closed and not self.is_empty()
+
+    def close(self):
+        """
+        drop everything and wake up whoever waits on this queue.
+        """
+        with self.condition:
+            self.closed = True
+            self.frames.clear()
+            self.queued_bytes = 0
+            self.chunk = b""
+            self.condition.notify_all()
@@ -1,19 +1,13 @@
 #!/usr/bin/env python
-import xml.etree.ElementTree as ET
 from argparse import ArgumentParser
 
-from src.communication import messages
+from src.communication import messages, decoding
 from src.communication.client import Client
-from src.communication.info import GameInfo, PlayerType, Allegiance, PieceInfo, ClientTypeTag, PlayerInfo
+from src.communication.decoding import decode, interned
+from src.communication.info import GameInfo, PlayerType, Allegiance, PieceInfo, ClientTypeTag, PlayerInfo, EMPTY_ID
 from src.communication.strategy import StrategyFactory, Decision
 from src.communication.unexpected import UnexpectedServerMessage
 
-REGISTERED_GAMES_TAG = "{https://se2.mini.pw.edu.pl/17-results/}"
-
-
-
-
-
 class Player(Client):
     def __init__(self, index=0, verbose=False, game_name='xxx'):
         """
@@ -36,123 +30,146 @@ class Player(Client):
 
         self.strategy = None
 
+        # type of a received message => method handling it:
+        self.confirmation_handlers = {decoding.ConfirmJoiningGame: self.handle_confirm_joining,
+                                      decoding.RejectJoiningGame: self.handle_reject_joining}
+        self.response_handlers = {decoding.Data: self.handle_data,
+                                  decoding.RejectKnowledgeExchange: self.handle_exchange_rejection}
+
     def parse_games(self, games):
         open_games = []
-        root = ET.fromstring(games)
-
-        for registered_games in root.findall(REGISTERED_GAMES_TAG + "GameInfo"):
-            game_name = registered_games.get("gameName")
-            blue_team_players = int(registered_games.get("blueTeamPlayers"))
-            red_team_players = int(registered_games.get("redTeamPlayers"))
+        for registered_game in decode(games).games:
+            game_name = registered_game.get("gameName")
+            blue_team_players = int(registered_game.get("blueTeamPlayers"))
+            red_team_players = int(registered_game.get("redTeamPlayers"))
             open_games.append((game_name, blue_team_players, red_team_players))
 
         return open_games
 
-    def handle_confirmation(self, message: str):
+    def handle_confirmation(self, message):
         """
         Parses the confirmation message and extracts game information
         """
-        if "ConfirmJoiningGame" in message:
-            root = ET.fromstring(message)
-            self.Guid = root.attrib.get('privateGuid')
-            self.game_info.id = str(root.attrib.get('gameId'))
-            self.game_info.name = self.game_name
-            self.id = root.attrib.get('playerId')
+        message = decode(message)
+        handler = self.confirmation_handlers.get(type(message))
+        if handler is None:
+            raise UnexpectedServerMessage("Unexpected message from server!")
+        return handler(message)
 
-            for player_definition in root.findall(REGISTERED_GAMES_TAG + "PlayerDefinition"):
-                self.team = player_definition.attrib.get('team')
-                self.type = player_definition.attrib.get('type')
+    def handle_confirm_joining(self, confirmation: decoding.ConfirmJoiningGame):
+        self.Guid = confirmation.private_guid
+        self.game_info.id = str(confirmation.game_id)
+        self.game_info.name = self.game_name
+        self.id = confirmation.player_id
 
-            self.verbose_debug("Got assigned role of " + self.type + " in team " + self.team)
+        player_definition = confirmation.player_definition
+        self.team = player_definition.get('team', self.team)
+        self.type = player_definition.get('type', self.type)
 
-            return True
+        self.verbose_debug("Got assigned role of " + self.type + " in team " + self.team)
 
-        elif "RejectJoiningGame" in message:
-            self.verbose_debug("Got rejected by the server, so shutting down.")
-            self.shutdown()
-            return False
+        return True
 
-        else:
-            raise UnexpectedServerMessage("Unexpected message from server!")
+    def handle_reject_joining(self, rejection: decoding.RejectJoiningGame):
+        self.verbose_debug("Got rejected by the server, so shutting down.")
+        self.shutdown()
+        return False
 
-    def handle_game(self, game_message: str):
+    def handle_game(self, game_message):
         """
         Parses a Game message, sets up self.game_info
         """
-        root = ET.fromstring(game_message)
+        game_message = decode(game_message)
 
-        for board in root.findall(REGISTERED_GAMES_TAG + "Board"):
-            self.game_info.task_height = int(board.attrib.get('tasksHeight'))
-            self.game_info.board_width = int(board.attrib.get('width'))
-            self.game_info.goals_height = int(board.attrib.get('goalsHeight'))
+        board = game_message.board
+        if len(board) > 0:
+            self.game_info.task_height = int(board.get('tasksHeight'))
+            self.game_info.board_width = int(board.get('width'))
+            self.game_info.goals_height = int(board.get('goalsHeight'))
 
-        for player_location in root.findall(REGISTERED_GAMES_TAG + "PlayerLocation"):
-            x = int(player_location.attrib.get('x'))
-            y = int(player_location.attrib.get('y'))
-            self.location = (x, y)
+        if game_message.player_location is not None:
+            self.location = game_message.player_location
 
-        for player_list in root.findall(REGISTERED_GAMES_TAG + "Players"):
-            for in_player in player_list.findall(REGISTERED_GAMES_TAG + "Player"):
-                in_team = in_player.attrib.get('team')
-                in_type = in_player.attrib.get('type')
-                in_id = in_player.attrib.get('id')
-                self.game_info.teams[in_team][in_id] = PlayerInfo(in_id, in_type, in_type)
+        for in_player in game_message.players:
+            in_team = in_player.get('team')
+            in_type = in_player.get('type')
+            in_id = interned(in_player.get('id'))
+            self.game_info.teams[in_team][in_id] = PlayerInfo(in_id, in_team, type=in_type)
 
         self.game_info.initialize_fields()
 
-    def handle_data(self, response_data: str):
+    def handle_data(self, response_data):
         """
         parses a Data messsage, updates self.game_info
         """
-        root = ET.fromstring(response_data)
+        response_data = decode(response_data)
 
-        if root.attrib.get('gameFinished') == 'true':
+        if response_data.game_finished:
             self.game_on = False
 
-        for task_field_list in root.findall(REGISTERED_GAMES_TAG + "TaskFields"):
-            if task_field_list is not None:
-                for task_field in task_field_list.findall(REGISTERED_GAMES_TAG + "TaskField"):
-                    x = int(task_field.attrib.get('x'))
-                    y = int(task_field.attrib.get('y'))
-                    self.game_info.task_fields[x, y].timestamp = task_field.attrib.get('timestamp')
-                    self.game_info.task_fields[x, y].distance_to_piece = int(task_field.attrib.get('distanceToPiece'))
-                    if task_field.attrib.get('playerId') is not None:
-                        self.game_info.task_fields[x, y].player_id = str(task_field.attrib.get('playerId'))
-                    else:
-                        self.game_info.task_fields[x, y].player_id = "-1"
-                    if task_field.attrib.get('pieceId') is not None:
-                        self.game_info.task_fields[x, y].piece_id = str(task_field.attrib.get('pieceId'))
-                    else:
-                        self.game_info.task_fields[x, y].piece_id = "-1"
-
-        for goal_field_list in root.findall(REGISTERED_GAMES_TAG + "GoalFields"):
-            if goal_field_list is not None:
-                for goal_field in goal_field_list.findall(REGISTERED_GAMES_TAG + "GoalField"):
-                    x = int(goal_field.attrib.get('x'))
-                    y = int(goal_field.attrib.get('y'))
-                    self.game_info.goal_fields[x, y].timestamp = goal_field.attrib.get('timestamp')
-                    if goal_field.attrib.get('playerId') is not None:
-                        self.game_info.goal_fields[x, y].player_id = str(goal_field.attrib.get('playerId'))
-                    self.game_info.goal_fields[x, y].allegiance = goal_field.attrib.get('team')
-                    self.game_info.goal_fields[x, y].type = goal_field.attrib.get('type')
-
-        for piece_list in root.findall(REGISTERED_GAMES_TAG + "Pieces"):
-            if piece_list is not None:
-                for piece in piece_list.findall(REGISTERED_GAMES_TAG + "Piece"):
-                    id = piece.attrib.get('id')
-                    timestamp = piece.attrib.get('timestamp')
-                    type = piece.attrib.get('type')
-                    player_id = piece.attrib.get('playerId')
-                    if player_id is not None:
-                        self.game_info.pieces[id] = PieceInfo(id, type, player_id, timestamp=timestamp)
-                    else:
-                        self.game_info.pieces[id] = PieceInfo(id, type, timestamp=timestamp)
-
-        for player_location in root.findall(REGISTERED_GAMES_TAG + "PlayerLocation"):
-            if player_location is not None:
-                x = int(player_location.attrib.get('x'))
-                y = int(player_location.attrib.get('y'))
-                self.location = (x, y)
+        for task_field in response_data.task_fields:
+            self.update_task_field(int(task_field.get('x')), int(task_field.get('y')), task_field.get('timestamp'),
+                                   int(task_field.get('distanceToPiece')), task_field.get('playerId'),
+                                   task_field.get('pieceId'))
+
+        for goal_field in response_data.goal_fields:
+            self.update_goal_field(int(goal_field.get('x')), int(goal_field.get('y')), goal_field.get('timestamp'),
+                                   goal_field.get('playerId'), goal_field.get('team'), goal_field.get('type'))
+
+        for piece in response_data.pieces:
+            self.update_piece(piece.get('id'), piece.get('timestamp'), piece.get('type'), piece.get('playerId'))
+
+        if response_data.player_location is not None:
+            self.location = response_data.player_location
+
+    def update_task_field(self, x, y, timestamp, distance_to_piece, player_id, piece_id):
+        """
+        store what we were told about a task field. ids which weren't sent are None. only the ids (and types) are
+        interned, they repeat; the timestamp is new in every message.
+        """
+        field = self.game_info.task_fields[x, y]
+        field.timestamp = timestamp
+        field.distance_to_piece = distance_to_piece
+        field.player_id = interned(player_id, EMPTY_ID)
+        field.piece_id = interned(piece_id, EMPTY_ID)
+
+    def update_goal_field(self, x, y, timestamp, player_id, allegiance, type):
+        field = self.game_info.goal_fields[x, y]
+        field.timestamp = timestamp
+        if player_id is not None:
+            field.player_id = interned(player_id)
+        field.allegiance = interned(allegiance)
+        field.type = interned(type)
+
+    def update_piece(self, id, timestamp, type, player_id):
+        id = interned(id)
+        self.game_info.pieces[id] = PieceInfo(id, interned(type), interned(player_id, EMPTY_ID),
+                                              timestamp=timestamp)
+
+    def handle_exchange_rejection(self, rejection: decoding.RejectKnowledgeExchange):
+        self.strategy.exchange_refused(rejection.sender_player_id, rejection.permanent)
+
+    def exchange_answer(self, requester_id) -> tuple:
+        """
+        :returns: (whether we share our knowledge with the player who asked for it, whether a refusal is for good)
+        """
+        if self.strategy is None:
+            # we're not playing yet, he can ask again later
+            return False, False
+        accepted = self.strategy.accept_exchange(requester_id)
+        return accepted, not accepted
+
+    def answer_exchange_request(self, request: decoding.KnowledgeExchangeRequest):
+        """
+        :returns: our answer to another player's KnowledgeExchangeRequest. the GM sends him our knowledge if we agree.
+        """
+        accepted, permanent = self.exchange_answer(request.sender_player_id)
+        if accepted:
+            return messages.AcceptExchangeRequest(request.sender_player_id, self.id)
+        return messages.RejectKnowledgeExchange(request.sender_player_id, self.id, permanent)
+
+    def handle_unexpected(self, message: decoding.DecodedMessage):
+        self.verbose_debug("Ignoring an unexpected " + message.tag + " message.")
 
     def receive(self):
         """
@@ -161,7 +178,8 @@ class Player(Client):
         received = super(Player, self).receive()
         if received is None:
             raise ConnectionAbortedError
-        if "GameMasterDisconnected" in received:
+        received = decode(received)
+        if isinstance(received, decoding.GameMasterDisconnected):
             # clean up our knowledge and try to join to the game again.
             self.game_on = False
             self.verbose_debug("GameMaster has disconnected! Trying to join game again...")
@@ -175,7 +193,7 @@ class Player(Client):
         self.send(messages.GetGames())
         games = self.receive()
 
-        if 'RegisteredGames' in games:
+        if isinstance(games, decoding.RegisteredGames):
             self.open_games = self.parse_games(games)
 
             if len(self.open_games) > 0:
@@ -201,6 +219,7 @@ class Player(Client):
     def play(self):
         self.game_on = True
         self.strategy = StrategyFactory(self.team, self.location, self.game_info)
+        self.strategy.player_id = self.id
 
         while self.game_on:
             # find the next decision, send a message specified by it.
@@ -209,38 +228,48 @@ class Player(Client):
             self.send(self.choose_message(decision))
 
             response = self.receive()
+            while isinstance(response, decoding.KnowledgeExchangeRequest):
+                # another player would like to know what we know, the response to our action is still to come
+                self.send(self.answer_exchange_request(response))
+                response = self.receive()
             if response is None:
                 self.verbose_debug("Something wrong happened to the server! Shutting down.")
                 self.shutdown()
 
             else:
                 # normal response!
-                self.handle_data(response)
-                # if we just succesfully moved, we need to update our info
-                # specifically, update player_id on the field we just left (make it empty again)
-                # for this I'm using strategy.current_location which hasn't been updated yet and so is the prev. loc.
-                old_location = self.strategy.current_location
-                if self.strategy.last_move.choice == Decision.MOVE and self.location != old_location:
-                    if self.game_info.is_task_field(old_location):
-                        self.game_info.task_fields[old_location].player_id = "-1"
-                    else:
-                        self.game_info.goal_fields[old_location].player_id = "-1"
-
-                if self.strategy.last_move.choice == Decision.PICK_UP:
-                    # check if we have a piece now
-                    for piece_info in self.game_info.pieces.values():
-                        if piece_info.player_id == self.id:
-                            self.strategy.have_piece = piece_info.id
-                            self.game_info.task_fields[old_location].piece_id = "-1"
-                            self.game_info.update_field_distances()
-                            break
-                    else:
-                        self.strategy.have_piece = "-1"
-
-                self.strategy.current_location = self.location
+                self.response_handlers.get(type(response), self.handle_unexpected)(response)
+                self.update_after_response()
 
         self.shutdown()
 
+    def update_after_response(self):
+        """
+        update what the strategy knows after the response to its last decision was handled.
+        """
+        # if we just succesfully moved, we need to update our info
+        # specifically, update player_id on the field we just left (make it empty again)
+        # for this I'm using strategy.current_location which hasn't been updated yet and so is the prev. loc.
+        old_location = self.strategy.current_location
+        if self.strategy.last_move.choice == Decision.MOVE and self.location != old_location:
+            if self.game_info.is_task_field(old_location):
+                self.game_info.task_fields[old_location].player_id = "-1"
+            else:
+                self.game_info.goal_fields[old_location].player_id = "-1"
+
+        if self.strategy.last_move.choice == Decision.PICK_UP:
+            # check if we have a piece now
+            for piece_info in self.game_info.pieces.values():
+                if piece_info.player_id == self.id:
+                    self.strategy.have_piece = piece_info.id
+                    self.game_info.task_fields[old_location].piece_id = "-1"
+                    self.game_info.set_piece_location(piece_info.id, None)
+                    break
+            else:
+                self.strategy.have_piece = "-1"
+
+        self.strategy.current_location = self.location
+
     def choose_message(self, decision: Decision) -> str:
         """
         :returns: an appropriate message string basing on decision.
@@ -261,6 +290,9 @@ class Player(Client):
         elif decision.choice == Decision.PLACE:
             return messages.PlacePiece(self.game_info.id, self.Guid)
 
+        elif decision.choice == Decision.KNOWLEDGE_EXCHANGE:
+            return messages.AuthorizeKnowledgeExchange(self.game_info.id, self.Guid, decision.additional_info)
+
 
 if __name__ == '__main__':
     def simulate(player_count, verbose, game_name):
@@ -276,5 +308,10 @@ if __name__ == '__main__':
     parser.add_argument('-c', '--playercount', default=1, help='Number of players to be deployed.')
     parser.add_argument('-v', '--verbose', action='store_true', default=False, help='Use verbose debugging mode.')
     parser.add_argument('-n', '--gamename', default="xxx", help="Name of the game", type=str)
+    parser.add_argument('--validation', default="always", choices=[mode.value for mode in messages.ValidationMode],
+                        help='Schema validation of the sent messages.')
+    parser.add_argument('--sample-rate', default=100, type=int,
+                        help='Validate one in that many messages of each type (with --validation sampled).')
     args = vars(parser.parse_args())
+    messages.set_validation_policy(args["validation"], args["sample_rate"])
     simulate(int(args["playercount"]), args["verbose"], str(args["gamename"]))
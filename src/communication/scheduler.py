@@ -0,0 +1,227 @@
+from concurrent.futures import Future
+from heapq import heappush, heappop, heapify
+from itertools import count
+from threading import Condition, Thread, current_thread
+from time import monotonic, perf_counter
+
+
+def print_error(action, error):
+    print("Action " + getattr(action, "__name__", str(action)) + " failed: " + repr(error))
+
+
+class Call(Future):
+    """
+    an action whose caller waits for what it returns (see ActionScheduler.call).
+    """
+
+    def __init__(self, action, args):
+        super(Call, self).__init__()
+        self.action = action
+        self.args = args
+
+    def __call__(self):
+        if not self.set_running_or_notify_cancel():
+            return
+        try:
+            self.set_result(self.action(*self.args))
+        except BaseException as e:
+            # the caller gets it, whatever it is (the custom exceptions aren't Exceptions)
+            self.set_exception(e)
+
+
+class ActionScheduler:
+    """
+    Runs actions (any functions) once their delay has passed, in the order in which they are due, one at a time on
+    a single worker thread. Replaces a sleeping thread per action: nothing runs concurrently, so the actions
+    don't need any locking, and waiting costs nothing but an entry in the heap.
+    Actions scheduled with the same key (e.g. a player's id) run in the order in which they were scheduled, even
+    if a later one has a shorter delay.
+    """
+
+    def __init__(self, clock=monotonic, on_error=print_error):
+        """
+        :param clock: function returning the current time in s. the worker thread only works with the real clock,
+        with any other one call run_due instead.
+        :param on_error: function(action, exception) called when an action raises, the worker keeps running.
+        """
+        self.clock = clock
+        self.on_error = on_error
+        self.heap = []  # (due time, sequence number, action, args, owner)
+        self.sequence = count()  # actions due at the same time run in the order they were scheduled
+        self.last_due = {}  # key => due time of the key's last scheduled action
+        self.condition = Condition()
+        self.running = False
+        self.worker = None
+
+        # statistics:
+        self.executed = 0
+        self.total_lateness = 0.0  # s by which the actions ran after their due time, summed
+        self.max_lateness = 0.0
+        # contention: how long the actions wait to be scheduled and how busy the worker is
+        self.scheduled = 0
+        self.total_lock_wait = 0.0  # s spent waiting for self.condition in schedule, summed
+        self.max_lock_wait = 0.0
+        self.max_queued = 0
+        self.busy_time = 0.0  # s spent running the actions
+
+    def __len__(self):
+        return len(self.heap)
+
+    def schedule(self, delay: float, action, *args, key=None, owner=None) -> float:
+        """
+        :param delay: time in s after which the action should run
+        :param args: arguments of the action
+        :param key: actions with the same key keep their order
+        :param owner: whoever the action belongs to (e.g. one of the games sharing the scheduler), see cancel
+        :returns: the time at which the action is due.
+        """
+        started = perf_counter()
+        with self.condition:
+            lock_wait = perf_counter() - started
+            self.scheduled += 1
+            self.total_lock_wait += lock_wait
+            self.max_lock_wait = max(self.max_lock_wait, lock_wait)
+            due = self.clock() + delay
+            if key is not None:
+                due = max(due, self.last_due.get(key, due))
+                self.last_due[key] = due
+            heappush(self.heap, (due, next(self.sequence), action, args, owner))
+            self.max_queued = max(self.max_queued, len(self.heap))
+            # wake the worker up, this action might be due before the one it waits for:
+            self.condition.notify()
+            return due
+
+    def call(self, action, *args, key=None):
+        """
+        run the action among the others, right after the ones which are due already, and wait for it. on the calling
+        thread if there's no worker (e.g. with run_due) or if it's the worker's own call.
+        :returns: what the action returned, what it raised is raised here. CancelledError if the scheduler was
+        stopped before it ran.
+        """
+        with self.condition:  # (reentrant) so that it isn't stopped before the call is in the heap
+            if not self.running or current_thread() is self.worker:
+                call = None
+            else:
+                call = Call(action, args)
+                self.schedule(0, call, key=key)
+        if call is None:
+            return action(*args)
+        return call.result()
+
+    def cancel(self, owner) -> int:
+        """
+        drop the actions of the owner which didn't run yet.
+        :returns: number of dropped actions.
+        """
+        with self.condition:
+            queued = len(self.heap)
+            self.cancel_calls([entry for entry in self.heap if entry[4] is owner])
+            self.heap = [entry for entry in self.heap if entry[4] is not owner]
+            heapify(self.heap)
+            # the keys whose actions have all run don't hold anything back any more:
+            now = self.clock()
+            self.last_due = {key: due for key, due in self.last_due.items() if due > now}
+            return queued - len(self.heap)
+
+    @staticmethod
+    def cancel_calls(entries):
+        # nobody is left waiting for the dropped actions
+        for entry in entries:
+            if isinstance(entry[2], Call):
+                entry[2].cancel()
+
+    def next_due(self):
+        """
+        :returns: due time of the next action, None if there is none.
+        """
+        with self.condition:
+            return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now: float):
+        """
+        :returns: the next action if it is due at now (the entry is removed from the heap), None otherwise.
+        """
+        with self.condition:
+            if not self.heap or self.heap[0][0] > now:
+                return None
+            return heappop(self.heap)
+
+    def execute(self, entry, now: float):
+        due, sequence, action, args, owner = entry
+        lateness = now - due
+        self.executed += 1
+        self.total_lateness += lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+        started = perf_counter()
+        try:
+            action(*args)
+        except Exception as e:
+            self.on_error(action, e)
+        finally:
+            self.busy_time += perf_counter() - started
+
+    def run_due(self, now: float = None) -> int:
+        """
+        run all the actions which are due (on the calling thread). actions scheduled by them run as well, if
+        they're due already.
+        :param now: current time, clock() if not given
+        :returns: number of actions which were run.
+        """
+        if now is None:
+            now = self.clock()
+        executed = 0
+        entry = self.pop_due(now)
+        while entry is not None:
+            self.execute(entry, now)
+            executed += 1
+            entry = self.pop_due(now)
+        return executed
+
+    def start(self):
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.worker = Thread(target=self.work, daemon=True)
+        self.worker.start()
+
+    def work(self):
+        while True:
+            with self.condition:
+                while self.running:
+                    if not self.heap:
+                        self.condition.wait()
+                        continue
+                    timeout = self.heap[0][0] - self.clock()
+                    if timeout <= 0:
+                        break
+                    self.condition.wait(timeout)
+                if not self.running:
+                    return
+                entry = heappop(self.heap)
+            self.execute(entry, self.clock())
+
+    def stop(self, wait: bool = True):
+        """
+        stop the worker. the actions which didn't run yet are dropped.
+        :param wait: wait for the action which is running at the moment to finish
+        """
+        with self.condition:
+            self.running = False
+            self.cancel_calls(self.heap)
+            self.heap.clear()
+            self.last_due.clear()
+            self.condition.notify_all()
+        if wait and self.worker is not None and self.worker.is_alive() and self.worker is not current_thread():
+            self.worker.join()
+
+    def stats(self) -> dict:
+        """
+        lateness is how long the due actions waited for the worker, lock wait how long scheduling them waited for
+        the scheduler's lock (both in s). busy time is the time the worker spent running them.
+        """
+        return {"executed": self.executed, "queued": len(self.heap), "max_lateness": self.max_lateness,
+                "mean_lateness": self.total_lateness / self.executed if self.executed > 0 else 0.0,
+                "max_queued": self.max_queued, "max_lock_wait": self.max_lock_wait,
+                "mean_lock_wait": self.total_lock_wait / self.scheduled if self.scheduled > 0 else 0.0,
+                "busy_time": self.busy_time}
@@ -8,7 +8,9 @@ from time import sleep
 
 from src.communication import messages
 from src.communication.info import ClientInfo, GameInfo, ClientTypeTag
-from src.communication.unexpected import UnexpectedClientMessage
+from src.communication.outbound import BackpressurePolicy, OutboundQueue
+from src.communication.sniffer import sniff
+from src.communication.unexpected import UnexpectedClientMessage, FrameTooLargeError, OutboundQueueFull
 
 XML_MESSAGE_TAG = "{https://se2.mini.pw.edu.pl/17-results/}"
 ET.register_namespace('', "https://se2.mini.pw.edu.pl/17-results/")
@@ -24,16 +26,22 @@ class CommunicationServer:
     # End of transmission byte is shown as an electric arrow.
     # See https://en.wikipedia.org/wiki/End-of-Transmission_character
     MSG_SEPARATOR = chr(23)
-    # below list contains messages which are addressed to a different player, NOT GM
-    TO_PLAYER_MESSAGES = ["Data", "KnowledgeExchangeRequest", "AcceptExchangeRequest",
-                          "RejectKnowledgeExchange"]
-
-    def __init__(self, verbose: bool, hostname: str = DEFAULT_HOSTNAME, port: int = DEFAULT_PORT):
+    MSG_SEPARATOR_BYTES = MSG_SEPARATOR.encode()
+    # below list contains messages which are addressed to a different player, NOT GM. a player's answer to a
+    # KnowledgeExchangeRequest (AcceptExchangeRequest, RejectKnowledgeExchange) goes to the GM: he sends the
+    # knowledge (or relays the rejection) to the player who asked for it.
+    TO_PLAYER_MESSAGES = ["Data", "KnowledgeExchangeRequest"]
+
+    def __init__(self, verbose: bool, hostname: str = DEFAULT_HOSTNAME, port: int = DEFAULT_PORT,
+                 backpressure: BackpressurePolicy = BackpressurePolicy.BLOCK,
+                 max_queued_messages: int = OutboundQueue.DEFAULT_MAX_MESSAGES):
         """
         constructor.
         :param verbose:
         :param hostname:
         :param port:
+        :param backpressure: what to do when a client doesn't read its messages fast enough
+        :param max_queued_messages: how many messages can wait to be written to a single client
         """
 
         # declare fields:
@@ -41,6 +49,8 @@ class CommunicationServer:
         self.hostname = hostname
         self.port = port
         self.verbose = verbose
+        self.backpressure = backpressure
+        self.max_queued_messages = max_queued_messages
 
         self.socket = socket.socket()
         self.clients = {}  # client_id => ClientInfo object
@@ -48,6 +58,10 @@ class CommunicationServer:
         self.client_indexer = 0
         self.games_indexer = 0
 
+        # statistics (only approximate in the threaded mode, the client threads count without a lock):
+        self.routed_messages = 0
+        self.routed_bytes = 0
+
         self.printing_state_thread = Thread()
         self.accepting_thread = Thread()
 
@@ -109,7 +123,9 @@ class CommunicationServer:
                     if len(self.clients) > 0:
                         for client in self.clients.values():
                             if client is not None:
-                                print(" " + client.get_tag() + ": " + str(client.socket.getsockname()))
+                                print(" " + client.get_tag() + ": " + str(client.socket.getsockname()) +
+                                      " queued messages: " + str(client.queue_depth) +
+                                      " bytes in flight: " + str(client.bytes_in_flight))
                     else:
                         print(" There are no currently connected clients.")
 
@@ -146,12 +162,29 @@ class CommunicationServer:
 
     def register_connection(self, client_socket: socket, client_id: str):
         new_client = ClientInfo(client_id, socket=client_socket)
+        new_client.outbound = OutboundQueue(self.max_queued_messages, policy=self.backpressure)
         self.clients[client_id] = new_client
 
         self.verbose_debug(
             "New client: " + new_client.get_tag() + " with address " + str(client_socket.getsockname()) + " connected.")
 
         Thread(target=self.handle_client, args=[new_client], daemon=True).start()
+        Thread(target=self.write_to_client, args=[new_client], daemon=True).start()
+
+    def write_to_client(self, client: ClientInfo):
+        """
+        method running on a separate thread for every client, writes out the messages queued for this client.
+        thanks to it, a client who is slow to read his messages doesn't stop whoever is sending messages to him.
+        """
+        while self.running and self.clients.get(client.id) is client:
+            if not client.outbound.wait(CommunicationServer.DEFAULT_TIMEOUT):
+                continue
+            try:
+                client.outbound.flush(client.socket)
+            except OSError as e:
+                self.verbose_debug("Couldn't write to " + client.get_tag() + ": " + str(e))
+                self.disconnect_client(client.id)
+                return
 
     def handle_client(self, new_client: ClientInfo):
         """
@@ -165,16 +198,13 @@ class CommunicationServer:
                 if new_client is None:
                     raise ConnectionAbortedError
                 # read the first message:
-                received_data = self.receive(new_client)
+                received_data = self.receive_frame(new_client)
 
                 if received_data is None:
                     self.verbose_debug("Received no message from " + new_client.get_tag() + ". Disconnecting them.")
                     raise ConnectionResetError
 
-                elif "RegisterGame" in received_data:
-                    new_client.tag = ClientTypeTag.GAME_MASTER
-                elif "GetGames" in received_data or "JoinGame" in received_data:
-                    new_client.tag = ClientTypeTag.PLAYER
+                self.identify_client(new_client, sniff(received_data)[0])
 
                 if new_client.tag == ClientTypeTag.CLIENT:
                     self.verbose_debug("Unknown client connected to server, disconnecting him.", True)
@@ -197,51 +227,33 @@ class CommunicationServer:
                 self.disconnect_client(new_client.id)
                 raise e
 
-    def handle_player(self, player: ClientInfo, first_message: str):
-
-        # parse the first message: it will be either GetGames or JoinGame
-        if "GetGames" in first_message:
-            open_games = {}
-            for game in self.games.values():
-                if game.open:
-                    open_games[game.id] = game
-
-            # and send them to this player
-            self.send(player, messages.RegisteredGames(open_games))
+    @staticmethod
+    def identify_client(client: ClientInfo, first_message_type: str):
+        """
+        set the client's tag basing on the first message it has sent (GM registers a game, players look for games).
+        :param first_message_type: name of the root element of the first message.
+        """
+        if first_message_type == "RegisterGame":
+            client.tag = ClientTypeTag.GAME_MASTER
+        elif first_message_type == "GetGames" or first_message_type == "JoinGame":
+            client.tag = ClientTypeTag.PLAYER
 
-        elif "JoinGame" in first_message:
-            self.handle_join(player, first_message)
+    def handle_player(self, player: ClientInfo, first_message: bytes):
 
-        else:
-            raise UnexpectedClientMessage(first_message)
+        # the first message should be either GetGames or JoinGame
+        if sniff(first_message)[0] not in ("GetGames", "JoinGame"):
+            raise UnexpectedClientMessage(first_message.decode())
+        self.route_player_message(player, first_message)
 
         while self.running:
             try:
                 if self.clients[player.id] is None:
                     raise ConnectionAbortedError
 
-                player_message = self.receive(player)
-                message_root = ET.fromstring(player_message)
-
-                # parse the message:
-                if "JoinGame" in player_message:
-                    self.handle_join(player, player_message)
-
-                elif any(message in player_message for message in self.TO_PLAYER_MESSAGES):
-                    self.send(self.clients[message_root.attrib["playerId"]], player_message)
-
-                elif "GetGames" in player_message:
-                    # he's trying to re-join so let's handle him again!
-                    self.handle_player(player, player_message)
-
-                else:
-                    # DEFAULT HANDLING: relay the message to GM
-                    client = self.clients.get(player.id)
-                    if client is not None:
-                        self.send(self.clients[player.game_master_id], player_message)
-                    else:
-                        self.verbose_debug("Not sending anything, because the player hath already disconnected.")
-                        # raise ConnectionAbortedError
+                player_message = self.receive_frame(player)
+                if player_message is None:
+                    raise ConnectionAbortedError
+                self.route_player_message(player, player_message)
 
             except ConnectionAbortedError:
                 self.disconnect_client(player.id)
@@ -253,6 +265,45 @@ class CommunicationServer:
                 self.disconnect_client(player.id)
                 break
 
+    def send_open_games(self, player: ClientInfo):
+        open_games = {}
+        for game in self.games.values():
+            if game.open:
+                open_games[game.id] = game
+
+        # and send them to this player
+        self.send(player, messages.RegisteredGames(open_games))
+
+    def route_player_message(self, player: ClientInfo, player_message: bytes):
+        """
+        handle a single message received from an already identified player.
+        shared by the threaded server and the event loop server, so that both route messages in the same way.
+        only the root element is read: relayed messages are forwarded as they are, without decoding them.
+        """
+        message_type, attributes = sniff(player_message)
+        self.routed_messages += 1
+        self.routed_bytes += len(player_message)
+
+        # parse the message:
+        if message_type == "JoinGame":
+            # the only message we have to change, so it gets fully parsed.
+            self.handle_join(player, player_message)
+
+        elif message_type in self.TO_PLAYER_MESSAGES:
+            self.send_frame(self.clients[attributes["playerId"]], player_message)
+
+        elif message_type == "GetGames":
+            # he's trying to (re-)join so let's send him the games!
+            self.send_open_games(player)
+
+        else:
+            # DEFAULT HANDLING: relay the message to GM
+            client = self.clients.get(player.id)
+            if client is not None:
+                self.send_frame(self.clients[player.game_master_id], player_message)
+            else:
+                self.verbose_debug("Not sending anything, because the player hath already disconnected.")
+
     def handle_join(self, player, player_message):
         message_root = ET.fromstring(player_message)
         # check if game with this name exists:
@@ -266,14 +317,14 @@ class CommunicationServer:
 
                 gm_id = game_info.game_master_id
                 player.game_master_id = gm_id
-                player.game_id = self.clients[gm_id].game_id
+                player.game_id = game_info.id
                 self.send(self.clients[gm_id], join_game_message)
                 return True
         # no game with this name, send rejection
         self.send(player, messages.RejectJoiningGame(player.id, players_game_name))
         return False
 
-    def handle_gm(self, gm: ClientInfo, registration_msg: str):
+    def handle_gm(self, gm: ClientInfo, registration_msg: bytes):
         # first_message should be a RegisterGames xml
 
         if not self.try_register_game(gm, registration_msg):
@@ -281,12 +332,12 @@ class CommunicationServer:
             self.send(gm, messages.RejectGameRegistration(gm.game_name))
 
             # GM will be trying again, so let's wait for his second attempt:
-            second_attempt_message = self.receive(gm)
+            second_attempt_message = self.receive_frame(gm)
             if not self.try_register_game(gm, second_attempt_message):
                 # registration failed, again. send rejection:
                 self.send(gm, messages.RejectGameRegistration(gm.game_name))
                 # gm should not try to register anymore, so if we receive any message now then it's an error:
-                should_not_be_a_message = self.receive(gm)
+                should_not_be_a_message = self.receive_frame(gm)
                 if len(should_not_be_a_message) > 0:
                     raise UnexpectedClientMessage(
                         "GameMaster tried to register a game again, while he should have switched off!")
@@ -295,34 +346,44 @@ class CommunicationServer:
 
             while self.running and gm.id in self.clients.keys():
 
-                gm_msg = self.receive(gm)
+                gm_msg = self.receive_frame(gm)
 
                 if gm_msg is None:
                     raise ConnectionAbortedError
 
-                msg_root = ET.fromstring(gm_msg)
+                self.route_gm_message(gm, gm_msg)
 
-                # non-default message types:
-                if "ConfirmJoiningGame" in gm_msg:
-                    player_id = msg_root.attrib["playerId"]
-                    self.clients[player_id].game_master_id = gm.id
-                    self.send(self.clients[player_id], gm_msg)
-                    # DUCT TAPE:
-                    # sleep(100)
+    def route_gm_message(self, gm: ClientInfo, gm_msg: bytes):
+        """
+        handle a single message received from a Game Master which has already registered its game.
+        """
+        message_type, attributes = sniff(gm_msg)
+        self.routed_messages += 1
+        self.routed_bytes += len(gm_msg)
+
+        # non-default message types:
+        if message_type == "ConfirmJoiningGame":
+            player_id = attributes["playerId"]
+            self.clients[player_id].game_master_id = gm.id
+            self.send_frame(self.clients[player_id], gm_msg)
+
+        elif message_type == "RegisterGame":
+            # one GM can host more than one game
+            if not self.try_register_game(gm, gm_msg):
+                self.send(gm, messages.RejectGameRegistration(gm.game_name))
 
-                elif "GameStarted" in gm_msg:
-                    game_id = msg_root.attrib["gameId"]
-                    self.games[game_id].open = False
+        elif message_type == "GameStarted":
+            game_id = attributes["gameId"]
+            self.games[game_id].open = False
 
-                elif "Data" in gm_msg:
-                    finished = msg_root.attrib["gameFinished"]
-                    self.relay_msg_to_player(gm_msg)
-                    if finished == "true":
-                        self.verbose_debug("Somebody won! Ask GM who.")
+        elif message_type == "Data":
+            self.relay_msg_to_player(gm_msg, attributes)
+            if attributes["gameFinished"] == "true":
+                self.verbose_debug("Somebody won! Ask GM who.")
 
-                else:
-                    # DEFAULT MESSAGE HANDLING:
-                    self.relay_msg_to_player(gm_msg)
+        else:
+            # DEFAULT MESSAGE HANDLING:
+            self.relay_msg_to_player(gm_msg, attributes)
 
     def try_register_game(self, gm: ClientInfo, register_game_message: str):
         """
@@ -364,13 +425,21 @@ class CommunicationServer:
             self.games_indexer += 1
             return True
 
-    def relay_msg_to_player(self, gm_msg):
+    def relay_msg_to_player(self, gm_msg, attributes: dict = None):
+        """
+        pass a message on to the player specified in its root element.
+        :param gm_msg: message as bytes or str
+        :param attributes: root attributes of the message, if they were already read
+        """
+        if isinstance(gm_msg, str):
+            gm_msg = gm_msg.encode()
         # the message should be a "PlayerMessage", so it definitely needs to have playerId in root attributes.
-        msg_root = ET.fromstring(gm_msg)
-        player_id = msg_root.attrib["playerId"]
+        if attributes is None:
+            attributes = sniff(gm_msg)[1]
+        player_id = attributes["playerId"]
         client = self.clients.get(player_id)
         if client is not None:
-            self.send(client, gm_msg)
+            self.send_frame(client, gm_msg)
         else:
             self.verbose_debug("Not sending anything, because the player hath already disconnected.")
 
@@ -380,25 +449,42 @@ class CommunicationServer:
         :param recipient: socket object of the recipient.
         :param message: message to be passed, any type. will be encoded as string.
         """
-        # We append the MSG_SEPARATOR to the end of each msg
+        self.send_frame(recipient, str(message).encode())
+
+    def send_frame(self, recipient: ClientInfo, frame: bytes):
+        """
+        sends an already encoded message to a recipient.
+        :param recipient: socket object of the recipient.
+        :param frame: encoded message, without the separator.
+        """
+        # the message is only queued (with MSG_SEPARATOR at the end), recipient's writer thread will send it
         try:
             # if recipient is None, then it means he has already disconnected, so lets not send him anything lol
             if recipient is None:
                 return
-            message = str(message + self.MSG_SEPARATOR)
-            recipient.socket.send(message.encode())
-            self.verbose_debug("Message sent to " + recipient.get_tag() + ": \"" + message + "\".")
+            if recipient.outbound.push(frame):
+                if self.verbose:
+                    self.verbose_debug("Message queued for " + recipient.get_tag() + ": \"" + frame.decode() + "\".")
+            else:
+                self.verbose_debug("Dropped a message for " + recipient.get_tag() + ", who is too slow to read it.")
+        except OutboundQueueFull as e:
+            self.verbose_debug("Disconnecting " + recipient.get_tag() + ": " + str(e), True)
+            self.disconnect_client(recipient.id)
         except Exception as e:
             self.verbose_debug("Is this an error I see before me? " + str(e))
 
-    def split_that_message(self, received_data, client):
+    def split_that_message(self, received_data: bytes, client):
+        """
+        feed received bytes to the client's framer and put every complete message in the client's queue.
+        :returns: number of messages added to the queue.
+        """
         count = 0
-        for msg in received_data.split(self.MSG_SEPARATOR):
-            if len(msg) > 0:
-                if "GameStarted" not in msg:
-                    client.queue.put(msg)
-                    count += 1
-                    self.verbose_debug("Added msg to queue: " + msg + " Of Client Id:" + client.id)
+        for msg in client.framer.feed_raw(received_data):
+            if b"GameStarted" not in msg:
+                client.queue.put(msg)
+                count += 1
+                if self.verbose:
+                    self.verbose_debug("Added msg to queue: " + msg.decode() + " Of Client Id:" + client.id)
         return count
 
     def receive(self, client: ClientInfo) -> str:
@@ -407,25 +493,39 @@ class CommunicationServer:
         Then it adds them to the queue and returns the first unread msg and removes it
         :type client: ClientInfo
         """
+        message = self.receive_frame(client)
+        if message is not None:
+            return message.decode()
+
+    def receive_frame(self, client: ClientInfo) -> bytes:
+        """
+        same as receive, but returns the message as it was received (bytes), without decoding it.
+        """
 
         # check if the client hadn't disconnected before we can read a message:
         if client.id not in self.clients.keys() or client is None or client.socket is None:
             raise ConnectionResetError
         try:
-            if client.queue.empty():
-                received_data = client.socket.recv(CommunicationServer.DEFAULT_BUFFER_SIZE).decode()
+            # a single recv may contain only a part of a message, so keep reading until a whole one arrives:
+            while client.queue.empty():
+                received_data = client.socket.recv(CommunicationServer.DEFAULT_BUFFER_SIZE)
                 if len(received_data) < 1 or received_data is None:
                     raise ConnectionResetError
 
-                self.verbose_debug("Message received from " + client.get_tag() + ": \"" + received_data + "\".")
+                self.verbose_debug("Received " + str(len(received_data)) + " bytes from " + client.get_tag() + ".")
                 self.split_that_message(received_data, client)
 
             message = client.queue.get()
-            self.verbose_debug("Processing from " + client.get_tag() + ": \"" + message + "\".")
             if message is None:
                 raise ConnectionError
+            if self.verbose:
+                self.verbose_debug("Processing from " + client.get_tag() + ": \"" + message.decode() + "\".")
             return message
 
+        except FrameTooLargeError as e:
+            self.verbose_debug("Disconnecting " + client.get_tag() + ": " + str(e), True)
+            self.disconnect_client(client.id)
+
         except ConnectionResetError as e:
             if self.clients[client.id] is not None:
                 self.verbose_debug(client.get_tag() + " disconnected. Closing connection.", True)
@@ -439,7 +539,7 @@ class CommunicationServer:
                 if not client.queue.empty():
                     return client.queue.get()
                 else:
-                    return self.receive(client)
+                    return self.receive_frame(client)
 
     def disconnect_client(self, client_id: int):
 
@@ -447,30 +547,41 @@ class CommunicationServer:
             return
         client = self.clients[client_id]
 
-        # if the client was a GM, remove his game from server:
+        # if the client was a GM, remove his games from server:
         if client.tag == ClientTypeTag.GAME_MASTER:
-            for game_info in self.games.values():
-                if game_info.name == client.game_name and game_info.game_master_id == client_id:
-                    # find all players who were connected to this game and send them a GameMasterdisconneted message
-                    for dude in self.clients.values():
-                        if dude is not None and dude.tag == ClientTypeTag.PLAYER and dude.game_master_id == client.id:
-                            self.send(dude, messages.GameMasterDisconnected(game_info.id))
-
-                    del self.games[game_info.id]
-                    self.verbose_debug("Closed " + client.get_tag() + "'s game (name was: " + game_info.name + ").")
-                    break
-            else:
+            hosted_games = [game_info for game_info in self.games.values() if game_info.game_master_id == client_id]
+            for game_info in hosted_games:
+                # find all players who were connected to this game and send them a GameMasterdisconneted message
+                for dude in self.clients.values():
+                    if dude is not None and dude.tag == ClientTypeTag.PLAYER and dude.game_master_id == client.id \
+                            and dude.game_id == game_info.id:
+                        self.send(dude, messages.GameMasterDisconnected(game_info.id))
+
+                del self.games[game_info.id]
+                self.verbose_debug("Closed " + client.get_tag() + "'s game (name was: " + game_info.name + ").")
+            if not hosted_games:
                 self.verbose_debug(
                     "Couldn't close " + client.get_tag() + "'s game - it wasn't found on the server.")
 
+        # if the client was a player who joined a game, let its GM know that he's gone:
+        elif client.tag == ClientTypeTag.PLAYER and client.game_master_id != "-1":
+            game_master = self.clients.get(client.game_master_id)
+            if game_master is not None:
+                self.send(game_master, messages.player_disconnected(client.id))
+
         # close the socket
         try:
+            client.outbound.close()
             client.socket.close()
             self.clients[client_id] = None
 
         except socket.error as e:
             self.verbose_debug("Couldn't close socket?! " + str(e), True)
 
+    def stats(self) -> dict:
+        return {"clients": len([client for client in self.clients.values() if client is not None]),
+                "games": len(self.games), "routed_messages": self.routed_messages, "routed_bytes": self.routed_bytes}
+
     def shutdown(self):
         self.running = False
         # self.accepting_thread.join()
@@ -482,10 +593,23 @@ class CommunicationServer:
 if __name__ == '__main__':
     parser = ArgumentParser()
     parser.add_argument('-v', '--verbose', action='store_true', default=False, help='Use verbose debugging mode.')
+    parser.add_argument('-e', '--event-loop', action='store_true', default=False,
+                        help='Handle all clients on a single event loop instead of one thread per client.')
+    parser.add_argument('-b', '--backpressure', default=None, choices=[policy.value for policy in BackpressurePolicy],
+                        help='What to do with a client who reads his messages too slowly.')
+    parser.add_argument('-q', '--max-queue', type=int, default=OutboundQueue.DEFAULT_MAX_MESSAGES,
+                        help='Maximum number of messages waiting to be sent to a single client.')
     args = vars(parser.parse_args())
 
     try:
-        server = CommunicationServer(args["verbose"])
+        if args["event_loop"]:
+            from src.communication.event_server import EventLoopServer
+
+            policy = BackpressurePolicy(args["backpressure"] or BackpressurePolicy.DISCONNECT.value)
+            server = EventLoopServer(args["verbose"], backpressure=policy, max_queued_messages=args["max_queue"])
+        else:
+            policy = BackpressurePolicy(args["backpressure"] or BackpressurePolicy.BLOCK.value)
+            server = CommunicationServer(args["verbose"], backpressure=policy, max_queued_messages=args["max_queue"])
         server.listen()
     except OSError:
         print("Couldn't start server.")
@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+import random
+from argparse import ArgumentParser
+from datetime import datetime
+from statistics import mean, median
+from time import perf_counter
+
+from src.communication import messages, decoding
+from src.communication.decoding import decode
+from src.communication.encoders import located
+from src.communication.gamemaster import GameMaster, parse_game_master_settings
+from src.communication.info import Allegiance, PlayerType, EMPTY_ID
+from src.communication.player import Player
+from src.communication.scheduler import ActionScheduler
+from src.communication.strategy import StrategyFactory, Decision
+
+MAX_GAME_TIME = 3600  # virtual s after which an unfinished game is called a draw
+
+# decision => type of the message sent for it, when the messages aren't encoded (see Player.choose_message):
+DECISION_MESSAGES = {Decision.DISCOVER: decoding.Discover,
+                     Decision.MOVE: decoding.Discover,  # a move without a direction is sent as a Discover
+                     Decision.PICK_UP: decoding.PickUpPiece,
+                     Decision.PLACE: decoding.PlacePiece}
+
+settings_cache = {}  # settings file => its parsed root, every simulated game would parse it twice otherwise
+
+
+def known(id):
+    """
+    :returns: the id, None if it means "nobody/nothing" (such ids are left out of the encoded messages).
+    """
+    return None if id is None or id == EMPTY_ID else id
+
+
+class VirtualClock:
+    """
+    time of a simulated game in s. it doesn't pass on its own, the simulation moves it to the next action.
+    """
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class SimulatedGameMaster(GameMaster):
+    """
+    GameMaster without a server or any waiting: the messages go straight to the SimulatedPlayers and the actions run
+    on a virtual clock, as soon as the previous one is done. the rules are the GameMaster's own handlers.
+    """
+
+    def __init__(self, encode=False, settings_file=None, verbose=False):
+        """
+        :param encode: send the actions and responses as xml messages, as the real clients do. otherwise the
+        players get the fields and pieces themselves (joining the game always goes through the messages).
+        """
+        super(SimulatedGameMaster, self).__init__(verbose, settings_file)
+        self.encode = encode
+        self.clock = VirtualClock()
+        self.scheduler = ActionScheduler(clock=self.clock, on_error=self.handle_action_error)
+        self.info.id = 1  # no server to register the game with
+        self.players = {}  # player id => SimulatedPlayer
+        self.errors = []  # exceptions raised by the handlers
+        self.winner = None
+
+    def create_socket(self):
+        return None
+
+    def read_settings(self):
+        if self.settings_file not in settings_cache:
+            settings_cache[self.settings_file] = parse_game_master_settings(self.settings_file)
+        return settings_cache[self.settings_file]
+
+    def send(self, message):
+        message = decode(message)
+        player = self.players.get(message.player_id)
+        if player is not None:
+            player.deliver(message)
+
+    def send_data(self, player_id, task_fields: dict = None, goal_fields: dict = None, pieces: dict = None,
+                  player_location: tuple = None):
+        if self.encode:
+            super(SimulatedGameMaster, self).send_data(player_id, task_fields, goal_fields, pieces, player_location)
+            return
+        player = self.players.get(player_id)
+        if player is not None:
+            player.receive_data(self.info.finished, task_fields, goal_fields, pieces, player_location)
+
+    def announce_winner(self, team):
+        self.winner = team
+        self.verbose_debug(team.upper() + " TEAM HAS WON THE GAME!")
+
+    def handle_action_error(self, action, error):
+        self.errors.append(error)
+        super(SimulatedGameMaster, self).handle_action_error(action, error)
+
+    def run(self, max_time: float = MAX_GAME_TIME):
+        """
+        run the actions until the game is over, or until max_time (virtual s) has passed.
+        """
+        while self.game_on:
+            due = self.scheduler.next_due()
+            if due is None or due > max_time:
+                break
+            self.clock.now = due
+            self.scheduler.run_due(due)
+
+    def shutdown(self):
+        self.game_on = False
+
+
+class SimulatedPlayer(Player):
+    """
+    Player without a socket: sends his actions to the SimulatedGameMaster's dispatch, decides on the next one as
+    soon as the response is delivered to him.
+    """
+
+    def __init__(self, game_master: SimulatedGameMaster, index=0, strategy_factory=StrategyFactory, verbose=False):
+        """
+        :param strategy_factory: function(team, location, game_info) returning the strategy to play with
+        """
+        super(SimulatedPlayer, self).__init__(index, verbose, game_master.game_name)
+        self.game_master = game_master
+        self.encode = game_master.encode
+        self.strategy_factory = strategy_factory
+        self.waiting = False  # for the response to the last action
+        self.actions = 0
+        self.error = None  # exception which made the player quit
+
+    def create_socket(self):
+        return None
+
+    def join(self, player_id, team, role):
+        # the server would give us the id
+        self.id = player_id
+        self.game_master.players[player_id] = self
+        self.game_master.handle_join(messages.JoinGame(self.game_name, team, role, player_id))
+
+    def deliver(self, message: decoding.DecodedMessage):
+        if isinstance(message, decoding.Data):
+            self.handle_data(message)
+            self.responded()
+        elif isinstance(message, decoding.Game):
+            self.handle_game(message)
+            self.start()
+        elif isinstance(message, decoding.KnowledgeExchangeRequest):
+            self.game_master.dispatch(self.answer_exchange_request(message))
+        elif isinstance(message, decoding.RejectKnowledgeExchange):
+            self.handle_exchange_rejection(message)
+            self.responded()
+        else:
+            self.handle_confirmation(message)
+
+    def receive_data(self, game_finished: bool, task_fields, goal_fields, pieces, player_location):
+        """
+        what handle_data does with a Data message, with the fields and pieces the GM would have encoded.
+        """
+        if game_finished:
+            self.game_on = False
+
+        timestamp = datetime.now().isoformat()
+        for (x, y), field in located(task_fields or ()):
+            self.update_task_field(x, y, timestamp, field.distance_to_piece, known(field.player_id),
+                                   known(field.piece_id))
+        for (x, y), field in located(goal_fields or ()):
+            self.update_goal_field(x, y, timestamp, known(field.player_id), field.allegiance, field.type)
+        for piece in (pieces.values() if hasattr(pieces, "values") else pieces or ()):
+            self.update_piece(piece.id, timestamp, piece.type, known(piece.player_id))
+
+        if player_location is not None:
+            self.location = player_location
+        self.responded()
+
+    def start(self):
+        self.game_on = True
+        self.strategy = self.strategy_factory(self.team, self.location, self.game_info)
+        self.strategy.player_id = self.id
+        self.act()
+
+    def act(self):
+        try:
+            message = self.choose_message(self.strategy.get_next_move(self.location))
+            if message is None:
+                raise ValueError("No message for the decision " + str(self.strategy.last_move.choice) + ".")
+        except Exception as e:
+            self.quit(e)
+            return
+        self.waiting = True
+        self.actions += 1
+        self.game_master.dispatch(message)
+
+    def responded(self):
+        if not self.waiting:
+            # the GM sometimes sends two responses to a single action, the second one only updates our info
+            return
+        self.waiting = False
+        try:
+            self.update_after_response()
+        except Exception as e:
+            self.quit(e)
+            return
+        if self.game_on:
+            self.act()
+
+    def choose_message(self, decision: Decision):
+        if self.encode:
+            return super(SimulatedPlayer, self).choose_message(decision)
+
+        attributes = {"gameId": self.game_info.id, "playerGuid": self.Guid}
+        if decision.choice == Decision.MOVE and decision.additional_info is not None:
+            attributes["direction"] = decision.additional_info
+            return decoding.Move.from_attributes(attributes)
+        if decision.choice == Decision.KNOWLEDGE_EXCHANGE:
+            attributes["withPlayerId"] = decision.additional_info
+            return decoding.AuthorizeKnowledgeExchange.from_attributes(attributes)
+        message_class = DECISION_MESSAGES.get(decision.choice)
+        return message_class.from_attributes(attributes) if message_class is not None else None
+
+    def answer_exchange_request(self, request: decoding.KnowledgeExchangeRequest):
+        if self.encode:
+            return super(SimulatedPlayer, self).answer_exchange_request(request)
+
+        accepted, permanent = self.exchange_answer(request.sender_player_id)
+        attributes = {"playerId": request.sender_player_id, "senderPlayerId": self.id}
+        if accepted:
+            return decoding.AcceptExchangeRequest.from_attributes(attributes)
+        attributes["permanent"] = str(permanent).lower()
+        return decoding.RejectKnowledgeExchange.from_attributes(attributes)
+
+    def quit(self, error):
+        """
+        the strategy failed: the real player would crash, and the server would tell the GM he has disconnected.
+        """
+        self.verbose_debug("Is this an error I see before me? " + repr(error))
+        self.error = error
+        self.game_on = False
+        self.waiting = False
+        if self.encode:
+            self.game_master.dispatch(messages.player_disconnected(self.id))
+        else:
+            self.game_master.dispatch(decoding.PlayerDisconnected.from_attributes({"playerId": self.id}))
+
+    def shutdown(self):
+        self.game_on = False
+
+
+class GameResult:
+    def __init__(self, seed=None, winner=None, duration=0.0, actions=0, goals=None, errors=0):
+        """
+        :param winner: team which won, None if the game didn't finish in time
+        :param duration: virtual time the game took, in s
+        :param actions: number of actions sent by all the players
+        :param goals: team => number of goals it achieved
+        :param errors: failed GM actions plus players who quit because of an error
+        """
+        self.seed = seed
+        self.winner = winner
+        self.duration = duration
+        self.actions = actions
+        self.goals = goals if goals is not None else {}
+        self.errors = errors
+
+
+def play_game(seed=None, settings_file=None, encode=False, strategies: dict = None, max_time=MAX_GAME_TIME,
+              verbose=False) -> GameResult:
+    """
+    play a whole game in-process, without any sockets or sleeps.
+    :param seed: seed of the random module, the whole game (board, pieces, decisions) follows from it
+    :param settings_file: path of the GameMasterSettings.xml, the one in the working directory by default
+    :param strategies: team => strategy factory (see SimulatedPlayer), StrategyFactory for teams not given
+    :param max_time: virtual s after which the game is stopped
+    """
+    if seed is not None:
+        random.seed(seed)
+    if strategies is None:
+        strategies = {}
+
+    game_master = SimulatedGameMaster(encode, settings_file, verbose)
+    players = []
+    for i in range(game_master.team_limit * 2):
+        team = Allegiance.RED.value if i % 2 == 0 else Allegiance.BLUE.value
+        player = SimulatedPlayer(game_master, i, strategies.get(team, StrategyFactory), verbose)
+        player.join(str(i + 1), team, PlayerType.LEADER.value if i < 2 else PlayerType.MEMBER.value)
+        players.append(player)
+
+    game_master.set_up_game()
+    game_master.game_on = True
+    game_master.start_game()
+    game_master.run(max_time)
+
+    return GameResult(seed, game_master.winner, game_master.clock.now, sum(player.actions for player in players),
+                      dict(game_master.achieved_goal_counters),
+                      len(game_master.errors) + sum(player.error is not None for player in players))
+
+
+def summarize(results: list) -> dict:
+    """
+    :returns: win rates of the teams, rate of draws, game lengths (virtual s and actions), errors per game.
+    """
+    finished = [result for result in results if result.winner is not None]
+    summary = {"games": len(results)}
+    for team in (Allegiance.RED.value, Allegiance.BLUE.value):
+        summary[team + "_win_rate"] = sum(result.winner == team for result in results) / len(results)
+    summary["draw_rate"] = 1 - len(finished) / len(results)
+    summary["mean_length"] = mean(result.duration for result in finished) if finished else None
+    summary["median_length"] = median(result.duration for result in finished) if finished else None
+    summary["mean_actions"] = mean(result.actions for result in results)
+    summary["errors_per_game"] = sum(result.errors for result in results) / len(results)
+    return summary
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-g', '--games', type=int, default=1000, help='Number of games to play.')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='Seed of the first game, the next ones get seed+1...')
+    parser.add_argument('--settings', default=None, help='GameMasterSettings.xml to use (the one here by default).')
+    parser.add_argument('-e', '--encode', action='store_true', default=False,
+                        help='Encode and decode the actions and responses, as the real clients do.')
+    parser.add_argument('-t', '--max-time', type=float, default=MAX_GAME_TIME,
+                        help='Virtual seconds after which a game is called a draw.')
+    parser.add_argument('-v', '--verbose', action='store_true', default=False, help='Use verbose debugging mode.')
+    parser.add_argument('--validation', default="off", choices=[mode.value for mode in messages.ValidationMode],
+                        help='Schema validation of the encoded messages (off by default).')
+    parser.add_argument('--sample-rate', default=100, type=int,
+                        help='Validate one in that many messages of each type (with --validation sampled).')
+    args = vars(parser.parse_args())
+    messages.set_validation_policy(args["validation"], args["sample_rate"])
+
+    started = perf_counter()
+    results = [play_game(args["seed"] + i, args["settings"], args["encode"], max_time=args["max_time"],
+                         verbose=args["verbose"]) for i in range(args["games"])]
+    elapsed = perf_counter() - started
+
+    for name, value in summarize(results).items():
+        print("%-16s %s" % (name, "%.3f" % value if isinstance(value, float) else value))
+    print("%-16s %.0f" % ("games_per_minute", len(results) / elapsed * 60))
@@ -0,0 +1,111 @@
+import re
+
+# reads the start tag of the root element: optional xml declaration, tag name (maybe prefixed) and the attributes.
+START_TAG = re.compile(rb'\s*(?:<\?.*?\?>\s*)?<(?:[\w.-]+:)?([\w.-]+)((?:\s+[\w:.-]+\s*=\s*(?:"[^"]*"|\'[^\']*\'))*)\s*/?>',
+                       re.DOTALL)
+ATTRIBUTE = re.compile(rb'([\w:.-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+# the same patterns for messages which were already decoded to str:
+START_TAG_STR = re.compile(START_TAG.pattern.decode(), re.DOTALL)
+ATTRIBUTE_STR = re.compile(ATTRIBUTE.pattern.decode())
+# reads only the tag name of the root element:
+TAG_NAME = re.compile(rb'\s*(?:<\?.*?\?>\s*)?<(?:[\w.-]+:)?([\w.-]+)', re.DOTALL)
+TAG_NAME_STR = re.compile(TAG_NAME.pattern.decode(), re.DOTALL)
+ATTRIBUTE_VALUE = r'\s%s\s*=\s*(?:"([^"]*)"|\'([^\']*)\')'  # value of a single, known attribute
+ATTRIBUTE_PATTERNS = {}  # (attribute name, str or bytes) => compiled ATTRIBUTE_VALUE
+# the predefined entities and the character references (decimal and hexadecimal) of an attribute value:
+REFERENCE = re.compile(r'&(?:#(\d+)|#x([0-9a-fA-F]+)|(amp|lt|gt|quot|apos));')
+ENTITIES = {"amp": "&", "lt": "<", "gt": ">", "quot": '"', "apos": "'"}
+
+
+class UnreadableHeader(ValueError):
+    # the frame doesn't start with an xml element
+    pass
+
+
+def unescape(value: str) -> str:
+    """
+    replace the references in an attribute value the way an xml parser does, in a single pass (so "&amp;#65;" is
+    "&#65;", not "A").
+    """
+    return REFERENCE.sub(replace_reference, value)
+
+
+def replace_reference(match) -> str:
+    decimal, hexadecimal, entity = match.groups()
+    if entity is not None:
+        return ENTITIES[entity]
+    return chr(int(decimal) if decimal is not None else int(hexadecimal, 16))
+
+
+def sniff(frame) -> (str, dict):
+    """
+    read the name of the root element and its attributes without parsing the whole message.
+    the server uses it to route messages: it only needs to know the message type and its playerId/gameId.
+    :param frame: message as bytes or str.
+    :returns: a tuple: (tag name without namespace, dict of root attributes: name => unescaped value)
+    """
+    if isinstance(frame, str):
+        start_tag, attribute, xmlns = START_TAG_STR, ATTRIBUTE_STR, "xmlns"
+    else:
+        start_tag, attribute, xmlns = START_TAG, ATTRIBUTE, b"xmlns"
+
+    match = start_tag.match(frame)
+    if match is None:
+        raise UnreadableHeader("Couldn't read the root element of: " + str(frame[:64]))
+
+    attributes = {}
+    for name, double_quoted, single_quoted in attribute.findall(match.group(2)):
+        if name.startswith(xmlns):
+            # namespace declarations are not attributes
+            continue
+        value = double_quoted if double_quoted or not single_quoted else single_quoted
+        if not isinstance(value, str):
+            name, value = name.decode(), value.decode()
+        if "&" in value:
+            value = unescape(value)
+        attributes[name] = value
+
+    tag = match.group(1)
+    return (tag if isinstance(tag, str) else tag.decode()), attributes
+
+
+def sniff_tag(frame) -> str:
+    """
+    read only the name of the root element (without namespace), cheaper than sniff.
+    :param frame: message as str or bytes.
+    """
+    if isinstance(frame, str) and frame[:1] == "<":
+        # the usual case: no declaration, no prefix, the name is followed by a space
+        end = frame.find(" ", 1, 128)
+        if end > 0 and frame[1:end].isidentifier():
+            return frame[1:end]
+
+    match = TAG_NAME_STR.match(frame) if isinstance(frame, str) else TAG_NAME.match(frame)
+    if match is None:
+        raise UnreadableHeader("Couldn't read the root element of: " + str(frame[:64]))
+    tag = match.group(1)
+    return tag if isinstance(tag, str) else tag.decode()
+
+
+def sniff_attribute(frame, name: str):
+    """
+    read the value of a single attribute, without reading the others. only for messages whose root element
+    has no children (e.g. Move), or the attribute could be found in one of them.
+    :param frame: message as str or bytes.
+    :returns: unescaped value (str), or None if there is no such attribute.
+    """
+    is_str = isinstance(frame, str)
+    pattern = ATTRIBUTE_PATTERNS.get((name, is_str))
+    if pattern is None:
+        pattern = re.compile(ATTRIBUTE_VALUE % re.escape(name))
+        pattern = ATTRIBUTE_PATTERNS[name, is_str] = pattern if is_str else re.compile(pattern.pattern.encode())
+
+    match = pattern.search(frame)
+    if match is None:
+        return None
+    value = match.group(1) if match.group(1) is not None else match.group(2)
+    if not is_str:
+        value = value.decode()
+    if "&" in value:
+        value = unescape(value)
+    return value
@@ -25,6 +25,8 @@ def StrategyFactory(team: str, location: tuple = None, game_info: GameInfo = Non
 
 
 class BaseStrategy:
+    EXCHANGE_INTERVAL = 20  # decisions between two knowledge exchanges with a teammate
+
     def __init__(self, team: str, player_type: str, location: tuple = None, game_info: GameInfo = None):
 
         self.team = team
@@ -34,12 +36,16 @@ class BaseStrategy:
         self.last_move = Decision(Decision.NULLDECISION)
         self.have_piece = "-1"  # by default, the player doesn't have a piece.
         # if self.have_piece is different from -1, then it is the id of the currently held piece
+        self.player_id = None  # our id, set by the player. we don't exchange knowledge without it
+        self.decisions_since_exchange = 0
+        self.refused_exchanges = set()  # ids of the players who will never exchange knowledge with us
 
     def get_next_move(self, new_location: tuple):
         # THE MAIN STRATEGY METHOD
         if self.game_info.is_out_of_bounds(new_location):
             raise LocationOutOfBoundsError("Strategy cannot accept this new location", new_location)
         self.current_location = new_location
+        self.decisions_since_exchange += 1
 
         # <DUCT TAPE>
         if self.last_move.choice == Decision.PICK_UP and self.have_piece == "-1":
@@ -62,7 +68,9 @@ class BaseStrategy:
 
         else:
             # we're in Task Field area. do we have enough information to make a clever move?
-            if self.have_sufficient_information():
+            if self.decisions_since_exchange >= self.EXCHANGE_INTERVAL and self.exchange_partners():
+                choice = self.exchange_knowledge()
+            elif self.have_sufficient_information():
                 choice = self.make_educated_move()
             else:
                 choice = self.gather_information()
@@ -120,6 +128,28 @@ class BaseStrategy:
         # base implementation: simply Discover
         return Decision(Decision.DISCOVER)
 
+    def exchange_partners(self) -> list:
+        """
+        :returns: ids of the players we could exchange knowledge with: our teammates who haven't refused for good.
+        """
+        if self.player_id is None:
+            return []
+        return [player_id for player_id in self.game_info.teams[self.team]
+                if player_id != self.player_id and player_id not in self.refused_exchanges]
+
+    def exchange_knowledge(self):
+        # ask a random teammate for what he knows better than we do.
+        self.decisions_since_exchange = 0
+        return Decision(Decision.KNOWLEDGE_EXCHANGE, random.choice(self.exchange_partners()))
+
+    def accept_exchange(self, player_id) -> bool:
+        # share our knowledge with the player who asked for it? base implementation: only with our teammates.
+        return player_id in self.game_info.teams[self.team]
+
+    def exchange_refused(self, player_id, permanent: bool):
+        if permanent:
+            self.refused_exchanges.add(player_id)
+
     def make_educated_move(self):
         # we assume we're in TaskField Area, without a piece and we have sufficient knowledge to make a clever move.
 
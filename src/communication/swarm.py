@@ -0,0 +1,438 @@
+#!/usr/bin/env python
+import errno
+import math
+import selectors
+import socket
+from argparse import ArgumentParser
+from time import monotonic
+
+from src.communication import messages, decoding
+from src.communication.client import Client
+from src.communication.decoding import decode
+from src.communication.info import GameInfo, PlayerType, Allegiance
+from src.communication.player import Player
+from src.communication.scheduler import ActionScheduler
+from src.communication.sniffer import sniff_tag
+from src.communication.strategy import StrategyFactory
+from src.communication.unexpected import CustomBaseExceptionWithMessage
+
+
+class LatencyHistogram:
+    """
+    latencies in logarithmic buckets (BUCKETS_PER_DECADE for every power of 10), so any number of samples takes the
+    same memory and the histograms of many players (or runs) can be added up. percentiles are read as the upper bound
+    of their bucket, which is within 12% of the real value.
+    """
+    MIN_LATENCY = 1e-6  # s, upper bound of the first bucket
+    BUCKETS_PER_DECADE = 20
+
+    def __init__(self):
+        self.buckets = {}  # bucket index => number of samples
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @staticmethod
+    def upper_bound(index: int) -> float:
+        return LatencyHistogram.MIN_LATENCY * 10 ** (index / LatencyHistogram.BUCKETS_PER_DECADE)
+
+    def record(self, latency: float):
+        index = 0 if latency <= LatencyHistogram.MIN_LATENCY else \
+            math.ceil(math.log10(latency / LatencyHistogram.MIN_LATENCY) * LatencyHistogram.BUCKETS_PER_DECADE)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+
+    def merge(self, other):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, fraction: float) -> float:
+        """
+        :param fraction: e.g. 0.99 for the 99th percentile
+        :returns: latency in s which that fraction of the samples doesn't exceed, 0 without any samples.
+        """
+        wanted = max(math.ceil(fraction * self.count), 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= wanted:
+                return min(LatencyHistogram.upper_bound(index), self.max)
+        return 0.0
+
+    def to_dict(self) -> dict:
+        """
+        :returns: summary in ms, with the non-empty buckets (upper bound in ms => number of samples).
+        """
+        return {"count": self.count,
+                "mean_ms": self.total / self.count * 1e3 if self.count > 0 else 0.0,
+                "max_ms": self.max * 1e3,
+                "p50_ms": self.percentile(0.5) * 1e3,
+                "p99_ms": self.percentile(0.99) * 1e3,
+                "p999_ms": self.percentile(0.999) * 1e3,
+                "buckets": {"%.6g" % (LatencyHistogram.upper_bound(index) * 1e3): self.buckets[index]
+                            for index in sorted(self.buckets)}}
+
+
+class SwarmPlayer(Player):
+    """
+    Player driven by the swarm's event loop instead of blocking on his socket: every received message moves him on
+    (list of games -> join -> Game -> an action per Data response), his messages are written out whenever the socket
+    is writable.
+    """
+    RETRY_DELAY = 1  # time in s after which a player who couldn't join a game asks for the games again
+
+    def __init__(self, swarm, index=0, strategy_factory=StrategyFactory, verbose=False, game_name=None):
+        """
+        :param swarm: PlayerSwarm running the player
+        :param strategy_factory: function(team, location, game_info) returning the strategy to play with
+        :param game_name: game to join, None to spread the players over all the open games
+        """
+        super(SwarmPlayer, self).__init__(index, verbose, game_name)
+        self.swarm = swarm
+        self.strategy_factory = strategy_factory
+        self.connecting = False
+        self.events = 0  # selector events the socket is registered for
+        self.waiting = False  # for the response to the last action
+        self.sent_at = None  # time the last action was sent
+        self.sent_type = None  # and its type
+
+        # statistics:
+        self.actions = 0
+        self.games_played = 0
+        self.rejections = 0
+        self.error = None  # exception which made the player quit
+
+    def connect(self, hostname=Client.DEFAULT_HOSTNAME, port=Client.DEFAULT_PORT):
+        """
+        start connecting without waiting, the player carries on once his socket becomes writable.
+        """
+        self.socket.setblocking(False)
+        error = self.socket.connect_ex((hostname, port))
+        if error not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+            self.quit(ConnectionRefusedError(error, "Couldn't connect to " + hostname + " at port " + str(port)))
+            return False
+        self.connecting = True
+        self.swarm.watch(self, writable=True)
+        return True
+
+    def handle_writable(self):
+        if self.connecting:
+            error = self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            if error != 0:
+                self.quit(ConnectionRefusedError(error, "Couldn't connect to the server."))
+                return
+            self.connecting = False
+            self.connected = True
+            self.verbose_debug("Succesfully connected to server.")
+            self.request_games()
+
+        try:
+            self.outbound.write_to(self.socket)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            self.quit(e)
+            return
+        self.swarm.watch(self, writable=not self.outbound.is_empty())
+
+    def handle_readable(self):
+        try:
+            received_data = self.socket.recv(Client.MESSAGE_BUFFER_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            received_data = b""
+
+        if len(received_data) < 1:
+            self.quit(ConnectionAbortedError("Server has shut down."))
+            return
+        try:
+            for message in self.framer.feed(received_data):
+                self.verbose_debug("Received from server: \"" + message + "\".")
+                self.handle_message(decode(message))
+                if not self.connected:
+                    return
+        except (Exception, CustomBaseExceptionWithMessage) as e:
+            # a message we can't handle would crash a real player, it mustn't bring the other players down
+            self.quit(e)
+
+    def send(self, message: str):
+        self.outbound.push(message.encode())
+        self.last_message = message
+        self.verbose_debug("Sent to server: \"" + message + "\".")
+        if not self.connecting:
+            # most of the time it goes out right away, the loop only has to wait for the socket if it didn't
+            self.handle_writable()
+
+    def handle_message(self, message: decoding.DecodedMessage):
+        if isinstance(message, decoding.Data):
+            self.handle_data(message)
+            self.responded()
+        elif isinstance(message, decoding.Game):
+            self.handle_game(message)
+            self.start()
+        elif isinstance(message, decoding.KnowledgeExchangeRequest):
+            self.send(self.answer_exchange_request(message))
+        elif isinstance(message, decoding.RejectKnowledgeExchange):
+            self.handle_exchange_rejection(message)
+            self.responded()
+        elif isinstance(message, decoding.RegisteredGames):
+            self.choose_game(self.parse_games(message))
+        elif isinstance(message, (decoding.ConfirmJoiningGame, decoding.RejectJoiningGame)):
+            self.handle_confirmation(message)
+        elif isinstance(message, decoding.GameMasterDisconnected):
+            self.verbose_debug("GameMaster has disconnected! Trying to join game again...")
+            self.game_on = False
+            self.waiting = False
+            self.swarm.schedule(SwarmPlayer.RETRY_DELAY, self.request_games)
+        else:
+            self.handle_unexpected(message)
+
+    def request_games(self):
+        if self.connected:
+            self.game_info = GameInfo()
+            self.location = tuple()
+            self.strategy = None
+            self.send(messages.GetGames())
+
+    def choose_game(self, open_games: list):
+        """
+        join the game we were told to join, or one of the open games (the players are spread over all of them).
+        """
+        names = [game_name for game_name, blue_team_players, red_team_players in open_games]
+        if self.swarm.game_name is not None:
+            names = [name for name in names if name == self.swarm.game_name]
+        if len(names) == 0:
+            self.swarm.schedule(SwarmPlayer.RETRY_DELAY, self.request_games)
+            return
+
+        self.game_name = names[self.index % len(names)]
+        team = Allegiance.RED.value if self.index % 2 == 0 else Allegiance.BLUE.value
+        self.send(messages.JoinGame(self.game_name, team, PlayerType.MEMBER.value))
+
+    def handle_reject_joining(self, rejection: decoding.RejectJoiningGame):
+        # the game filled up before we got there, try another one
+        self.rejections += 1
+        self.swarm.schedule(SwarmPlayer.RETRY_DELAY, self.request_games)
+        return False
+
+    def start(self):
+        self.game_on = True
+        self.strategy = self.strategy_factory(self.team, self.location, self.game_info)
+        self.strategy.player_id = self.id
+        self.act()
+
+    def act(self):
+        try:
+            message = self.choose_message(self.strategy.get_next_move(self.location))
+            if message is None:
+                raise ValueError("No message for the decision " + str(self.strategy.last_move.choice) + ".")
+        except (Exception, CustomBaseExceptionWithMessage) as e:
+            self.quit(e)
+            return
+        self.waiting = True
+        self.actions += 1
+        self.sent_at = monotonic()
+        self.sent_type = sniff_tag(message)
+        self.send(message)
+
+    def responded(self):
+        if not self.waiting:
+            # the GM sometimes sends two responses to a single action, the second one only updates our info
+            return
+        self.waiting = False
+        self.swarm.record_response(self.sent_type, monotonic() - self.sent_at)
+        try:
+            self.update_after_response()
+        except (Exception, CustomBaseExceptionWithMessage) as e:
+            self.quit(e)
+            return
+
+        if self.game_on:
+            self.act()
+            return
+        self.games_played += 1
+        if self.swarm.rejoin:
+            self.request_games()
+        else:
+            self.shutdown()
+
+    def quit(self, error):
+        """
+        the player is gone for good (the server tells the GM he has disconnected).
+        """
+        self.verbose_debug("Is this an error I see before me? " + repr(error))
+        self.error = error
+        self.shutdown()
+
+    def shutdown(self):
+        self.game_on = False
+        self.waiting = False
+        self.connecting = False
+        self.connected = False
+        self.swarm.unwatch(self)
+        self.socket.close()
+
+
+class PlayerSwarm:
+    """
+    Many players in a single thread, for load-testing the server: a selectors event loop drives all of their sockets,
+    their retries run on an ActionScheduler polled by the same loop. The players connect one after another over the
+    ramp-up time, every one of them keeps a single action in flight.
+    """
+    SELECT_TIMEOUT = 0.5  # longest time in s the loop waits for the sockets
+    REPORT_INTERVAL = 5  # time in s between the reports printed while running
+
+    def __init__(self, player_count, hostname=Client.DEFAULT_HOSTNAME, port=Client.DEFAULT_PORT, ramp=0.0,
+                 game_name=None, rejoin=True, strategy_factory=StrategyFactory, verbose=False, report=False):
+        """
+        :param ramp: time in s over which the players are started, evenly spaced
+        :param game_name: game every player joins, None to spread them over all the open games
+        :param rejoin: True if the players join another game once theirs is finished, False if they disconnect
+        :param report: print the stats every REPORT_INTERVAL s
+        """
+        self.hostname = hostname
+        self.port = port
+        self.ramp = ramp
+        self.game_name = game_name
+        self.rejoin = rejoin
+        self.verbose = verbose
+        self.report = report
+        self.selector = selectors.DefaultSelector()
+        self.scheduler = ActionScheduler()  # never started, the loop runs the due actions itself
+        self.players = [SwarmPlayer(self, i, strategy_factory, verbose, game_name) for i in range(player_count)]
+        self.running = False
+        self.started = None
+        self.stopped = None
+
+        # statistics, time between sending an action and getting its response:
+        self.latency = LatencyHistogram()
+        self.latencies = {}  # action type => LatencyHistogram
+
+    def watch(self, player: SwarmPlayer, writable: bool):
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if writable else 0)
+        if events == player.events:
+            return
+        if player.events == 0:
+            self.selector.register(player.socket, events, player)
+        else:
+            self.selector.modify(player.socket, events, player)
+        player.events = events
+
+    def unwatch(self, player: SwarmPlayer):
+        if player.events != 0:
+            self.selector.unregister(player.socket)
+            player.events = 0
+
+    def schedule(self, delay: float, action, *args):
+        self.scheduler.schedule(delay, action, *args)
+
+    def record_response(self, action_type: str, latency: float):
+        self.latency.record(latency)
+        histogram = self.latencies.get(action_type)
+        if histogram is None:
+            histogram = self.latencies[action_type] = LatencyHistogram()
+        histogram.record(latency)
+
+    def launch(self, player: SwarmPlayer):
+        if player.connect(self.hostname, self.port):
+            player.verbose_debug("Trying to connect to server " + self.hostname + " at port " + str(self.port) + ".")
+
+    def run(self, duration: float = None):
+        """
+        run the loop until all the players are gone, duration s pass or stop is called.
+        """
+        self.running = True
+        self.started = monotonic()
+        for i, player in enumerate(self.players):
+            self.schedule(i * self.ramp / len(self.players), self.launch, player)
+        next_report = self.started + PlayerSwarm.REPORT_INTERVAL
+
+        try:
+            while self.running:
+                now = monotonic()
+                if duration is not None and now - self.started >= duration:
+                    break
+                if len(self.scheduler) == 0 and len(self.selector.get_map()) == 0:
+                    # everybody has left
+                    break
+
+                next_due = self.scheduler.next_due()
+                timeout = PlayerSwarm.SELECT_TIMEOUT if next_due is None else \
+                    min(max(next_due - now, 0), PlayerSwarm.SELECT_TIMEOUT)
+                for key, mask in self.selector.select(timeout):
+                    player = key.data
+                    if mask & selectors.EVENT_WRITE:
+                        player.handle_writable()
+                    if mask & selectors.EVENT_READ and player.events != 0:
+                        player.handle_readable()
+                self.scheduler.run_due()
+
+                if self.report and monotonic() >= next_report:
+                    next_report += PlayerSwarm.REPORT_INTERVAL
+                    print(self.stats())
+        finally:
+            self.running = False
+            self.stopped = monotonic()
+            for player in self.players:
+                if player.connected or player.connecting:
+                    player.shutdown()
+            self.selector.close()
+
+    def stop(self):
+        self.running = False
+
+    def stats(self) -> dict:
+        elapsed = (self.stopped or monotonic()) - self.started if self.started is not None else 0.0
+        actions = sum(player.actions for player in self.players)
+        return {"elapsed": elapsed,
+                "connected": sum(1 for player in self.players if player.connected),
+                "playing": sum(1 for player in self.players if player.game_on),
+                "actions": actions,
+                "actions_per_second": actions / elapsed if elapsed > 0 else 0.0,
+                "mean_latency_ms": self.latency.total / self.latency.count * 1e3 if self.latency.count > 0 else 0.0,
+                "p99_latency_ms": self.latency.percentile(0.99) * 1e3,
+                "max_latency_ms": self.latency.max * 1e3,
+                "games_played": sum(player.games_played for player in self.players),
+                "rejections": sum(player.rejections for player in self.players),
+                "errors": sum(1 for player in self.players if player.error is not None)}
+
+    def latency_stats(self) -> dict:
+        """
+        :returns: action type => summary of its LatencyHistogram, "all" for all the actions together.
+        """
+        summaries = {action_type: histogram.to_dict() for action_type, histogram in sorted(self.latencies.items())}
+        summaries["all"] = self.latency.to_dict()
+        return summaries
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-c', '--playercount', default=100, type=int, help='Number of players to be deployed.')
+    parser.add_argument('-r', '--ramp', default=10.0, type=float, help='Seconds over which the players are started.')
+    parser.add_argument('-d', '--duration', default=None, type=float, help='Seconds to run for (until all are gone).')
+    parser.add_argument('-n', '--gamename', default=None, help="Game to join (all the open games by default).")
+    parser.add_argument('--once', action='store_true', default=False,
+                        help='Disconnect after a single game instead of joining another one.')
+    parser.add_argument('--host', default=Client.DEFAULT_HOSTNAME, help='Hostname of the server.')
+    parser.add_argument('--port', default=Client.DEFAULT_PORT, type=int, help='Port of the server.')
+    parser.add_argument('-v', '--verbose', action='store_true', default=False, help='Use verbose debugging mode.')
+    parser.add_argument('--validation', default="always", choices=[mode.value for mode in messages.ValidationMode],
+                        help='Schema validation of the sent messages.')
+    parser.add_argument('--sample-rate', default=100, type=int,
+                        help='Validate one in that many messages of each type (with --validation sampled).')
+    args = vars(parser.parse_args())
+    messages.set_validation_policy(args["validation"], args["sample_rate"])
+
+    swarm = PlayerSwarm(args["playercount"], args["host"], args["port"], args["ramp"], args["gamename"],
+                        not args["once"], verbose=args["verbose"], report=True)
+    try:
+        swarm.run(args["duration"])
+    except KeyboardInterrupt:
+        pass
+    print(swarm.stats())
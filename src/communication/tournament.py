@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+import importlib
+import json
+import os
+import signal
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+
+from src.communication import messages
+from src.communication.info import Allegiance, PlayerType
+from src.communication.simulation import play_game, summarize, GameResult, MAX_GAME_TIME
+from src.communication.strategy import StrategyFactory, BaseStrategy
+
+# name => strategy factory, see resolve_strategy for the strategies which aren't here:
+STRATEGIES = {"basic": StrategyFactory}
+BATCH_SIZE = 20  # games played by a worker in one go, every batch is written to the results as soon as it's done
+RESULTS_FILE = "tournament.jsonl"
+
+
+def resolve_strategy(name: str):
+    """
+    :param name: a name from STRATEGIES, or "module:attribute" - either a factory function(team, location,
+    game_info) or a BaseStrategy subclass, e.g. "src.communication.strategy:BasicRedStrategy"
+    :returns: strategy factory for the simulation
+    """
+    if name in STRATEGIES:
+        return STRATEGIES[name]
+    module_name, _, attribute = name.partition(":")
+    strategy = getattr(importlib.import_module(module_name), attribute)
+    if isinstance(strategy, type) and issubclass(strategy, BaseStrategy):
+        return lambda team, location, game_info: strategy(team, PlayerType.MEMBER.value, location, game_info)
+    return strategy
+
+
+def game_key(record: dict) -> tuple:
+    return record["settings"], record["red"], record["blue"], record["seed"]
+
+
+def to_result(record: dict) -> GameResult:
+    return GameResult(record["seed"], record["winner"], record["duration"], record["actions"], record["goals"],
+                      record["errors"])
+
+
+def start_worker(validation, sample_rate):
+    # ctrl+c reaches the whole process group: the workers finish their batch, the tournament decides what's next
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    messages.set_validation_policy(validation, sample_rate)
+
+
+def play_batch(settings, red, blue, seeds, encode=False, max_time=MAX_GAME_TIME) -> list:
+    """
+    play the games of one configuration (runs in a worker process).
+    :returns: list of records (dicts) of the games, in the order of seeds
+    """
+    strategies = {Allegiance.RED.value: resolve_strategy(red), Allegiance.BLUE.value: resolve_strategy(blue)}
+    records = []
+    for seed in seeds:
+        result = play_game(seed, settings, encode, strategies, max_time)
+        records.append({"settings": settings, "red": red, "blue": blue, "seed": seed, "winner": result.winner,
+                        "duration": round(result.duration, 3), "actions": result.actions, "goals": result.goals,
+                        "errors": result.errors})
+    return records
+
+
+def read_results(path: str) -> list:
+    """
+    :returns: records of the games already in the results file. a line cut short (the tournament was killed while
+    writing it) is skipped, its game will be played again.
+    """
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path) as file:
+        for line in file:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def plan_batches(settings: list, pairings: list, seeds: range, done: set, batch_size=BATCH_SIZE) -> list:
+    """
+    :param pairings: list of (red strategy, blue strategy)
+    :param done: keys (see game_key) of the games which are already in the results
+    :returns: list of (settings, red, blue, list of seeds) of the games still to be played
+    """
+    batches = []
+    for settings_file, (red, blue) in product(settings, pairings):
+        missing = [seed for seed in seeds if (settings_file, red, blue, seed) not in done]
+        for i in range(0, len(missing), batch_size):
+            batches.append((settings_file, red, blue, missing[i:i + batch_size]))
+    return batches
+
+
+def run_tournament(settings: list, pairings: list, seeds: range, path=RESULTS_FILE, workers=None, encode=False,
+                   max_time=MAX_GAME_TIME, validation="off", sample_rate=100, batch_size=BATCH_SIZE) -> list:
+    """
+    play every pairing on every board with every seed, on a pool of processes (one per core by default). the
+    results are appended to the file as the batches finish, the games already in it are not played again.
+    on ctrl+c the batches which haven't started are cancelled, the running ones are still written.
+    :returns: records of all the games in the results file
+    """
+    records = read_results(path)
+    batches = plan_batches(settings, pairings, seeds, {game_key(record) for record in records}, batch_size)
+    if not batches:
+        return records
+
+    with open(path, "a") as file, \
+            ProcessPoolExecutor(workers, initializer=start_worker, initargs=(validation, sample_rate)) as pool:
+        futures = [pool.submit(play_batch, *batch, encode, max_time) for batch in batches]
+        try:
+            for future in as_completed(futures):
+                for record in future.result():
+                    file.write(json.dumps(record, separators=(",", ":")) + "\n")
+                    records.append(record)
+                file.flush()
+        except KeyboardInterrupt:
+            print("Cancelling the tournament, waiting for the running batches...")
+            for future in futures:
+                future.cancel()
+            for future in futures:
+                if not future.cancelled():
+                    for record in future.result():
+                        file.write(json.dumps(record, separators=(",", ":")) + "\n")
+                        records.append(record)
+            file.flush()
+    return records
+
+
+def summarize_records(records: list) -> dict:
+    """
+    :returns: (settings, red strategy, blue strategy) => summary of its games (see simulation.summarize)
+    """
+    configurations = {}
+    for record in records:
+        configurations.setdefault((record["settings"], record["red"], record["blue"]), []).append(to_result(record))
+    return {configuration: summarize(results) for configuration, results in configurations.items()}
+
+
+def parse_pairing(pairing: str) -> tuple:
+    red, _, blue = pairing.partition(",")
+    return red, blue or red
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('-g', '--games', type=int, default=1000, help='Number of games of every configuration.')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='Seed of the first game of every configuration.')
+    parser.add_argument('--settings', nargs='+', default=[os.path.join(os.getcwd(), "GameMasterSettings.xml")],
+                        help='GameMasterSettings.xml files to play on.')
+    parser.add_argument('-p', '--pairings', nargs='+', default=["basic,basic"],
+                        help='red,blue strategies: names or module:attribute, e.g. basic,my.module:MyStrategy')
+    parser.add_argument('-o', '--output', default=RESULTS_FILE,
+                        help='Results file, the games already in it are not played again.')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='Processes to use (one per core by default).')
+    parser.add_argument('-e', '--encode', action='store_true', default=False,
+                        help='Encode and decode the actions and responses, as the real clients do.')
+    parser.add_argument('-t', '--max-time', type=float, default=MAX_GAME_TIME,
+                        help='Virtual seconds after which a game is called a draw.')
+    parser.add_argument('--validation', default="off", choices=[mode.value for mode in messages.ValidationMode],
+                        help='Schema validation of the encoded messages (off by default).')
+    parser.add_argument('--sample-rate', default=100, type=int,
+                        help='Validate one in that many messages of each type (with --validation sampled).')
+    args = vars(parser.parse_args())
+
+    all_records = run_tournament(args["settings"], [parse_pairing(pairing) for pairing in args["pairings"]],
+                                 range(args["seed"], args["seed"] + args["games"]), args["output"], args["workers"],
+                                 args["encode"], args["max_time"], args["validation"], args["sample_rate"])
+
+    print("%-30s %-12s %-12s %6s %6s %6s %6s %8s" % ("settings", "red", "blue", "games", "red", "blue", "draw",
+                                                     "length"))
+    for (settings_file, red, blue), summary in summarize_records(all_records).items():
+        print("%-30s %-12s %-12s %6d %6.2f %6.2f %6.2f %8s" % (
+            os.path.basename(settings_file), red[-12:], blue[-12:], summary["games"], summary["red_win_rate"],
+            summary["blue_win_rate"], summary["draw_rate"],
+            "-" if summary["mean_length"] is None else "%.1f" % summary["mean_length"]))
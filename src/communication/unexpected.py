@@ -39,3 +39,13 @@ class LocationOutOfBoundsError(CustomBaseExceptionWithMessage):
     def __init__(self, location, message=""):
         super(LocationOutOfBoundsError, self).__init__(
             message + "The provided location: " + str(location) + " was out of bounds.")
+
+
+class FrameTooLargeError(GameConnectionError):
+    # the peer keeps sending data without a message separator, so we refuse to buffer any more of it
+    pass
+
+
+class OutboundQueueFull(GameConnectionError):
+    # a peer doesn't read the messages we send to it fast enough
+    pass
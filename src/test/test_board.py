@@ -0,0 +1,162 @@
+import copy
+from datetime import datetime, timedelta
+from random import Random
+from unittest import TestCase, skipUnless
+
+from src.communication import messages
+from src.communication.info import GameInfo, PieceInfo, TaskFieldInfo, GoalFieldInfo, GoalFieldType, Allegiance
+
+try:
+    import numpy as np
+    from src.communication.board import ArrayGameInfo, UNKNOWN_DISTANCE, manhattan_distance_transform
+except ImportError:  # numpy is optional, only the ArrayGameInfo needs it
+    np = None
+
+TIMESTAMP = datetime(2017, 4, 1, 12, 30)
+
+
+def boards(width=6, task_height=7, goals_height=2):
+    dict_info = GameInfo(board_width=width, task_height=task_height, goals_height=goals_height)
+    dict_info.initialize_fields()
+    array_info = ArrayGameInfo(board_width=width, task_height=task_height, goals_height=goals_height)
+    array_info.initialize_fields()
+    return dict_info, array_info
+
+
+def distances(game_info: GameInfo) -> dict:
+    return {location: UNKNOWN_DISTANCE if field.distance_to_piece is None else field.distance_to_piece
+            for location, field in game_info.task_fields.items()}
+
+
+@skipUnless(np, "needs numpy")
+class TestArrayGameInfo(TestCase):
+    def test_same_fields(self):
+        dict_info, array_info = boards()
+
+        self.assertEqual(list(dict_info.task_fields.keys()), list(array_info.task_fields.keys()))
+        self.assertEqual(list(dict_info.goal_fields.keys()), list(array_info.goal_fields.keys()))
+        for location, field in dict_info.goal_fields.items():
+            self.assertEqual(field.allegiance, array_info.goal_fields[location].allegiance, str(location))
+        self.assertTrue(array_info.is_task_field((0, 2)))
+        self.assertTrue(array_info.is_goal_field((5, 10)))
+        self.assertTrue(array_info.is_out_of_bounds((6, 3)))
+        self.assertNotIn((0, 11), array_info.goal_fields)
+
+    def test_field_views(self):
+        array_info = ArrayGameInfo(board_width=4, task_height=5, goals_height=1)
+        array_info.initialize_fields()
+
+        field = array_info.task_fields[1, 3]
+        field.player_id = "5"
+        field.piece_id = "12"
+        field.timestamp = TIMESTAMP
+        self.assertEqual(("5", "12", TIMESTAMP), (field.player_id, field.piece_id, field.timestamp))
+        self.assertTrue(array_info.task_fields[1, 3].is_occupied)
+        self.assertTrue(array_info.task_fields[1, 3].has_piece)
+        self.assertTrue(array_info.has_piece(1, 3))
+
+        goal = array_info.goal_fields[2, 0]
+        goal.type = GoalFieldType.GOAL.value
+        self.assertEqual((Allegiance.BLUE.value, GoalFieldType.GOAL.value, "-1"),
+                         (goal.allegiance, array_info.goal_fields[2, 0].type, goal.player_id))
+
+        # assigning a field copies its values into the board:
+        array_info.goal_fields[2, 6] = GoalFieldInfo(2, 6, Allegiance.RED.value, "3", TIMESTAMP,
+                                                     GoalFieldType.NON_GOAL.value)
+        self.assertEqual(("3", GoalFieldType.NON_GOAL.value), (array_info.goal_fields[2, 6].player_id,
+                                                              array_info.goal_fields[2, 6].type))
+
+        # a copy doesn't change with the board:
+        snapshot = copy.deepcopy(array_info.task_fields[1, 3])
+        array_info.task_fields[1, 3].player_id = "-1"
+        self.assertIsInstance(snapshot, TaskFieldInfo)
+        self.assertEqual("5", snapshot.player_id)
+
+    def test_distances_match(self):
+        dict_info, array_info = boards(9, 11, 3)
+        random = Random(5)
+        locations = list(dict_info.task_fields.keys())
+        for i in range(12):
+            dict_info.pieces[str(i)] = PieceInfo(str(i))
+            array_info.pieces[str(i)] = PieceInfo(str(i))
+
+        for _ in range(200):
+            piece_id = str(random.randrange(12))
+            location = random.choice(locations) if random.random() < 0.6 else None
+            dict_info.set_piece_location(piece_id, location)
+            array_info.set_piece_location(piece_id, location)
+            self.assertEqual(distances(dict_info), distances(array_info))
+
+        # a piece outside of the task area:
+        dict_info.set_piece_location("0", (1, 0))
+        array_info.set_piece_location("0", (1, 0))
+        self.assertEqual(distances(dict_info), distances(array_info))
+
+    def test_distance_transform(self):
+        random = Random(3)
+        sources = np.array([[random.random() < 0.05 for _ in range(23)] for _ in range(17)])
+        expected = [[min(abs(x - sx) + abs(y - sy) for sx, sy in zip(*np.nonzero(sources))) for y in range(23)]
+                    for x in range(17)]
+
+        self.assertEqual(expected, manhattan_distance_transform(sources).tolist())
+        self.assertEqual({UNKNOWN_DISTANCE}, set(manhattan_distance_transform(np.zeros((3, 4), bool)).flat))
+
+    def test_pieces_and_empty_fields(self):
+        dict_info, array_info = boards(3, 2, 1)
+        for i, (x, y) in enumerate([(0, 1), (2, 2), (1, 1)]):
+            dict_info.add_piece(str(i), x, y)
+            array_info.add_piece(str(i), x, y)
+
+        self.assertEqual(sorted(location for location, field in dict_info.task_fields.items() if not field.has_piece),
+                         sorted(array_info.empty_task_fields()))
+        self.assertTrue(array_info.check_for_empty_task_fields())
+        for i, (x, y) in enumerate([(0, 2), (1, 2), (2, 1)]):
+            array_info.add_piece(str(i + 3), x, y)
+        self.assertFalse(array_info.check_for_empty_task_fields())
+        self.assertEqual([], array_info.empty_task_fields())
+
+    def test_neighbours(self):
+        dict_info, array_info = boards()
+
+        for location in [(0, 0), (3, 5), (5, 10), (2, 1)]:
+            for extended in (False, True):
+                self.assertEqual(list(dict_info.get_neighbours(location, extended).keys()),
+                                 list(array_info.get_neighbours(location, extended).keys()))
+
+    def test_merge(self):
+        own, other = ArrayGameInfo(board_width=3, task_height=3, goals_height=1), \
+            ArrayGameInfo(board_width=3, task_height=3, goals_height=1)
+        own.initialize_fields()
+        other.initialize_fields()
+        other.timestamps[...] = own.timestamps
+        own.task_fields[0, 1].player_id = "1"
+        own.task_fields[0, 1].timestamp = TIMESTAMP
+        other.task_fields[0, 1].player_id = "2"
+        other.task_fields[0, 1].timestamp = TIMESTAMP + timedelta(seconds=1)
+        other.task_fields[1, 2].player_id = "2"
+        other.task_fields[1, 2].timestamp = TIMESTAMP - timedelta(days=1)
+
+        self.assertEqual(1, own.merge(other))
+        self.assertEqual("2", own.task_fields[0, 1].player_id)
+        self.assertEqual("-1", own.task_fields[1, 2].player_id)
+
+    def test_grow_board_keeps_fields(self):
+        array_info = ArrayGameInfo(board_width=3, task_height=3, goals_height=1)
+        array_info.initialize_fields()
+        array_info.task_fields[1, 2].player_id = "4"
+
+        array_info.initialize_fields(board_width=5)
+
+        self.assertEqual("4", array_info.task_fields[1, 2].player_id)
+        self.assertIn((4, 2), array_info.task_fields)
+
+    def test_data_message(self):
+        dict_info, array_info = boards(4, 5, 1)
+        for info in (dict_info, array_info):
+            info.add_piece("1", 2, 3)
+            info.task_fields[1, 3].player_id = "7"
+            info.goal_fields[0, 0].type = GoalFieldType.GOAL.value
+
+        self.assertEqual(messages.Data("7", False, dict_info.task_fields, dict_info.goal_fields, timestamp=TIMESTAMP),
+                         messages.Data("7", False, array_info.task_fields, array_info.goal_fields,
+                                       timestamp=TIMESTAMP))
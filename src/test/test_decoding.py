@@ -0,0 +1,111 @@
+from unittest import TestCase
+
+from src.communication import messages, decoding
+from src.communication.decoding import decode
+from src.communication.info import TaskFieldInfo, PieceInfo, GoalFieldInfo, Allegiance, GameInfo
+from src.communication.player import Player
+
+GUID = "c094cab7-da7b-457f-89e5-a5c51756035f"
+
+
+def sample(name):
+    return open("../messages/" + name + ".xml", encoding="utf-8-sig").read()
+
+
+class TestDecoding(TestCase):
+    def test_message_types(self):
+        expected = {"Move": decoding.Move, "Discover": decoding.Discover, "PickUpPiece": decoding.PickUpPiece,
+                    "PlacePiece": decoding.PlacePiece, "TestPiece": decoding.TestPiece, "JoinGame": decoding.JoinGame,
+                    "ConfirmJoiningGame": decoding.ConfirmJoiningGame, "Game": decoding.Game,
+                    "MoveResponseGood": decoding.Data, "DiscoverResponse": decoding.Data,
+                    "RegisteredGames": decoding.RegisteredGames, "RegisterGame": decoding.DecodedMessage,
+                    "AuthorizeKnowledgeExchange": decoding.AuthorizeKnowledgeExchange,
+                    "KnowledgeExchangeRequest": decoding.KnowledgeExchangeRequest,
+                    "AcceptExchangeRequest": decoding.AcceptExchangeRequest,
+                    "KnowledgeExchangeReject": decoding.RejectKnowledgeExchange,
+                    "KnowledgeExchangeResponse": decoding.Data}
+        for name, cls in expected.items():
+            self.assertIs(cls, type(decode(sample(name))), name)
+
+    def test_game_message_attributes(self):
+        move = decode(messages.Move("3", GUID, "left").encode())
+
+        self.assertEqual(("Move", "3", GUID, "left"), (move.tag, move.game_id, move.player_guid, move.direction))
+        self.assertEqual({"gameId": "3", "playerGuid": GUID, "direction": "left"}, move.attributes)
+        # the header is enough, the message is never parsed:
+        self.assertIsNone(move._root)
+
+    def test_between_players_attributes(self):
+        request = decode(messages.KnowledgeExchangeRequest("2", "1"))
+        rejection = decode(messages.RejectKnowledgeExchange("1", "2", True))
+
+        self.assertEqual(("2", "1"), (request.player_id, request.sender_player_id))
+        self.assertEqual(("1", "2", True), (rejection.player_id, rejection.sender_player_id, rejection.permanent))
+        self.assertFalse(decode(messages.RejectKnowledgeExchange("1", "2", False)).permanent)
+        self.assertIsNone(request._root)
+
+    def test_data_children_are_lazy(self):
+        task_fields = {(1, 4): TaskFieldInfo(1, 4, distance_to_piece=2, player_id="5"),
+                       (1, 5): TaskFieldInfo(1, 5, distance_to_piece=0, piece_id="7")}
+        goal_fields = {(0, 0): GoalFieldInfo(0, 0, Allegiance.BLUE.value)}
+        pieces = {"7": PieceInfo("7")}
+        data = decode(messages.Data("5", True, task_fields, goal_fields, pieces, (1, 4)))
+
+        self.assertIs(decoding.Data, type(data))
+        self.assertIsNone(data._root)
+        self.assertEqual("5", data.player_id)
+        self.assertTrue(data.game_finished)
+
+        self.assertEqual([("1", "4", "2", "5", None), ("1", "5", "0", None, "7")],
+                         [(f.get("x"), f.get("y"), f.get("distanceToPiece"), f.get("playerId"), f.get("pieceId"))
+                          for f in data.task_fields])
+        self.assertEqual([("0", "0", "blue")], [(f.get("x"), f.get("y"), f.get("team")) for f in data.goal_fields])
+        self.assertEqual(["7"], [p.get("id") for p in data.pieces])
+        self.assertEqual((1, 4), data.player_location)
+
+    def test_empty_data(self):
+        data = decode(messages.Data("1", False))
+
+        self.assertEqual(([], [], [], None), (data.task_fields, data.goal_fields, data.pieces, data.player_location))
+
+    def test_decoded_passes_through(self):
+        data = decode(sample("MoveResponseGood"))
+
+        self.assertIs(data, decode(data))
+
+
+class TestPlayerHandlers(TestCase):
+    def setUp(self):
+        self.player = Player(1, False, "Easy set_up_game")
+
+    def tearDown(self):
+        self.player.shutdown()
+
+    def test_parse_games(self):
+        games = messages.RegisteredGames({"1": GameInfo(name="first", max_red_players=2, max_blue_players=3),
+                                           "2": GameInfo(name="b", max_red_players=0, max_blue_players=1)})
+
+        self.assertEqual([("first", 3, 2), ("b", 1, 0)], self.player.parse_games(games))
+
+    def test_join_and_play(self):
+        self.assertTrue(self.player.handle_confirmation(sample("ConfirmJoiningGame")))
+        self.assertEqual((GUID, "1", "blue", "member"),
+                         (self.player.Guid, self.player.game_info.id, self.player.team, self.player.type))
+
+        self.player.handle_game(sample("Game"))
+        self.assertEqual((5, 5, 3), (self.player.game_info.board_width, self.player.game_info.task_height,
+                                     self.player.game_info.goals_height))
+        self.assertEqual((0, 3), self.player.location)
+        self.assertEqual(4, len(self.player.game_info.teams["red"]))
+
+        self.player.handle_data(sample("DiscoverResponse"))
+        field = self.player.game_info.task_fields[1, 5]
+        self.assertEqual((0, "2", "2"), (field.distance_to_piece, field.player_id, field.piece_id))
+        self.assertEqual("unknown", self.player.game_info.pieces["2"].type)
+        # the ids are interned, the fields share them (timestamps are new in every message, they're kept as they are):
+        self.assertEqual(field.timestamp, self.player.game_info.task_fields[0, 5].timestamp)
+        self.assertIs(field.piece_id, self.player.game_info.pieces["2"].id)
+
+        self.player.handle_data(sample("MoveResponseGood"))
+        self.assertEqual((1, 5), self.player.location)
+        self.assertEqual("-1", self.player.game_info.task_fields[1, 5].piece_id)
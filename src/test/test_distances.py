@@ -0,0 +1,84 @@
+from random import Random
+from unittest import TestCase
+
+from src.communication.helpful_math import Manhattan_Distance as manhattan
+from src.communication.info import GameInfo, PieceInfo
+
+
+def full_recalculation(game_info: GameInfo) -> dict:
+    """
+    :returns: (x,y) => distance_to_piece, calculated the way update_field_distances always did it.
+    """
+    distances = {}
+    for location in game_info.task_fields:
+        min_dist = None
+        for piece in game_info.pieces.values():
+            if piece.location is not None and (min_dist is None or manhattan(location, piece.location) < min_dist):
+                min_dist = manhattan(location, piece.location)
+        distances[location] = min_dist
+    return distances
+
+
+def board(width=7, task_height=9, goals_height=2) -> GameInfo:
+    game_info = GameInfo(board_width=width, task_height=task_height, goals_height=goals_height)
+    game_info.initialize_fields()
+    return game_info
+
+
+class TestPieceDistances(TestCase):
+    def assert_distances(self, game_info: GameInfo):
+        self.assertEqual(full_recalculation(game_info),
+                         {location: field.distance_to_piece for location, field in game_info.task_fields.items()})
+
+    def test_add_pieces(self):
+        game_info = board()
+        for i, (x, y) in enumerate([(3, 6), (0, 2), (6, 10), (3, 7), (5, 5)]):
+            game_info.add_piece(str(i), x, y)
+            self.assert_distances(game_info)
+
+    def test_remove_pieces(self):
+        game_info = board()
+        for i, (x, y) in enumerate([(3, 6), (0, 2), (6, 10), (2, 6), (5, 5)]):
+            game_info.add_piece(str(i), x, y)
+
+        for i in range(5):
+            game_info.set_piece_location(str(i), None)
+            self.assert_distances(game_info)
+        # no pieces left on the board:
+        self.assertEqual({None}, {field.distance_to_piece for field in game_info.task_fields.values()})
+
+    def test_pieces_on_the_same_field(self):
+        game_info = board()
+        game_info.add_piece("0", 3, 6)
+        game_info.pieces["1"] = PieceInfo("1")
+        game_info.set_piece_location("1", (3, 6))
+
+        game_info.set_piece_location("0", None)
+        self.assert_distances(game_info)
+        self.assertEqual(0, game_info.task_fields[3, 6].distance_to_piece)
+
+    def test_random_moves(self):
+        random = Random(17)
+        game_info = board(12, 15, 3)
+        task_locations = list(game_info.task_fields.keys())
+        for i in range(30):
+            game_info.pieces[str(i)] = PieceInfo(str(i))
+
+        for _ in range(500):
+            piece_id = str(random.randrange(30))
+            location = random.choice(task_locations) if random.random() < 0.6 else None
+            game_info.set_piece_location(piece_id, location)
+            self.assert_distances(game_info)
+
+    def test_piece_outside_task_area(self):
+        game_info = board()
+        game_info.add_piece("0", 3, 6)
+        game_info.pieces["1"] = PieceInfo("1")
+
+        # pieces can only lie on task fields in the game, but the distances are right anyway:
+        game_info.set_piece_location("1", (1, 0))
+        self.assert_distances(game_info)
+        game_info.set_piece_location("1", None)
+        self.assert_distances(game_info)
+        game_info.add_piece("2", 4, 4)
+        self.assert_distances(game_info)
@@ -0,0 +1,155 @@
+import uuid
+from datetime import datetime
+from unittest import TestCase
+
+from lxml import etree
+
+from src.communication import messages
+from src.communication.encoders import MessageTemplate, escape_attribute
+from src.communication.info import Direction, TaskFieldInfo, GoalFieldInfo, PieceInfo, Allegiance, GoalFieldType, \
+    PieceType
+
+TEMPLATES = [messages.MOVE_TEMPLATE, messages.DISCOVER_TEMPLATE, messages.PICK_UP_PIECE_TEMPLATE,
+             messages.PLACE_PIECE_TEMPLATE, messages.TEST_PIECE_TEMPLATE]
+
+# attribute values which lxml has to escape (or keep as they are)
+TRICKY_VALUES = ["", "0", 17, "a&b", "<tag>", '"quoted"', "'single'", "new\nline", "carriage\rreturn", "tab\ttab",
+                 "&amp;", "zażółć gęślą jaźń", "emoji \U0001F600", "]]>", "%s %d %%"]
+
+
+def lxml_encode(template: MessageTemplate, *values):
+    """
+    how the builders encoded these messages before the templates.
+    """
+    root = etree.Element(messages.NAMESPACE_PREFIX + template.message_name, nsmap=messages.NSMAP)
+    for name, value in zip(template.attribute_names, values):
+        root.set(name, str(value))
+    return etree.tostring(root, encoding='unicode')
+
+
+class TestEncoders(TestCase):
+    def tearDown(self):
+        messages.set_validation_policy(messages.ValidationMode.ALWAYS)
+
+    def test_templates_match_lxml(self):
+        for template in TEMPLATES:
+            for value in TRICKY_VALUES:
+                values = [value] * len(template.attribute_names)
+                self.assertEqual(lxml_encode(template, *values), template.encode(*values))
+
+    def test_escaping_matches_lxml(self):
+        for value in TRICKY_VALUES:
+            root = etree.Element("e", a=str(value))
+            self.assertEqual(etree.tostring(root, encoding='unicode'), '<e a="' + escape_attribute(value) + '"/>')
+
+    def test_forbidden_characters(self):
+        for value in ["null\x00byte", "bell\x07", "escape\x1b"]:
+            with self.assertRaises(ValueError):
+                lxml_encode(messages.DISCOVER_TEMPLATE, value, value)
+            with self.assertRaises(ValueError):
+                messages.DISCOVER_TEMPLATE.encode(value, value)
+
+    def test_builders_unchanged(self):
+        guid = str(uuid.uuid4())
+        built = {}
+        for mode in messages.ValidationMode:
+            # validated messages are still built as trees, the rest comes from the templates
+            policy = messages.set_validation_policy(mode)
+            built[mode] = [messages.Move(3, guid, Direction.LEFT.value), messages.Discover("3", guid),
+                           messages.PickUpPiece("3", guid), messages.PlacePiece("3", guid),
+                           messages.TestPiece("3", guid)]
+            policy.wait_for_background()
+            self.assertTrue(all(counters["failed"] == 0 for counters in messages.validation_stats().values()))
+
+        for mode in messages.ValidationMode:
+            self.assertEqual(built[messages.ValidationMode.ALWAYS], built[mode])
+        self.assertEqual(lxml_encode(messages.MOVE_TEMPLATE, 3, guid, "left"), built[messages.ValidationMode.OFF][0])
+
+    def test_always_still_rejects_invalid(self):
+        with self.assertRaises(etree.DocumentInvalid):
+            messages.Move("1", str(uuid.uuid4()), "sideways")
+        with self.assertRaises(etree.DocumentInvalid):
+            messages.Discover("1", "not a guid")
+
+
+class TestDataEncoder(TestCase):
+    TIMESTAMP = datetime(2017, 11, 5, 12, 30, 15, 123456)
+
+    def tearDown(self):
+        messages.set_validation_policy(messages.ValidationMode.ALWAYS)
+
+    @staticmethod
+    def payloads():
+        task_fields = {(x, y): TaskFieldInfo(x, y, distance_to_piece=x + y) for x in range(3) for y in range(2, 5)}
+        task_fields[1, 3].player_id = "2"
+        task_fields[2, 4].piece_id = "7"
+        goal_fields = {(x, y): GoalFieldInfo(x, y, Allegiance.BLUE.value) for x in range(3) for y in range(2)}
+        goal_fields[0, 1].type = GoalFieldType.GOAL.value
+        goal_fields[2, 0].player_id = "3"
+        pieces = {"7": PieceInfo("7", PieceType.SHAM.value), "8": PieceInfo("8", player_id="1")}
+        return [
+            {},
+            {"player_location": (1, 3)},
+            {"task_fields": {(1, 3): task_fields[1, 3]}, "player_location": (1, 3)},
+            {"task_fields": task_fields, "goal_fields": goal_fields, "pieces": pieces},
+            {"task_fields": {}, "goal_fields": {}, "pieces": {}},
+            {"goal_fields": goal_fields, "player_location": (0, 0)},
+            {"pieces": pieces},
+            {"task_fields": list(task_fields.values()), "goal_fields": list(goal_fields.values()),
+             "pieces": list(pieces.values())},
+        ]
+
+    def test_stream_matches_tree(self):
+        for payload in self.payloads():
+            for game_finished in (False, True):
+                messages.set_validation_policy(messages.ValidationMode.ALWAYS)
+                tree = messages.Data("4", game_finished, timestamp=self.TIMESTAMP, **payload)
+                messages.set_validation_policy(messages.ValidationMode.OFF)
+                stream = messages.Data("4", game_finished, timestamp=self.TIMESTAMP, **payload)
+                self.assertEqual(tree, stream)
+
+    def test_pieces_streamed(self):
+        pieces = self.payloads()[3]["pieces"]
+        for mode in (messages.ValidationMode.ALWAYS, messages.ValidationMode.OFF):
+            messages.set_validation_policy(mode)
+            self.assertEqual(messages.Data("4", False, pieces=pieces, timestamp=self.TIMESTAMP),
+                             messages.Data("4", False, pieces=(piece for piece in pieces.values()),
+                                           timestamp=self.TIMESTAMP))
+            self.assertEqual(messages.Data("4", False, player_location=(1, 3), timestamp=self.TIMESTAMP),
+                             messages.Data("4", False, pieces=iter(()), player_location=(1, 3),
+                                           timestamp=self.TIMESTAMP))
+            self.assertEqual(messages.Data("4", False), messages.Data("4", False, pieces=iter(())))
+
+    def test_escaping_matches_tree(self):
+        task_fields = {(1, 1): TaskFieldInfo(1, 1, distance_to_piece='<&>', player_id='"p"', piece_id="a\tb")}
+        goal_fields = {(0, 0): GoalFieldInfo(0, 0, "x&y", player_id="\n", type="'")}
+        pieces = {"&": PieceInfo("&", "<sham>", player_id="\r")}
+        # sampled validation of every message builds the tree, but doesn't raise on invalid messages
+        messages.set_validation_policy(messages.ValidationMode.SAMPLED, sample_rate=1, on_violation=None)
+        tree = messages.Data("&", False, task_fields, goal_fields, pieces, timestamp=self.TIMESTAMP)
+        messages.set_validation_policy(messages.ValidationMode.OFF)
+        stream = messages.Data("&", False, task_fields, goal_fields, pieces, timestamp=self.TIMESTAMP)
+        self.assertEqual(tree, stream)
+
+    def test_single_timestamp(self):
+        task_fields = {(x, 5): TaskFieldInfo(x, 5) for x in range(50)}
+        messages.set_validation_policy(messages.ValidationMode.OFF)
+        message = messages.Data("1", False, task_fields, pieces={"1": PieceInfo("1")})
+        root = etree.fromstring(message)
+        timestamps = {element.get("timestamp") for element in root.iter() if element.get("timestamp") is not None}
+        self.assertEqual(1, len(timestamps))
+
+    def test_encode_into_bytearray(self):
+        task_fields = {(x, y): TaskFieldInfo(x, y, distance_to_piece=1) for x in range(100) for y in range(100)}
+        expected = messages.DATA_ENCODER.encode("1", False, task_fields, timestamp=self.TIMESTAMP)
+
+        buffer = bytearray(b"previous message")
+        messages.DATA_ENCODER.encode("1", False, task_fields, timestamp=self.TIMESTAMP, out=buffer)
+        self.assertEqual(b"previous message" + expected.encode(), buffer)
+
+        for mode in messages.ValidationMode:
+            policy = messages.set_validation_policy(mode)
+            buffer = bytearray()
+            self.assertIs(buffer, messages.Data("1", False, task_fields, timestamp=self.TIMESTAMP, out=buffer))
+            self.assertEqual(expected.encode(), buffer)
+            policy.wait_for_background()
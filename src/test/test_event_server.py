@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+import socket
+from threading import Thread
+from time import sleep
+from unittest import TestCase
+
+from src.communication import messages
+from src.communication.event_server import EventLoopServer
+from src.communication.server import CommunicationServer
+
+
+class ServerRoutingTests:
+    """
+    the same routing checks, ran against both server modes.
+    """
+    server_class = None
+
+    def setUp(self):
+        self.mock_server = self.server_class(False, "127.0.0.1", 0)
+        self.mock_server.socket.listen()
+        self.port = self.mock_server.socket.getsockname()[1]
+        self.loop_thread = Thread(target=self.mock_server.accept_clients, daemon=True)
+        self.loop_thread.start()
+        self.mock_clients = []
+
+    def tearDown(self):
+        for client in self.mock_clients:
+            client.close()
+        self.mock_server.running = False
+        try:
+            # closing alone doesn't wake up a thread blocked in accept()
+            self.mock_server.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.mock_server.socket.close()
+        self.loop_thread.join()
+
+    def connect(self):
+        client = socket.create_connection(("127.0.0.1", self.port))
+        client.settimeout(5)
+        self.mock_clients.append(client)
+        return client
+
+    def send(self, client, message):
+        client.sendall((message + EventLoopServer.MSG_SEPARATOR).encode())
+
+    def receive(self, client):
+        received = b""
+        while not received.endswith(EventLoopServer.MSG_SEPARATOR.encode()):
+            received += client.recv(1024)
+        return received.decode()[:-1]
+
+    def test_many_clients_on_one_thread(self):
+        clients = [self.connect() for i in range(50)]
+        for client in clients:
+            self.send(client, messages.GetGames())
+        for client in clients:
+            assert "RegisteredGames" in self.receive(client)
+        assert len(self.mock_server.clients) == 50
+
+    def test_game_registration_and_join(self):
+        game_master = self.connect()
+        self.send(game_master, messages.RegisterGame("easy clone", 1, 1))
+        assert "ConfirmGameRegistration" in self.receive(game_master)
+
+        player = self.connect()
+        self.send(player, messages.JoinGame("easy clone", "red", "leader"))
+        join_game = self.receive(game_master)
+        assert "JoinGame" in join_game and 'playerId="1"' in join_game
+
+        # the GM answers, the server relays it to the player:
+        self.send(game_master, messages.ConfirmJoiningGame("1", "0", "c094cab7-da7b-457f-89e5-a5c51756035f", "red", "leader"))
+        assert "ConfirmJoiningGame" in self.receive(player)
+
+        # and the player's actions are relayed back to the GM:
+        self.send(player, messages.Discover("0", "c094cab7-da7b-457f-89e5-a5c51756035f"))
+        assert "Discover" in self.receive(game_master)
+
+    def test_duplicate_game_rejected(self):
+        first = self.connect()
+        self.send(first, messages.RegisterGame("easy clone", 1, 1))
+        assert "ConfirmGameRegistration" in self.receive(first)
+
+        second = self.connect()
+        self.send(second, messages.RegisterGame("easy clone", 1, 1))
+        assert "RejectGameRegistration" in self.receive(second)
+
+    def test_many_games_on_one_connection(self):
+        game_master = self.connect()
+        self.send(game_master, messages.RegisterGame("first", 1, 1))
+        assert 'gameId="0"' in self.receive(game_master)
+        self.send(game_master, messages.RegisterGame("second", 1, 1))
+        assert 'gameId="1"' in self.receive(game_master)
+        self.send(game_master, messages.RegisterGame("second", 1, 1))
+        assert "RejectGameRegistration" in self.receive(game_master)
+
+        player = self.connect()
+        self.send(player, messages.JoinGame("second", "red", "leader"))
+        assert 'gameName="second"' in self.receive(game_master)
+        assert self.mock_server.clients["1"].game_id == "1"
+
+        # all his games are closed when the GM goes:
+        game_master.close()
+        assert 'GameMasterDisconnected' in self.receive(player)
+        sleep(0.2)
+        assert self.mock_server.games == {}
+
+    def test_disconnect(self):
+        client = self.connect()
+        self.send(client, messages.GetGames())
+        self.receive(client)
+        client.close()
+        sleep(0.2)
+        assert self.mock_server.clients["0"] is None
+
+
+class TestEventLoopServer(ServerRoutingTests, TestCase):
+    server_class = EventLoopServer
+
+
+class TestThreadedServer(ServerRoutingTests, TestCase):
+    server_class = CommunicationServer
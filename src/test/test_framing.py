@@ -0,0 +1,50 @@
+from unittest import TestCase
+
+from src.communication.framing import MessageFramer, MSG_SEPARATOR
+from src.communication.unexpected import FrameTooLargeError
+
+SEPARATOR = MSG_SEPARATOR.encode()
+
+
+class TestMessageFramer(TestCase):
+    def setUp(self):
+        self.framer = MessageFramer()
+
+    def test_whole_messages(self):
+        frames = self.framer.feed(b"<Discover/>" + SEPARATOR + b"<Move/>" + SEPARATOR)
+        assert frames == ["<Discover/>", "<Move/>"]
+        assert self.framer.pending == 0
+
+    def test_message_split_between_reads(self):
+        assert self.framer.feed(b"<Data playerId=") == []
+        assert self.framer.feed(b'"1"/>' + SEPARATOR + b"<Ga") == ['<Data playerId="1"/>']
+        assert self.framer.pending == 3
+        assert self.framer.feed(b"me/>" + SEPARATOR) == ["<Game/>"]
+
+    def test_multibyte_character_split_between_reads(self):
+        encoded = "<Game name=\"zażółć\"/>".encode() + SEPARATOR
+        cut = encoded.index("ż".encode()) + 1  # cut in the middle of a two-byte character
+        assert self.framer.feed(encoded[:cut]) == []
+        assert self.framer.feed(encoded[cut:]) == ["<Game name=\"zażółć\"/>"]
+
+    def test_byte_by_byte(self):
+        stream = (b"<a/>" + SEPARATOR) * 3
+        frames = []
+        for i in range(len(stream)):
+            frames += self.framer.feed(stream[i:i + 1])
+        assert frames == ["<a/>"] * 3
+
+    def test_empty_messages_are_skipped(self):
+        assert self.framer.feed(SEPARATOR + SEPARATOR + b"<a/>" + SEPARATOR + SEPARATOR) == ["<a/>"]
+
+    def test_raw_frames(self):
+        assert self.framer.feed_raw(b"<a/>" + SEPARATOR + b"<b") == [b"<a/>"]
+
+    def test_buffer_cap(self):
+        framer = MessageFramer(max_buffer_size=16)
+        framer.feed(b"0123456789")
+        with self.assertRaises(FrameTooLargeError):
+            framer.feed(b"0123456789")
+        # the framer is usable again after the error:
+        assert framer.pending == 0
+        assert framer.feed(b"<a/>" + SEPARATOR) == ["<a/>"]
@@ -0,0 +1,73 @@
+from random import seed
+from unittest import TestCase
+
+from src.communication.free_fields import FreeFields
+from src.communication.info import GameInfo
+
+
+def board(width=4, task_height=3, goals_height=1) -> GameInfo:
+    game_info = GameInfo(board_width=width, task_height=task_height, goals_height=goals_height)
+    game_info.initialize_fields()
+    return game_info
+
+
+def scanned(game_info: GameInfo) -> set:
+    return {location for location, field in game_info.task_fields.items() if not field.has_piece}
+
+
+class TestFreeFields(TestCase):
+    def test_add_remove(self):
+        free = FreeFields([(0, 0), (1, 0), (2, 0)])
+        free.remove((0, 0))
+        free.remove((0, 0))
+        free.add((1, 0))
+
+        self.assertEqual(2, len(free))
+        self.assertNotIn((0, 0), free)
+        self.assertEqual({(1, 0), (2, 0)}, set(free.locations))
+        self.assertEqual({location: i for i, location in enumerate(free.locations)}, free.positions)
+
+    def test_random_is_uniform(self):
+        seed(0)
+        free = FreeFields([(x, 0) for x in range(4)])
+        counts = {}
+        for i in range(4000):
+            location = free.random()
+            counts[location] = counts.get(location, 0) + 1
+
+        self.assertEqual(set(free.locations), set(counts))
+        for count in counts.values():
+            self.assertAlmostEqual(1000, count, delta=150)
+        self.assertIsNone(FreeFields().random())
+
+
+class TestGameInfoFreeFields(TestCase):
+    def test_kept_up_to_date(self):
+        game_info = board()
+        self.assertEqual(12, len(game_info.free_task_fields()))
+
+        game_info.add_piece("1", 0, 1)
+        game_info.add_piece("2", 3, 3)
+        self.assertEqual(scanned(game_info), set(game_info.free_task_fields().locations))
+
+        # picked up, then put down somewhere else:
+        game_info.task_fields[0, 1].piece_id = "-1"
+        game_info.set_piece_location("1", None)
+        self.assertIn((0, 1), game_info.free_task_fields())
+        game_info.task_fields[2, 2].piece_id = "1"
+        game_info.set_piece_location("1", (2, 2))
+        self.assertEqual(scanned(game_info), set(game_info.free_task_fields().locations))
+
+    def test_full_board(self):
+        game_info = board(2, 1)
+        game_info.add_piece("1", 0, 1)
+        self.assertTrue(game_info.check_for_empty_task_fields())
+        game_info.add_piece("2", 1, 1)
+        self.assertFalse(game_info.check_for_empty_task_fields())
+        self.assertIsNone(game_info.free_task_fields().random())
+
+    def test_new_fields(self):
+        game_info = board()
+        game_info.free_task_fields()
+        game_info.initialize_fields(task_height=5)
+        self.assertEqual(20, len(game_info.free_task_fields()))
@@ -0,0 +1,411 @@
+import uuid
+from time import perf_counter
+from unittest import TestCase
+
+from src.communication import messages, decoding
+from src.communication.gamemaster import GameMaster, DELAY_MODIFIER
+from src.communication.info import Allegiance, PlayerType
+
+
+class MockGameMaster(GameMaster):
+    """
+    game master which doesn't talk to any server: sent messages are collected, handlers are only recorded.
+    """
+
+    def __init__(self):
+        super(MockGameMaster, self).__init__()
+        self.sent = []
+        self.handled = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+    def run_handler(self, handler, message, player_info):
+        self.handled.append((message.tag, player_info.id))
+
+
+class PlayingGameMaster(MockGameMaster):
+    """
+    mock game master whose handlers do run, on its scheduler.
+    """
+    run_handler = GameMaster.run_handler
+
+
+class TestGameMaster(TestCase):
+    def setUp(self):
+        self.gm = MockGameMaster()
+        self.gm.team_limit = 3
+
+    def tearDown(self):
+        self.gm.socket.close()
+
+    def join(self, player_id, team=Allegiance.RED.value):
+        guid = str(uuid.uuid4())
+        self.gm.add_player(player_id, PlayerType.MEMBER.value, team, guid)
+        return guid
+
+    def assert_indexes_consistent(self):
+        players = [player for team in self.gm.info.teams.values() for player in team.values()]
+        self.assertEqual({player.id: player for player in players}, self.gm.players_by_id)
+        self.assertEqual({player.guid: player for player in players}, self.gm.players_by_guid)
+        for team_name, team in self.gm.info.teams.items():
+            for player_id, player in team.items():
+                self.assertEqual((player_id, team_name), (player.id, player.team))
+
+    def test_add_player_indexes(self):
+        guids = [self.join(str(i), Allegiance.RED.value if i % 2 else Allegiance.BLUE.value) for i in range(6)]
+
+        self.assert_indexes_consistent()
+        for i, guid in enumerate(guids):
+            self.assertIs(self.gm.find_player_by_guid(guid), self.gm.find_player_by_id(str(i)))
+        self.assertIsNone(self.gm.find_player_by_guid(str(uuid.uuid4())))
+        self.assertIsNone(self.gm.find_player_by_id("42"))
+
+    def test_remove_player_before_game(self):
+        guid = self.join("1")
+        self.join("2")
+
+        self.assertIsNotNone(self.gm.remove_player("1"))
+        self.assertIsNone(self.gm.remove_player("1"))
+        self.assert_indexes_consistent()
+        self.assertIsNone(self.gm.find_player_by_guid(guid))
+        self.assertEqual(1, self.gm.get_num_of_players)
+
+    def test_remove_player_during_game(self):
+        self.gm.team_limit = 1
+        self.join("1", Allegiance.RED.value)
+        self.join("2", Allegiance.BLUE.value)
+        self.gm.set_up_game()
+
+        player = self.gm.find_player_by_id("1")
+        location = player.location
+        self.assertEqual("1", self.gm.info.goal_fields[location].player_id)
+
+        self.gm.dispatch(messages.player_disconnected("1"))
+        # he's removed on the scheduler, after his actions:
+        self.assertIsNotNone(self.gm.find_player_by_id("1"))
+        self.gm.scheduler.run_due()
+
+        self.assert_indexes_consistent()
+        self.assertEqual("-1", self.gm.info.goal_fields[location].player_id)
+        self.assertIsNone(self.gm.find_player_by_id("1"))
+
+    def test_removed_player_drops_piece(self):
+        self.gm.team_limit = 1
+        self.join("1", Allegiance.RED.value)
+        self.join("2", Allegiance.BLUE.value)
+        self.gm.set_up_game()
+
+        player = self.gm.find_player_by_id("1")
+        location = (0, self.gm.info.goals_height)
+        self.gm.info.goal_fields[player.location].player_id = "-1"
+        self.gm.info.task_fields[location].player_id = "1"
+        self.gm.info.task_fields[location].piece_id = "-1"
+        player.location = location
+        piece = next(piece for piece in self.gm.info.pieces.values() if piece.location is not None)
+        self.gm.info.task_fields[piece.location].piece_id = "-1"
+        piece.player_id, piece.location, player.piece_id = "1", None, piece.id
+
+        self.gm.remove_player("1")
+
+        self.assertEqual(("-1", location), (piece.player_id, piece.location))
+        self.assertEqual(piece.id, self.gm.info.task_fields[location].piece_id)
+        self.assertEqual("-1", self.gm.info.task_fields[location].player_id)
+
+    def test_clean_up_resets_indexes(self):
+        self.join("1")
+        self.join("2", Allegiance.BLUE.value)
+
+        self.gm.clean_up()
+
+        self.assertEqual({}, self.gm.players_by_id)
+        self.assertEqual({}, self.gm.players_by_guid)
+        self.assert_indexes_consistent()
+
+    def test_dispatch(self):
+        guid = self.join("1")
+
+        self.gm.dispatch(messages.Move("1", guid, "up"))
+        self.gm.dispatch(messages.Discover("1", str(uuid.uuid4())))  # unknown player
+        self.gm.dispatch(messages.RegisterGame("easy clone", 1, 1))  # no handler for this one
+
+        self.assertEqual([("Move", "1")], self.gm.handled)
+
+    def test_dispatch_reads_the_snapshot(self):
+        guid = self.join("1")
+        published = self.gm.snapshot["players_by_guid"]
+        self.assertEqual({guid}, set(published))
+
+        # a published snapshot never changes:
+        other_guid = self.join("2")
+        self.gm.remove_player("1")
+        self.assertEqual({guid}, set(published))
+        self.assertEqual({other_guid}, set(self.gm.snapshot["players_by_guid"]))
+
+        self.gm.dispatch(messages.Move("1", guid, "up"))
+        self.gm.dispatch(messages.Move("1", other_guid, "up"))
+        self.assertEqual([("Move", "2")], self.gm.handled)
+
+    def test_actions_are_scheduled(self):
+        self.gm.team_limit = 1
+        guid = self.join("1", Allegiance.RED.value)
+        self.join("2", Allegiance.BLUE.value)
+        self.gm.set_up_game()
+        self.gm.scheduler.clock = lambda: 100.0
+        player = self.gm.find_player_by_id("1")
+
+        # the real run_handler, not the recording one:
+        for message in (messages.Move("1", guid, "down"), messages.Discover("1", guid)):
+            message = decoding.decode(message)
+            GameMaster.run_handler(self.gm, self.gm.message_handlers[type(message)], message, player)
+
+        self.assertEqual(0, self.gm.scheduler.run_due(100.0))
+        # discover costs nothing, but it waits for the move sent before it:
+        self.assertEqual(2, self.gm.scheduler.run_due(100.0 + self.gm.move_delay / DELAY_MODIFIER))
+        self.assertEqual(2, len(self.gm.sent))
+        self.assertEqual([decoding.Data, decoding.Data], [type(decoding.decode(message)) for message in self.gm.sent])
+
+    def test_set_up_game_pieces(self):
+        self.gm.team_limit = 1
+        self.join("1", Allegiance.RED.value)
+        self.join("2", Allegiance.BLUE.value)
+        self.gm.set_up_game()
+
+        # only real pieces, each on its own field:
+        pieces = self.gm.info.pieces.values()
+        self.assertEqual(self.gm.initial_number_of_pieces + 1, len(pieces))
+        self.assertEqual(len(pieces), len({piece.location for piece in pieces if piece.location is not None}))
+
+    def test_add_piece_fills_the_board(self):
+        self.gm.info.initialize_fields()
+        fields = len(self.gm.info.task_fields)
+        for i in range(fields):
+            self.gm.add_piece()
+
+        self.assertEqual(fields, len({piece.location for piece in self.gm.info.pieces.values()}))
+        self.assertTrue(all(field.has_piece for field in self.gm.info.task_fields.values()))
+        self.assertFalse(self.gm.add_piece())
+        self.assertEqual(fields, len(self.gm.info.pieces))
+
+    def test_goal_fields_with_known_types(self):
+        self.gm.team_limit = 1
+        self.join("1", Allegiance.RED.value)
+        self.join("2", Allegiance.BLUE.value)
+        self.gm.set_up_game()
+        player = self.gm.find_player_by_id("1")
+        for location in self.gm.info.goal_fields:
+            player.knowledge.goal_field(location).type = "unknown" if location[0] % 2 else "goal"
+        known = player.knowledge.goal_fields
+        known_fields = dict(known)
+        self.gm.sent.clear()
+
+        self.gm.handle_discover_message(player)
+        sent = decoding.decode(self.gm.sent[-1])
+        self.assertGreater(len(sent.goal_fields), 0)
+        for goal_field in sent.goal_fields:
+            location = int(goal_field.get("x")), int(goal_field.get("y"))
+            self.assertEqual(known[location].type, goal_field.get("type"))
+            self.assertIs(known_fields[location], known[location])  # updated, not replaced
+            self.assertEqual(self.gm.info.goal_fields[location].player_id, known[location].player_id)
+
+        # move along the goal area:
+        x, y = player.location
+        direction = "left" if x > 0 else "right"
+        new_location = (x - 1 if x > 0 else x + 1, y)
+        gm_type = self.gm.info.goal_fields[new_location].type
+        self.gm.handle_move_message(direction, player)
+        sent = decoding.decode(self.gm.sent[-1])
+        self.assertEqual(new_location, sent.player_location)
+        self.assertEqual([known[new_location].type], [field.get("type") for field in sent.goal_fields])
+        self.assertEqual(gm_type, self.gm.info.goal_fields[new_location].type)
+
+    def test_players_know_what_they_were_told(self):
+        self.gm.team_limit = 1
+        self.join("1", Allegiance.RED.value)
+        self.join("2", Allegiance.BLUE.value)
+        self.gm.set_up_game()
+        player = self.gm.find_player_by_id("1")
+        self.assertEqual(0, len(player.knowledge))
+
+        self.gm.handle_discover_message(player)
+
+        neighbours = self.gm.info.get_neighbours(player.location, True)
+        self.assertEqual(set(neighbours) | {player.location},
+                         set(player.knowledge.task_fields) | set(player.knowledge.goal_fields))
+        for location in neighbours:
+            self.assertEqual(self.gm.info.goal_fields.get(location, self.gm.info.task_fields.get(location)).player_id,
+                             player.knowledge.believed_field(location).player_id)
+
+    def test_players_know_where_they_moved(self):
+        self.gm.team_limit = 1
+        self.join("1", Allegiance.RED.value)
+        self.join("2", Allegiance.BLUE.value)
+        self.gm.set_up_game()
+        player = self.gm.find_player_by_id("1")
+        info = self.gm.info
+
+        # put him on a task field below a free one:
+        y = info.goals_height
+        x = next(x for x in range(info.board_width)
+                 if not info.task_fields[x, y].is_occupied and not info.task_fields[x, y + 1].is_occupied)
+        info.goal_fields[player.location].player_id = "-1"
+        info.task_fields[x, y].player_id = player.id
+        player.location = x, y
+
+        self.gm.handle_move_message("up", player)
+        sent = decoding.decode(self.gm.sent[-1])
+        self.assertEqual((x, y + 1), sent.player_location)
+        known = player.knowledge.task_fields[x, y + 1]
+        self.assertIsNot(info.task_fields[x, y + 1], known)
+        self.assertEqual((player.id, info.task_fields[x, y + 1].piece_id), (known.player_id, known.piece_id))
+        self.assertEqual([player.id], [field.get("playerId") for field in sent.task_fields])
+        self.assertGreater(player.knowledge.told_at((x, y + 1)), 0)
+        if known.has_piece:
+            self.assertIn(known.piece_id, player.knowledge.pieces)
+        version = player.knowledge.version
+
+        # he can't move onto a field someone else stands on, but he is told who it is:
+        info.task_fields[x, y].player_id = "2"
+        self.gm.handle_move_message("down", player)
+        sent = decoding.decode(self.gm.sent[-1])
+        self.assertEqual((x, y + 1), sent.player_location)
+        self.assertEqual("2", player.knowledge.task_fields[x, y].player_id)
+        self.assertGreater(player.knowledge.told_at((x, y)), version)
+
+    def test_players_know_the_pieces_they_tested(self):
+        self.gm.team_limit = 2
+        for player_id, team in (("1", Allegiance.RED.value), ("2", Allegiance.RED.value),
+                                ("3", Allegiance.BLUE.value), ("4", Allegiance.BLUE.value)):
+            self.join(player_id, team)
+        self.gm.set_up_game()
+        self.gm.scheduler.clock = lambda: 100.0
+        tester, asking = self.gm.find_player_by_id("1"), self.gm.find_player_by_id("2")
+        piece = next(iter(self.gm.info.pieces.values()))
+        info = self.gm.info
+        info.task_fields[piece.location].piece_id = "-1"
+        piece.player_id, piece.location, tester.piece_id = tester.id, None, piece.id
+
+        self.gm.handle_test_message(tester)
+        sent = decoding.decode(self.gm.sent[-1])
+        self.assertEqual([(piece.id, piece.type)], [(sent_piece.get("id"), sent_piece.get("type"))
+                                                    for sent_piece in sent.pieces])
+        self.assertIsNot(piece, tester.knowledge.pieces[piece.id])
+        self.assertEqual(piece.type, tester.knowledge.pieces[piece.id].type)
+        self.assertEqual(tester.knowledge.version, tester.knowledge.told_at(piece.id))
+
+        # his teammate learns the type from him:
+        self.gm.handle_knowledge_exchange_message(tester.id, asking)
+        self.gm.dispatch(messages.AcceptExchangeRequest(asking.id, tester.id))
+        self.gm.scheduler.run_due(100.0)
+        data = decoding.decode(self.gm.sent[-1])
+        self.assertEqual(asking.id, data.player_id)
+        self.assertEqual([(piece.id, piece.type)], [(sent_piece.get("id"), sent_piece.get("type"))
+                                                    for sent_piece in data.pieces])
+        self.assertEqual(piece.type, asking.knowledge.pieces[piece.id].type)
+
+    def test_exchange_after_playing(self):
+        self.gm.socket.close()
+        self.gm = PlayingGameMaster()
+        self.gm.team_limit = 2
+        guids = {player_id: self.join(player_id, team)
+                 for player_id, team in (("1", Allegiance.RED.value), ("2", Allegiance.RED.value),
+                                         ("3", Allegiance.BLUE.value), ("4", Allegiance.BLUE.value))}
+        self.gm.set_up_game()
+        info = self.gm.info
+        asking, asked = self.gm.find_player_by_id("1"), self.gm.find_player_by_id("2")
+        now = [100.0]
+        self.gm.scheduler.clock = lambda: now[0]
+
+        def play(message):
+            self.gm.dispatch(message)
+            now[0] += 10
+            self.gm.scheduler.run_due(now[0])
+            return decoding.decode(self.gm.sent[-1])
+
+        # he stands on a piece's field in the task area, below a free field:
+        y = info.goals_height
+        x = next(x for x in range(info.board_width) if not info.task_fields[x, y].is_occupied and
+                 not info.task_fields[x, y].has_piece and not info.task_fields[x, y + 1].is_occupied)
+        piece = next(iter(info.pieces.values()))
+        info.task_fields[piece.location].piece_id = "-1"
+        info.task_fields[x, y].piece_id = piece.id
+        info.set_piece_location(piece.id, (x, y))
+        info.goal_fields[asked.location].player_id = "-1"
+        info.task_fields[x, y].player_id = asked.id
+        asked.location = x, y
+
+        play(messages.PickUpPiece("1", guids["2"]))
+        tested = play(messages.TestPiece("1", guids["2"]))
+        self.assertEqual([piece.type], [sent_piece.get("type") for sent_piece in tested.pieces])
+        moved = play(messages.Move("1", guids["2"], "up"))
+        self.assertEqual((x, y + 1), moved.player_location)
+        play(messages.Discover("1", guids["2"]))
+
+        self.gm.sent.clear()
+        play(messages.AuthorizeKnowledgeExchange("1", guids["1"], asked.id))
+        data = play(messages.AcceptExchangeRequest(asking.id, asked.id))
+        self.assertEqual(asking.id, data.player_id)
+        self.assertEqual(set(asked.knowledge.task_fields) | set(asked.knowledge.goal_fields),
+                         {(int(field.get("x")), int(field.get("y"))) for field in data.task_fields + data.goal_fields})
+        self.assertIn((x, y + 1), asked.knowledge.task_fields)
+        self.assertEqual(asked.id, asking.knowledge.task_fields[x, y + 1].player_id)
+        self.assertEqual((piece.type, asked.id),
+                         (asking.knowledge.pieces[piece.id].type, asking.knowledge.pieces[piece.id].player_id))
+
+    def test_game_over_doesnt_block(self):
+        self.join("1", Allegiance.RED.value)
+        self.gm.set_up_game()
+        self.gm.game_on = True
+        self.gm.achieved_goal_counters[Allegiance.RED.value] = self.gm.goal_target
+
+        started = perf_counter()
+        self.gm.check_for_game_over(self.gm.find_player_by_id("1"))
+        self.assertLess(perf_counter() - started, 0.5)
+        self.assertEqual((False, True), (self.gm.game_on, self.gm.info.finished))
+
+    def test_knowledge_exchange(self):
+        self.gm.team_limit = 2
+        for player_id, team in (("1", Allegiance.RED.value), ("2", Allegiance.RED.value),
+                                ("3", Allegiance.BLUE.value), ("4", Allegiance.BLUE.value)):
+            self.join(player_id, team)
+        self.gm.set_up_game()
+        self.gm.scheduler.clock = lambda: 100.0
+        asking, asked = self.gm.find_player_by_id("1"), self.gm.find_player_by_id("2")
+        self.gm.handle_discover_message(asked)
+        self.gm.sent.clear()
+
+        def exchange(with_player_id, answer):
+            self.gm.handle_knowledge_exchange_message(with_player_id, asking)
+            self.gm.dispatch(answer)
+            self.gm.scheduler.run_due(100.0)
+            return [decoding.decode(message) for message in self.gm.sent[-2:]]
+
+        request, data = exchange("2", messages.AcceptExchangeRequest("1", "2"))
+        self.assertEqual((decoding.KnowledgeExchangeRequest, "2", "1"),
+                         (type(request), request.player_id, request.sender_player_id))
+        self.assertEqual("1", data.player_id)
+        self.assertEqual(set(asked.knowledge.task_fields) | set(asked.knowledge.goal_fields),
+                         {(int(field.get("x")), int(field.get("y"))) for field in data.task_fields + data.goal_fields})
+        self.assertEqual(set(asked.knowledge.pieces), {piece.get("id") for piece in data.pieces})
+
+        # he already knows all that:
+        request, data = exchange("2", messages.AcceptExchangeRequest("1", "2"))
+        self.assertEqual(0, len(data.task_fields) + len(data.goal_fields) + len(data.pieces))
+
+        # a refusal is relayed to him, answers nobody asked for are ignored:
+        sent = len(self.gm.sent)
+        request, rejection = exchange("3", messages.RejectKnowledgeExchange("1", "3", True))
+        self.gm.dispatch(messages.AcceptExchangeRequest("1", "3"))
+        self.gm.scheduler.run_due(100.0)
+        self.assertEqual(sent + 2, len(self.gm.sent))
+        self.assertEqual((decoding.RejectKnowledgeExchange, "1", "3", True),
+                         (type(rejection), rejection.player_id, rejection.sender_player_id, rejection.permanent))
+
+        # nobody to ask, or the one he asked has left:
+        rejection = exchange("42", messages.AcceptExchangeRequest("1", "42"))[-1]
+        self.assertEqual(("1", "42", True), (rejection.player_id, rejection.sender_player_id, rejection.permanent))
+        self.gm.handle_knowledge_exchange_message("4", asking)
+        self.gm.remove_player("4")
+        rejection = decoding.decode(self.gm.sent[-1])
+        self.assertEqual(("1", "4", True), (rejection.player_id, rejection.sender_player_id, rejection.permanent))
+        self.assertEqual(set(), self.gm.exchange_requests)
@@ -0,0 +1,121 @@
+from threading import current_thread
+from unittest import TestCase
+
+from src.communication import messages
+from src.communication.host import GameHost
+
+
+class MockGameHost(GameHost):
+    """
+    game host which doesn't talk to any server: sent messages are collected, actions only run when run_due is called.
+    """
+
+    def __init__(self, copies=2):
+        super(MockGameHost, self).__init__(copies=copies)
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+
+class TestGameHost(TestCase):
+    def setUp(self):
+        self.host = MockGameHost()
+        for game in self.host.games:
+            self.host.register(game)
+        self.host.route(messages.ConfirmGameRegistration("0"))
+        self.host.route(messages.ConfirmGameRegistration("1"))
+        self.first, self.second = self.host.games
+
+    def tearDown(self):
+        self.host.scheduler.stop()
+        self.host.socket.close()
+
+    def join(self, game, player_id, team):
+        self.host.route(messages.JoinGame(game.game_name, team, "leader", player_id))
+        return game.find_player_by_id(player_id)
+
+    def test_registration(self):
+        self.assertEqual(["easy clone 1", "easy clone 2"], [game.game_name for game in self.host.games])
+        self.assertEqual(2, len([message for message in self.host.sent if "RegisterGame" in message]))
+        self.assertEqual({"0": self.first, "1": self.second}, self.host.games_by_id)
+        self.assertEqual(("0", "1"), (self.first.info.id, self.second.info.id))
+
+        # games share the parsed settings, each one has its own board:
+        self.assertIs(self.first.read_settings(), self.second.read_settings())
+        self.assertIsNot(self.first.info, self.second.info)
+
+    def test_games_are_separate(self):
+        red = self.join(self.first, "1", "red")
+        self.assertFalse(self.first.game_on)
+        self.join(self.first, "2", "blue")
+        self.assertTrue(self.first.game_on)
+        self.assertFalse(self.second.game_on)
+
+        other = self.join(self.second, "3", "red")
+        self.join(self.second, "4", "blue")
+        self.assertIsNone(self.first.find_player_by_id("3"))
+        self.assertIs(self.second, self.host.games_of_players["3"])
+
+        # actions are handled by the game they were sent to, a guid from the other game is unknown there:
+        self.host.route(messages.Discover("1", other.guid))
+        self.host.route(messages.Discover("0", red.guid))
+        self.host.route(messages.Discover("0", other.guid))
+        del self.host.sent[:]
+        self.assertEqual(2, self.host.scheduler.run_due(self.host.scheduler.clock()))
+        self.assertEqual(2, len(self.host.sent))
+        self.assertIn('playerId="3"', self.host.sent[0])
+        self.assertIn('playerId="1"', self.host.sent[1])
+        self.assertEqual((1, 1), (self.first.actions, self.second.actions))
+
+    def test_disconnect_before_game(self):
+        self.join(self.second, "3", "red")
+        self.host.route(messages.player_disconnected("3"))
+        self.assertEqual(0, self.second.get_num_of_players)
+        self.assertNotIn("3", self.host.games_of_players)
+
+    def test_disconnect_during_game(self):
+        self.join(self.first, "1", "red")
+        self.join(self.first, "2", "blue")
+        self.assertTrue(self.first.snapshot["game_on"])
+
+        # after the actions he has already sent:
+        self.host.route(messages.player_disconnected("1"))
+        self.assertEqual(2, self.first.get_num_of_players)
+        self.host.scheduler.run_due(self.host.scheduler.clock())
+        self.assertEqual(1, self.first.snapshot["players"])
+        self.assertNotIn("1", self.host.games_of_players)
+
+    def test_restart(self):
+        self.join(self.first, "1", "red")
+        self.join(self.first, "2", "blue")
+        self.join(self.second, "3", "red")
+        self.assertGreater(len(self.host.scheduler), 0)
+
+        self.first.restart()
+        # only the first game's actions and players are gone:
+        self.assertEqual(0, len(self.host.scheduler))
+        self.assertEqual({"3": self.second}, self.host.games_of_players)
+        self.assertEqual(("0", False, 0, 1), (self.first.info.id, self.first.game_on, self.first.get_num_of_players,
+                                              self.first.games_played))
+        self.assertEqual(1, self.second.get_num_of_players)
+
+        # and new players can play under the same id:
+        self.join(self.first, "4", "red")
+        self.join(self.first, "5", "blue")
+        self.assertTrue(self.first.game_on)
+
+    def test_joins_run_on_the_scheduler(self):
+        threads = []
+        handle_join = self.first.handle_join
+        self.first.handle_join = lambda message: threads.append(current_thread()) or handle_join(message)
+        self.host.scheduler.start()
+
+        self.join(self.first, "1", "red")
+        self.host.route(messages.player_disconnected("1"))
+        self.join(self.first, "2", "red")
+
+        self.assertEqual([self.host.scheduler.worker] * 2, threads)
+        self.assertEqual({"2": self.first}, self.host.games_of_players)
+        self.assertEqual((False, 1), (self.first.snapshot["game_on"], self.first.snapshot["players"]))
+        self.assertEqual(1, self.host.stats()[0]["players"])
@@ -0,0 +1,101 @@
+from unittest import TestCase
+
+from src.communication.info import GameInfo, TaskFieldInfo, GoalFieldInfo, PieceInfo, Allegiance, EMPTY_ID, \
+    GoalFieldType, KnownGoalFieldView
+
+
+def scan_neighbours(game_info: GameInfo, location: tuple, look_for_extended=False) -> dict:
+    """
+    neighbours found the way get_neighbours always did it: checking every field of the board.
+    """
+    dist = 2 if look_for_extended else 1
+    neighbours = {}
+    for fields in (game_info.task_fields, game_info.goal_fields):
+        for (x, y), field in fields.items():
+            if abs(location[0] - x) <= 1 and abs(location[1] - y) <= 1 and \
+                    abs(location[0] - x) + abs(location[1] - y) <= dist:
+                neighbours[x, y] = field
+    return neighbours
+
+
+class TestNeighbours(TestCase):
+    def assert_same_neighbours(self, game_info: GameInfo, location: tuple):
+        for extended in (False, True):
+            expected = scan_neighbours(game_info, location, extended)
+            actual = game_info.get_neighbours(location, extended)
+            # the order matters as well, strategies pick the first of equally good fields
+            self.assertEqual(list(expected.items()), list(actual.items()), str(location))
+
+    def test_whole_board(self):
+        game_info = GameInfo(board_width=6, task_height=5, goals_height=2)
+        game_info.initialize_fields()
+
+        for x in range(-2, 8):
+            for y in range(-2, game_info.whole_board_length + 3):
+                self.assert_same_neighbours(game_info, (x, y))
+
+    def test_custom_fields(self):
+        task_fields = {(2, 3): TaskFieldInfo(2, 3), (1, 2): TaskFieldInfo(1, 2), (1, 3): TaskFieldInfo(1, 3),
+                       (2, 2): TaskFieldInfo(2, 2)}
+        goal_fields = {(1, 1): GoalFieldInfo(1, 1, Allegiance.BLUE.value),
+                       (2, 1): GoalFieldInfo(2, 1, Allegiance.BLUE.value)}
+        game_info = GameInfo(task_fields=task_fields, goal_fields=goal_fields)
+
+        for location in [(1, 2), (2, 2), (1, 1), (0, 0), (3, 4)]:
+            self.assert_same_neighbours(game_info, location)
+
+    def test_board_changes(self):
+        game_info = GameInfo(board_width=3, task_height=3, goals_height=1)
+        game_info.initialize_fields()
+        self.assert_same_neighbours(game_info, (1, 1))
+
+        game_info.initialize_fields(2, 4, 4)
+        self.assert_same_neighbours(game_info, (3, 3))
+
+        # fields replaced by new objects are returned, not the old ones:
+        game_info.goal_fields[3, 0] = GoalFieldInfo(3, 0, Allegiance.BLUE.value)
+        self.assertIs(game_info.goal_fields[3, 0], game_info.get_neighbours((3, 1))[3, 0])
+
+
+class TestCompactInfo(TestCase):
+    def test_no_instance_dicts(self):
+        for info in (TaskFieldInfo(), GoalFieldInfo(), PieceInfo()):
+            self.assertFalse(hasattr(info, "__dict__"), type(info).__name__)
+            with self.assertRaises(AttributeError):
+                info.misspelled_attribute = 1
+
+    def test_attributes(self):
+        task_field = TaskFieldInfo(1, 2, distance_to_piece=3, player_id="4", piece_id="5")
+        goal_field = GoalFieldInfo(0, 1, Allegiance.RED.value, "4")
+        piece = PieceInfo("5", player_id="4", location=(1, 2))
+
+        self.assertEqual(((1, 2), 3, "4", "5", True, True), (task_field.location, task_field.distance_to_piece,
+                                                             task_field.player_id, task_field.piece_id,
+                                                             task_field.is_occupied, task_field.has_piece))
+        self.assertEqual(((0, 1), "red", "unknown"), (goal_field.location, goal_field.allegiance, goal_field.type))
+        self.assertEqual(("5", "unknown", "4", (1, 2)), (piece.id, piece.type, piece.player_id, piece.location))
+
+        task_field[0] = 7
+        self.assertEqual((7, 2), (task_field[0], task_field[1]))
+
+    def test_shared_defaults(self):
+        first, second = TaskFieldInfo(0, 0), TaskFieldInfo(1, 0)
+
+        self.assertIs(first.timestamp, second.timestamp)
+        self.assertIs(EMPTY_ID, first.piece_id)
+        self.assertFalse(first.has_piece)
+
+
+class TestKnownGoalFieldView(TestCase):
+    def test_view(self):
+        field = GoalFieldInfo(1, 2, Allegiance.RED.value, "-1", type=GoalFieldType.GOAL.value)
+        view = KnownGoalFieldView(field, GoalFieldType.UNKNOWN.value)
+
+        self.assertEqual(((1, 2), "red", "unknown", False), (view.location, view.allegiance, view.type,
+                                                            view.is_occupied))
+        field.player_id = "3"
+        self.assertEqual("3", view.player_id)
+        self.assertTrue(view.is_occupied)
+        with self.assertRaises(AttributeError):
+            view.type = GoalFieldType.GOAL.value
+        self.assertEqual(GoalFieldType.GOAL.value, field.type)
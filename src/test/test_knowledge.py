@@ -0,0 +1,87 @@
+from itertools import count
+from unittest import TestCase
+
+from src.communication.info import GameInfo, GoalFieldType
+from src.communication.knowledge import PlayerKnowledge
+
+
+def board() -> GameInfo:
+    game_info = GameInfo(board_width=5, task_height=5, goals_height=2)
+    game_info.initialize_fields()
+    return game_info
+
+
+class TestPlayerKnowledge(TestCase):
+    def test_only_what_he_was_told(self):
+        game_info = board()
+        game_info.add_piece("1", 2, 3)
+        knowledge = PlayerKnowledge()
+        self.assertIsNone(knowledge.believed_field((2, 3)))
+        self.assertEqual(GoalFieldType.UNKNOWN.value, knowledge.goal_type((0, 0)))
+
+        known_field = knowledge.tell_task_field(game_info.task_fields[2, 3])
+        knowledge.piece("1", (2, 3))
+        game_info.task_fields[2, 3].player_id = "4"  # he wasn't told about that
+
+        self.assertIs(known_field, knowledge.believed_field((2, 3)))
+        self.assertEqual(("1", "-1", 0), (known_field.piece_id, known_field.player_id, known_field.distance_to_piece))
+        self.assertEqual((2, 3), knowledge.pieces["1"].location)
+        self.assertEqual(2, len(knowledge))
+
+    def test_goal_type_kept(self):
+        game_info = board()
+        knowledge = PlayerKnowledge()
+        knowledge.goal_field((1, 0)).type = GoalFieldType.GOAL.value
+        game_info.goal_fields[1, 0].player_id = "2"
+
+        known_field = knowledge.tell_goal_field(game_info.goal_fields[1, 0])
+
+        self.assertEqual((GoalFieldType.GOAL.value, "2"), (known_field.type, known_field.player_id))
+        self.assertEqual(GoalFieldType.GOAL.value, knowledge.goal_type((1, 0)))
+
+    def test_changes_since(self):
+        game_info = board()
+        knowledge = PlayerKnowledge()
+        knowledge.tell_task_field(game_info.task_fields[0, 2])
+        knowledge.tell_goal_field(game_info.goal_fields[0, 1])
+        seen = knowledge.version
+
+        knowledge.tell_task_field(game_info.task_fields[0, 2])
+        knowledge.tell_task_field(game_info.task_fields[1, 2])
+        knowledge.piece("3")
+
+        task_fields, goal_fields, pieces = knowledge.changes_since(seen)
+        self.assertEqual({(0, 2), (1, 2)}, set(task_fields))
+        self.assertEqual({}, goal_fields)
+        self.assertEqual(["3"], list(pieces))
+        self.assertEqual(({}, {}, {}), knowledge.changes_since(knowledge.version))
+        self.assertEqual(4, sum(len(changes) for changes in knowledge.changes_since(0)))
+
+    def test_learn_from(self):
+        game_info = board()
+        clock = count(1)
+        asking, asked = PlayerKnowledge(clock), PlayerKnowledge(clock)
+        asked.tell_task_field(game_info.task_fields[0, 2])
+        asking.tell_task_field(game_info.task_fields[1, 2])
+        asked.tell_task_field(game_info.task_fields[1, 2])
+        asked.tell_task_field(game_info.task_fields[0, 3])
+        asking.tell_task_field(game_info.task_fields[0, 3])  # he knows this one better
+        asked.goal_field((1, 0)).type = GoalFieldType.GOAL.value
+        asking.tell_goal_field(game_info.goal_fields[1, 0])  # newer, but he doesn't know its type
+        asked.piece("3", (0, 2))
+
+        task_fields, goal_fields, pieces = asking.learn_from(asked)
+        self.assertEqual({(0, 2), (1, 2)}, set(task_fields))
+        self.assertIsNot(asked.task_fields[0, 2], task_fields[0, 2])
+        self.assertEqual(["3"], list(pieces))
+        self.assertEqual((0, 2), asking.pieces["3"].location)
+        self.assertEqual([(1, 0)], list(goal_fields))
+        self.assertEqual(GoalFieldType.GOAL.value, asking.goal_type((1, 0)))
+
+        # nothing new the second time, and nothing he learned goes back to the one he learned it from:
+        self.assertEqual(({}, {}, {}), asking.learn_from(asked))
+        task_fields, goal_fields, pieces = asked.learn_from(asking)
+        self.assertEqual(([(0, 3)], [(1, 0)], {}), (list(task_fields), list(goal_fields), pieces))
+
+        asked.tell_task_field(game_info.task_fields[1, 2])
+        self.assertEqual([(1, 2)], list(asking.learn_from(asked)[0]))
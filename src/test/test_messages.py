@@ -1,6 +1,7 @@
 import uuid
 from unittest import TestCase
 
+from lxml import etree
 from lxml.etree import DocumentInvalid
 
 from src.communication.info import *
@@ -420,4 +421,75 @@ class TestClass(TestCase):
             GameMasterDisconnected(player_id)
 
         except DocumentInvalid:
-            flag = False
\ No newline at end of file
+            flag = False
+
+
+class TestValidationPolicy(TestCase):
+    def setUp(self):
+        self.violations = []
+
+    def tearDown(self):
+        # tests must stay strict:
+        set_validation_policy(ValidationMode.ALWAYS)
+
+    def report(self, message_type, error):
+        self.violations.append(message_type)
+
+    def test_always_raises(self):
+        set_validation_policy(ValidationMode.ALWAYS)
+        guid = str(uuid.uuid4())
+
+        Move("1", guid, Direction.UP.value)
+        with self.assertRaises(DocumentInvalid):
+            Move("1", guid, "sideways")
+
+        assert validation_stats()["Move"] == {"validated": 1, "skipped": 0, "failed": 1}
+
+    def test_off_never_validates(self):
+        set_validation_policy(ValidationMode.OFF, on_violation=self.report)
+
+        message = Move("1", str(uuid.uuid4()), "sideways")
+
+        assert 'direction="sideways"' in message
+        assert self.violations == []
+        assert validation_stats()["Move"] == {"validated": 0, "skipped": 1, "failed": 0}
+
+    def test_sampled_validates_one_in_n(self):
+        set_validation_policy(ValidationMode.SAMPLED, sample_rate=5, on_violation=self.report)
+        guid = str(uuid.uuid4())
+
+        for i in range(10):
+            Move("1", guid, "sideways")
+        for i in range(3):
+            Discover("1", guid)
+
+        # the first message of each type is always checked, invalid ones are only reported
+        assert self.violations == ["Move", "Move"]
+        assert validation_stats()["Move"] == {"validated": 0, "skipped": 8, "failed": 2}
+        assert validation_stats()["Discover"] == {"validated": 1, "skipped": 2, "failed": 0}
+
+    def test_async_reports_violations(self):
+        policy = set_validation_policy(ValidationMode.ASYNC, on_violation=self.report)
+        guid = str(uuid.uuid4())
+
+        Move("1", guid, "sideways")
+        Move("1", guid, Direction.DOWN.value)
+        policy.wait_for_background()
+
+        assert self.violations == ["Move"]
+        assert validation_stats()["Move"] == {"validated": 1, "skipped": 0, "failed": 1}
+
+    def test_async_never_queues_trees(self):
+        root = etree.fromstring(GetGames())
+        policy = set_validation_policy(ValidationMode.ASYNC, on_violation=self.report)
+        checked = []
+        check = policy.check
+        policy.check = lambda message_type, message: checked.append(type(message)) or check(message_type, message)
+
+        AuthorizeKnowledgeExchange("1", str(uuid.uuid4()), "2")
+        GetGames()
+        policy.validate_message("GetGames", root)
+        policy.wait_for_background()
+
+        assert checked == [str, str, str]
+        assert self.violations == []
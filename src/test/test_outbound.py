@@ -0,0 +1,112 @@
+from threading import Thread
+from time import sleep
+from unittest import TestCase
+
+from src.communication.framing import MSG_SEPARATOR
+from src.communication.outbound import OutboundQueue, BackpressurePolicy
+from src.communication.unexpected import OutboundQueueFull
+
+SEPARATOR = MSG_SEPARATOR.encode()
+
+
+class MockSocket:
+    """
+    accepts at most write_limit bytes in a single send, like a socket with a full buffer.
+    """
+
+    def __init__(self, write_limit=None):
+        self.write_limit = write_limit
+        self.sends = []
+
+    def send(self, data):
+        if self.write_limit is not None:
+            data = data[:self.write_limit]
+        self.sends.append(bytes(data))
+        return len(data)
+
+    @property
+    def received(self):
+        return b"".join(self.sends)
+
+
+class TestOutboundQueue(TestCase):
+    def test_small_messages_are_coalesced(self):
+        queue = OutboundQueue()
+        sock = MockSocket()
+        for i in range(10):
+            queue.push(b"<Move/>")
+        queue.flush(sock)
+
+        assert len(sock.sends) == 1
+        assert sock.received == (b"<Move/>" + SEPARATOR) * 10
+        assert queue.sent_messages == 10
+
+    def test_short_writes_are_resumed(self):
+        queue = OutboundQueue()
+        sock = MockSocket(write_limit=3)
+        queue.push(b"<Data playerId=\"1\"/>")
+        queue.push(b"<Game/>")
+        queue.flush(sock)
+
+        assert sock.received == b"<Data playerId=\"1\"/>" + SEPARATOR + b"<Game/>" + SEPARATOR
+        assert queue.is_empty()
+
+    def test_depth_and_bytes_in_flight(self):
+        queue = OutboundQueue()
+        queue.push(b"12345")
+        queue.push(b"123")
+        assert queue.depth == 2
+        assert queue.bytes_in_flight == 10
+
+        # a short write leaves a part of the joined messages in flight:
+        queue.write_to(MockSocket(write_limit=4))
+        assert queue.depth == 1
+        assert queue.bytes_in_flight == 6
+
+    def test_drop_policy(self):
+        queue = OutboundQueue(max_messages=2, policy=BackpressurePolicy.DROP)
+        assert queue.push(b"1") and queue.push(b"2")
+        assert not queue.push(b"3")
+        assert queue.dropped_messages == 1
+        assert queue.depth == 2
+
+    def test_disconnect_policy(self):
+        queue = OutboundQueue(max_bytes=8, policy=BackpressurePolicy.DISCONNECT)
+        queue.push(b"1234")
+        with self.assertRaises(OutboundQueueFull):
+            queue.push(b"5678")
+
+    def test_message_bigger_than_limit_is_not_dropped(self):
+        queue = OutboundQueue(max_bytes=8, policy=BackpressurePolicy.DROP)
+        assert queue.push(b"0123456789")
+
+    def test_block_policy_waits_for_writer(self):
+        queue = OutboundQueue(max_messages=1, policy=BackpressurePolicy.BLOCK)
+        sock = MockSocket()
+        queue.push(b"1")
+
+        def drain_later():
+            sleep(0.1)
+            queue.flush(sock)
+
+        Thread(target=drain_later, daemon=True).start()
+        assert queue.push(b"2")  # blocks until the first message gets written
+        queue.flush(sock)
+        assert sock.received == b"1" + SEPARATOR + b"2" + SEPARATOR
+
+    def test_block_policy_gives_up(self):
+        queue = OutboundQueue(max_messages=1, policy=BackpressurePolicy.BLOCK)
+        queue.push(b"1")
+        timeout = OutboundQueue.BLOCK_TIMEOUT
+        OutboundQueue.BLOCK_TIMEOUT = 0.05
+        try:
+            with self.assertRaises(OutboundQueueFull):
+                queue.push(b"2")
+        finally:
+            OutboundQueue.BLOCK_TIMEOUT = timeout
+
+    def test_close_wakes_up_writer(self):
+        queue = OutboundQueue()
+        Thread(target=lambda: (sleep(0.1), queue.close()), daemon=True).start()
+        assert not queue.wait(timeout=5)
+        assert not queue.push(b"1")
@@ -0,0 +1,138 @@
+from concurrent.futures import CancelledError
+from threading import Event, Thread, current_thread
+from time import sleep
+from unittest import TestCase
+
+from src.communication.scheduler import ActionScheduler
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestActionScheduler(TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.scheduler = ActionScheduler(self.clock)
+        self.log = []
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def test_runs_in_order_of_due_time(self):
+        self.scheduler.schedule(0.3, self.log.append, "c")
+        self.scheduler.schedule(0.1, self.log.append, "a")
+        self.scheduler.schedule(0.2, self.log.append, "b")
+        self.scheduler.schedule(0.1, self.log.append, "a2")
+
+        self.assertEqual(0, self.scheduler.run_due())
+        self.assertEqual(2, self.scheduler.run_due(0.15))
+        self.assertEqual(["a", "a2"], self.log)
+        self.assertEqual(2, self.scheduler.run_due(1))
+        self.assertEqual(["a", "a2", "b", "c"], self.log)
+        self.assertIsNone(self.scheduler.next_due())
+
+    def test_key_keeps_order(self):
+        self.scheduler.schedule(0.5, self.log.append, "slow", key="1")
+        self.assertEqual(0.5, self.scheduler.schedule(0.0, self.log.append, "fast", key="1"))
+        self.scheduler.schedule(0.0, self.log.append, "other", key="2")
+
+        self.scheduler.run_due(0.5)
+        self.assertEqual(["other", "slow", "fast"], self.log)
+
+        # once the key's actions have run, its new actions get their own delay again:
+        self.clock.now = 2
+        self.assertEqual(2.1, self.scheduler.schedule(0.1, self.log.append, "later", key="1"))
+
+    def test_errors_and_stats(self):
+        errors = []
+        self.scheduler.on_error = lambda action, error: errors.append(error)
+        self.scheduler.schedule(0, lambda: 1 / 0)
+        self.scheduler.schedule(0, self.log.append, "after")
+
+        self.scheduler.run_due(0.25)
+        self.assertEqual(1, len(errors))
+        self.assertEqual(["after"], self.log)
+        stats = self.scheduler.stats()
+        self.assertEqual({"executed": 2, "queued": 0, "max_lateness": 0.25, "mean_lateness": 0.25, "max_queued": 2},
+                         {name: stats[name] for name in ("executed", "queued", "max_lateness", "mean_lateness",
+                                                         "max_queued")})
+        self.assertGreaterEqual(stats["max_lock_wait"], stats["mean_lock_wait"])
+        self.assertGreater(stats["busy_time"], 0)
+
+    def test_actions_schedule_actions(self):
+        def first():
+            self.log.append("first")
+            self.scheduler.schedule(0, self.log.append, "second")
+
+        self.scheduler.schedule(0, first)
+        self.assertEqual(2, self.scheduler.run_due())
+
+    def test_cancel_owner(self):
+        first_game, second_game = object(), object()
+        for i in range(3):
+            self.scheduler.schedule(i * 0.1, self.log.append, "first " + str(i), owner=first_game)
+            self.scheduler.schedule(i * 0.1, self.log.append, "second " + str(i), owner=second_game)
+
+        self.assertEqual(3, self.scheduler.cancel(first_game))
+        self.assertEqual(0, self.scheduler.cancel(first_game))
+        self.scheduler.run_due(1)
+        self.assertEqual(["second 0", "second 1", "second 2"], self.log)
+
+    def test_worker(self):
+        scheduler = ActionScheduler()
+        done = Event()
+        scheduler.start()
+        scheduler.schedule(0.05, done.set)
+        scheduler.schedule(0.01, self.log.append, "first")
+
+        self.assertTrue(done.wait(5))
+        self.assertEqual(["first"], self.log)
+
+        scheduler.schedule(10, self.log.append, "never")
+        scheduler.stop()
+        sleep(0.01)
+        self.assertEqual(["first"], self.log)
+        self.assertFalse(scheduler.worker.is_alive())
+
+    def test_call(self):
+        # without a worker, on the calling thread:
+        self.assertEqual(3, self.scheduler.call(len, "abc"))
+
+        scheduler = ActionScheduler()
+        scheduler.start()
+        try:
+            scheduler.schedule(0, self.log.append, "before")
+            self.assertIs(scheduler.worker, scheduler.call(lambda: self.log.append("call") or current_thread()))
+            self.assertEqual(["before", "call"], self.log)
+            with self.assertRaises(ZeroDivisionError):
+                scheduler.call(lambda: 1 / 0)
+        finally:
+            scheduler.stop()
+
+    def test_stop_cancels_calls(self):
+        scheduler = ActionScheduler()
+        scheduler.start()
+        started, waiting = Event(), Event()
+        scheduler.schedule(0, lambda: started.set() or waiting.wait(5))
+        started.wait(5)
+        outcome = []
+
+        def call():
+            try:
+                scheduler.call(self.log.append, "never")
+            except CancelledError:
+                outcome.append("cancelled")
+
+        caller = Thread(target=call)
+        caller.start()
+        while len(scheduler) == 0:
+            sleep(0.001)
+        scheduler.stop(wait=False)
+        caller.join(5)
+        waiting.set()
+        self.assertEqual((["cancelled"], []), (outcome, self.log))
@@ -0,0 +1,76 @@
+from unittest import TestCase
+
+from src.communication.info import Allegiance
+from src.communication.simulation import play_game, summarize, SimulatedGameMaster, SimulatedPlayer, GameResult
+from src.communication.strategy import StrategyFactory
+
+
+class BrokenStrategy:
+    def __init__(self, team, location, game_info):
+        pass
+
+    def get_next_move(self, location):
+        raise RuntimeError("this strategy never works")
+
+
+class TestSimulation(TestCase):
+    def test_game_finishes(self):
+        result = play_game(1)
+
+        self.assertIn(result.winner, (Allegiance.RED.value, Allegiance.BLUE.value))
+        self.assertGreaterEqual(result.goals[result.winner], 1)
+        self.assertGreater(result.duration, 0)
+        self.assertGreater(result.actions, 0)
+        self.assertEqual(0, result.errors)
+
+    def test_same_seed_same_game(self):
+        first, second = play_game(7), play_game(7)
+
+        self.assertEqual((first.winner, first.duration, first.actions, first.goals),
+                         (second.winner, second.duration, second.actions, second.goals))
+
+    def test_encoding_changes_nothing(self):
+        for seed in range(3):
+            plain, encoded = play_game(seed), play_game(seed, encode=True)
+
+            self.assertEqual((plain.winner, plain.duration, plain.actions, plain.goals),
+                             (encoded.winner, encoded.duration, encoded.actions, encoded.goals))
+
+    def test_encoding_changes_nothing_in_teams(self):
+        # two players in a team, so they also exchange what they know:
+        for seed in range(3):
+            plain = play_game(seed, settings_file="../communication/GameMasterSettings.xml")
+            encoded = play_game(seed, settings_file="../communication/GameMasterSettings.xml", encode=True)
+
+            self.assertEqual((plain.winner, plain.duration, plain.actions, plain.goals),
+                             (encoded.winner, encoded.duration, encoded.actions, encoded.goals))
+            self.assertEqual(0, plain.errors + encoded.errors)
+
+    def test_draw_after_max_time(self):
+        result = play_game(3, max_time=0.05)
+
+        self.assertIsNone(result.winner)
+        self.assertLessEqual(result.duration, 0.05)
+
+    def test_broken_strategy_quits(self):
+        result = play_game(2, strategies={Allegiance.RED.value: BrokenStrategy})
+
+        self.assertEqual(Allegiance.BLUE.value, result.winner)
+        self.assertEqual(0, result.goals[Allegiance.RED.value])
+        self.assertEqual(1, result.errors)
+
+    def test_no_sockets(self):
+        game_master = SimulatedGameMaster()
+        player = SimulatedPlayer(game_master, strategy_factory=StrategyFactory)
+
+        self.assertIsNone(game_master.socket)
+        self.assertIsNone(player.socket)
+
+    def test_summary(self):
+        results = [GameResult(winner="red", duration=10, actions=100), GameResult(winner="blue", duration=20),
+                   GameResult(winner="red", duration=30, errors=2), GameResult(winner=None, duration=99)]
+
+        summary = summarize(results)
+        self.assertEqual((0.5, 0.25, 0.25), (summary["red_win_rate"], summary["blue_win_rate"], summary["draw_rate"]))
+        self.assertEqual((20, 20), (summary["mean_length"], summary["median_length"]))
+        self.assertEqual(0.5, summary["errors_per_game"])
@@ -0,0 +1,68 @@
+import xml.etree.ElementTree as ET
+from unittest import TestCase
+
+from src.communication import messages
+from src.communication.info import GameInfo
+from src.communication.sniffer import sniff, UnreadableHeader, sniff_tag, sniff_attribute
+
+XML_MESSAGE_TAG = "{https://se2.mini.pw.edu.pl/17-results/}"
+
+
+class TestSniffer(TestCase):
+    def check_same_as_parser(self, message):
+        root = ET.fromstring(message)
+        tag, attributes = sniff(message.encode())
+        assert tag == root.tag.replace(XML_MESSAGE_TAG, "")
+        assert attributes == {name: value for name, value in root.attrib.items()}
+
+    def test_generated_messages(self):
+        guid = "c094cab7-da7b-457f-89e5-a5c51756035f"
+        self.check_same_as_parser(messages.Move("1", guid, "up"))
+        self.check_same_as_parser(messages.Discover("1", guid))
+        self.check_same_as_parser(messages.Data("3", True))
+        self.check_same_as_parser(messages.JoinGame("easy clone", "red", "leader", "2"))
+        self.check_same_as_parser(messages.RegisteredGames({"0": GameInfo("0", "easy clone", open=True)}))
+
+    def test_escaped_values(self):
+        self.check_same_as_parser('<Note text="&quot;a&quot; &amp; &lt;b&gt; &apos;c&apos;&#10;" other=\'"\'/>')
+
+    def test_character_references(self):
+        self.check_same_as_parser('<Note text="&#65;&#x42;&#x6a;&#233;&#x1F600; &#38;lt; &amp;#65;" other="&#34;&#60;"/>')
+        assert sniff_attribute('<Note text="&#65;&#x42;&amp;#67;"/>', "text") == "AB&#67;"
+
+    def test_sample_messages(self):
+        for sample_name in ("MoveResponseGood", "Move", "JoinGame", "ConfirmJoiningGame", "RegisteredGames",
+                            "KnowledgeExchangeRequest"):
+            with open("../messages/" + sample_name + ".xml", encoding="utf-8-sig") as sample:
+                text = sample.read()
+            root = ET.fromstring(text.encode())
+            tag, attributes = sniff(text.encode())
+            assert tag == root.tag.replace(XML_MESSAGE_TAG, "")
+            assert attributes == {name: value for name, value in root.attrib.items() if not name.startswith("{")}
+
+    def test_prefixed_and_single_quoted(self):
+        tag, attributes = sniff(b"<?xml version='1.0'?>\n<ns:Move xmlns:ns='x' gameId='1' direction = \"up\"/>")
+        assert tag == "Move"
+        assert attributes == {"gameId": "1", "direction": "up"}
+
+    def test_str_is_accepted(self):
+        assert sniff('<Data playerId="2" gameFinished="false"></Data>') == (
+            "Data", {"playerId": "2", "gameFinished": "false"})
+
+    def test_not_xml(self):
+        with self.assertRaises(UnreadableHeader):
+            sniff(b"hello.")
+
+    def test_tag_only(self):
+        for frame in ('<Move xmlns="x" gameId="1"/>', b'<Move xmlns="x"/>', "<?xml version='1.0'?><ns:Move/>",
+                      "<Move/>", "\n  <Move\n gameId='1'/>"):
+            assert sniff_tag(frame) == "Move"
+        with self.assertRaises(UnreadableHeader):
+            sniff_tag("hello.")
+
+    def test_single_attribute(self):
+        for frame in (messages.Move("1", "c094cab7-da7b-457f-89e5-a5c51756035f", "up"),
+                      '<Note text="&quot;a&quot; &amp; &lt;b&gt;" other=\'"\'/>', b'<Note xtext="1" text = "2"/>'):
+            for name, value in sniff(frame)[1].items():
+                assert sniff_attribute(frame, name) == value
+        assert sniff_attribute('<Move gameId="1"/>', "playerGuid") is None
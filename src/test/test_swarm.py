@@ -0,0 +1,86 @@
+import socket
+from threading import Thread
+from unittest import TestCase
+
+from src.communication.event_server import EventLoopServer
+from src.communication.host import GameHost
+from src.communication.swarm import PlayerSwarm, LatencyHistogram
+
+
+class TestPlayerSwarm(TestCase):
+    def setUp(self):
+        self.server = EventLoopServer(False, "127.0.0.1", 0)
+        self.server.socket.listen()
+        self.port = self.server.socket.getsockname()[1]
+        self.server_thread = Thread(target=self.server.accept_clients, daemon=True)
+        self.server_thread.start()
+
+    def tearDown(self):
+        self.server.running = False
+        try:
+            self.server.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.server.socket.close()
+        self.server_thread.join()
+
+    def test_players_join_and_play(self):
+        host = GameHost(copies=2)
+        self.assertTrue(host.connect("127.0.0.1", self.port))
+        Thread(target=host.run, daemon=True).start()
+
+        swarm = PlayerSwarm(4, "127.0.0.1", self.port, ramp=0.2)
+        swarm.run(duration=1.5)
+        stats = swarm.stats()
+        games_on = [game.game_on or game.info.finished or game.games_played > 0 for game in host.games]
+        host.shutdown()
+
+        # both games were filled, one player of each team in each:
+        self.assertEqual({("easy clone 1", 0), ("easy clone 2", 1), ("easy clone 1", 2), ("easy clone 2", 3)},
+                         {(player.game_name, player.index) for player in swarm.players})
+        self.assertEqual([True, True], games_on)
+        self.assertGreater(stats["actions"], 4)
+        self.assertGreater(stats["mean_latency_ms"], 0)
+        self.assertEqual(0, stats["errors"])
+        self.assertEqual(0, stats["connected"])  # the swarm closes its sockets when it stops
+
+
+class TestSwarmWithoutServer(TestCase):
+    def test_no_server(self):
+        # nobody listens on a port we've just freed
+        free = socket.socket()
+        free.bind(("127.0.0.1", 0))
+        port = free.getsockname()[1]
+        free.close()
+        swarm = PlayerSwarm(3, "127.0.0.1", port)
+        swarm.run(duration=5)
+
+        self.assertEqual(3, swarm.stats()["errors"])
+        self.assertEqual(0, swarm.stats()["actions"])
+
+
+class TestLatencyHistogram(TestCase):
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for i in range(1, 1001):
+            histogram.record(i / 1000)
+
+        self.assertEqual(1000, histogram.count)
+        # read from the bucket bounds, so only within the bucket's width:
+        self.assertAlmostEqual(0.5, histogram.percentile(0.5), delta=0.5 * 0.13)
+        self.assertAlmostEqual(0.99, histogram.percentile(0.99), delta=0.99 * 0.13)
+        self.assertEqual(1.0, histogram.percentile(0.999))
+        self.assertEqual(0.0, LatencyHistogram().percentile(0.5))
+
+    def test_merge(self):
+        first, second, both = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for latency in (0.001, 0.002, 0.5):
+            first.record(latency)
+            both.record(latency)
+        for latency in (0.0, 0.03):
+            second.record(latency)
+            both.record(latency)
+
+        first.merge(second)
+        self.assertEqual(both.to_dict(), first.to_dict())
+        self.assertEqual(5, sum(first.to_dict()["buckets"].values()))
@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from src.communication.info import Allegiance, GameInfo
+from src.communication.strategy import StrategyFactory, BasicRedStrategy
+from src.communication.tournament import resolve_strategy, plan_batches, read_results, run_tournament, \
+    summarize_records, parse_pairing
+
+SETTINGS = os.path.join(os.getcwd(), "GameMasterSettings.xml")
+
+
+class TestTournament(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "results.jsonl")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_resolve_strategy(self):
+        self.assertIs(StrategyFactory, resolve_strategy("basic"))
+        self.assertIs(StrategyFactory, resolve_strategy("src.communication.strategy:StrategyFactory"))
+
+        strategy = resolve_strategy("src.communication.strategy:BasicRedStrategy")(Allegiance.RED.value, (1, 2),
+                                                                                    GameInfo())
+        self.assertIsInstance(strategy, BasicRedStrategy)
+        self.assertEqual((Allegiance.RED.value, (1, 2)), (strategy.team, strategy.current_location))
+
+    def test_parse_pairing(self):
+        self.assertEqual(("basic", "my.module:Mine"), parse_pairing("basic,my.module:Mine"))
+        self.assertEqual(("basic", "basic"), parse_pairing("basic"))
+
+    def test_plan_skips_played_games(self):
+        done = {("a.xml", "basic", "basic", seed) for seed in (0, 1, 2, 5)}
+
+        batches = plan_batches(["a.xml", "b.xml"], [("basic", "basic")], range(8), done, batch_size=3)
+        self.assertEqual([("a.xml", "basic", "basic", [3, 4, 6]), ("a.xml", "basic", "basic", [7]),
+                          ("b.xml", "basic", "basic", [0, 1, 2]), ("b.xml", "basic", "basic", [3, 4, 5]),
+                          ("b.xml", "basic", "basic", [6, 7])], batches)
+
+    def test_read_skips_cut_lines(self):
+        record = {"settings": "a.xml", "red": "basic", "blue": "basic", "seed": 0}
+        with open(self.path, "w") as file:
+            file.write(json.dumps(record) + "\n" + json.dumps(record)[:20])
+
+        self.assertEqual([record], read_results(self.path))
+        self.assertEqual([], read_results(self.path + ".missing"))
+
+    def test_run_and_resume(self):
+        records = run_tournament([SETTINGS], [("basic", "basic")], range(6), self.path, workers=1, batch_size=4)
+
+        self.assertEqual(list(range(6)), sorted(record["seed"] for record in records))
+        self.assertEqual(records, read_results(self.path))
+
+        # only the new seeds are played:
+        more = run_tournament([SETTINGS], [("basic", "basic")], range(8), self.path, workers=1, batch_size=4)
+        self.assertEqual(list(range(8)), sorted(record["seed"] for record in more))
+        self.assertEqual(8, len(read_results(self.path)))
+
+        summary = summarize_records(more)[SETTINGS, "basic", "basic"]
+        self.assertEqual(8, summary["games"])
+        self.assertAlmostEqual(1, summary["red_win_rate"] + summary["blue_win_rate"] + summary["draw_rate"])